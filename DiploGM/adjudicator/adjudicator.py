@@ -2,14 +2,19 @@ from __future__ import annotations
 
 import abc
 import collections
+from array import array
 import logging
 from typing import TYPE_CHECKING
 
+from DiploGM.adjudicator.convoy_index import ConvoyIndex
+from DiploGM.adjudicator import trace as resolution_trace
 from DiploGM.adjudicator.defs import (
     ResolutionState,
     Resolution,
     AdjudicableOrder,
+    OrderTable,
     OrderType,
+    to_csr,
 )
 
 if TYPE_CHECKING:
@@ -38,6 +43,8 @@ from DiploGM.models.order import (
     RebellionMarker
 )
 
+from DiploGM.models.board_state import diff_board_states, encode_unit_order, get_board_state, unit_key
+from DiploGM.models.phase_delta import PhaseDelta
 from DiploGM.models.player import PlayerClass
 from DiploGM.models.province import Province, ProvinceType
 from DiploGM.models.unit import UnitType, Unit
@@ -45,7 +52,17 @@ from DiploGM.db import database
 
 logger = logging.getLogger(__name__)
 
-
+# Integer forms of the enums, as stored in OrderTable columns
+_SUCCEEDS = Resolution.SUCCEEDS.value
+_FAILS = Resolution.FAILS.value
+_UNRESOLVED = ResolutionState.UNRESOLVED.value
+_GUESSING = ResolutionState.GUESSING.value
+_RESOLVED = ResolutionState.RESOLVED.value
+_HOLD = OrderType.HOLD.value
+_CORE = OrderType.CORE.value
+_MOVE = OrderType.MOVE.value
+_SUPPORT = OrderType.SUPPORT.value
+_CONVOY = OrderType.CONVOY.value
 
 
 def convoy_is_possible(start: Province, end: Province, check_fleet_orders=False) -> bool:
@@ -108,7 +125,12 @@ def _validate_move_fleet(province: Province, order: Move | RetreatMove, unit: Un
     return True, None
 
 
-def order_is_valid(province: Province, order: Order, strict_convoys_supports=False, strict_coast_movement=True) -> tuple[bool, str | None]:
+def order_is_valid(
+    province: Province,
+    order: Order,
+    strict_convoys_supports=False,
+    strict_coast_movement=True,
+) -> tuple[bool, str | None]:
     """
     Checks if order from given location is valid for configured board
 
@@ -122,121 +144,191 @@ def order_is_valid(province: Province, order: Order, strict_convoys_supports=Fal
         - bool result is True if the order is valid, False otherwise
         - str reason is arbitrary if the order is valid, provides reasoning if invalid
     """
-    if order is None:
-        return False, "Order is missing"
-
-    if isinstance(order, Support) or isinstance(order, ConvoyTransport):
-        source = order.source
-        source_unit = source.unit
-
-        if source_unit == None:
-            return False, f"No unit for supporting / convoying at {source}"
-
-        order.source = source_unit.province
-
-    unit = province.unit
-    if unit is None:
-        return False, f"There is no unit in {province}"
-
-    if isinstance(order, Hold) or isinstance(order, RetreatDisband) or isinstance(order, NMR):
-        return True, None
-    elif isinstance(order, Core):
-        if not province.has_supply_center:
-            return False, f"{province} does not have a supply center to core"
-        if province.get_owner() != unit.player:
-            return False, "Units can only core in owned supply centers"
-        return True, None
-    elif isinstance(order, Move) or isinstance(order, RetreatMove):
-        destination_province = order.destination
-        if unit.unit_type == UnitType.ARMY:
-            valid, reason = _validate_move_army(province, destination_province)
-            if not valid:
-                return valid, reason
-        elif unit.unit_type == UnitType.FLEET:
-            valid, reason = _validate_move_fleet(province, order, unit, strict_coast_movement)
-            if not valid:
-                return valid, reason
-        else:
-            raise ValueError("Unknown type of unit. Something has broken in the bot. Please report this")
-
-        if isinstance(order, RetreatMove) and destination_province.unit is not None:
-            return False, "Cannot retreat to occupied provinces"
-        return True, None
-    elif isinstance(order, ConvoyMove):
-        if unit.unit_type != UnitType.ARMY:
-            return False, "Only armies can be convoyed"
-        destination_province = order.destination
-        if destination_province.type == ProvinceType.SEA:
-            return False, "Cannot convoy to a sea space"
-        if destination_province == unit.province:
-            return False, "Cannot convoy army to its previous space"
-        return (
-            convoy_is_possible(
-                province,
-                destination_province,
-                check_fleet_orders=strict_convoys_supports,
-            ),
-            f"No valid convoy path from {province} to {order.destination}",
-        )
-    elif isinstance(order, ConvoyTransport):
-        if unit.unit_type != UnitType.FLEET:
-            return False, "Only fleets can convoy"
-        source_unit = order.source.unit
-        if not isinstance(source_unit, Unit):
-            return False, "There is no unit to convoy"
-        if strict_convoys_supports:
-            if not isinstance(source_unit.order, (Move, ConvoyMove)) or source_unit.order.destination != order.destination:
-                return False, f"Convoyed unit {order.source} did not make corresponding order"
-        valid_move, reason = order_is_valid(
-            order.source, ConvoyMove(order.destination), strict_convoys_supports
-        )
-        if not valid_move:
-            return valid_move, reason
-        # Check we are actually part of the convoy chain
-        destination_province = order.destination
-        if not convoy_is_possible(
-            order.source, destination_province, check_fleet_orders=strict_convoys_supports
-        ):
-            return False, f"No valid convoy path from {order.source} to {province}"
-        return True, None
-    elif isinstance(order, Support):
-        source_unit = order.source.unit
-        if not isinstance(source_unit, Unit):
-            return False, "There is no unit to support"
-        if isinstance(source_unit.order, Core) and order_is_valid(order.source, source_unit.order):
-            return False, f"Cannot support a unit that is coring"
-
-        move_valid, _ = order_is_valid(province, Move(order.destination), strict_convoys_supports, False)
-        if not move_valid:
-            return False, f"Cannot support somewhere you can't move to"
-
-        is_support_hold = order.source == order.destination
-        source_to_destination_valid = (
-            is_support_hold
-            or order_is_valid(order.source, Move(order.destination), strict_convoys_supports, strict_coast_movement=False)[0]
-            or order_is_valid(order.source, ConvoyMove(order.destination), strict_convoys_supports)[0]
+    return PhaseValidator().validate(province, order, strict_convoys_supports, strict_coast_movement)
+
+
+class PhaseValidator:
+    """
+    Validates the orders of a phase, sharing work between them.
+
+    Validating a support or convoy also validates the move it supports or convoys, so with many supports for one
+    unit the same checks come up again and again. Those nested checks are remembered by province, order kind,
+    destination, coast and strictness. Orders ordered to units may change between calls to validate, since only
+    the nested checks are remembered, but the units themselves must not move. Strict convoy checks do look at fleet
+    orders, so call orders_changed() before validating a different set of orders with the same validator.
+    """
+
+    def __init__(self, board: Board | None = None):
+        # Without a board there's no convoy index, and every convoy question is a fresh search
+        self._convoy_index = ConvoyIndex(board) if board is not None else None
+        self._board = board
+        self._memo: dict[tuple, tuple[bool, str | None]] = {}
+        # Nested checks with strict_convoys_supports, which depend on the orders of convoying fleets
+        self._strict_memo: dict[tuple, tuple[bool, str | None]] = {}
+        self.memo_hits = 0
+
+    def orders_changed(self):
+        """Forgets the checks that depended on orders, keeping the ones that only depend on where units are."""
+        self._strict_memo = {}
+        if self._convoy_index is not None:
+            self._convoy_index.orders_changed()
+
+    def validate_all(self, strict_convoys_supports=False) -> dict[Unit, tuple[bool, str | None]]:
+        """Validates the order of every (non-dislodged) unit on the board, supports last as in adjudication."""
+        assert self._board is not None
+        return self.validate_units(
+            [unit for unit in self._board.units if unit.province.unit is unit], strict_convoys_supports
         )
 
-        if not source_to_destination_valid:
-            return False, "Supported unit can't reach destination"
-
-        if strict_convoys_supports:
-            # if move is invalid then it doesn't go through
-            if (
-                is_support_hold and isinstance(source_unit.order, (Move, ConvoyMove))
-            ) or (
-                not is_support_hold and 
-                (
-                    not isinstance(source_unit.order, (Move, ConvoyMove)) or
-                    source_unit.order.destination != order.destination or
-                    (order.destination_coast is not None and source_unit.order.destination_coast != order.destination_coast)
-                )
+    def validate_units(self, units: list[Unit], strict_convoys_supports=False) -> dict[Unit, tuple[bool, str | None]]:
+        results = {}
+        for unit in sorted(units, key=lambda unit: isinstance(unit.order, Support)):
+            results[unit] = self.validate(unit.province, unit.order, strict_convoys_supports)
+        return results
+
+    def validate(
+        self, province: Province, order: Order | None, strict_convoys_supports=False, strict_coast_movement=True
+    ) -> tuple[bool, str | None]:
+        """Same as order_is_valid."""
+        if order is None:
+            return False, "Order is missing"
+
+        if isinstance(order, Support) or isinstance(order, ConvoyTransport):
+            source = order.source
+            source_unit = source.unit
+
+            if source_unit == None:
+                return False, f"No unit for supporting / convoying at {source}"
+
+            order.source = source_unit.province
+
+        unit = province.unit
+        if unit is None:
+            return False, f"There is no unit in {province}"
+
+        if isinstance(order, Hold) or isinstance(order, RetreatDisband) or isinstance(order, NMR):
+            return True, None
+        elif isinstance(order, Core):
+            if not province.has_supply_center:
+                return False, f"{province} does not have a supply center to core"
+            if province.get_owner() != unit.player:
+                return False, "Units can only core in owned supply centers"
+            return True, None
+        elif isinstance(order, Move) or isinstance(order, RetreatMove):
+            destination_province = order.destination
+            if unit.unit_type == UnitType.ARMY:
+                valid, reason = _validate_move_army(province, destination_province)
+                if not valid:
+                    return valid, reason
+            elif unit.unit_type == UnitType.FLEET:
+                valid, reason = _validate_move_fleet(province, order, unit, strict_coast_movement)
+                if not valid:
+                    return valid, reason
+            else:
+                raise ValueError("Unknown type of unit. Something has broken in the bot. Please report this")
+
+            if isinstance(order, RetreatMove) and destination_province.unit is not None:
+                return False, "Cannot retreat to occupied provinces"
+            return True, None
+        elif isinstance(order, ConvoyMove):
+            if unit.unit_type != UnitType.ARMY:
+                return False, "Only armies can be convoyed"
+            destination_province = order.destination
+            if destination_province.type == ProvinceType.SEA:
+                return False, "Cannot convoy to a sea space"
+            if destination_province == unit.province:
+                return False, "Cannot convoy army to its previous space"
+            return (
+                self._convoy_is_possible(
+                    province,
+                    destination_province,
+                    check_fleet_orders=strict_convoys_supports,
+                ),
+                f"No valid convoy path from {province} to {order.destination}",
+            )
+        elif isinstance(order, ConvoyTransport):
+            if unit.unit_type != UnitType.FLEET:
+                return False, "Only fleets can convoy"
+            source_unit = order.source.unit
+            if not isinstance(source_unit, Unit):
+                return False, "There is no unit to convoy"
+            if strict_convoys_supports:
+                if not isinstance(source_unit.order, (Move, ConvoyMove)) or source_unit.order.destination != order.destination:
+                    return False, f"Convoyed unit {order.source} did not make corresponding order"
+            valid_move, reason = self._validate_nested(
+                order.source, ConvoyMove(order.destination), strict_convoys_supports
+            )
+            if not valid_move:
+                return valid_move, reason
+            # Check we are actually part of the convoy chain
+            destination_province = order.destination
+            if not self._convoy_is_possible(
+                order.source, destination_province, check_fleet_orders=strict_convoys_supports
             ):
-                return False, f"Supported unit {order.source} did not make corresponding order"
-
-        return True, None
+                return False, f"No valid convoy path from {order.source} to {province}"
+            return True, None
+        elif isinstance(order, Support):
+            source_unit = order.source.unit
+            if not isinstance(source_unit, Unit):
+                return False, "There is no unit to support"
+            if isinstance(source_unit.order, Core) and self._validate_nested(order.source, Core())[0]:
+                return False, f"Cannot support a unit that is coring"
+
+            move_valid, _ = self._validate_nested(province, Move(order.destination), strict_convoys_supports, False)
+            if not move_valid:
+                return False, f"Cannot support somewhere you can't move to"
+
+            is_support_hold = order.source == order.destination
+            source_to_destination_valid = (
+                is_support_hold
+                or self._validate_nested(order.source, Move(order.destination), strict_convoys_supports, False)[0]
+                or self._validate_nested(order.source, ConvoyMove(order.destination), strict_convoys_supports)[0]
+            )
+
+            if not source_to_destination_valid:
+                return False, "Supported unit can't reach destination"
+
+            if strict_convoys_supports:
+                # if move is invalid then it doesn't go through
+                if (
+                    is_support_hold and isinstance(source_unit.order, (Move, ConvoyMove))
+                ) or (
+                    not is_support_hold and 
+                    (
+                        not isinstance(source_unit.order, (Move, ConvoyMove)) or
+                        source_unit.order.destination != order.destination or
+                        (order.destination_coast is not None and source_unit.order.destination_coast != order.destination_coast)
+                    )
+                ):
+                    return False, f"Supported unit {order.source} did not make corresponding order"
+
+            return True, None
+
+        return False, f"Unknown move type: {order.__class__.__name__}"
+
+    def _validate_nested(
+        self, province: Province, order: Core | Move | ConvoyMove, strict_convoys_supports=False, strict_coast_movement=True
+    ) -> tuple[bool, str | None]:
+        # Only for orders made up by validate itself, so nobody sees the coast it may fill in on a Move
+        key = (
+            province,
+            order.__class__,
+            order.destination,
+            order.destination_coast,
+            strict_convoys_supports,
+            strict_coast_movement,
+        )
+        memo = self._strict_memo if strict_convoys_supports else self._memo
+        if key in memo:
+            self.memo_hits += 1
+        else:
+            memo[key] = self.validate(province, order, strict_convoys_supports, strict_coast_movement)
+        return memo[key]
 
-    return False, f"Unknown move type: {order.__class__.__name__}"
+    def _convoy_is_possible(self, start: Province, end: Province, check_fleet_orders: bool) -> bool:
+        if self._convoy_index is None:
+            return convoy_is_possible(start, end, check_fleet_orders)
+        return self._convoy_index.convoy_is_possible(start, end, check_fleet_orders)
 
 
 class MapperInformation:
@@ -260,56 +352,69 @@ class Adjudicator:
     def run(self) -> Board:
         pass
 
+    def run_with_delta(self) -> tuple[Board, PhaseDelta]:
+        """Like run(), but also says what the adjudication changed."""
+        before = get_board_state(self._board)
+        # Orders as they are adjudicated; the adjudicator clears them once it's done
+        orders = {unit_key(unit): unit.order for unit in self._board.units}
+        new_board = self.run()
+        diff = diff_board_states(before, get_board_state(new_board))
+        return new_board, PhaseDelta(before, {key: encode_unit_order(order) for key, order in orders.items()}, diff)
+
 
 class BuildsAdjudicator(Adjudicator):
     def __init__(self, board: Board):
         super().__init__(board)
 
     def vassal_adju(self):
+        # Linear in the number of players and relationship orders; chaos games have a player per province
         new_vassals: dict[Player, list[Player]] = {}
         new_lieges: dict[Player, Player | None] = {}
         for player in self._board.players:
-            scs = 0
-            for vassal in player.vassals:
-                scs += len(vassal.centers)
             new_vassals[player] = player.vassals.copy()
+            scs = sum(len(vassal.centers) for vassal in player.vassals)
             if scs > len(player.centers):
+                # Vassals disown in order until the rest fit; if they never do, all of them are lost
+                vassals = set(player.vassals)
+                disowned: set[Player] = set()
                 for order in player.vassal_orders.values():
-                    if isinstance(order, Disown) and order.player in player.vassals:
-                        new_vassals[player].remove(order.player)
-                    scs2 = 0
-                    for vassal in new_vassals[player]:
-                        scs2 += len(vassal.centers)
-                    if scs2 > len(player.centers):
+                    if isinstance(order, Disown) and order.player in vassals:
+                        disowned.add(order.player)
+                        scs -= len(order.player.centers)
+                    if scs > len(player.centers):
                         new_vassals[player] = []
+                        break
+                else:
+                    new_vassals[player] = _without_first(player.vassals, disowned)
             else:
                 for order in player.vassal_orders.values():
                     if isinstance(order, Vassal):
                         vassal = order.player
-                        if player in vassal.vassal_orders and isinstance(vassal.vassal_orders[player], Liege):
-                            if (not vassal.liege) or (vassal.liege in player.vassal_orders and isinstance(player.vassal_orders[vassal.liege], RebellionMarker)):
+                        if isinstance(vassal.vassal_orders.get(player), Liege):
+                            if (not vassal.liege) or isinstance(player.vassal_orders.get(vassal.liege), RebellionMarker):
                                 new_vassals[player].append(vassal)
-                
+
+        # vassal -> every player taking them as a vassal, in board order
+        offers: dict[Player, list[Player]] = {}
+        for liege in self._board.players:
+            for vassal in new_vassals[liege]:
+                lieges = offers.setdefault(vassal, [])
+                if not lieges or lieges[-1] is not liege:
+                    lieges.append(liege)
+
+        overcommitted: dict[Player, set[Player]] = {}
         for player in self._board.players:
-            new_liege = None
-            overcommited = False
-            for liege in self._board.players:
-                if player in new_vassals[liege]:
-                    if new_liege is None:
-                        new_liege = liege
-                    else:
-                        overcommited = True
-                        break
-            if overcommited:
-                for liege in self._board.players:
-                    if player in new_vassals[liege]:
-                        new_vassals[liege].remove(player)
-            for order in player.vassal_orders:
-                if isinstance(order, Defect) and player in new_vassals[order.player]:
-                    new_vassals[order.player].remove(player)
-                    new_liege = None
-            new_lieges[player] = new_liege
-            
+            lieges = offers.get(player, [])
+            new_lieges[player] = lieges[0] if lieges else None
+            # A vassal taken by more than one liege belongs to none of them (but keeps the first as its liege)
+            if len(lieges) > 1:
+                for liege in lieges:
+                    overcommitted.setdefault(liege, set()).add(player)
+            # Defect orders are deliberately not applied here; the check this replaced looked at vassal_orders' keys,
+            # so they never took effect
+        for liege, players in overcommitted.items():
+            new_vassals[liege] = _without_first(new_vassals[liege], players)
+
         for player in self._board.players:
             player.liege = new_lieges[player]
             player.vassals = new_vassals[player]
@@ -386,6 +491,18 @@ class BuildsAdjudicator(Adjudicator):
         return self._board
 
 
+def _without_first(players: list[Player], removed: set[Player]) -> list[Player]:
+    """players without the first occurrence of each player in removed, like calling list.remove for each."""
+    remaining = []
+    seen: set[Player] = set()
+    for player in players:
+        if player in removed and player not in seen:
+            seen.add(player)
+        else:
+            remaining.append(player)
+    return remaining
+
+
 class RetreatsAdjudicator(Adjudicator):
     def __init__(self, board: Board):
         super().__init__(board)
@@ -466,10 +583,20 @@ class RetreatsAdjudicator(Adjudicator):
 
 class MovesAdjudicator(Adjudicator):
     # Algorithm from https://diplom.org/Zine/S2009M/Kruijswijk/DipMath_Chp6.htm
-    def __init__(self, board: Board):
+    def __init__(self, board: Board, preview: bool = False, validator: PhaseValidator | None = None):
+        """
+        :param preview: Adjudicate without touching the units' orders (no NMRs filled in, no hasFailed flags),
+                        for predicting results while orders are still being submitted
+        :param validator: A PhaseValidator for this board to share checks with earlier adjudications of other orders
+                          for the same positions; orders_changed() is called on it first
+        """
         super().__init__(board)
  
-        self.orders: set[AdjudicableOrder] = set()
+        self.orders: list[AdjudicableOrder] = []
+        if validator is None:
+            validator = PhaseValidator(board)
+        else:
+            validator.orders_changed()
 
         # run supports after everything else since illegal cores / moves should be treated as holds
         units = sorted(board.units, key=lambda unit: isinstance(unit.order, Support))
@@ -478,102 +605,179 @@ class MovesAdjudicator(Adjudicator):
             # Importantly, this includes supports for which the corresponding unit didn't make the same move
             # Same for convoys
             
-            if unit.order is None:
-                unit.order = NMR()
+            unit_order = unit.order
+            if unit_order is None:
+                unit_order = NMR()
+                if not preview:
+                    unit.order = unit_order
 
             failed: bool = False
             # indicates that an illegal move / core can't be support held
             not_supportable: bool = False
 
             # TODO clean up mapper info
-            valid, reason = order_is_valid(unit.province, unit.order, strict_convoys_supports=True)
+            valid, reason = validator.validate(unit.province, unit_order, strict_convoys_supports=True)
             if not valid:
                 logger.debug(f"Order for {unit} is invalid because {reason}")
-                if isinstance(unit.order, Move) and unit.unit_type == UnitType.ARMY:
+                if isinstance(unit_order, Move) and unit.unit_type == UnitType.ARMY:
                     logger.debug("Retrying move order as ConvoyMove")
                     # TODO Runs duplicated code
-                    valid, reason = order_is_valid(
-                        unit.province, ConvoyMove(unit.order.destination), strict_convoys_supports=False
+                    valid, reason = validator.validate(
+                        unit.province, ConvoyMove(unit_order.destination), strict_convoys_supports=False
                     )
                     if not valid:  # move is invalid in the first place, so it is a failed move
                         not_supportable = True
                         failed = True
                     else:
-                        strict_valid, reason = order_is_valid(
-                            unit.province, ConvoyMove(unit.order.destination), strict_convoys_supports=True
+                        strict_valid, reason = validator.validate(
+                            unit.province, ConvoyMove(unit_order.destination), strict_convoys_supports=True
                         )
 
                         if not strict_valid:  # move is valid but no convoy, so it is a failed move
                             not_supportable = True
                             failed = True
                         else:
-                            unit.order = ConvoyMove(unit.order.destination)
-                elif isinstance(unit.order, Core):
+                            unit_order = ConvoyMove(unit_order.destination)
+                            if not preview:
+                                unit.order = unit_order
+                elif isinstance(unit_order, Core):
                     not_supportable = True
                     failed = True
                 else:
                     failed = True
 
-            order = AdjudicableOrder(unit)
+            order = AdjudicableOrder(unit, unit_order)
             if failed:
                 self.failed_or_invalid_units.add(MapperInformation(unit))
                 order.is_valid = False
-                unit.order.hasFailed = True
+                if not preview:
+                    unit_order.hasFailed = True
             if not_supportable:
                 order.not_supportable = True
 
-            self.orders.add(order)
-
-
-        self.orders_by_province = {order.current_province.name: order for order in self.orders}
-        self.moves_by_destination: dict[str, set[AdjudicableOrder]] = {}
-        for order in self.orders:
-            if order.type == OrderType.MOVE:
-                if order.destination_province.name not in self.moves_by_destination:
-                    self.moves_by_destination[order.destination_province.name] = set()
-                self.moves_by_destination[order.destination_province.name].add(order)
-
-        for order in self.orders:
-            if order.type == OrderType.SUPPORT:
-                self.orders_by_province[order.source_province.name].supports.add(order)
-            if order.type == OrderType.CONVOY:
-                self.orders_by_province[order.source_province.name].convoys.add(order)
-
-        self._dependencies: list[AdjudicableOrder] = []
+            self.orders.append(order)
+
+        self._table = OrderTable(self.orders)
+        # Number of times each order appears in self._dependencies
+        self._dependency_count = array("l", [0]) * len(self.orders)
+        self._dependencies: list[int] = []
+        # Number of strongly connected components of the order dependency graph that contain a cycle,
+        # i.e. the ones that needed the guessing algorithm; set by resolve_all()
+        self.cyclic_components: int = 0
+        # How often the resolver ran, for benchmarks
+        self.resolve_calls: int = 0
+        self.adjudicate_calls: int = 0
+        self.backup_rule_calls: int = 0
+        self.trace: resolution_trace.ResolutionTrace | None = None
+        # Move order -> the convoys that can carry it, see _convoy_path_graph
+        self._convoy_paths: dict[int, tuple[list[int], dict[int, list[int]], dict[int, bool]]] = {}
 
         self._find_convoy_kidnappings()
 
     def _find_convoy_kidnappings(self):
-        for order in self.orders:
-            if order.type != OrderType.MOVE:
+        table = self._table
+        for i in range(len(self.orders)):
+            if table.type[i] != _MOVE:
                 continue
 
-            if len(self.orders_by_province[order.source_province.name].convoys) == 0:
+            if len(table.convoys(table.order_at[table.source[i]])) == 0:
                 continue
 
             # According to the 1971 ruling in DATC, the army only is kidnapped if
             # 1. the army's destination is moving back at it
             # 2.  the convoy isn't disrupted
 
-            if order.destination_province.name in self.orders_by_province:
-                attacked_order = self.orders_by_province[order.destination_province.name]
-                if attacked_order.destination_province == order.source_province:
-                    if self._adjudicate_convoys_for_order(order) == Resolution.SUCCEEDS:
-                        order.is_convoy = True
+            attacked = table.order_at[table.destination[i]]
+            if attacked != -1 and table.destination[attacked] == table.source[i]:
+                if self._adjudicate_convoys_for_order(i) == _SUCCEEDS:
+                    table.is_convoy[i] = True
 
     def run(self) -> Board:
+        table = self._table
+        for i in range(len(self.orders)):
+            table.state[i] = _UNRESOLVED
+        self.resolve_all()
         for order in self.orders:
-            order.state = ResolutionState.UNRESOLVED
-        for order in self.orders:
-            self._resolve_order(order)
-            order.get_original_order().hasFailed = (order.resolution == Resolution.FAILS)
+            order.get_original_order().hasFailed = (table.resolution[order.id] == _FAILS)
         if self.save_orders:
-            database.get_connection().save_order_for_units(self._board, set(o.base_unit for o in self.orders))
+            database.get_async_connection().save_order_for_units(self._board, set(o.base_unit for o in self.orders))
         self._update_board()
         return self._board
 
+    def start_trace(self) -> resolution_trace.ResolutionTrace:
+        """Records every step of resolution from now on; see DiploGM.adjudicator.trace."""
+        self.trace = resolution_trace.ResolutionTrace()
+        # Shadow _resolve on this instance only, so untraced adjudications don't pay for the check
+        self._resolve = self._traced_resolve
+        return self.trace
+
+    def _traced_resolve(self, order: int) -> int:
+        assert self.trace is not None
+        if self._table.state[order] != _UNRESOLVED:
+            return MovesAdjudicator._resolve(self, order)
+        self.trace.record(resolution_trace.ENTER, order)
+        result = MovesAdjudicator._resolve(self, order)
+        self.trace.record(resolution_trace.EXIT, order, result)
+        return result
+
+    def resolve_all(self):
+        # Resolve the dependency graph one strongly connected component at a time, dependencies first.
+        # An acyclic component then resolves in a single pass, since everything it depends on is already resolved;
+        # only components containing a cycle go through guessing and the backup rule.
+        # The graph only decides the resolution order, so a missing edge costs time, not correctness.
+        ptr, idx = self._dependency_graph()
+        self.cyclic_components = 0
+        for component in _strongly_connected_components(ptr, idx):
+            if len(component) > 1 or component[0] in idx[ptr[component[0]]:ptr[component[0] + 1]]:
+                self.cyclic_components += 1
+            for order in component:
+                self._resolve(order)
+        logger.debug(f"adjudicator.moves: {len(self.orders)} orders, {self.cyclic_components} cyclic components")
+
+    def _dependency_graph(self) -> tuple[array, array]:
+        # Edge i -> j if adjudicating order i may resolve order j; mirrors the _adjudicate_* methods below
+        table = self._table
+        edges: list[tuple[int, int]] = []
+        for i in range(len(self.orders)):
+            order_type = table.type[i]
+            if order_type == _MOVE:
+                edges.extend((i, j) for j in self._move_dependencies(i))
+            elif order_type == _CORE or order_type == _SUPPORT:
+                for move_here in table.moves_to(table.current[i]):
+                    if not table.is_valid[move_here] or move_here == i:
+                        continue
+                    if table.country[move_here] == table.country[i] and order_type == _SUPPORT:
+                        continue
+                    if table.is_convoy[move_here]:
+                        edges.extend((i, j) for j in table.convoys(move_here))
+                    elif table.current[move_here] == table.destination[i]:
+                        edges.append((i, move_here))
+            elif order_type == _CONVOY:
+                # Convoys are disrupted by a move here that would succeed, regardless of that move's own state
+                for move_here in table.moves_to(table.current[i]):
+                    edges.extend((i, j) for j in self._move_dependencies(move_here))
+        return to_csr(len(self.orders), edges)
+
+    def _move_dependencies(self, order: int) -> list[int]:
+        table = self._table
+        dependencies = list(table.supports(order))
+        if table.is_convoy[order]:
+            dependencies.extend(table.convoys(order))
+        attacked = table.order_at[table.destination[order]]
+        if attacked != -1:
+            if table.type[attacked] == _MOVE:
+                dependencies.append(attacked)
+            dependencies.extend(table.supports(attacked))
+        for opponent in table.moves_to(table.destination[order]):
+            if opponent == order or not table.is_valid[opponent]:
+                continue
+            dependencies.extend(table.supports(opponent))
+            if table.is_convoy[opponent]:
+                dependencies.extend(table.convoys(opponent))
+        return dependencies
+
     def _update_board(self):
-        if not all(order.state == ResolutionState.RESOLVED for order in self.orders):
+        if not all(state == _RESOLVED for state in self._table.state):
             raise RuntimeError("Cannot update board until all orders are resolved!")
 
         for order in self.orders:
@@ -630,258 +834,341 @@ class MovesAdjudicator(Adjudicator):
                     self._board.change_owner(unit.province, unit.player)
 
     def _find_contested_areas(self):
+        table = self._table
         bounces_and_occupied = set()
-        for order in self.orders:
-            if order.type == OrderType.MOVE:
-                if order.is_convoy:
-                    # unsuccessful convoys don't bounce
-                    if order.resolution == Resolution.SUCCEEDS:
-                        bounces_and_occupied.add(order.destination_province)
-                else:
-                    # TODO duplicated head on code
-                    if order.destination_province.name in self.orders_by_province:
-                        attacked_order = self.orders_by_province[order.destination_province.name]
-                        if (
-                            attacked_order.type == OrderType.MOVE
-                            and attacked_order.destination_province == order.current_province
-                        ):
-                            # if this is a head on attack, and the unit lost the head on, then the area is not contested
-                            head_on = not attacked_order.is_convoy and not order.is_convoy
-                            if head_on and order.resolution == Resolution.FAILS:
-                                continue
-
-                    bounces_and_occupied.add(order.destination_province)
+        for i in range(len(self.orders)):
+            if table.type[i] != _MOVE:
+                continue
+            if table.is_convoy[i]:
+                # unsuccessful convoys don't bounce
+                if table.resolution[i] == _SUCCEEDS:
+                    bounces_and_occupied.add(table.provinces[table.destination[i]])
+            else:
+                # TODO duplicated head on code
+                attacked = table.order_at[table.destination[i]]
+                if attacked != -1 and table.type[attacked] == _MOVE and table.destination[attacked] == table.current[i]:
+                    # if this is a head on attack, and the unit lost the head on, then the area is not contested
+                    head_on = not table.is_convoy[attacked] and not table.is_convoy[i]
+                    if head_on and table.resolution[i] == _FAILS:
+                        continue
+
+                bounces_and_occupied.add(table.provinces[table.destination[i]])
 
         for unit in self._board.units:
             bounces_and_occupied.add(unit.province)
 
         return bounces_and_occupied
 
-    def _adjudicate_convoys_for_order(self, order: AdjudicableOrder) -> Resolution:
+    def _adjudicate_convoys_for_order(self, order: int) -> int:
         # Breadth-first search to determine if there is a convoy connection for order.
         # Only considers it a success if it passes through at least one fleet to get to the destination
-        assert order.type == OrderType.MOVE
-        visited: set[str] = set()
+        table = self._table
+        assert table.type[order] == _MOVE
+        if order not in self._convoy_paths:
+            self._convoy_paths[order] = self._convoy_path_graph(order)
+        from_source, next_convoys, reaches_destination = self._convoy_paths[order]
+        visited: set[int] = set()
         to_visit = collections.deque()
-        to_visit.append(order.source_province)
+        to_visit.append(-1)
         while 0 < len(to_visit):
             current = to_visit.popleft()
             # Have to pass through at least one convoying fleet
-            if current != order.source_province and order.destination_province in current.adjacent:
-                return Resolution.SUCCEEDS
+            if current != -1 and reaches_destination[current]:
+                return _SUCCEEDS
 
-            visited.add(current.name)
+            visited.add(current)
 
-            adjacent_convoys = {
-                convoy_order for convoy_order in order.convoys if convoy_order.current_province in current.adjacent
-            }
-            for convoy in adjacent_convoys:
-                if convoy.current_province.name in visited:
+            for convoy in (from_source if current == -1 else next_convoys[current]):
+                if convoy in visited:
                     continue
-                if self._resolve_order(convoy) == Resolution.SUCCEEDS:
-                    to_visit.append(convoy.current_province)
-        return Resolution.FAILS
-
-    def _adjudicate_order(self, order: AdjudicableOrder) -> Resolution:
-        if order.type == OrderType.HOLD:
+                if self._resolve(convoy) == _SUCCEEDS:
+                    to_visit.append(convoy)
+        return _FAILS
+
+    def _convoy_path_graph(self, order: int) -> tuple[list[int], dict[int, list[int]], dict[int, bool]]:
+        # Which of the convoys for order border the source, each other and the destination; these don't change during
+        # resolution, so the search above only has to look at whether each convoy succeeds
+        table = self._table
+        source = table.provinces[table.source[order]]
+        destination = table.provinces[table.destination[order]]
+        convoys = list(table.convoys(order))
+        from_source = [convoy for convoy in convoys if table.provinces[table.current[convoy]] in source.adjacent]
+        next_convoys = {}
+        reaches_destination = {}
+        for convoy in convoys:
+            adjacent = table.provinces[table.current[convoy]].adjacent
+            next_convoys[convoy] = [
+                other for other in convoys if other != convoy and table.provinces[table.current[other]] in adjacent
+            ]
+            reaches_destination[convoy] = destination in adjacent
+        return from_source, next_convoys, reaches_destination
+
+    def _adjudicate_order(self, order: int) -> int:
+        self.adjudicate_calls += 1
+        table = self._table
+        order_type = table.type[order]
+        if order_type == _HOLD:
             # Resolution is arbitrary for holds; they don't do anything
-            return Resolution.SUCCEEDS
-        elif order.type == OrderType.CORE or order.type == OrderType.SUPPORT:
+            return _SUCCEEDS
+        elif order_type == _CORE or order_type == _SUPPORT:
             # Both these orders fail if attacked by nation, even if that order isn't successful
-            moves_here = self.moves_by_destination.get(order.current_province.name, set()) - {order}
-            for move_here in moves_here:
+            for move_here in table.moves_to(table.current[order]):
+                if move_here == order:
+                    continue
                 # coring should fail even if the attack comes from the same nation
-                if move_here.country == order.country and order.type == OrderType.SUPPORT:
+                if table.country[move_here] == table.country[order] and order_type == _SUPPORT:
                     continue
-                if not move_here.is_valid:
+                if not table.is_valid[move_here]:
                     continue
-                if not move_here.is_convoy:
-                    if move_here.current_province != order.destination_province:
-                        return Resolution.FAILS
+                if not table.is_convoy[move_here]:
+                    if table.current[move_here] != table.destination[order]:
+                        return _FAILS
                     else:
                         # If we are being attacked by the place we are supporting against,
                         # our support only fails if they succeed
-                        if self._resolve_order(move_here) == Resolution.SUCCEEDS:
-                            return Resolution.FAILS
+                        if self._resolve(move_here) == _SUCCEEDS:
+                            return _FAILS
                 else:
                     # decide to fail convoys that cut support to their attack
                     if (
-                        self._adjudicate_convoys_for_order(move_here) == Resolution.SUCCEEDS
-                        and move_here.current_province != order.destination_province
+                        self._adjudicate_convoys_for_order(move_here) == _SUCCEEDS
+                        and table.current[move_here] != table.destination[order]
                     ):
-                        return Resolution.FAILS
-            return Resolution.SUCCEEDS
-        elif order.type == OrderType.CONVOY:
-            moves_here = self.moves_by_destination.get(order.current_province.name, set())
-            for move_here in moves_here:
+                        return _FAILS
+            return _SUCCEEDS
+        elif order_type == _CONVOY:
+            for move_here in table.moves_to(table.current[order]):
                 # see https://webdiplomacy.net/doc/DATC_v3_0.html#5.D
-                if self._adjudicate_order(move_here) == Resolution.SUCCEEDS:
-                    return Resolution.FAILS
-            return Resolution.SUCCEEDS
+                if self._adjudicate_order(move_here) == _SUCCEEDS:
+                    return _FAILS
+            return _SUCCEEDS
         # Algorithm from https://diplom.org/Zine/S2009M/Kruijswijk/DipMath_Chp2.htm
-        elif order.type == OrderType.MOVE:
+        elif order_type == _MOVE:
             return self._adjudicate_move_order(order)
         raise ValueError("Unknown order type for adjudication")
 
-    def _adjudicate_move_order(self, order: AdjudicableOrder) -> Resolution:
+    def _support_strength(self, order: int, exclude_country: int = -1) -> int:
+        table = self._table
+        strength = 1
+        for support in table.supports(order):
+            if self._resolve(support) == _SUCCEEDS and table.country[support] != exclude_country:
+                strength += 1
+        return strength
+
+    def _adjudicate_move_order(self, order: int) -> int:
+        table = self._table
         # check that convoy path work
-        if order.is_convoy:
-            if self._adjudicate_convoys_for_order(order) == Resolution.FAILS:
-                return Resolution.FAILS
+        if table.is_convoy[order]:
+            if self._adjudicate_convoys_for_order(order) == _FAILS:
+                return _FAILS
 
-        # X -> Z, Y -> Z scenario, prevent strength
-        orders_to_overcome = self.moves_by_destination[order.destination_province.name] - {order}
         # X -> Y, Y -> Z scenario
-        attacked_order: AdjudicableOrder | None = None
+        attacked = table.order_at[table.destination[order]]
 
         head_on = False
-        if order.destination_province.name in self.orders_by_province:
-            attacked_order = self.orders_by_province[order.destination_province.name]
-
-            if attacked_order.type == OrderType.MOVE and attacked_order.destination_province == order.current_province:
+        if attacked != -1:
+            if table.type[attacked] == _MOVE and table.destination[attacked] == table.current[order]:
                 # only head on if not convoy
-                head_on = not attacked_order.is_convoy and not order.is_convoy
+                head_on = not table.is_convoy[attacked] and not table.is_convoy[order]
 
-        attack_strength = 1
         attacked_move = (
-            attacked_order == None
-            or (attacked_order.type == OrderType.MOVE
-                and self._resolve_order(attacked_order) == Resolution.SUCCEEDS)
+            attacked == -1
+            or (table.type[attacked] == _MOVE
+                and self._resolve(attacked) == _SUCCEEDS)
         )
 
-        if attacked_order and (head_on or not attacked_move):
-            attacked_country = attacked_order.country
+        # If A -> B, and B beats C head on then C can't affect A
+        ignored_source = -1
+        if attacked != -1 and (head_on or not attacked_move):
+            attacked_country = table.country[attacked]
 
-            if attacked_country == order.country:
-                return Resolution.FAILS
+            if attacked_country == table.country[order]:
+                return _FAILS
 
-            for support in order.supports:
-                if self._resolve_order(support) == Resolution.SUCCEEDS and attacked_country != support.country:
-                    attack_strength += 1
+            attack_strength = self._support_strength(order, attacked_country)
 
             opponent_strength = 1
             # count supports if it wasn't a failed move
-            if head_on or (attacked_order.type != OrderType.MOVE and not attacked_order.not_supportable):
-                for support in attacked_order.supports:
-                    if self._resolve_order(support) == Resolution.SUCCEEDS:
-                        opponent_strength += 1
+            if head_on or (table.type[attacked] != _MOVE and not table.not_supportable[attacked]):
+                opponent_strength = self._support_strength(attacked)
 
             if attack_strength <= opponent_strength:
-                return Resolution.FAILS
+                return _FAILS
         else:
-            for support in order.supports:
-                if self._resolve_order(support) == Resolution.SUCCEEDS:
-                    attack_strength += 1
-
-            # If A -> B, and B beats C head on then C can't affect A
-            if attacked_order is not None and not attacked_order.is_convoy:
-                orders_to_overcome = {
-                    order
-                    for order in orders_to_overcome
-                    if order.source_province != attacked_order.destination_province or order.is_convoy
-                }
-
-        for opponent in orders_to_overcome:
-            if not opponent.is_valid:
+            attack_strength = self._support_strength(order)
+
+            if attacked != -1 and not table.is_convoy[attacked]:
+                ignored_source = table.destination[attacked]
+
+        # X -> Z, Y -> Z scenario, prevent strength
+        for opponent in table.moves_to(table.destination[order]):
+            if opponent == order:
+                continue
+            if table.source[opponent] == ignored_source and not table.is_convoy[opponent]:
+                continue
+            if not table.is_valid[opponent]:
                 continue
             # don't need to overcome failed convoys
-            if opponent.is_convoy and self._adjudicate_convoys_for_order(opponent) == Resolution.FAILS:
+            if table.is_convoy[opponent] and self._adjudicate_convoys_for_order(opponent) == _FAILS:
                 continue
-            prevent_strength = 1
-            for support in opponent.supports:
-                if self._resolve_order(support) == Resolution.SUCCEEDS:
-                    prevent_strength += 1
-            if attack_strength <= prevent_strength:
-                return Resolution.FAILS
+            if attack_strength <= self._support_strength(opponent):
+                return _FAILS
 
-        return Resolution.SUCCEEDS
+        return _SUCCEEDS
 
     def _resolve_order(self, order: AdjudicableOrder) -> Resolution:
-        # logger.debug(f"Adjudicating order {order}")
-        if order.state == ResolutionState.RESOLVED:
-            return order.resolution
-
-        if order.state == ResolutionState.GUESSING:
-            if order not in self._dependencies:
-                self._dependencies.append(order)
-            return order.resolution
-            
-        if not order.is_valid:
-            order.resolution = Resolution.FAILS
-            order.state = ResolutionState.RESOLVED
-            return order.resolution
+        return Resolution(self._resolve(order.id))
+
+    def _add_dependency(self, order: int):
+        self._dependencies.append(order)
+        self._dependency_count[order] += 1
+
+    def _reset_dependencies(self, old_dependency_count: int) -> list[int]:
+        orders = self._dependencies[old_dependency_count:]
+        del self._dependencies[old_dependency_count:]
+        for order in orders:
+            self._dependency_count[order] -= 1
+        return orders
+
+    def _resolve(self, order: int) -> int:
+        self.resolve_calls += 1
+        table = self._table
+        state = table.state[order]
+        if state == _RESOLVED:
+            return table.resolution[order]
+
+        if state == _GUESSING:
+            if self._dependency_count[order] == 0:
+                self._add_dependency(order)
+            return table.resolution[order]
+
+        if not table.is_valid[order]:
+            table.resolution[order] = _FAILS
+            table.state[order] = _RESOLVED
+            return _FAILS
 
         old_dependency_count = len(self._dependencies)
         # Guess that this fails
-        order.resolution = Resolution.FAILS
-        order.state = ResolutionState.GUESSING
+        table.resolution[order] = _FAILS
+        table.state[order] = _GUESSING
+        if self.trace is not None:
+            self.trace.record(resolution_trace.GUESS, order, _FAILS)
 
         first_result = self._adjudicate_order(order)
 
         if old_dependency_count == len(self._dependencies):
             # Adjudication has not introduced new dependencies, see backup rule
-            if order.state != ResolutionState.RESOLVED:
-                order.resolution = first_result
-                order.state = ResolutionState.RESOLVED
+            if table.state[order] != _RESOLVED:
+                table.resolution[order] = first_result
+                table.state[order] = _RESOLVED
             return first_result
 
         if self._dependencies[old_dependency_count] != order:
             # We depend on a guess, but not our own guess
-            self._dependencies.append(order)
-            order.resolution = first_result
+            self._add_dependency(order)
+            table.resolution[order] = first_result
             # State remains Guessing
             return first_result
 
         # We depend on our own guess; reset all dependencies
-        for other_unit in self._dependencies[old_dependency_count:]:
-            other_unit.state = ResolutionState.UNRESOLVED
-        self._dependencies = self._dependencies[:old_dependency_count]
+        if self.trace is not None:
+            self.trace.record(resolution_trace.BACKTRACK, order)
+        for other in self._reset_dependencies(old_dependency_count):
+            table.state[other] = _UNRESOLVED
 
         # Guess that this succeeds
-        order.resolution = Resolution.SUCCEEDS
-        order.state = ResolutionState.GUESSING
+        table.resolution[order] = _SUCCEEDS
+        table.state[order] = _GUESSING
+        if self.trace is not None:
+            self.trace.record(resolution_trace.GUESS, order, _SUCCEEDS)
 
         second_result = self._adjudicate_order(order)
 
         if first_result == second_result:
-            for other_unit in self._dependencies[old_dependency_count:]:
-                other_unit.state = ResolutionState.UNRESOLVED
-            self._dependencies = self._dependencies[:old_dependency_count]
-            order.state = ResolutionState.RESOLVED
-            order.resolution = first_result
+            for other in self._reset_dependencies(old_dependency_count):
+                table.state[other] = _UNRESOLVED
+            table.state[order] = _RESOLVED
+            table.resolution[order] = first_result
             return first_result
 
         self._backup_rule(old_dependency_count)
 
-        return self._resolve_order(order)
+        return self._resolve(order)
 
     def _backup_rule(self, old_dependency_count):
         # Deal with paradoxes and circular dependencies
-        orders = self._dependencies[old_dependency_count:]
-        self._dependencies = self._dependencies[:old_dependency_count]
-        logger.warning(f"I think there's a move paradox involving these moves: {[str(x) for x in orders]}")
+        self.backup_rule_calls += 1
+        table = self._table
+        orders = self._reset_dependencies(old_dependency_count)
+        logger.warning(f"I think there's a move paradox involving these moves: {[str(self.orders[x]) for x in orders]}")
+        if self.trace is not None:
+            for order in orders:
+                self.trace.record(resolution_trace.BACKUP_RULE, order)
         # Szykman rule - If any of these orders is a convoy, fail the order
-        apply_szykman = False
-        for order in orders:
-            if order.type == OrderType.CONVOY:
-                apply_szykman = True
-                break
+        apply_szykman = any(table.type[order] == _CONVOY for order in orders)
 
         if apply_szykman:
             for order in orders:
-                if order.type == OrderType.CONVOY:
-                    order.resolution = Resolution.FAILS
-                    order.state = ResolutionState.RESOLVED
+                if table.type[order] == _CONVOY:
+                    table.resolution[order] = _FAILS
+                    table.state[order] = _RESOLVED
                 else:
-                    order.state = ResolutionState.UNRESOLVED
+                    table.state[order] = _UNRESOLVED
             return
         # Circular dependencies
         for order in orders:
-            if order.type == OrderType.MOVE:
-                order.resolution = Resolution.SUCCEEDS
-                order.state = ResolutionState.RESOLVED
+            if table.type[order] == _MOVE:
+                table.resolution[order] = _SUCCEEDS
+                table.state[order] = _RESOLVED
             else:
-                order.state = ResolutionState.UNRESOLVED
+                table.state[order] = _UNRESOLVED
+
+def _strongly_connected_components(ptr: array, idx: array) -> list[list[int]]:
+    # Iterative Tarjan; components come out in reverse topological order, so every edge points to
+    # the same or an earlier component
+    n = len(ptr) - 1
+    index = array("l", [-1]) * n
+    low = array("l", [0]) * n
+    on_stack = bytearray(n)
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, ptr[root])]
+        while work:
+            node, edge = work[-1]
+            if edge < ptr[node + 1]:
+                work[-1] = (node, edge + 1)
+                other = idx[edge]
+                if index[other] == -1:
+                    index[other] = low[other] = counter
+                    counter += 1
+                    stack.append(other)
+                    on_stack[other] = 1
+                    work.append((other, ptr[other]))
+                elif on_stack[other]:
+                    low[node] = min(low[node], index[other])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    other = stack.pop()
+                    on_stack[other] = 0
+                    component.append(other)
+                    if other == node:
+                        break
+                components.append(component)
+    return components
 
 
 def make_adjudicator(board: Board) -> Adjudicator:
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class AdjudicationCache:
+    """The most recent adjudication results, keyed by hash_board_state of the board that was adjudicated.
+
+    Adjudication only depends on what that hash covers, so a hit can be applied instead of adjudicating again, e.g.
+    when a GM runs `.adjudicate test` more than once. Each entry holds the adjudicated orders (with their resolutions)
+    and the diff to the resulting state, as produced by adjudicate_state; entries must not be modified.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[dict[tuple, tuple | None], dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, state_hash: str) -> tuple[dict[tuple, tuple | None], dict[str, Any]] | None:
+        entry = self._entries.get(state_hash)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(state_hash)
+        logger.info(f"adjudicator.cache: {'miss' if entry is None else 'hit'}, {self.hits} hits, {self.misses} misses "
+                    f"({self.hit_rate:.0%} hit rate)")
+        return entry
+
+    def put(self, state_hash: str, orders: dict[tuple, tuple | None], diff: dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+        self._entries[state_hash] = (orders, diff)
+        self._entries.move_to_end(state_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from DiploGM.models.order import ConvoyTransport
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.province import Province
+
+
+class ConvoyIndex:
+    """Answers convoy_is_possible for a whole phase without a breadth-first search per question.
+
+    Fleets in sea provinces are grouped into connected chains once; an army can be convoyed between two provinces if
+    both border the same chain. Strict questions, where only fleets ordered to convoy that army count, are answered
+    once per (source, destination) pair. Call invalidate() after fleets move, or orders_changed() after convoy orders
+    change.
+    """
+
+    def __init__(self, board: Board):
+        self._board = board
+        self._chain_of: dict[Province, int] | None = None
+        # Every province bordering a chain, by chain
+        self._chain_borders: list[set[Province]] = []
+        self._ordered_convoys: dict[tuple[Province, Province], bool] = {}
+
+    def invalidate(self):
+        self._chain_of = None
+        self._chain_borders = []
+        self._ordered_convoys = {}
+
+    def orders_changed(self):
+        # Chains only depend on where fleets are
+        self._ordered_convoys = {}
+
+    def convoy_is_possible(self, start: Province, end: Province, check_fleet_orders=False) -> bool:
+        """Same answer as adjudicator.convoy_is_possible."""
+        if end in start.adjacent:
+            return True
+        if check_fleet_orders:
+            key = (start, end)
+            if key not in self._ordered_convoys:
+                self._ordered_convoys[key] = self._ordered_convoy_is_possible(start, end)
+            return self._ordered_convoys[key]
+
+        if self._chain_of is None:
+            self._build_chains()
+        assert self._chain_of is not None
+        for province in start.adjacent:
+            chain = self._chain_of.get(province)
+            if chain is not None and end in self._chain_borders[chain]:
+                return True
+        return False
+
+    def _build_chains(self):
+        fleet_seas = {
+            unit.province
+            for unit in self._board.units
+            if unit.unit_type == UnitType.FLEET
+            and unit.province.type == ProvinceType.SEA
+            and unit.province.unit is unit
+        }
+        self._chain_of = {}
+        self._chain_borders = []
+        for sea in fleet_seas:
+            if sea in self._chain_of:
+                continue
+            chain = len(self._chain_borders)
+            borders: set[Province] = set()
+            self._chain_of[sea] = chain
+            to_visit = [sea]
+            while to_visit:
+                current = to_visit.pop()
+                borders.update(current.adjacent)
+                for adjacent in current.adjacent:
+                    if adjacent in fleet_seas and adjacent not in self._chain_of:
+                        self._chain_of[adjacent] = chain
+                        to_visit.append(adjacent)
+            self._chain_borders.append(borders)
+
+    @staticmethod
+    def _ordered_convoy_is_possible(start: Province, end: Province) -> bool:
+        # Only fleets ordered to convoy start -> end; there are rarely more than a handful
+        def is_convoying(province: Province) -> bool:
+            if province.type != ProvinceType.SEA:
+                return False
+            unit = province.unit
+            if unit is None or unit.unit_type != UnitType.FLEET:
+                return False
+            order = unit.order
+            return isinstance(order, ConvoyTransport) and order.source is start and order.destination is end
+
+        visited: set[Province] = set()
+        to_visit = [province for province in start.adjacent if is_convoying(province)]
+        while to_visit:
+            current = to_visit.pop()
+            if current in visited:
+                continue
+            visited.add(current)
+            if end in current.adjacent:
+                return True
+            to_visit.extend(province for province in current.adjacent if province not in visited and is_convoying(province))
+        return False
@@ -1,3 +1,6 @@
+from __future__ import annotations
+
+from array import array
 from enum import Enum
 
 from DiploGM.models.order import NMR, Hold, Core, Move, ConvoyMove, Support, ConvoyTransport, UnitOrder
@@ -25,11 +28,18 @@ class OrderType(Enum):
 
 
 class AdjudicableOrder:
-    def __init__(self, unit: Unit):
-        self.state = ResolutionState.UNRESOLVED
-        self.resolution = Resolution.FAILS
+    def __init__(self, unit: Unit, order: UnitOrder | None = None):
+        # Once the order is added to an OrderTable, state, resolution and is_convoy live in the table's columns
+        self.id: int = -1
+        self._table: OrderTable | None = None
+        self._state = ResolutionState.UNRESOLVED
+        self._resolution = Resolution.FAILS
+        self._is_convoy: bool = False
 
-        if unit.order is None:
+        # order overrides unit.order, so that orders can be adjudicated without modifying the unit
+        if order is None:
+            order = unit.order
+        if order is None:
             raise ValueError(f"Order for unit {unit} is missing")
 
         self.country = unit.player
@@ -37,36 +47,32 @@ class AdjudicableOrder:
         self.current_province = unit.province
         self.current_coast = unit.coast
 
-        self.supports: set[AdjudicableOrder] = set()
-        self.convoys: set[AdjudicableOrder] = set()
-
         self.type: OrderType
         self.destination_province: Province = self.current_province
         self.destination_coast: str | None = self.current_coast
         self.source_province: Province = self.current_province
-        self.is_convoy: bool = False
         # indicates that a move is also a convoy that failed, so no support holds
         self.not_supportable = False
         self.is_valid = True
-        if isinstance(unit.order, Hold) or isinstance(unit.order, NMR):
+        if isinstance(order, Hold) or isinstance(order, NMR):
             self.type = OrderType.HOLD
-        elif isinstance(unit.order, Core):
+        elif isinstance(order, Core):
             self.type = OrderType.CORE
-        elif isinstance(unit.order, Move) or isinstance(unit.order, ConvoyMove):
+        elif isinstance(order, Move) or isinstance(order, ConvoyMove):
             self.type = OrderType.MOVE
-            (self.destination_province, self.destination_coast) = unit.order.get_destination_and_coast()
-            if isinstance(unit.order, ConvoyMove):
+            (self.destination_province, self.destination_coast) = order.get_destination_and_coast()
+            if isinstance(order, ConvoyMove):
                 self.is_convoy = True
-        elif isinstance(unit.order, Support):
+        elif isinstance(order, Support):
             self.type = OrderType.SUPPORT
-            self.source_province = unit.order.source
-            (self.destination_province, self.destination_coast) = unit.order.get_destination_and_coast()
-        elif isinstance(unit.order, ConvoyTransport):
+            self.source_province = order.source
+            (self.destination_province, self.destination_coast) = order.get_destination_and_coast()
+        elif isinstance(order, ConvoyTransport):
             self.type = OrderType.CONVOY
-            self.source_province = unit.order.source
-            self.destination_province = unit.order.destination
+            self.source_province = order.source
+            self.destination_province = order.destination
         else:
-            raise ValueError(f"Can't parse {unit.order.__class__.__name__} to OrderType")
+            raise ValueError(f"Can't parse {order.__class__.__name__} to OrderType")
 
         self.base_unit = unit
 
@@ -74,7 +80,137 @@ class AdjudicableOrder:
         # This could be improved
         return f"{self.current_province} {self.type} {self.source_province if self.source_province else ''} {self.destination_province} [{self.state}:{self.resolution}]"
     
+    @property
+    def state(self) -> ResolutionState:
+        if self._table is None:
+            return self._state
+        return ResolutionState(self._table.state[self.id])
+
+    @state.setter
+    def state(self, value: ResolutionState):
+        if self._table is None:
+            self._state = value
+        else:
+            self._table.state[self.id] = value.value
+
+    @property
+    def resolution(self) -> Resolution:
+        if self._table is None:
+            return self._resolution
+        return Resolution(self._table.resolution[self.id])
+
+    @resolution.setter
+    def resolution(self, value: Resolution):
+        if self._table is None:
+            self._resolution = value
+        else:
+            self._table.resolution[self.id] = value.value
+
+    @property
+    def is_convoy(self) -> bool:
+        if self._table is None:
+            return self._is_convoy
+        return bool(self._table.is_convoy[self.id])
+
+    @is_convoy.setter
+    def is_convoy(self, value: bool):
+        if self._table is None:
+            self._is_convoy = value
+        else:
+            self._table.is_convoy[self.id] = value
+
+    @property
+    def supports(self) -> list[AdjudicableOrder]:
+        if self._table is None:
+            return []
+        return [self._table.orders[i] for i in self._table.supports(self.id)]
+
+    @property
+    def convoys(self) -> list[AdjudicableOrder]:
+        if self._table is None:
+            return []
+        return [self._table.orders[i] for i in self._table.convoys(self.id)]
+
     def get_original_order(self) -> UnitOrder:
         if self.base_unit.order is None:
             raise ValueError("AdjudicableOrder can't find source order somehow")
-        return self.base_unit.order
\ No newline at end of file
+        return self.base_unit.order
+
+
+class OrderTable:
+    """Column store for the orders of a moves phase, indexed by dense order and province ids.
+
+    Each column holds one field of every order so that adjudication only deals with integers. Provinces are numbered
+    in the order they are first seen; -1 means "no order/province". Supports, convoys and moves into each province are
+    stored CSR-style: the entries for row i are `idx[ptr[i]:ptr[i + 1]]`.
+    """
+
+    def __init__(self, orders: list[AdjudicableOrder]):
+        self.orders: list[AdjudicableOrder] = orders
+        self.provinces: list[Province] = []
+        province_ids: dict[Province, int] = {}
+        country_ids: dict = {}
+
+        def province_id(province: Province) -> int:
+            if province not in province_ids:
+                province_ids[province] = len(self.provinces)
+                self.provinces.append(province)
+            return province_ids[province]
+
+        self.state = array("b", (order.state.value for order in orders))
+        self.resolution = array("b", (order.resolution.value for order in orders))
+        self.type = array("b", (order.type.value for order in orders))
+        self.country = array("l", (country_ids.setdefault(order.country, len(country_ids)) for order in orders))
+        self.current = array("l", (province_id(order.current_province) for order in orders))
+        self.source = array("l", (province_id(order.source_province) for order in orders))
+        self.destination = array("l", (province_id(order.destination_province) for order in orders))
+        self.is_convoy = array("b", (order.is_convoy for order in orders))
+        self.is_valid = array("b", (order.is_valid for order in orders))
+        self.not_supportable = array("b", (order.not_supportable for order in orders))
+
+        for i, order in enumerate(orders):
+            order.id = i
+            order._table = self
+
+        self.order_at = array("l", [-1]) * len(self.provinces)
+        for i in range(len(orders)):
+            self.order_at[self.current[i]] = i
+
+        move = OrderType.MOVE.value
+        self.moves_ptr, self.moves_idx = to_csr(
+            len(self.provinces), ((self.destination[i], i) for i in range(len(orders)) if self.type[i] == move)
+        )
+        support = OrderType.SUPPORT.value
+        convoy = OrderType.CONVOY.value
+        # A support or convoy attaches to the order of the unit it supports/convoys, if there is one
+        self.supports_ptr, self.supports_idx = to_csr(len(orders), self._attached_to(support))
+        self.convoys_ptr, self.convoys_idx = to_csr(len(orders), self._attached_to(convoy))
+
+    def _attached_to(self, order_type: int):
+        for i in range(len(self.orders)):
+            if self.type[i] == order_type and (target := self.order_at[self.source[i]]) != -1:
+                yield target, i
+
+    def moves_to(self, province: int) -> array:
+        return self.moves_idx[self.moves_ptr[province]:self.moves_ptr[province + 1]]
+
+    def supports(self, order: int) -> array:
+        return self.supports_idx[self.supports_ptr[order]:self.supports_ptr[order + 1]]
+
+    def convoys(self, order: int) -> array:
+        return self.convoys_idx[self.convoys_ptr[order]:self.convoys_ptr[order + 1]]
+
+
+def to_csr(rows: int, pairs) -> tuple[array, array]:
+    pairs = list(pairs)
+    ptr = array("l", [0]) * (rows + 1)
+    for row, _ in pairs:
+        ptr[row + 1] += 1
+    for row in range(rows):
+        ptr[row + 1] += ptr[row]
+    idx = array("l", [0]) * len(pairs)
+    fill = ptr[:-1]
+    for row, value in pairs:
+        idx[fill[row]] = value
+        fill[row] += 1
+    return ptr, idx
@@ -0,0 +1,204 @@
+"""Runs adjudications in worker processes so that large boards don't block the Discord event loop.
+
+The main process sends a compact board state (see DiploGM.models.board_state) to a worker, which rebuilds the board
+from its variant topology, adjudicates it, and sends back the orders as they were adjudicated plus a diff of the
+resulting state. Workers never touch the database; saving stays with the main process.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator, make_adjudicator
+from DiploGM.adjudicator.cache import AdjudicationCache
+from DiploGM.adjudicator.what_if import Overlay, ScenarioOutcome, what_if_state
+from DiploGM.config import ADJUDICATION_TRACE_DIR, ADJUDICATION_TRACE_THRESHOLD
+from DiploGM.db import database
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.board_state import (
+    apply_board_state_diff,
+    decode_unit_order,
+    diff_board_states,
+    encode_unit_order,
+    get_board_state,
+    hash_board_state,
+    restore_board_state,
+    unit_key,
+)
+from DiploGM.models.phase_delta import PhaseDelta
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+
+class AdjudicationCancelled(Exception):
+    pass
+
+
+class AdjudicationResult:
+    def __init__(self, state: dict[str, Any], orders: dict[tuple, tuple | None], diff: dict[str, Any]):
+        # State that was adjudicated
+        self.state = state
+        # unit key -> order as adjudicated (NMRs filled in, hasFailed set)
+        self.orders = orders
+        self.diff = diff
+
+    def apply(self, board: Board, save_orders: bool = True) -> Board:
+        """Applies the result to the board that was adjudicated, like Adjudicator.run() would have."""
+        adjudicated_units = self.apply_orders(board)
+        if save_orders and board.turn.is_moves():
+            database.get_async_connection().save_order_for_units(board, adjudicated_units)
+        return restore_board_state(board, self.new_state())
+
+    def apply_orders(self, board: Board) -> list[Unit]:
+        """Replaces the orders on board with the adjudicated ones and returns the units they belong to."""
+        provinces = {province.name: province for province in board.provinces}
+        adjudicated_units = []
+        for unit in board.units:
+            key = unit_key(unit)
+            if key in self.orders:
+                unit.order = decode_unit_order(provinces, self.orders[key])
+                adjudicated_units.append(unit)
+        return adjudicated_units
+
+    def new_state(self) -> dict[str, Any]:
+        return apply_board_state_diff(self.state, self.diff)
+
+    @property
+    def delta(self) -> PhaseDelta:
+        return PhaseDelta(self.state, self.orders, self.diff)
+
+
+def adjudicate_state(state: dict[str, Any]) -> tuple[dict[tuple, tuple | None], dict[str, Any]]:
+    """Worker entry point; must stay a module-level function so it can be pickled."""
+    start = time.time()
+    board = get_parser(state["board"][3]).parse()
+    restore_board_state(board, state)
+
+    adjudicator = make_adjudicator(board)
+    adjudicator.save_orders = False
+    trace = None
+    if ADJUDICATION_TRACE_DIR and isinstance(adjudicator, MovesAdjudicator):
+        trace = adjudicator.start_trace()
+    # The adjudicator fills in NMRs and convoys, and clears every order once it's done, so keep them here.
+    # Units are keyed by where they were before adjudication, which is also where the main process has them
+    orders = {unit_key(unit): unit.order for unit in board.units}
+    new_board = adjudicator.run()
+    if trace is not None and (time.time() - start >= ADJUDICATION_TRACE_THRESHOLD or trace.backup_rules):
+        assert isinstance(adjudicator, MovesAdjudicator)
+        trace.finish(adjudicator, state)
+        os.makedirs(ADJUDICATION_TRACE_DIR, exist_ok=True)
+        path = os.path.join(ADJUDICATION_TRACE_DIR, f"{state['board'][0]}-{time.time_ns()}.trace")
+        trace.save(path)
+        logger.info(f"adjudicator.executor.worker.{state['board'][0]}: resolution trace saved to {path}")
+
+    encoded_orders = {key: encode_unit_order(order) for key, order in orders.items()}
+    diff = diff_board_states(state, get_board_state(new_board))
+    logger.info(f"adjudicator.executor.worker.{state['board'][0]}.{time.time() - start}s")
+    return encoded_orders, diff
+
+
+class AdjudicationExecutor:
+    """A pool of adjudication worker processes.
+
+    With max_workers=0 adjudication runs in a thread of the main process instead, which still keeps the event loop
+    responsive but shares the GIL with it. Results are cached, so adjudicating the same board with the same orders
+    again doesn't need a worker at all.
+    """
+
+    def __init__(self, max_workers: int, timeout: float, cache_size: int = 0, what_if_batch: int = 100):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Fewest scenarios worth sending to a worker; see what_if
+        self.what_if_batch = what_if_batch
+        self.cache = AdjudicationCache(cache_size)
+        self._pool: ProcessPoolExecutor | None = None
+        self._jobs: dict[int, asyncio.Future] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn rather than fork, since the bot process has sockets and threads that children shouldn't inherit
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def adjudicate(self, board: Board) -> AdjudicationResult:
+        """Adjudicates a copy of board in a worker. Raises TimeoutError after self.timeout seconds and
+        AdjudicationCancelled if cancel() is called; in both cases the board is left untouched."""
+        if board.board_id in self._jobs:
+            raise RuntimeError(f"An adjudication is already running for board {board.board_id}")
+
+        start = time.time()
+        state = get_board_state(board)
+        state_hash = hash_board_state(state)
+        cached = self.cache.get(state_hash)
+        if cached is not None:
+            logger.info(f"adjudicator.executor.{board.board_id}.cached.{time.time() - start}s")
+            return AdjudicationResult(state, *cached)
+
+        loop = asyncio.get_running_loop()
+        if self.max_workers > 0:
+            job = loop.run_in_executor(self._get_pool(), adjudicate_state, state)
+        else:
+            job = loop.run_in_executor(None, adjudicate_state, state)
+        self._jobs[board.board_id] = job
+        try:
+            orders, diff = await asyncio.wait_for(job, self.timeout)
+        except TimeoutError:
+            # A worker that is already running can't be interrupted; its result is simply discarded
+            logger.warning(f"adjudicator.executor.{board.board_id} timed out after {self.timeout}s")
+            raise
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if job.cancelled() and not (task and task.cancelling()):
+                raise AdjudicationCancelled(f"Adjudication of board {board.board_id} was cancelled") from None
+            raise
+        finally:
+            del self._jobs[board.board_id]
+
+        self.cache.put(state_hash, orders, diff)
+        logger.info(f"adjudicator.executor.{board.board_id}.{time.time() - start}s")
+        return AdjudicationResult(state, orders, diff)
+
+    async def what_if(self, board: Board, overlays: list[Overlay]) -> list[ScenarioOutcome]:
+        """Adjudicates each overlay on top of board's orders (see DiploGM.adjudicator.what_if), in order.
+        Scenarios are split into batches of at least what_if_batch, one per worker; fewer run in a thread."""
+        start = time.time()
+        state = get_board_state(board)
+        loop = asyncio.get_running_loop()
+        batch = max(self.what_if_batch, -(-len(overlays) // max(self.max_workers, 1)))
+        if self.max_workers > 0 and len(overlays) > batch:
+            pool = self._get_pool()
+            jobs = [
+                loop.run_in_executor(pool, what_if_state, state, overlays[i:i + batch])
+                for i in range(0, len(overlays), batch)
+            ]
+        else:
+            jobs = [loop.run_in_executor(None, what_if_state, state, overlays)]
+        batches = await asyncio.wait_for(asyncio.gather(*jobs), self.timeout)
+        logger.info(f"adjudicator.executor.what_if.{board.board_id}.{len(overlays)}.{time.time() - start}s")
+        return [outcome for outcomes in batches for outcome in outcomes]
+
+    def is_running(self, board_id: int) -> bool:
+        return board_id in self._jobs
+
+    def cancel(self, board_id: int) -> bool:
+        """Cancels the running adjudication for board_id; returns False if there is none."""
+        job = self._jobs.get(board_id)
+        if job is None:
+            return False
+        return job.cancel()
+
+    def shutdown(self):
+        for job in self._jobs.values():
+            job.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
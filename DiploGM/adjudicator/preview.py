@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+from DiploGM.adjudicator.defs import Resolution, ResolutionState
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.province import Province
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+
+class LivePreview:
+    """Predicted results of a moves phase, kept up to date while orders are being submitted.
+
+    Orders only interact with orders that share a province with them (as current, source or destination province),
+    so the board splits into independent neighbourhoods. When orders change, only the neighbourhoods containing the
+    changed orders are adjudicated again; everything else keeps its previous resolution.
+    """
+
+    def __init__(self, board: Board):
+        self.board = board
+        self._signatures: dict[Unit, tuple] = {}
+        self._resolutions: dict[Unit, Resolution] = {}
+        # Number of orders adjudicated again by the last preview() call, for logging and tests
+        self.last_resolved: int = 0
+
+    def preview(self) -> dict[Unit, Resolution]:
+        if not self.board.turn.is_moves():
+            raise ValueError("Live previews are only available in moves phases")
+
+        adjudicator = MovesAdjudicator(self.board, preview=True)
+        table = adjudicator._table
+        signatures = {order.base_unit: _signature(order) for order in adjudicator.orders}
+
+        touched: set[Province] = set()
+        for unit, signature in signatures.items():
+            old = self._signatures.get(unit)
+            if old != signature:
+                touched.update(signature[1:4])
+                if old is not None:
+                    touched.update(old[1:4])
+        for unit in self._signatures.keys() - signatures.keys():
+            touched.update(self._signatures[unit][1:4])
+
+        # Union-find over provinces, joining the provinces each order mentions
+        parent = list(range(len(table.provinces)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for i in range(len(adjudicator.orders)):
+            root = find(table.current[i])
+            for other in (table.source[i], table.destination[i]):
+                other_root = find(other)
+                if other_root != root:
+                    parent[other_root] = root
+
+        province_ids = {province: i for i, province in enumerate(table.provinces)}
+        dirty_roots = {find(province_ids[province]) for province in touched if province in province_ids}
+
+        self.last_resolved = 0
+        for order in adjudicator.orders:
+            previous = self._resolutions.get(order.base_unit)
+            if previous is not None and find(table.current[order.id]) not in dirty_roots:
+                order.resolution = previous
+                order.state = ResolutionState.RESOLVED
+            else:
+                self.last_resolved += 1
+        adjudicator.resolve_all()
+
+        self._signatures = signatures
+        self._resolutions = {order.base_unit: order.resolution for order in adjudicator.orders}
+        logger.debug(f"adjudicator.preview: {self.last_resolved}/{len(adjudicator.orders)} orders adjudicated")
+        return dict(self._resolutions)
+
+
+def _signature(order) -> tuple:
+    # Everything about an order that adjudication looks at; provinces are kept at indexes 1-3
+    return (
+        order.type,
+        order.current_province,
+        order.source_province,
+        order.destination_province,
+        order.is_valid,
+        order.not_supportable,
+        order.is_convoy,
+        order.country,
+    )
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.phase_delta import PhaseDelta
+    from DiploGM.models.unit import Unit
+
+# Keys of Speculation.maps
+MOVES_MAP = "moves"
+MOVEMENT_MAP = "movement"
+RESULTS_MAP = "results"
+
+
+class Speculation:
+    """An adjudication worked out in the background once orders are locked.
+
+    It stays usable as long as the live board still hashes to state_hash; any change to the orders (or to the
+    board) after locking makes it stale, and .adjudicate then does the work itself.
+    """
+
+    def __init__(self, state_hash: str):
+        self.state_hash = state_hash
+        self.task: asyncio.Task | None = None
+        # The adjudicated board, with orders as adjudicated (NMRs filled in, hasFailed set)
+        self.old_board: Board | None = None
+        self.adjudicated_units: list[Unit] = []
+        # The resulting board, already on the next turn
+        self.new_board: Board | None = None
+        # What the adjudication changed, for saving the new board
+        self.delta: PhaseDelta | None = None
+        # Maps in the default color mode, as (svg, file name)
+        self.maps: dict[str, tuple[bytes, str]] = {}
+
+    def is_ready(self) -> bool:
+        return self.task is not None and self.task.done() and not self.task.cancelled() and self.task.exception() is None
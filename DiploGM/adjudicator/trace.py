@@ -0,0 +1,190 @@
+"""Records how MovesAdjudicator resolved a phase, for profiling slow or paradoxical adjudications offline.
+
+A trace is a flat list of events (entering and leaving the resolution of an order, guesses, backtracks and the backup
+rule) with nanosecond timestamps. It is saved together with the board state that was adjudicated, so a trace can be
+both inspected and re-run without the live bot:
+    python -m DiploGM.adjudicator.trace <file>.trace [--top 20] [--rerun]
+
+Trace files are pickles; only open ones you made yourself.
+"""
+from __future__ import annotations
+
+import argparse
+import pickle
+import time
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from DiploGM.adjudicator.defs import Resolution
+
+if TYPE_CHECKING:
+    from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+
+MAGIC = b"DGMTRACE"
+VERSION = 1
+
+# Event codes
+ENTER = 0
+EXIT = 1
+GUESS = 2
+BACKTRACK = 3
+BACKUP_RULE = 4
+
+
+class ResolutionTrace:
+    """Collects events while a MovesAdjudicator resolves; see MovesAdjudicator.start_trace."""
+
+    def __init__(self):
+        # (event, order, value, time in ns) for every event, one after the other
+        self.events = array("q")
+        self.orders: list[str] = []
+        self.resolutions: list[int] = []
+        self.state: dict[str, Any] | None = None
+
+    def record(self, event: int, order: int, value: int = 0):
+        self.events.extend((event, order, value, time.perf_counter_ns()))
+
+    @property
+    def backup_rules(self) -> int:
+        return self.events[::4].count(BACKUP_RULE)
+
+    def finish(self, adjudicator: MovesAdjudicator, state: dict[str, Any] | None = None):
+        """Keeps what's needed to read the trace without the adjudicator: order descriptions, final resolutions and,
+        for --rerun, the state of the board before adjudication."""
+        self.orders = [
+            f"{order.current_province} {order.type.name} {order.source_province or ''} {order.destination_province or ''}"
+            for order in adjudicator.orders
+        ]
+        self.resolutions = [order.resolution.value for order in adjudicator.orders]
+        self.state = state
+
+    def save(self, path: str):
+        metadata = pickle.dumps(
+            {"orders": self.orders, "resolutions": self.resolutions, "state": self.state},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        with open(path, "wb") as f:
+            f.write(MAGIC + bytes([VERSION]))
+            for block in (zlib.compress(metadata), zlib.compress(self.events.tobytes())):
+                f.write(len(block).to_bytes(8, "little"))
+                f.write(block)
+
+    @classmethod
+    def load(cls, path: str) -> ResolutionTrace:
+        with open(path, "rb") as f:
+            header = f.read(len(MAGIC) + 1)
+            if header[:len(MAGIC)] != MAGIC or header[-1] != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} resolution trace")
+            blocks = []
+            for _ in range(2):
+                length = int.from_bytes(f.read(8), "little")
+                blocks.append(zlib.decompress(f.read(length)))
+        trace = cls()
+        metadata = pickle.loads(blocks[0])
+        trace.orders = metadata["orders"]
+        trace.resolutions = metadata["resolutions"]
+        trace.state = metadata["state"]
+        trace.events.frombytes(blocks[1])
+        return trace
+
+
+@dataclass
+class OrderProfile:
+    order: int
+    resolutions: int = 0
+    guesses: int = 0
+    backtracks: int = 0
+    backup_rules: int = 0
+    # Time spent resolving this order, with and without the orders it had to resolve first
+    total_ns: int = 0
+    self_ns: int = 0
+    # Orders this one had to resolve
+    dependencies: set[int] = field(default_factory=set)
+
+
+def profile(trace: ResolutionTrace) -> list[OrderProfile]:
+    """Replays the events of a trace; returns one profile per order, slowest (by own time) first."""
+    profiles = [OrderProfile(order) for order in range(len(trace.orders))]
+    # (order, entered at, time spent in nested resolutions)
+    stack: list[list[int]] = []
+    events = trace.events
+    for i in range(0, len(events), 4):
+        event, order, _, timestamp = events[i:i + 4]
+        if event == ENTER:
+            if stack:
+                profiles[stack[-1][0]].dependencies.add(order)
+            stack.append([order, timestamp, 0])
+            profiles[order].resolutions += 1
+        elif event == EXIT:
+            entered_order, entered_at, nested = stack.pop()
+            assert entered_order == order, "Unbalanced trace"
+            elapsed = timestamp - entered_at
+            profiles[order].total_ns += elapsed
+            profiles[order].self_ns += elapsed - nested
+            if stack:
+                stack[-1][2] += elapsed
+        elif event == GUESS:
+            profiles[order].guesses += 1
+        elif event == BACKTRACK:
+            profiles[order].backtracks += 1
+        elif event == BACKUP_RULE:
+            profiles[order].backup_rules += 1
+    return sorted(profiles, key=lambda p: p.self_ns, reverse=True)
+
+
+def rerun(trace: ResolutionTrace) -> ResolutionTrace:
+    """Adjudicates the traced board again, with a new trace."""
+    from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+    from DiploGM.map_parser.vector.vector import get_parser
+    from DiploGM.models.board_state import restore_board_state
+
+    if trace.state is None:
+        raise ValueError("This trace was saved without the board state, so it can't be re-run")
+    board = restore_board_state(get_parser(trace.state["board"][3]).parse(), trace.state)
+    adjudicator = MovesAdjudicator(board)
+    adjudicator.save_orders = False
+    new_trace = adjudicator.start_trace()
+    adjudicator.run()
+    new_trace.finish(adjudicator, trace.state)
+    return new_trace
+
+
+def _print_profile(trace: ResolutionTrace, top: int):
+    profiles = profile(trace)
+    events = len(trace.events) // 4
+    duration = (trace.events[-1] - trace.events[3]) / 1e6 if events else 0
+    print(f"{len(trace.orders)} orders, {events} events over {duration:.3f}ms, {trace.backup_rules} backup rules")
+    print(f"{'self ms':>9} {'total ms':>9} {'resolves':>8} {'guesses':>7} {'backtracks':>10}  order")
+    for p in profiles[:top]:
+        flags = " (backup rule)" if p.backup_rules else ""
+        print(f"{p.self_ns / 1e6:9.3f} {p.total_ns / 1e6:9.3f} {p.resolutions:8} {p.guesses:7} {p.backtracks:10}  "
+              f"{trace.orders[p.order]} -> {Resolution(trace.resolutions[p.order]).name}{flags}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Inspect an adjudication trace")
+    arg_parser.add_argument("trace", help="a .trace file written by the adjudicator")
+    arg_parser.add_argument("--top", type=int, default=20, help="number of orders to show")
+    arg_parser.add_argument("--rerun", action="store_true",
+                            help="adjudicate the traced board again and check the results are the same")
+    args = arg_parser.parse_args()
+
+    trace = ResolutionTrace.load(args.trace)
+    _print_profile(trace, args.top)
+    if args.rerun:
+        start = time.time()
+        new_trace = rerun(trace)
+        print(f"\nRe-run in {time.time() - start:.3f}s")
+        # Orders may come out in a different order on a re-parsed board, so match them by description
+        new_resolutions = dict(zip(new_trace.orders, new_trace.resolutions))
+        differences = [order for order, resolution in zip(trace.orders, trace.resolutions)
+                       if new_resolutions.get(order) != resolution]
+        if differences:
+            print(f"{len(differences)} orders resolved differently: {differences}")
+        _print_profile(new_trace, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Adjudicates many alternative order sets for one moves phase, e.g. "what if France supports instead of moves".
+
+Every scenario is an overlay on the board's current orders: unit key -> encoded order (see DiploGM.models.board_state),
+where None takes the unit's order away. Scenarios are adjudicated one after the other on a single scratch copy of the
+board, so the map, the units and the validation checks that only depend on where units are get shared between them.
+The live board is never touched.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator, PhaseValidator
+from DiploGM.adjudicator.defs import OrderType, Resolution
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.board_state import decode_unit_order, encode_unit_order, get_board_state, restore_board_state, unit_key
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.order import UnitOrder
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+Overlay = dict[tuple, tuple | None]
+
+
+@dataclass
+class ScenarioOutcome:
+    # Unit key -> whether its order would succeed
+    resolutions: dict[tuple, Resolution] = field(default_factory=dict)
+    # Keys of the units that would be dislodged
+    dislodged: set[tuple] = field(default_factory=set)
+
+
+def make_overlay(orders: dict[Unit, UnitOrder | None]) -> Overlay:
+    return {unit_key(unit): encode_unit_order(order) for unit, order in orders.items()}
+
+
+class WhatIf:
+    def __init__(self, state: dict[str, Any]):
+        self.board = restore_board_state(get_parser(state["board"][3]).parse(), state)
+        if not self.board.turn.is_moves():
+            raise ValueError("What-if adjudication is only available in moves phases")
+        self._units = {unit_key(unit): unit for unit in self.board.units}
+        self._base_orders = {key: unit.order for key, unit in self._units.items()}
+        self._provinces = {province.name: province for province in self.board.provinces}
+        self._validator = PhaseValidator(self.board)
+        self._overlaid: set[tuple] = set()
+
+    @classmethod
+    def from_board(cls, board: Board) -> WhatIf:
+        return cls(get_board_state(board))
+
+    def adjudicate(self, overlay: Overlay) -> ScenarioOutcome:
+        for key in self._overlaid:
+            self._units[key].order = self._base_orders[key]
+        for key, encoded in overlay.items():
+            if key not in self._units:
+                raise ValueError(f"There is no unit at {key[0]}")
+            self._units[key].order = decode_unit_order(self._provinces, encoded)
+        self._overlaid = set(overlay)
+
+        adjudicator = MovesAdjudicator(self.board, preview=True, validator=self._validator)
+        adjudicator.resolve_all()
+        return _outcome(adjudicator)
+
+    def adjudicate_all(self, overlays: list[Overlay]) -> list[ScenarioOutcome]:
+        return [self.adjudicate(overlay) for overlay in overlays]
+
+
+def what_if_state(state: dict[str, Any], overlays: list[Overlay]) -> list[ScenarioOutcome]:
+    """Worker entry point; must stay a module-level function so it can be pickled."""
+    start = time.time()
+    outcomes = WhatIf(state).adjudicate_all(overlays)
+    logger.info(f"adjudicator.what_if.{state['board'][0]}.{len(overlays)}.{time.time() - start}s")
+    return outcomes
+
+
+def _outcome(adjudicator: MovesAdjudicator) -> ScenarioOutcome:
+    table = adjudicator._table
+    keys = [unit_key(order.base_unit) for order in adjudicator.orders]
+    outcome = ScenarioOutcome({key: Resolution(table.resolution[i]) for i, key in enumerate(keys)})
+    # Whatever stays in a province that a move into succeeds is dislodged
+    moved = {
+        i for i in range(len(keys))
+        if table.type[i] == OrderType.MOVE.value and table.resolution[i] == Resolution.SUCCEEDS.value
+    }
+    for i in moved:
+        occupant = table.order_at[table.destination[i]]
+        if occupant != -1 and occupant not in moved:
+            outcome.dislodged.add(keys[occupant])
+    return outcome
@@ -1,3 +1,4 @@
+import asyncio
 import aiohttp.client_exceptions
 import datetime
 import inspect
@@ -22,6 +23,7 @@ from DiploGM.config import (
 from DiploGM.events.eventbus import EventBus
 from DiploGM.perms import CommandPermissionError
 from DiploGM.utils import send_message_and_file
+from DiploGM.db.database import close_async_connection
 from DiploGM.manager import Manager
 
 logger = logging.getLogger(__name__)
@@ -61,9 +63,12 @@ class DiploGM(commands.Bot):
         # bind command invocation handling methods
         self.before_invoke(self.before_any_command)
         self.after_invoke(self.after_any_command)
+        self.add_check(self.load_board_first)
 
         current_servers = [g.id async for g in self.fetch_guilds()]
         self.manager = Manager(board_ids=current_servers)
+        # Keep a reference, since the event loop only keeps weak ones to tasks
+        self.board_warm_up = asyncio.create_task(self.manager.keep_boards_warm())
 
         self.eventbus = EventBus()
         for module_path in DiploGM.get_all_listeners():
@@ -200,6 +205,8 @@ class DiploGM(commands.Bot):
 
     async def close(self):
         logger.info("Shutting down gracefully.")
+        if getattr(self, "board_warm_up", None) is not None:
+            self.board_warm_up.cancel()
 
         # safely handle any runtime cog state that needs storing/ending
         for name, cog in self.cogs.items():
@@ -216,8 +223,16 @@ class DiploGM(commands.Bot):
             except Exception as e:
                 logger.warning(f"Failed to close Cog '{name}' safely: {e}")
 
+        # Commit the orders still queued for the database
+        await asyncio.to_thread(close_async_connection)
         await super().close()
 
+    async def load_board_first(self, ctx: commands.Context) -> bool:
+        # Global checks run before the other checks and the command, which look the server's board up
+        if ctx.guild is not None:
+            await self.manager.load_board(ctx.guild.id)
+        return True
+
     async def before_any_command(self, ctx: commands.Context):
         if isinstance(ctx.channel, (discord.DMChannel, discord.PartialMessageable)):
             return
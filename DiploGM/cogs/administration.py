@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import re
@@ -273,9 +274,10 @@ class AdminCog(commands.Cog):
             .split()
         )
         server_id = int(arguments[0])
+        await manager.load_board(server_id)
         board = manager.get_board(server_id)
         season = parse_season(arguments[1:], board.turn)
-        file, _ = manager.draw_map(
+        file, _ = await manager.draw_map(
             server_id,
             draw_moves=True,
             turn=season,
@@ -318,9 +320,9 @@ class AdminCog(commands.Cog):
 
         if embed_print.text:
             await send_message_and_file(channel=ctx.channel, message=embed_print.text)
-        manager._database.delete_board(board)
+        manager.delete_board(board)
 
-        manager._database.save_board(ctx.guild.id, board)
+        await asyncio.wrap_future(manager._save_phase(board))
 
     # @commands.command(
     #     brief="Execute Arbitrary SQL",
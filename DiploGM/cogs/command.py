@@ -100,16 +100,10 @@ class CommandCog(commands.Cog):
             )
         return response
 
-    def generate_scoreboard(self, board: Board, ctx: commands.Context, alphabetical: bool) -> str:
+    async def generate_scoreboard(self, board: Board, ctx: commands.Context, alphabetical: bool) -> str:
         assert ctx.guild is not None
         response = ""
-        old_board = manager._database.get_board(
-            board.board_id,
-            parse_season(["Fall"], board.turn.get_previous_turn()),
-            board.fish,
-            board.name,
-            board.datafile,
-        )
+        old_board = await manager.get_past_board(board.board_id, parse_season(["Fall"], board.turn.get_previous_turn()))
         player_list = (
             sorted(board.players, key=lambda p: p.get_name())
             if alphabetical
@@ -174,7 +168,7 @@ class CommandCog(commands.Cog):
         if board.is_chaos() and "standard" not in ctx.message.content:
             response = self.generate_chaos_scoreboard(board, ctx)
         else:
-            response = self.generate_scoreboard(board, ctx, alphabetical)
+            response = await self.generate_scoreboard(board, ctx, alphabetical)
 
         log_command(logger, ctx, message="Generated scoreboard")
         await send_message_and_file(
@@ -28,7 +28,9 @@ from DiploGM.utils import (
 )
 
 from DiploGM.perms import is_gm
-from DiploGM.db.database import get_connection
+from DiploGM.adjudicator.executor import AdjudicationCancelled
+from DiploGM.adjudicator.speculation import MOVEMENT_MAP, MOVES_MAP, RESULTS_MAP
+from DiploGM.db.database import get_order_journal
 from DiploGM.models.order import Disband, Build
 from DiploGM.models.player import Player
 from DiploGM.manager import Manager, SEVERENCE_A_ID, SEVERENCE_B_ID
@@ -275,6 +277,7 @@ class GameManagementCog(commands.Cog):
         assert ctx.guild is not None
         board = manager.get_board(ctx.guild.id)
         board.orders_enabled = False
+        manager.speculate(ctx.guild.id)
         log_command(logger, ctx, message="Locked orders")
         await send_message_and_file(
             channel=ctx.channel,
@@ -288,6 +291,7 @@ class GameManagementCog(commands.Cog):
         assert ctx.guild is not None
         board = manager.get_board(ctx.guild.id)
         board.orders_enabled = True
+        manager.cancel_speculation(ctx.guild.id)
         log_command(logger, ctx, message="Unlocked orders")
         await send_message_and_file(
             channel=ctx.channel,
@@ -303,8 +307,7 @@ class GameManagementCog(commands.Cog):
         for unit in board.units:
             unit.order = None
 
-        database = get_connection()
-        database.save_order_for_units(board, board.units)
+        get_order_journal().record(board, board.units)
         log_command(logger, ctx, message="Removed all Orders")
         await send_message_and_file(channel=ctx.channel, title="Removed all Orders")
 
@@ -317,7 +320,7 @@ class GameManagementCog(commands.Cog):
         guild = ctx.guild
         assert guild is not None
 
-        board = manager.get_previous_board(guild.id)
+        board = await manager.get_previous_board(guild.id)
         curr_board = manager.get_board(guild.id)
         if not board:
             await send_message_and_file(
@@ -464,14 +467,30 @@ class GameManagementCog(commands.Cog):
             await self.lock_orders(ctx)
 
         old_turn = board.turn
-        new_board = manager.adjudicate(guild.id, test=test_adjudicate)
+        try:
+            new_board = await manager.adjudicate_async(guild.id, test=test_adjudicate)
+        except (TimeoutError, AdjudicationCancelled):
+            log_command(logger, ctx, message=f"Adjudication stopped for {board.turn}")
+            await send_message_and_file(
+                channel=ctx.channel,
+                title="Adjudication stopped",
+                message="The adjudication timed out or was cancelled. Nothing was changed.",
+                embed_colour=config.ERROR_COLOUR,
+            )
+            return
 
         log_command(
             logger,
             ctx,
             message=f"Adjudication Successful for {board.turn}",
         )
-        file, file_name = manager.draw_map(
+        # Maps drawn ahead of time when the orders were locked, if any; they only exist for the default colors
+        def speculated_map(kind: str) -> tuple[bytes, str] | None:
+            if color_mode is not None:
+                return None
+            return manager.get_speculated_map(guild.id, new_board, kind)
+
+        file, file_name = speculated_map(MOVES_MAP) or await manager.draw_map(
             guild.id,
             draw_moves=True,
             player_restriction=None,
@@ -502,7 +521,7 @@ class GameManagementCog(commands.Cog):
                 pass
 
         if movement_adjudicate:
-            file, file_name = manager.draw_map(
+            file, file_name = speculated_map(MOVEMENT_MAP) or await manager.draw_map(
                 guild.id,
                 draw_moves=True,
                 player_restriction=None,
@@ -521,7 +540,7 @@ class GameManagementCog(commands.Cog):
                 convert_svg=return_svg,
             )
 
-        file, file_name = manager.draw_map_for_board(new_board, color_mode=color_mode)
+        file, file_name = speculated_map(RESULTS_MAP) or manager.draw_map_for_board(new_board, color_mode=color_mode)
         await send_message_and_file(
             channel=ctx.channel,
             title=f"{title} Results Map",
@@ -579,11 +598,25 @@ class GameManagementCog(commands.Cog):
             await channel.send(title)
             await channel.send(counts)
 
+    @commands.command(brief="Cancels an adjudication that is still running.")
+    @perms.gm_only("cancel adjudication")
+    async def cancel_adjudication(self, ctx: commands.Context) -> None:
+        assert ctx.guild is not None
+        if manager.cancel_adjudication(ctx.guild.id):
+            log_command(logger, ctx, message="Cancelled adjudication")
+            await send_message_and_file(channel=ctx.channel, title="Cancelled adjudication")
+        else:
+            await send_message_and_file(
+                channel=ctx.channel,
+                title="There is no adjudication running",
+                embed_colour=config.ERROR_COLOUR,
+            )
+
     @commands.command(brief="Rolls back to the previous game state.")
     @perms.gm_only("rollback")
     async def rollback(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        message, file, file_name = manager.rollback(ctx.guild.id)
+        message, file, file_name = await manager.rollback(ctx.guild.id)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message, file=file, file_name=file_name)
 
@@ -591,7 +624,7 @@ class GameManagementCog(commands.Cog):
     @perms.gm_only("reload")
     async def reload(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        message, file, file_name = manager.reload(ctx.guild.id)
+        message, file, file_name = await manager.reload(ctx.guild.id)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message, file=file, file_name=file_name)
 
@@ -18,7 +18,7 @@ from DiploGM import perms
 from DiploGM.config import ERROR_COLOUR, is_bumble, temporary_bumbles, IMPDIP_SERVER_ID
 from DiploGM.utils import log_command, send_message_and_file
 
-from DiploGM.db.database import get_connection
+from DiploGM.db.database import get_async_connection
 
 logger = logging.getLogger(__name__)
 manager = Manager()
@@ -305,7 +305,7 @@ class PartyCog(commands.Cog):
             fish_message = "You find nothing but barren water and overfished seas, maybe let the population recover?"
         fish_message += f"\nIn total, {board.fish} fish have been caught!"
         if random.randrange(0, 5) == 0:
-            get_connection().execute_arbitrary_sql(
+            get_async_connection().execute_arbitrary_sql(
                 """UPDATE boards SET fish=? WHERE board_id=? AND phase=?""",
                 (board.fish, board.board_id, board.turn.get_indexed_name()),
             )
@@ -319,31 +319,29 @@ class PartyCog(commands.Cog):
     @commands.command(brief="Show global fishing leaderboard")
     async def global_leaderboard(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        sorted_boards = sorted(
-            manager._boards.items(), key=lambda board: board[1].fish, reverse=True
-        )
-        raw_boards = tuple(map(lambda b: b[1], sorted_boards))
+        fish = manager.fish_by_server()
+        sorted_ids = sorted(fish, key=lambda board_id: fish[board_id], reverse=True)
         try:
-            this_board = manager.get_board(ctx.guild.id)
+            this_id = manager.get_board(ctx.guild.id).board_id
         except Exception:
-            this_board = None
-        sorted_boards = sorted_boards[:9]
+            this_id = None
+        top_ids = sorted_ids[:9]
         text = ""
-        if this_board is not None:
-            index = str(raw_boards.index(this_board) + 1)
+        if this_id is not None:
+            index = str(sorted_ids.index(this_id) + 1)
         else:
             index = "NaN"
 
-        max_fishes = len(str(sorted_boards[0][1].fish))
+        max_fishes = len(str(fish[top_ids[0]]))
 
-        for i, board in enumerate(sorted_boards):
-            bold = "**" if this_board == board[1] else ""
-            guild = ctx.bot.get_guild(board[0])
+        for i, board_id in enumerate(top_ids):
+            bold = "**" if this_id == board_id else ""
+            guild = ctx.bot.get_guild(board_id)
             if guild:
-                text += f"\\#{i + 1: >{len(index)}} | {board[1].fish: <{max_fishes}} | {bold}{guild.name}{bold}\n"
-        if this_board is not None and this_board not in raw_boards[:9]:
+                text += f"\\#{i + 1: >{len(index)}} | {fish[board_id]: <{max_fishes}} | {bold}{guild.name}{bold}\n"
+        if this_id is not None and this_id not in top_ids:
             text += (
-                f"\n\\#{index} | {this_board.fish: <{max_fishes}} | {ctx.guild.name}"
+                f"\n\\#{index} | {fish[this_id]: <{max_fishes}} | {ctx.guild.name}"
             )
 
         await send_message_and_file(
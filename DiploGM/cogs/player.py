@@ -186,7 +186,7 @@ class PlayerCog(commands.Cog):
 
         try:
             if not board.fow:
-                file, file_name = manager.draw_map(
+                file, file_name = await manager.draw_map(
                     ctx.guild.id,
                     draw_moves=True,
                     player_restriction=player,
@@ -261,7 +261,7 @@ class PlayerCog(commands.Cog):
         
         try:
             if not board.fow:
-                file, file_name = manager.draw_map(
+                file, file_name = await manager.draw_map(
                     ctx.guild.id,
                     player_restriction=player,
                     color_mode=color_mode,
@@ -79,6 +79,27 @@ ERROR_COLOUR = all_config["colours"]["embed_error"]
 # TODO: move to config_defaults.toml if applicable or elsewhere
 color_options = {"standard", "dark", "pink", "blue", "kingdoms", "empires"}
 
+# ADJUDICATION
+ADJUDICATION_WORKERS = all_config["adjudication"]["workers"]
+ADJUDICATION_TIMEOUT = all_config["adjudication"]["timeout"]
+ADJUDICATION_CACHE_SIZE = all_config["adjudication"]["cache_size"]
+ADJUDICATION_TRACE_DIR = all_config["adjudication"]["trace_dir"]
+ADJUDICATION_TRACE_THRESHOLD = all_config["adjudication"]["trace_threshold"]
+ADJUDICATION_WHAT_IF_BATCH = all_config["adjudication"]["what_if_batch"]
+ADJUDICATION_ROLLBACK_SNAPSHOTS = all_config["adjudication"]["rollback_snapshots"]
+
+# BOARDS
+BOARDS_WARM_UP = all_config["boards"]["warm_up"]
+BOARDS_IDLE_EVICTION = all_config["boards"]["idle_eviction"]
+BOARDS_HISTORY_CACHE_PROVINCES = all_config["boards"]["history_cache_provinces"]
+
+# DATABASE
+DATABASE_READERS = all_config["database"]["readers"]
+DATABASE_WRITE_BATCH = all_config["database"]["write_batch"]
+DATABASE_ORDER_JOURNAL = all_config["database"]["order_journal"]
+DATABASE_ORDER_JOURNAL_WINDOW = all_config["database"]["order_journal_window"]
+DATABASE_KEYFRAME_INTERVAL = all_config["database"]["keyframe_interval"]
+
 # INKSCAPE
 SIMULATRANEOUS_SVG_EXPORT_LIMIT = all_config["inkscape"]["simultaneous_svg_exports_limit"]
 
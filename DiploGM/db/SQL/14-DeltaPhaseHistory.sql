@@ -0,0 +1,37 @@
+-- Past phases are stored as deltas between keyframes; see DiploGM/db/phase_history.py.
+-- After creating the tables, run `python -m DiploGM.db.phase_history bot_db.sqlite` to compact existing games.
+BEGIN TRANSACTION;
+
+CREATE TABLE IF NOT EXISTS phase_history (
+    board_id int,
+    phase text,
+    ordinal int,
+    is_keyframe boolean,
+    PRIMARY KEY (board_id, phase),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase));
+CREATE INDEX IF NOT EXISTS phase_history_ordinal ON phase_history (board_id, ordinal);
+CREATE TABLE IF NOT EXISTS province_deltas (
+    board_id int,
+    phase text,
+    province_name text,
+    owner text,
+    core text,
+    half_core text,
+    PRIMARY KEY (board_id, phase, province_name),
+    FOREIGN KEY (board_id, phase) REFERENCES phase_history (board_id, phase));
+CREATE TABLE IF NOT EXISTS unit_deltas (
+    board_id int,
+    phase text,
+    location text,
+    is_dislodged boolean,
+    is_removed boolean,
+    owner text,
+    is_army boolean,
+    order_type text,
+    order_destination text,
+    order_source text,
+    failed_order boolean,
+    PRIMARY KEY (board_id, phase, location, is_dislodged),
+    FOREIGN KEY (board_id, phase) REFERENCES phase_history (board_id, phase));
+
+COMMIT;
@@ -0,0 +1,278 @@
+-- Phases are keyed by an integer ordinal computed from their name, and players, provinces and unit locations by
+-- integer ids into players and location_names, rather than by their names in every row. See DiploGM/db/schema.sql.
+-- provinces and units become views with their old columns, so queries written by hand keep working.
+-- Run 14-DeltaPhaseHistory.sql first if it hasn't been; `python -m DiploGM.db.phase_history bot_db.sqlite` runs both.
+-- Rows of provinces and units whose phase has no row in boards are dropped.
+BEGIN TRANSACTION;
+
+-- Players get an id. Rebuilt under a new name and renamed, so references to players in other tables are kept
+CREATE TABLE new_players (
+    player_id INTEGER PRIMARY KEY,
+    board_id int,
+    player_name text,
+    color varchar(6),
+    liege text,
+    points int,
+    discord_id text,
+    UNIQUE (board_id, player_name),
+    FOREIGN KEY (board_id, liege) REFERENCES players (board_id, player_name),
+    FOREIGN KEY (board_id) REFERENCES boards (board_id));
+INSERT INTO new_players (board_id, player_name, color, liege, points, discord_id)
+    SELECT board_id, player_name, color, liege, points, discord_id FROM players;
+DROP TABLE players;
+ALTER TABLE new_players RENAME TO players;
+
+ALTER TABLE boards ADD COLUMN ordinal int GENERATED ALWAYS AS (
+    CAST(substr(phase, 1, instr(phase, ' ') - 1) AS INTEGER) * 5 + CASE substr(phase, instr(phase, ' ') + 1)
+    WHEN 'Spring Moves' THEN 0 WHEN 'Spring Retreats' THEN 1 WHEN 'Fall Moves' THEN 2
+    WHEN 'Fall Retreats' THEN 3 WHEN 'Winter Builds' THEN 4 END) VIRTUAL;
+CREATE INDEX boards_ordinal ON boards (board_id, ordinal);
+
+CREATE TABLE location_names (
+    location_id INTEGER PRIMARY KEY,
+    name text NOT NULL UNIQUE);
+CREATE TABLE province_states (
+    board_id int,
+    ordinal int,
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, ordinal, province_id),
+    FOREIGN KEY (province_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner_id) REFERENCES players (player_id),
+    FOREIGN KEY (core_id) REFERENCES players (player_id),
+    FOREIGN KEY (half_core_id) REFERENCES players (player_id)) WITHOUT ROWID;
+CREATE TABLE unit_states (
+    board_id int,
+    ordinal int,
+    location_id int,
+    is_dislodged boolean,
+    owner_id int,
+    is_army boolean,
+    order_type text,
+    destination_id int,
+    source_id int,
+    failed_order boolean,
+    PRIMARY KEY (board_id, ordinal, location_id, is_dislodged),
+    FOREIGN KEY (location_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner_id) REFERENCES players (player_id),
+    FOREIGN KEY (destination_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (source_id) REFERENCES location_names (location_id)) WITHOUT ROWID;
+
+INSERT INTO location_names (name)
+    SELECT name FROM (
+        SELECT province_name AS name FROM provinces
+        UNION SELECT location FROM units
+        UNION SELECT order_destination FROM units
+        UNION SELECT order_source FROM units
+        UNION SELECT province_name FROM province_deltas
+        UNION SELECT location FROM unit_deltas
+        UNION SELECT order_destination FROM unit_deltas
+        UNION SELECT order_source FROM unit_deltas)
+    WHERE name IS NOT NULL ORDER BY name;
+
+INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id)
+    SELECT p.board_id, b.ordinal, l.location_id, o.player_id, c.player_id, h.player_id
+    FROM provinces p
+    JOIN boards b ON b.board_id = p.board_id AND b.phase = p.phase
+    JOIN location_names l ON l.name = p.province_name
+    LEFT JOIN players o ON o.board_id = p.board_id AND o.player_name = p.owner
+    LEFT JOIN players c ON c.board_id = p.board_id AND c.player_name = p.core
+    LEFT JOIN players h ON h.board_id = p.board_id AND h.player_name = p.half_core
+    WHERE b.ordinal IS NOT NULL;
+INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type,
+    destination_id, source_id, failed_order)
+    SELECT u.board_id, b.ordinal, l.location_id, u.is_dislodged, o.player_id, u.is_army, u.order_type,
+        d.location_id, r.location_id, u.failed_order
+    FROM units u
+    JOIN boards b ON b.board_id = u.board_id AND b.phase = u.phase
+    JOIN location_names l ON l.name = u.location
+    LEFT JOIN players o ON o.board_id = u.board_id AND o.player_name = u.owner
+    LEFT JOIN location_names d ON d.name = u.order_destination
+    LEFT JOIN location_names r ON r.name = u.order_source
+    WHERE b.ordinal IS NOT NULL;
+DROP TABLE provinces;
+DROP TABLE units;
+
+-- The past phases stored as deltas, from 14-DeltaPhaseHistory.sql, already have their ordinal
+CREATE TABLE new_phase_history (
+    board_id int,
+    ordinal int,
+    is_keyframe boolean,
+    PRIMARY KEY (board_id, ordinal)) WITHOUT ROWID;
+CREATE TABLE new_province_deltas (
+    board_id int,
+    ordinal int,
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, ordinal, province_id),
+    FOREIGN KEY (board_id, ordinal) REFERENCES phase_history (board_id, ordinal)) WITHOUT ROWID;
+CREATE TABLE new_unit_deltas (
+    board_id int,
+    ordinal int,
+    location_id int,
+    is_dislodged boolean,
+    is_removed boolean,
+    owner_id int,
+    is_army boolean,
+    order_type text,
+    destination_id int,
+    source_id int,
+    failed_order boolean,
+    PRIMARY KEY (board_id, ordinal, location_id, is_dislodged),
+    FOREIGN KEY (board_id, ordinal) REFERENCES phase_history (board_id, ordinal)) WITHOUT ROWID;
+INSERT INTO new_phase_history (board_id, ordinal, is_keyframe)
+    SELECT board_id, ordinal, is_keyframe FROM phase_history;
+INSERT INTO new_province_deltas (board_id, ordinal, province_id, owner_id, core_id, half_core_id)
+    SELECT d.board_id, h.ordinal, l.location_id, o.player_id, c.player_id, hc.player_id
+    FROM province_deltas d
+    JOIN phase_history h ON h.board_id = d.board_id AND h.phase = d.phase
+    JOIN location_names l ON l.name = d.province_name
+    LEFT JOIN players o ON o.board_id = d.board_id AND o.player_name = d.owner
+    LEFT JOIN players c ON c.board_id = d.board_id AND c.player_name = d.core
+    LEFT JOIN players hc ON hc.board_id = d.board_id AND hc.player_name = d.half_core;
+INSERT INTO new_unit_deltas (board_id, ordinal, location_id, is_dislodged, is_removed, owner_id, is_army, order_type,
+    destination_id, source_id, failed_order)
+    SELECT u.board_id, h.ordinal, l.location_id, u.is_dislodged, u.is_removed, o.player_id, u.is_army, u.order_type,
+        d.location_id, r.location_id, u.failed_order
+    FROM unit_deltas u
+    JOIN phase_history h ON h.board_id = u.board_id AND h.phase = u.phase
+    JOIN location_names l ON l.name = u.location
+    LEFT JOIN players o ON o.board_id = u.board_id AND o.player_name = u.owner
+    LEFT JOIN location_names d ON d.name = u.order_destination
+    LEFT JOIN location_names r ON r.name = u.order_source;
+DROP TABLE province_deltas;
+DROP TABLE unit_deltas;
+DROP TABLE phase_history;
+ALTER TABLE new_phase_history RENAME TO phase_history;
+ALTER TABLE new_province_deltas RENAME TO province_deltas;
+ALTER TABLE new_unit_deltas RENAME TO unit_deltas;
+
+-- Rebuilt without their keys into provinces, which becomes a view: their locations are kept by name, coast included,
+-- so they aren't keys into province_states. vassal_orders referred to a players column that doesn't exist
+CREATE TABLE new_retreat_options (
+    board_id int,
+    phase text,
+    origin text,
+    retreat_loc text,
+    PRIMARY KEY (board_id, phase, origin, retreat_loc),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase));
+INSERT INTO new_retreat_options SELECT board_id, phase, origin, retreat_loc FROM retreat_options;
+DROP TABLE retreat_options;
+ALTER TABLE new_retreat_options RENAME TO retreat_options;
+CREATE TABLE new_builds (
+    board_id int,
+    phase text,
+    player text,
+    location text,
+    is_build boolean,
+    is_army boolean,
+    PRIMARY KEY (board_id, phase, player, location),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name));
+INSERT INTO new_builds SELECT board_id, phase, player, location, is_build, is_army FROM builds;
+DROP TABLE builds;
+ALTER TABLE new_builds RENAME TO builds;
+CREATE TABLE new_vassal_orders (
+    board_id int,
+    phase text,
+    player text,
+    target_player text,
+    order_type text,
+    PRIMARY KEY (board_id, phase, player, target_player),
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
+    FOREIGN KEY (board_id, target_player) REFERENCES players (board_id, player_name));
+INSERT INTO new_vassal_orders SELECT board_id, phase, player, target_player, order_type FROM vassal_orders;
+DROP TABLE vassal_orders;
+ALTER TABLE new_vassal_orders RENAME TO vassal_orders;
+
+-- provinces and units show the current layout of province_states and unit_states by name, for queries written by hand
+-- (see .exec_sql) and GM edits. Writing to them writes to the tables behind them.
+CREATE VIEW provinces AS
+    SELECT s.board_id, b.phase, l.name AS province_name, o.player_name AS owner, c.player_name AS core,
+        h.player_name AS half_core, s.ordinal, s.province_id
+    FROM province_states s
+    JOIN boards b ON b.board_id = s.board_id AND b.ordinal = s.ordinal
+    JOIN location_names l ON l.location_id = s.province_id
+    LEFT JOIN players o ON o.player_id = s.owner_id
+    LEFT JOIN players c ON c.player_id = s.core_id
+    LEFT JOIN players h ON h.player_id = s.half_core_id;
+CREATE TRIGGER provinces_insert INSTEAD OF INSERT ON provinces BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.province_name);
+    INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id) VALUES (
+        NEW.board_id,
+        (SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase),
+        (SELECT location_id FROM location_names WHERE name = NEW.province_name),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.core),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.half_core));
+END;
+CREATE TRIGGER provinces_update INSTEAD OF UPDATE ON provinces BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.province_name);
+    UPDATE province_states SET
+        ordinal = COALESCE((SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase), OLD.ordinal),
+        province_id = (SELECT location_id FROM location_names WHERE name = NEW.province_name),
+        owner_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        core_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.core),
+        half_core_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.half_core)
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND province_id = OLD.province_id;
+END;
+CREATE TRIGGER provinces_delete INSTEAD OF DELETE ON provinces BEGIN
+    DELETE FROM province_states
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND province_id = OLD.province_id;
+END;
+CREATE VIEW units AS
+    SELECT s.board_id, b.phase, l.name AS location, s.is_dislodged, o.player_name AS owner, s.is_army, s.order_type,
+        d.name AS order_destination, r.name AS order_source, s.failed_order, s.ordinal, s.location_id
+    FROM unit_states s
+    JOIN boards b ON b.board_id = s.board_id AND b.ordinal = s.ordinal
+    JOIN location_names l ON l.location_id = s.location_id
+    LEFT JOIN players o ON o.player_id = s.owner_id
+    LEFT JOIN location_names d ON d.location_id = s.destination_id
+    LEFT JOIN location_names r ON r.location_id = s.source_id;
+CREATE TRIGGER units_insert INSTEAD OF INSERT ON units BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.location), (NEW.order_destination), (NEW.order_source);
+    INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type,
+        destination_id, source_id, failed_order) VALUES (
+        NEW.board_id,
+        (SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase),
+        (SELECT location_id FROM location_names WHERE name = NEW.location),
+        NEW.is_dislodged,
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        NEW.is_army,
+        NEW.order_type,
+        (SELECT location_id FROM location_names WHERE name = NEW.order_destination),
+        (SELECT location_id FROM location_names WHERE name = NEW.order_source),
+        NEW.failed_order);
+END;
+CREATE TRIGGER units_update INSTEAD OF UPDATE ON units BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.location), (NEW.order_destination), (NEW.order_source);
+    UPDATE unit_states SET
+        ordinal = COALESCE((SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase), OLD.ordinal),
+        location_id = (SELECT location_id FROM location_names WHERE name = NEW.location),
+        is_dislodged = NEW.is_dislodged,
+        owner_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        is_army = NEW.is_army,
+        order_type = NEW.order_type,
+        destination_id = (SELECT location_id FROM location_names WHERE name = NEW.order_destination),
+        source_id = (SELECT location_id FROM location_names WHERE name = NEW.order_source),
+        failed_order = NEW.failed_order
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND location_id = OLD.location_id
+        AND is_dislodged = OLD.is_dislodged;
+END;
+CREATE TRIGGER units_delete INSTEAD OF DELETE ON units BEGIN
+    DELETE FROM unit_states
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND location_id = OLD.location_id
+        AND is_dislodged = OLD.is_dislodged;
+END;
+-- Renaming a phase moves its rows to the new ordinal
+CREATE TRIGGER boards_phase_renamed AFTER UPDATE OF phase ON boards
+WHEN NEW.ordinal IS NOT OLD.ordinal BEGIN
+    UPDATE province_states SET ordinal = NEW.ordinal WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal;
+    UPDATE unit_states SET ordinal = NEW.ordinal WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal;
+END;
+
+COMMIT;
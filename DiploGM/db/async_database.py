@@ -0,0 +1,210 @@
+"""Database access from the bot's event loop that doesn't block it.
+
+Writes are queued to a single writer thread, which commits whatever has queued up together in one transaction, and
+each write gets a future that is done once it's committed. Reads run on a small pool of reader threads with their own
+connections. The database keeps a write-ahead log, so reads never wait for a write to finish, but they only see what
+has been committed: wait for the writes a read depends on first.
+
+Writes are queued as statements, or as jobs that look up ids as they go, with their rows already built, so they can run
+on the writer thread while the board they came from keeps changing. The bot writes only through the writer, so it
+never waits for SQLite's write lock on the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar, TYPE_CHECKING
+
+from DiploGM.config import DATABASE_READERS, DATABASE_WRITE_BATCH
+from DiploGM.db.database import (
+    SQL_FILE_PATH,
+    Job,
+    Statement,
+    _DatabaseConnection,
+    build_order_statements,
+    clear_failed_orders_job,
+    delete_board_job,
+    order_statements,
+    run_statements,
+    save_board_delta_job,
+    save_board_job,
+    spec_request_statements,
+    total_delete_job,
+)
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.phase_delta import PhaseDelta
+    from DiploGM.models.player import Player
+    from DiploGM.models.spec_request import SpecRequest
+    from DiploGM.models.turn import Turn
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_Write = tuple[Job, Future]
+
+
+class AsyncDatabase:
+    def __init__(self, db_file: str = SQL_FILE_PATH, readers: int = DATABASE_READERS,
+                 write_batch: int = DATABASE_WRITE_BATCH):
+        self.db_file = db_file
+        self.write_batch = write_batch
+        # None stops the writer
+        self._writes: queue.SimpleQueue[_Write | None] = queue.SimpleQueue()
+        self._last_write: Future | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader_connections = threading.local()
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="database-reader")
+        self._writer = threading.Thread(target=self._write_loop, name="database-writer", daemon=True)
+        self._writer.start()
+
+    def submit_job(self, job: Job[T]) -> Future[T]:
+        """Queues job to be run, and committed in the writer's next transaction. The future is done with its result."""
+        future: Future[T] = Future()
+        future.add_done_callback(_log_failure)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The database has been closed")
+            self._writes.put((job, future))
+            self._last_write = future
+        return future
+
+    def submit(self, statements: list[Statement]) -> Future[None]:
+        """Queues statements to be run together, and committed in the writer's next transaction."""
+        return self.submit_job(lambda cursor: run_statements(cursor, statements))
+
+    async def write(self, statements: list[Statement]):
+        await asyncio.wrap_future(self.submit(statements))
+
+    def save_order_for_units(self, board: Board, units: Iterable[Unit]) -> Future[None]:
+        return self.submit(order_statements(board, units))
+
+    def save_build_orders_for_players(self, board: Board, player: Player | None) -> Future[None]:
+        return self.submit(build_order_statements(board, player))
+
+    def save_board(self, board_id: int, board: Board) -> Future[bool]:
+        return self.submit_job(save_board_job(board_id, board))
+
+    def save_board_delta(self, board_id: int, board: Board, delta: PhaseDelta) -> Future[bool]:
+        """Done with False, without saving anything, if the previous phase isn't saved; see save_board_delta_job.
+        All of board is only built when it's needed, so save it with save_board then."""
+        return self.submit_job(save_board_delta_job(board_id, board, delta))
+
+    def clear_failed_orders(self, board_id: int, turn: Turn) -> Future[None]:
+        return self.submit_job(clear_failed_orders_job(board_id, turn))
+
+    def save_spec_request(self, request: SpecRequest) -> Future[None]:
+        return self.submit(spec_request_statements(request))
+
+    def delete_board(self, board: Board) -> Future[None]:
+        return self.submit_job(delete_board_job(board))
+
+    def total_delete(self, board: Board) -> Future[None]:
+        return self.submit_job(total_delete_job(board))
+
+    def execute_arbitrary_sql(self, sql: str, args: tuple) -> Future[None]:
+        return self.submit([(sql, [args])])
+
+    def executemany_arbitrary_sql(self, sql: str, args: list[tuple]) -> Future[None]:
+        return self.submit([(sql, args)])
+
+    async def read(self, job: Callable[[_DatabaseConnection], T]) -> T:
+        """Runs job with a connection on one of the reader threads."""
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._read, job)
+
+    def _read(self, job: Callable[[_DatabaseConnection], T]) -> T:
+        connection = getattr(self._reader_connections, "connection", None)
+        if connection is None:
+            connection = _DatabaseConnection(self.db_file, reader=True)
+            self._reader_connections.connection = connection
+        return job(connection)
+
+    def flush(self, timeout: float | None = None):
+        """Blocks until every write queued so far is committed or has failed."""
+        with self._lock:
+            last_write = self._last_write
+        if last_write is not None:
+            concurrent.futures.wait([last_write], timeout)
+
+    async def wait_for_writes(self):
+        with self._lock:
+            last_write = self._last_write
+        if last_write is not None:
+            await asyncio.wait([asyncio.wrap_future(last_write)])
+
+    def close(self):
+        """Commits what's queued, then stops the writer and reader threads."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._writes.put(None)
+        self._writer.join()
+        self._readers.shutdown()
+
+    def _write_loop(self):
+        connection = sqlite3.connect(self.db_file, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        stopping = False
+        while not stopping:
+            batch: list[_Write] = []
+            write = self._writes.get()
+            while write is not None:
+                batch.append(write)
+                if len(batch) >= self.write_batch:
+                    break
+                try:
+                    write = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = write is None
+            if batch:
+                self._commit(connection, batch)
+        connection.close()
+
+    def _commit(self, connection: sqlite3.Connection, batch: list[_Write]):
+        start = time.time()
+        committed: list[tuple[Future, object]] = []
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN")
+            for job, future in batch:
+                # A failed write is undone on its own, without failing the rest of the batch
+                cursor.execute("SAVEPOINT queued_write")
+                try:
+                    result = job(cursor)
+                except Exception as ex:
+                    cursor.execute("ROLLBACK TO queued_write")
+                    future.set_exception(ex)
+                else:
+                    committed.append((future, result))
+                cursor.execute("RELEASE queued_write")
+            cursor.execute("COMMIT")
+        except sqlite3.Error as ex:
+            if connection.in_transaction:
+                connection.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        finally:
+            cursor.close()
+        for future, result in committed:
+            future.set_result(result)
+        logger.info(f"async_database.commit.{len(batch)}.{time.time() - start}s")
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Queued database write failed", exc_info=future.exception())
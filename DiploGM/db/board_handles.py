@@ -0,0 +1,130 @@
+"""Boards that are loaded from the database the first time they're needed, and can be unloaded again when idle.
+
+A BoardHandle is what's known about a game without loading it: its row in the boards table. BoardHandles maps server
+ids to boards like a dict, but only loads a board when it's looked up; iterating over it or checking whether a game
+exists never does.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator, MutableMapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from DiploGM.db.database import _DatabaseConnection
+    from DiploGM.models.board import Board
+    from DiploGM.models.turn import Turn
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BoardHandle:
+    board_id: int
+    turn: Turn
+    data_file: str
+    fish: int
+    name: str | None
+    # Rowid of the board's latest phase, so games adjudicated or created most recently have the highest
+    recency: int = 0
+    # Whether turn is the year as stored in the database, rather than the board's own turn
+    year_offset: bool = True
+    board: Board | None = None
+    last_used: float = 0.0
+    # State that only lives in memory, kept while the board is unloaded
+    orders_enabled: bool = True
+    fish_pop: dict | None = None
+
+    def unload(self) -> Board | None:
+        board = self.board
+        if board is not None:
+            self.turn = board.turn
+            self.year_offset = False
+            self.data_file = board.datafile
+            self.fish = board.fish
+            self.name = board.name
+            self.orders_enabled = board.orders_enabled
+            self.fish_pop = board.fish_pop
+            self.board = None
+        return board
+
+
+class BoardHandles(MutableMapping):
+    def __init__(self, database: _DatabaseConnection, handles: dict[int, BoardHandle]):
+        self.database = database
+        self.handles = handles
+        self._recency = max((handle.recency for handle in handles.values()), default=0)
+
+    def __getitem__(self, board_id: int) -> Board:
+        handle = self.handles[board_id]
+        if handle.board is None:
+            self.load(board_id)
+        handle.last_used = time.monotonic()
+        assert handle.board is not None
+        return handle.board
+
+    def __setitem__(self, board_id: int, board: Board):
+        handle = self.handles.get(board_id)
+        if handle is None:
+            handle = BoardHandle(board_id, board.turn, board.datafile, board.fish, board.name, year_offset=False)
+            self.handles[board_id] = handle
+        # Boards are only replaced when a game is created or changes phase
+        self._recency += 1
+        handle.recency = self._recency
+        handle.board = board
+        handle.last_used = time.monotonic()
+
+    def __delitem__(self, board_id: int):
+        del self.handles[board_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.handles)
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def __contains__(self, board_id: object) -> bool:
+        return board_id in self.handles
+
+    def is_loaded(self, board_id: int) -> bool:
+        handle = self.handles.get(board_id)
+        return handle is not None and handle.board is not None
+
+    def load(self, board_id: int) -> Board:
+        start = time.time()
+        board = self.loaded(board_id, self.database.load_board(self.handles[board_id]))
+        logger.info(f"board_handles.load.{board_id}.{time.time() - start}s")
+        return board
+
+    def loaded(self, board_id: int, board: Board) -> Board:
+        """Keeps board, loaded from board_id's handle elsewhere (like on a reader thread), as the game's board.
+        If the game was loaded in the meantime, that board is kept instead."""
+        handle = self.handles[board_id]
+        if handle.board is None:
+            board.orders_enabled = handle.orders_enabled
+            if handle.fish_pop is not None:
+                board.fish_pop = handle.fish_pop
+            handle.board = board
+        handle.last_used = time.monotonic()
+        return handle.board
+
+    def fish(self, board_id: int) -> int:
+        handle = self.handles[board_id]
+        return handle.fish if handle.board is None else handle.board.fish
+
+    def most_recent(self, count: int) -> list[int]:
+        """The count games that were adjudicated or created last, most recent first."""
+        return sorted(self.handles, key=lambda board_id: self.handles[board_id].recency, reverse=True)[:count]
+
+    def idle(self, max_idle: float) -> list[int]:
+        """Loaded games that haven't been looked up for max_idle seconds."""
+        cutoff = time.monotonic() - max_idle
+        return [
+            board_id for board_id, handle in self.handles.items()
+            if handle.board is not None and handle.last_used < cutoff
+        ]
+
+    def unload(self, board_id: int) -> Board | None:
+        return self.handles[board_id].unload()
@@ -0,0 +1,68 @@
+"""Past phases of games, kept in memory after they're first loaded for viewing maps, orders and scoreboards.
+
+Phases before a game's current one only change when the game is rolled back or deleted, so the Manager can hand out
+the same Board for them until then. Boards from the cache are shared and must not be modified.
+"""
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+
+logger = logging.getLogger(__name__)
+
+
+class BoardHistoryCache:
+    """The most recently used past boards, keyed by (board id, indexed phase name).
+
+    The cache is bounded by the total number of provinces of the boards in it, since a board's size in memory mostly
+    depends on its map rather than on how far the game is.
+    """
+
+    def __init__(self, max_provinces: int):
+        self.max_provinces = max_provinces
+        self._entries: OrderedDict[tuple[int, str], Board] = OrderedDict()
+        self._provinces = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, board_id: int, phase: str) -> Board | None:
+        board = self._entries.get((board_id, phase))
+        if board is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end((board_id, phase))
+        logger.info(f"board_history: {'miss' if board is None else 'hit'} for {board_id} {phase}, {self.hits} hits, "
+                    f"{self.misses} misses ({self.hit_rate:.0%} hit rate)")
+        return board
+
+    def put(self, board_id: int, phase: str, board: Board):
+        size = len(board.provinces)
+        if size > self.max_provinces:
+            return
+        key = (board_id, phase)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._provinces -= len(old.provinces)
+        self._entries[key] = board
+        self._provinces += size
+        while self._provinces > self.max_provinces:
+            _, evicted = self._entries.popitem(last=False)
+            self._provinces -= len(evicted.provinces)
+
+    def invalidate(self, board_id: int):
+        """Forgets every phase of a game."""
+        for key in [key for key in self._entries if key[0] == board_id]:
+            self._provinces -= len(self._entries.pop(key).provinces)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -1,8 +1,14 @@
+import atexit
 import logging
 import sqlite3
+import time
 from collections.abc import Iterable
-from typing import Optional
+from typing import Callable, Optional, TypeVar, TYPE_CHECKING
 
+from DiploGM.config import DATABASE_KEYFRAME_INTERVAL
+from DiploGM.db import phase_history
+from DiploGM.db.phase_history import phase_ordinal
+from DiploGM.db.board_handles import BoardHandle
 # TODO: Find a better way to do this
 # maybe use a copy from manager?
 from DiploGM.map_parser.vector.vector import get_parser
@@ -28,17 +34,532 @@ from DiploGM.models.order import (
     Defect,
     RebellionMarker,
 )
+from DiploGM.models.phase_delta import PhaseDelta
 from DiploGM.models.player import Player
+from DiploGM.models.province import Province
+from DiploGM.models.board_state import unit_key
 from DiploGM.models.spec_request import SpecRequest
 from DiploGM.models.unit import UnitType, Unit
 
+if TYPE_CHECKING:
+    from DiploGM.db.async_database import AsyncDatabase
+    from DiploGM.db.order_journal import OrderJournal
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 SQL_FILE_PATH = "bot_db.sqlite"
 
 
+_UPSERT_PLAYER = (
+    "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?) ON CONFLICT "
+    "DO UPDATE SET "
+    "color = ?, "
+    "liege = ?, "
+    "points = ?"
+)
+
+
+def _player_row(board_id: int, player: Player) -> tuple:
+    # Player rows are upserted, so the updated values come twice
+    liege = None if player.liege is None else str(player.liege)
+    return board_id, player.name, player.render_color, liege, player.points, player.render_color, liege, player.points
+
+
+def _player_id(player_ids: dict[str, int], player: str | None) -> int | None:
+    return None if player is None else player_ids[player]
+
+
+def _location_id(location_ids: dict[str, int], location: str | None) -> int | None:
+    return None if location is None else location_ids[location]
+
+
+def _name(player: Player | None) -> str | None:
+    return None if player is None else player.name
+
+
+def _province_names(province: Province) -> tuple[str, str | None, str | None, str | None]:
+    """A province and its owner, core and half core, by name; see _province_row."""
+    return province.name, _name(province.owner), _name(province.core), _name(province.half_core)
+
+
+def _province_row(
+    board_id: int, ordinal: int, names: tuple, player_ids: dict[str, int], location_ids: dict[str, int]
+) -> tuple:
+    name, owner, core, half_core = names
+    return (
+        board_id,
+        ordinal,
+        location_ids[name],
+        _player_id(player_ids, owner),
+        _player_id(player_ids, core),
+        _player_id(player_ids, half_core),
+    )
+
+
+def _unit_locations(unit: Unit) -> tuple[str, str | None, str | None]:
+    """The location of a unit, and the destination and source of its order, by the names they're saved under."""
+    return (
+        unit.province.get_name(unit.coast),
+        unit.order.get_destination_str() if unit.order is not None else None,
+        unit.order.get_source_str() if unit.order is not None else None,
+    )
+
+
+def _unit_names(unit: Unit) -> tuple:
+    """A unit and its order, with players and locations by name; see _unit_row."""
+    # TODO - this is hacky
+    location, destination, source = _unit_locations(unit)
+    return (
+        location,
+        unit == unit.province.dislodged_unit,
+        unit.player.name,
+        unit.unit_type == UnitType.ARMY,
+        unit.order.__class__.__name__ if unit.order is not None else None,
+        destination,
+        source,
+        unit.order.hasFailed if unit.order is not None else False
+    )
+
+
+def _unit_row(
+    board_id: int, ordinal: int, names: tuple, player_ids: dict[str, int], location_ids: dict[str, int]
+) -> tuple:
+    location, is_dislodged, owner, is_army, order_type, destination, source, failed = names
+    return (
+        board_id,
+        ordinal,
+        location_ids[location],
+        is_dislodged,
+        player_ids[owner],
+        is_army,
+        order_type,
+        _location_id(location_ids, destination),
+        _location_id(location_ids, source),
+        failed,
+    )
+
+
+def _locations(province_names: list[tuple], unit_names: list[tuple]) -> list[str | None]:
+    """The names of the locations of provinces and units, and of the destinations and sources of their orders."""
+    return [names[0] for names in province_names] + [
+        name for names in unit_names for name in (names[0], names[5], names[6])
+    ]
+
+
+def _ids_of_locations(cursor: sqlite3.Cursor, names: Iterable[str | None]) -> dict[str, int]:
+    """Location ids by name, including every one of names; new names are added to location_names."""
+    cursor.executemany(
+        "INSERT OR IGNORE INTO location_names (name) VALUES (?)", [(name,) for name in set(names) if name is not None]
+    )
+    return dict(cursor.execute("SELECT name, location_id FROM location_names"))
+
+
+def _ids_of_players(cursor: sqlite3.Cursor, board_id: int) -> dict[str, int]:
+    return dict(cursor.execute("SELECT player_name, player_id FROM players WHERE board_id=?", (board_id,)))
+
+
+_INSERT_BOARD = "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, ?, ?, ?)"
+_INSERT_PROVINCE_STATE = (
+    "INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_INSERT_UNIT_STATE = (
+    "INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type, "
+    "destination_id, source_id, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_BUILD = "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)"
+_INSERT_RETREAT_OPTION = "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)"
+
+
+def _build_rows(board_id: int, board: Board) -> list[tuple]:
+    return [
+        (
+            board_id,
+            board.turn.get_indexed_name(),
+            player.name,
+            build_order.province.get_name(build_order.coast),
+            isinstance(build_order, Build),
+            getattr(build_order, "unit_type", None) == UnitType.ARMY,
+        )
+        for player in board.players
+        for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+    ]
+
+
+def _retreat_option_rows(board_id: int, board: Board) -> list[tuple]:
+    return [
+        (
+            board_id,
+            board.turn.get_indexed_name(),
+            unit.province.get_name(unit.coast),
+            retreat_option[0].get_name(retreat_option[1]),
+        )
+        for unit in board.units
+        if unit.retreat_options is not None
+        for retreat_option in unit.retreat_options
+    ]
+
+
+_UNIT_ORDERS = {
+    order_class.__name__: order_class
+    for order_class in [NMR, Hold, Core, Move, ConvoyMove, ConvoyTransport, Support, RetreatMove, RetreatDisband]
+}
+_VASSAL_ORDERS = {
+    order_class.__name__: order_class
+    for order_class in [Vassal, Liege, DualMonarchy, Disown, Defect, RebellionMarker]
+}
+
+
+def _location_names(board: Board) -> dict[str, tuple[Province, str | None]]:
+    """Every province and coast by the exact name it's saved under; see Province.get_name."""
+    locations: dict[str, tuple[Province, str | None]] = {province.name: (province, None) for province in board.provinces}
+    # Board keeps coasts by the same names
+    locations.update(board.name_to_coast)
+    return locations
+
+
+# An SQL statement and the rows to run it with
+Statement = tuple[str, list[tuple]]
+
+
+def order_row(board: Board, unit: Unit) -> tuple:
+    """A unit's order by name, followed by its retreat options, or None if it has none.
+
+    It's made of plain values, so it can be written to the order journal as JSON.
+    """
+    return (
+        board.board_id,
+        board.turn.get_indexed_name(),
+        unit.province.get_name(unit.coast),
+        f"{unit.province.get_name()} coast" if not unit.coast else None, # Legacy coast support
+        unit.province.dislodged_unit == unit,
+        unit.order.__class__.__name__ if unit.order is not None else None,
+        unit.order.get_destination_str() if unit.order is not None else None,
+        unit.order.get_source_str() if unit.order is not None else None,
+        unit.order.hasFailed if unit.order is not None else False,
+        None if unit.retreat_options is None else sorted(
+            retreat_option[0].get_name(retreat_option[1]) for retreat_option in unit.retreat_options
+        ),
+    )
+
+
+def order_row_statements(rows: Iterable[tuple]) -> list[Statement]:
+    rows = list(rows)
+    # Names are looked up in SQL, since the statements may run on a connection of the async database
+    return [
+        (
+            "INSERT OR IGNORE INTO location_names (name) VALUES (?)",
+            [(name,) for row in rows for name in (row[6], row[7]) if name is not None],
+        ),
+        (
+            "UPDATE unit_states SET order_type=?, "
+            "destination_id=(SELECT location_id FROM location_names WHERE name=?), "
+            "source_id=(SELECT location_id FROM location_names WHERE name=?), failed_order=? "
+            "WHERE board_id=? and ordinal=? "
+            "and location_id IN (SELECT location_id FROM location_names WHERE name IN (?, ?)) and is_dislodged=?",
+            [
+                (
+                    order_type, destination, source, failed, board_id, phase_ordinal(phase), location,
+                    legacy_location, dislodged,
+                )
+                for (board_id, phase, location, legacy_location, dislodged, order_type, destination, source, failed,
+                     _) in rows
+            ],
+        ),
+        (
+            "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
+            [(row[0], row[1], row[2]) for row in rows if row[9] is not None],
+        ),
+        (
+            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+            [(row[0], row[1], row[2], retreat_loc) for row in rows if row[9] is not None for retreat_loc in row[9]],
+        ),
+    ]
+
+
+def order_statements(board: Board, units: Iterable[Unit]) -> list[Statement]:
+    """The statements that save the orders and retreat options of units.
+
+    They're built right away, so they can be run on another thread while the board keeps changing.
+    """
+    return order_row_statements(order_row(board, unit) for unit in units)
+
+
+def build_order_statements(board: Board, player: Player | None) -> list[Statement]:
+    """The statements that save the build and vassal orders of a player, or of every player if player is None."""
+    if player is None:
+        players = board.players
+    else:
+        players = {player}
+    phase = board.turn.get_indexed_name()
+    return [
+        (
+            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (board_id, phase, player, location) DO UPDATE SET is_build=?, is_army=?",
+            [
+                (
+                    board.board_id,
+                    phase,
+                    player.name,
+                    build_order.province.get_name(build_order.coast if isinstance(build_order, Build) else None),
+                    isinstance(build_order, Build),
+                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
+                    isinstance(build_order, Build),
+                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
+                )
+                for player in players
+                for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+            ],
+        ),
+        (
+            "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?) ",
+            [
+                (
+                    board.board_id,
+                    phase,
+                    player.name,
+                    build_order.player.name,
+                    build_order.__class__.__name__,
+                )
+                for player in players
+                for build_order in player.vassal_orders.values()
+            ],
+        ),
+    ]
+
+
+def spec_request_statements(request: SpecRequest) -> list[Statement]:
+    return [
+        (
+            "INSERT OR REPLACE INTO spec_requests (server_id, user_id, role_id) VALUES (?, ?, ?)",
+            [(request.server_id, request.user_id, request.role_id)],
+        )
+    ]
+
+
+def run_statements(cursor: sqlite3.Cursor, statements: list[Statement]):
+    for sql, rows in statements:
+        cursor.executemany(sql, rows)
+
+
+# A write that has to look things up as it goes, like the ids of what it saves. Like statements, a job is built with
+# its rows, so it can run on the async database's writer thread while the board it came from keeps changing
+Job = Callable[[sqlite3.Cursor], T]
+
+
+def save_board_job(board_id: int, board: Board) -> Job[bool]:
+    """The job that saves the phase board is in. It's done with True, like save_board_delta_job when it can save."""
+    # Queued orders of the previous phase have to be written before it's compacted, so they're queued before it
+    phase = board.turn.get_indexed_name()
+    ordinal = phase_ordinal(phase)
+    board_row = (board_id, phase, board.datafile, board.fish, board.name)
+    player_rows = [_player_row(board_id, player) for player in board.players]
+
+    # cache = []
+    # for p in board.provinces:
+    #     if p.name == "NICE":
+    #         print(p.type)
+    #         import matplotlib.pyplot as plt
+    #         import shapely
+    #         if isinstance(p.geometry, shapely.Polygon):
+    #             plt.plot(*p.geometry.exterior.xy)
+    #         else:
+    #             for geo in p.geometry.geoms:
+    #                 plt.plot(*geo.exterior.xy)
+    # plt.gca().invert_yaxis()
+    # plt.show()
+
+    cache = []
+    for p in board.provinces:
+        if p.name in cache:
+            print(f"{p.name} repeats!!!")
+        cache.append(p.name)
+
+    province_names = [_province_names(province) for province in board.provinces]
+    build_rows = _build_rows(board_id, board)
+    unit_names = [_unit_names(unit) for unit in board.units]
+    retreat_option_rows = _retreat_option_rows(board_id, board)
+
+    def save(cursor: sqlite3.Cursor) -> bool:
+        # TODO: Check if board already exists
+        cursor.execute(_INSERT_BOARD, board_row)
+        cursor.executemany(_UPSERT_PLAYER, player_rows)
+        player_ids = _ids_of_players(cursor, board_id)
+        location_ids = _ids_of_locations(cursor, _locations(province_names, unit_names))
+        cursor.executemany(
+            _INSERT_PROVINCE_STATE,
+            [_province_row(board_id, ordinal, names, player_ids, location_ids) for names in province_names],
+        )
+        cursor.executemany(_INSERT_BUILD, build_rows)
+        cursor.executemany(
+            _INSERT_UNIT_STATE,
+            [_unit_row(board_id, ordinal, names, player_ids, location_ids) for names in unit_names],
+        )
+        cursor.executemany(_INSERT_RETREAT_OPTION, retreat_option_rows)
+        phase_history.compact_previous_phase(cursor, board_id, ordinal, DATABASE_KEYFRAME_INTERVAL)
+        return True
+
+    return save
+
+
+def save_board_delta_job(board_id: int, board: Board, delta: PhaseDelta) -> Job[bool]:
+    """The job that saves the phase board is in after the adjudication described by delta, like save_board_job. Rows
+    that didn't change are copied from the previous phase inside SQLite, so only the changed ones are built and sent.
+
+    If the previous phase isn't (fully) saved there is nothing to copy, and it's done with False without saving
+    anything: save_board_job has to save all of the phase then.
+    """
+    phase = board.turn.get_indexed_name()
+    previous_phase = delta.previous_phase
+    ordinal, previous_ordinal = phase_ordinal(phase), phase_ordinal(previous_phase)
+    previous_size = len(delta.before["provinces"])
+    board_row = (board_id, phase, board.datafile, board.fish, board.name)
+    players = {player.name: player for player in board.players}
+    provinces = {province.name: province for province in board.provinces}
+    player_rows = [_player_row(board_id, players[name]) for name in delta.changed("players")]
+    province_names = [_province_names(provinces[name]) for name in delta.changed("provinces")]
+    build_rows = _build_rows(board_id, board)
+    written, dropped = delta.unit_rows
+    unit_names = [_unit_names(unit) for unit in board.units if unit_key(unit) in written]
+    dropped_locations = [(provinces[name].get_name(coast), is_dislodged) for name, coast, is_dislodged in dropped]
+    retreat_option_rows = _retreat_option_rows(board_id, board)
+    units = len(board.units)
+
+    def save(cursor: sqlite3.Cursor) -> bool:
+        (previous_provinces,) = cursor.execute(
+            "SELECT COUNT(*) FROM province_states WHERE board_id=? AND ordinal=?", (board_id, previous_ordinal)
+        ).fetchone()
+        if previous_provinces != previous_size:
+            logger.warning(f"Phase {previous_phase} of board {board_id} isn't saved; saving all of {phase}")
+            return False
+
+        cursor.execute(_INSERT_BOARD, board_row)
+        cursor.executemany(_UPSERT_PLAYER, player_rows)
+        player_ids = _ids_of_players(cursor, board_id)
+        location_ids = _ids_of_locations(
+            cursor, _locations(province_names, unit_names) + [location for location, _ in dropped_locations]
+        )
+
+        cursor.execute(
+            "INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id) "
+            "SELECT board_id, ?, province_id, owner_id, core_id, half_core_id FROM province_states "
+            "WHERE board_id=? AND ordinal=?",
+            (ordinal, board_id, previous_ordinal),
+        )
+        cursor.executemany(
+            "UPDATE province_states SET owner_id=?, core_id=?, half_core_id=? "
+            "WHERE board_id=? AND ordinal=? AND province_id=?",
+            [
+                _province_row(board_id, ordinal, names, player_ids, location_ids)[3:]
+                + (board_id, ordinal, location_ids[names[0]])
+                for names in province_names
+            ],
+        )
+        cursor.executemany(_INSERT_BUILD, build_rows)
+
+        # Units that stayed where they were keep their row, without the order they had
+        cursor.execute(
+            "INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type, "
+            "destination_id, source_id, failed_order) "
+            "SELECT board_id, ?, location_id, is_dislodged, owner_id, is_army, NULL, NULL, NULL, FALSE "
+            "FROM unit_states WHERE board_id=? AND ordinal=?",
+            (ordinal, board_id, previous_ordinal),
+        )
+        cursor.executemany(
+            "DELETE FROM unit_states WHERE board_id=? AND ordinal=? AND location_id=? AND is_dislodged=?",
+            [
+                (board_id, ordinal, location_ids[location], is_dislodged)
+                for location, is_dislodged in dropped_locations
+            ],
+        )
+        cursor.executemany(
+            _INSERT_UNIT_STATE,
+            [_unit_row(board_id, ordinal, names, player_ids, location_ids) for names in unit_names],
+        )
+        cursor.executemany(_INSERT_RETREAT_OPTION, retreat_option_rows)
+        phase_history.compact_previous_phase(cursor, board_id, ordinal, DATABASE_KEYFRAME_INTERVAL)
+        logger.info(
+            f"database.save_board_delta.{board_id}: {len(player_rows)} players, "
+            f"{len(province_names)}/{previous_provinces} provinces, {len(written)}/{units} units written"
+        )
+        return True
+
+    return save
+
+
+def clear_failed_orders_job(board_id: int, turn: Turn) -> Job[None]:
+    ordinal = phase_ordinal(turn.get_indexed_name())
+
+    def clear(cursor: sqlite3.Cursor):
+        phase_history.expand_phase(cursor, board_id, ordinal)
+        cursor.execute("UPDATE unit_states SET failed_order=False WHERE board_id=? and ordinal=?",
+            (board_id, ordinal))
+
+    return clear
+
+
+def delete_board_job(board: Board) -> Job[None]:
+    board_id = board.board_id
+    phase = board.turn.get_indexed_name()
+    ordinal = phase_ordinal(phase)
+
+    def delete(cursor: sqlite3.Cursor):
+        cursor.execute(
+            "DELETE FROM boards WHERE board_id=? AND phase=?",
+            (board_id, phase),
+        )
+        cursor.execute(
+            "DELETE FROM province_states WHERE board_id=? AND ordinal=?",
+            (board_id, ordinal),
+        )
+        cursor.execute(
+            "DELETE FROM unit_states WHERE board_id=? AND ordinal=?",
+            (board_id, ordinal),
+        )
+        cursor.execute(
+            "DELETE FROM builds WHERE board_id=? AND phase=?",
+            (board_id, phase),
+        )
+        cursor.execute(
+            "DELETE FROM retreat_options WHERE board_id=? AND phase=?",
+            (board_id, phase),
+        )
+        cursor.execute(
+            "DELETE FROM vassal_orders WHERE board_id=? AND phase=?",
+            (board_id, phase),
+        )
+        phase_history.delete_phase(cursor, board_id, ordinal)
+        # The phase before it becomes the current one again, which is changed in place
+        phase_history.expand_latest_phase(cursor, board_id)
+
+    return delete
+
+
+def total_delete_job(board: Board) -> Job[None]:
+    board_id = board.board_id
+
+    def delete(cursor: sqlite3.Cursor):
+        cursor.execute("DELETE FROM boards WHERE board_id=?", (board_id,))
+        cursor.execute("DELETE FROM board_parameters WHERE board_id=?", (board_id,))
+        cursor.execute("DELETE FROM province_states WHERE board_id=?", (board_id,))
+        cursor.execute("DELETE FROM unit_states WHERE board_id=?", (board_id,))
+        cursor.execute("DELETE FROM builds WHERE board_id=?", (board_id,))
+        cursor.execute(
+            "DELETE FROM retreat_options WHERE board_id=?", (board_id,)
+        )
+        cursor.execute("DELETE FROM players WHERE board_id=?", (board_id,))
+        cursor.execute("DELETE FROM spec_requests WHERE server_id=?", (board_id,))
+        phase_history.delete_game(cursor, board_id)
+
+    return delete
+
+
 class _DatabaseConnection:
-    def __init__(self, db_file: str = SQL_FILE_PATH):
+    def __init__(self, db_file: str = SQL_FILE_PATH, reader: bool = False):
+        # Readers are the extra connections of the async database, which don't set up the schema
+        self.reader = reader
         try:
             self._connection = sqlite3.connect(db_file)
             logger.info("Connection to SQLite DB successful")
@@ -48,30 +569,58 @@ class _DatabaseConnection:
                 ":memory:"
             )  # Special wildcard; in-memory db
 
-        self._initialize_schema()
+        # With a write-ahead log, reading never waits for another connection's write to finish
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # location_names by id; ids are never reused, so they're only loaded again to find new ones
+        self._location_names: dict[int, str] = {}
+        if not reader:
+            self._initialize_schema()
 
     def _initialize_schema(self):
+        if phase_history.needs_migration(self._connection):
+            raise RuntimeError(
+                "The database keeps provinces and units by name; migrate it with "
+                "`python -m DiploGM.db.phase_history` (see DiploGM/db/SQL/15-IntegerKeys.sql)"
+            )
         # FIXME: move the sql file somewhere more accessible (maybe it shouldn't be inside the package? /resources ?)
         with open("DiploGM/db/schema.sql", "r") as sql_file:
             cursor = self._connection.cursor()
             cursor.executescript(sql_file.read())
             cursor.close()
 
+    def _load_location_names(self, cursor: sqlite3.Cursor):
+        for location_id, name in cursor.execute("SELECT location_id, name FROM location_names"):
+            self._location_names[location_id] = name
+
+    def _names_of_locations(self, cursor: sqlite3.Cursor, location_ids: Iterable[int | None]) -> dict[int, str]:
+        """Location names by id, including every one of location_ids."""
+        if any(location_id is not None and location_id not in self._location_names for location_id in location_ids):
+            self._load_location_names(cursor)
+        return self._location_names
+
     def get_boards(self, board_ids:Optional[list[int]]=None) -> dict[int, Board]:
+        handles = self.get_board_handles(board_ids)
+        boards = {board_id: self.load_board(handle) for board_id, handle in handles.items()}
+        logger.info("Successfully loaded")
+        return boards
+
+    def get_board_handles(self, board_ids:Optional[list[int]]=None) -> dict[int, BoardHandle]:
+        """The latest phase of every game, without loading any of them; see DiploGM.db.board_handles."""
         cursor = self._connection.cursor()
 
         if board_ids is not None:
             placeholders = ",".join("?" for _ in board_ids)
-            sql = f"SELECT * FROM boards WHERE board_id IN ({placeholders})"
+            sql = f"SELECT rowid, board_id, phase, data_file, fish, name FROM boards WHERE board_id IN ({placeholders})"
             board_data = cursor.execute(sql, board_ids).fetchall()
         else:
-            board_data = cursor.execute("SELECT * FROM boards").fetchall()
+            board_data = cursor.execute("SELECT rowid, board_id, phase, data_file, fish, name FROM boards").fetchall()
+        cursor.close()
 
-        board_keys = [(row[0], row[1]) for row in board_data]
-        logger.info(f"Loading {len(board_data)} boards from DB")
-        boards: dict[int, Board] = {}
+        board_keys = {(row[1], row[2]) for row in board_data}
+        logger.info(f"Found {len(board_data)} board phases in DB")
+        handles: dict[int, BoardHandle] = {}
         for board_row in board_data:
-            board_id, phase_string, data_file, fish, name = board_row
+            rowid, board_id, phase_string, data_file, fish, name = board_row
 
             current_turn = Turn.turn_from_string(phase_string)
             if current_turn is None:
@@ -83,15 +632,17 @@ class _DatabaseConnection:
             if fish is None:
                 fish = 0
 
-            board = self._get_board(
-                board_id, current_turn, fish, name, data_file, cursor, year_offset=True
-            )
-
-            boards[board_id] = board
+            handles[board_id] = BoardHandle(board_id, current_turn, data_file, fish, name, recency=rowid)
+        return handles
 
+    def load_board(self, handle: BoardHandle) -> Board:
+        cursor = self._connection.cursor()
+        board = self._get_board(
+            handle.board_id, handle.turn, handle.fish, handle.name, handle.data_file, cursor,
+            year_offset=handle.year_offset,
+        )
         cursor.close()
-        logger.info("Successfully loaded")
-        return boards
+        return board
 
     def get_board(
         self,
@@ -114,6 +665,9 @@ class _DatabaseConnection:
 
         board = self._get_board(board_id, turn, fish, name, data_file, cursor, clear_status=clear_status)
         cursor.close()
+        if clear_status:
+            # Left open, the write would keep the async database's writer waiting for the lock
+            self._connection.commit()
         return board
 
 
@@ -155,14 +709,15 @@ class _DatabaseConnection:
         clear_status: bool = False,
         year_offset: bool = False,
     ) -> Board:
-        logger.info(f"Loading board with ID {board_id}")
-        # TODO - we should eventually store things like coords, adjacencies, etc
-        #  so we don't have to reparse the whole board each time
+        start = time.time()
+        # The variant topology is compiled once and shared; this only builds fresh per-game state
         board = get_parser(data_file).parse()
         board.turn = Turn(board.year_offset + turn.year, turn.phase, board.year_offset) if year_offset else turn
         board.fish = fish
         board.name = name
         board.board_id = board_id
+        phase = board.turn.get_indexed_name()
+        ordinal = phase_ordinal(phase)
 
         board_params = cursor.execute(
             "SELECT parameter_key, parameter_value FROM board_parameters WHERE board_id=?",
@@ -182,15 +737,40 @@ class _DatabaseConnection:
         if board.data["players"] != "chaos":
             board.update_players()
 
+        # Locations are saved under their exact names, so look them up directly rather than through
+        # get_province_and_coast, which is meant for user input. It's only needed for rows saved by older versions
+        locations = _location_names(board)
+
+        def get_location(location: str) -> tuple[Province, str | None]:
+            found = locations.get(location)
+            return found if found is not None else board.get_province_and_coast(location)
+
+        name_to_player = {player.name: player for player in board.players}
+
+        def get_player_by_name(player_name: str) -> Player | None:
+            player = name_to_player.get(player_name)
+            if player is None:
+                player = board.get_player(player_name)
+            if player is None:
+                logger.warning(f"Unknown player: {player_name}")
+            return player
+
         player_data = cursor.execute(
-            "SELECT player_name, color, liege, points FROM players WHERE board_id=?",
+            "SELECT player_id, player_name, color, liege, points FROM players WHERE board_id=?",
             (board_id,),
         ).fetchall()
         player_info_by_name = {
             player_name: (color, liege, points)
-            for player_name, color, liege, points in player_data
+            for _, player_name, color, liege, points in player_data
         }
-        name_to_player = {player.name: player for player in board.players}
+        player_names = {player_id: player_name for player_id, player_name, *_ in player_data}
+
+        def get_player_by_id(player_id: int) -> Player | None:
+            player_name = player_names.get(player_id)
+            if player_name is None:
+                logger.warning(f"Unknown player id: {player_id}")
+                return None
+            return get_player_by_name(player_name)
         for player in board.players:
             if player.name not in player_info_by_name:
                 logger.warning(f"Couldn't find player {player.name} in DB")
@@ -210,81 +790,63 @@ class _DatabaseConnection:
         if board.turn.is_builds():
             builds_data = cursor.execute(
                 "SELECT player, location, is_build, is_army FROM builds WHERE board_id=? and phase=?",
-                (board_id, board.turn.get_indexed_name()),
+                (board_id, phase),
             ).fetchall()
 
-            def get_player_by_name(player_name) -> Player | None:
-                player_by_name = {player.name: player for player in board.players}
-
-                if player_name not in player_by_name:
-                    logger.warning(f"Unknown player: {player_name}")
-                    return None
-
-                return player_by_name[player_name]
-
             for player_name, location, is_build, is_army in builds_data:
                 player = get_player_by_name(player_name)
 
                 if player is None:
                     continue
 
+                province, coast = get_location(location)
                 if is_build:
-                    player_order = Build(
-                        board.get_province_and_coast(location)[0],
-                        UnitType.ARMY if is_army else UnitType.FLEET,
-                        board.get_province_and_coast(location)[1],
-                    )
+                    player_order = Build(province, UnitType.ARMY if is_army else UnitType.FLEET, coast)
                 else:
-                    player_order = Disband(board.get_province(location))
+                    player_order = Disband(province)
 
                 player.build_orders.add(player_order)
 
             vassals_data = cursor.execute(
                 "SELECT player, target_player, order_type FROM vassal_orders WHERE board_id=? and phase=?",
-                (board_id, board.turn.get_indexed_name()),
+                (board_id, phase),
             ).fetchall()
 
-            order_classes = [
-                Vassal,
-                Liege,
-                DualMonarchy,
-                Disown,
-                Defect,
-                RebellionMarker,
-            ]
-
             for player_name, target_player_name, order_type in vassals_data:
                 player = get_player_by_name(player_name)
                 target_player = get_player_by_name(target_player_name)
                 assert isinstance(player, Player)
                 assert isinstance(target_player, Player)
-                order_class = next(
-                    order_class
-                    for order_class in order_classes
-                    if order_class.__name__ == order_type
-                )
-
-                order = order_class(target_player)
-
-                player.vassal_orders[target_player] = order
+                player.vassal_orders[target_player] = _VASSAL_ORDERS[order_type](target_player)
 
-        province_data = cursor.execute(
-            "SELECT province_name, owner, core, half_core FROM provinces WHERE board_id=? and phase=?",
-            (board_id, board.turn.get_indexed_name()),
-        ).fetchall()
-        province_info_by_name = {
-            province_name: (owner, core, half_core)
-            for province_name, owner, core, half_core in province_data
-        }
-        
         if clear_status:
-            cursor.execute("UPDATE units SET failed_order=False WHERE board_id=? and phase=?",
-                (board_id, board.turn.get_indexed_name()))
-        
-        unit_data = cursor.execute(
-            "SELECT location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order FROM units WHERE board_id=? and phase=?",
-            (board_id, board.turn.get_indexed_name()),
-        ).fetchall()
+            phase_history.expand_phase(cursor, board_id, ordinal)
+            cursor.execute("UPDATE unit_states SET failed_order=False WHERE board_id=? and ordinal=?",
+                (board_id, ordinal))
+
+        province_rows, unit_rows = phase_history.phase_rows(cursor, board_id, ordinal)
+        location_names = self._names_of_locations(
+            cursor,
+            list(province_rows) + [
+                location_id
+                for (location, _), (_, _, _, destination, source, _) in unit_rows.items()
+                for location_id in (location, destination, source)
+            ],
+        )
+        province_info_by_name = {location_names[province_id]: row for province_id, row in province_rows.items()}
+        unit_data = [
+            (location_names[location], is_dislodged, owner, is_army, order_type,
+             location_names.get(destination), location_names.get(source), has_failed)
+            for (location, is_dislodged), (owner, is_army, order_type, destination, source, has_failed)
+            in unit_rows.items()
+        ]
+        retreat_data: dict[str, list[str]] = {}
+        for origin, retreat_loc in cursor.execute(
+            "SELECT origin, retreat_loc FROM retreat_options WHERE board_id=? and phase=?",
+            (board_id, phase),
+        ):
+            retreat_data.setdefault(origin, []).append(retreat_loc)
+
         for province in board.provinces:
             if province.name not in province_info_by_name:
                 logger.warning(f"Couldn't find province {province.name} in DB")
@@ -293,7 +855,7 @@ class _DatabaseConnection:
             owner, core, half_core = province_info_by_name[province.name]
 
             if owner is not None:
-                owner_player = board.get_player(owner)
+                owner_player = get_player_by_id(owner)
                 if owner_player is None:
                     logger.warning(
                         f"Couldn't find corresponding player for {owner} in DB"
@@ -308,40 +870,33 @@ class _DatabaseConnection:
 
             core_player = None
             if core is not None:
-                core_player = board.get_player(core)
+                core_player = get_player_by_id(core)
             province.core = core_player
 
             half_core_player = None
             if half_core is not None:
-                half_core_player = board.get_player(half_core)
+                half_core_player = get_player_by_id(half_core)
             province.half_core = half_core_player
             province.unit = None
             province.dislodged_unit = None
         board.units.clear()
-        for unit_info in unit_data:
-            (
-                location,
-                is_dislodged,
-                owner,
-                is_army,
-                order_type,
-                order_destination,
-                order_source,
-                hasFailed,
-            ) = unit_info
-            province, coast = board.get_province_and_coast(location)
-            owner_player = board.get_player(owner)
+        for (
+            location,
+            is_dislodged,
+            owner,
+            is_army,
+            order_type,
+            order_destination,
+            order_source,
+            hasFailed,
+        ) in unit_data:
+            province, coast = get_location(location)
+            owner_player = get_player_by_id(owner)
             if owner_player is None:
                 logger.warning(f"Couldn't find corresponding player for {owner} in DB")
                 continue
             if is_dislodged:
-                retreat_ops = cursor.execute(
-                    "SELECT retreat_loc FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-                    (board_id, board.turn.get_indexed_name(), location),
-                )
-                retreat_options = set(
-                    map(board.get_province_and_coast, set().union(*retreat_ops))
-                )
+                retreat_options = {get_location(retreat_loc) for retreat_loc in retreat_data.get(location, ())}
             else:
                 retreat_options = None
             unit = Unit(
@@ -357,273 +912,64 @@ class _DatabaseConnection:
                 province.unit = unit
             owner_player.units.add(unit)
             board.units.add(unit)
-        # AAAAA We shouldn't be having to loop twice; why is ComplexOrder.source a Unit? Turn it into a province or something
-        # Currently we have to loop twice because it's a unit and we need to have all the units set up before parsing orders because of it
-        for unit_info in unit_data:
+
+            # Orders refer to provinces, not units, so they can be set up as each unit is
+            if order_type is None or order_type == NMR.__name__:
+                continue
             try:
-                (
-                    location,
-                    is_dislodged,
-                    owner,
-                    is_army,
-                    order_type,
-                    order_destination,
-                    order_source,
-                    hasFailed,
-                ) = unit_info
-                if order_type is not None:
-                    order_classes = [
-                        NMR,
-                        Hold,
-                        Core,
-                        Move,
-                        ConvoyMove,
-                        ConvoyTransport,
-                        Support,
-                        RetreatMove,
-                        RetreatDisband,
-                    ]
-                    order_class = next(
-                        _class
-                        for _class in order_classes
-                        if _class.__name__ == order_type
+                order_class = _UNIT_ORDERS[order_type]
+                source_province, destination_province, destination_coast = None, None, None
+                if order_destination is not None:
+                    destination_province, destination_coast = get_location(order_destination)
+                if order_source is not None:
+                    source_province = get_location(order_source)[0]
+                if order_class in [Hold, Core, RetreatDisband]:
+                    order = order_class()
+                elif order_class in [Move, ConvoyMove, RetreatMove]:
+                    order = order_class(destination=destination_province, destination_coast=destination_coast)
+                elif order_class in [ConvoyTransport, Support]:
+                    order = order_class(
+                        destination=destination_province, source=source_province, destination_coast=destination_coast
                     )
-                    source_province, destination_province, destination_coast = None, None, None
-                    if order_destination is not None:
-                        destination_province, destination_coast = (
-                            board.get_province_and_coast(order_destination)
-                        )
-                    if order_source is not None:
-                        source_province = board.get_province(order_source)
-                    if order_class == NMR:
-                        continue
-                    elif order_class in [Hold, Core, RetreatDisband]:
-                        order = order_class()
-                    elif order_class in [Move, ConvoyMove, RetreatMove]:
-                        order = order_class(destination=destination_province, destination_coast=destination_coast)
-                    elif order_class in [ConvoyTransport, Support]:
-                        order = order_class(
-                            destination=destination_province, source=source_province, destination_coast=destination_coast
-                        )
-                    else:
-                        raise ValueError(f"Could not parse {order_class}")
-                    
-                    order.hasFailed = hasFailed
-
-                    province, coast = board.get_province_and_coast(location)
-                    if is_dislodged:
-                        assert province.dislodged_unit is not None
-                        province.dislodged_unit.order = order
-                    else:
-                        assert province.unit is not None
-                        province.unit.order = order
+                else:
+                    raise ValueError(f"Could not parse {order_class}")
+
+                order.hasFailed = hasFailed
+                unit.order = order
             except:
                 logger.warning("BAD UNIT INFO: replacing with hold")
                 continue
+
+        logger.info(f"database.get_board.{board_id}.{phase}.{time.time() - start}s")
         return board
 
-    def save_board(self, board_id: int, board: Board):
-        # TODO: Check if board already exists
+    def run(self, job: Job[T]) -> T:
+        """Runs a job on this connection and commits what it wrote."""
         cursor = self._connection.cursor()
-        cursor.execute(
-            "INSERT INTO boards (board_id, phase, data_file, fish, name) VALUES (?, ?, ?, ?, ?)",
-            (board_id, board.turn.get_indexed_name(), board.datafile, board.fish, board.name),
-        )
-        cursor.executemany(
-            "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?) ON CONFLICT "
-            "DO UPDATE SET "
-            "color = ?, "
-            "liege = ?, "
-            "points = ?",
-            [
-                (
-                    board_id,
-                    player.name,
-                    player.render_color,
-                    (None if player.liege is None else str(player.liege)),
-                    player.points,
-                    player.render_color,
-                    (None if player.liege is None else str(player.liege)),
-                    player.points,
-                )
-                for player in board.players
-            ],
-        )
-
-        # cache = []
-        # for p in board.provinces:
-        #     if p.name == "NICE":
-        #         print(p.type)
-        #         import matplotlib.pyplot as plt
-        #         import shapely
-        #         if isinstance(p.geometry, shapely.Polygon):
-        #             plt.plot(*p.geometry.exterior.xy)
-        #         else:
-        #             for geo in p.geometry.geoms:
-        #                 plt.plot(*geo.exterior.xy)
-        # plt.gca().invert_yaxis()
-        # plt.show()
-
-        cache = []
-        for p in board.provinces:
-            if p.name in cache:
-                print(f"{p.name} repeats!!!")
-            cache.append(p.name)
-
-        cursor.executemany(
-            "INSERT INTO provinces (board_id, phase, province_name, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
-            [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    province.name,
-                    province.owner.name if province.owner else None,
-                    province.core.name if province.core else None,
-                    province.half_core.name if province.half_core else None,
-                )
-                for province in board.provinces
-            ],
-        )
-        cursor.executemany(
-            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)",
-            [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.province.get_name(build_order.coast),
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                )
-                for player in board.players
-                for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
-            ],
-        )
-        # TODO - this is hacky
-        cursor.executemany(
-            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    unit == unit.province.dislodged_unit,
-                    unit.player.name,
-                    unit.unit_type == UnitType.ARMY,
-                    unit.order.__class__.__name__ if unit.order is not None else None,
-                    unit.order.get_destination_str() if unit.order is not None else None,
-                    unit.order.get_source_str() if unit.order is not None else None,
-                    unit.order.hasFailed if unit.order is not None else False
-                )
-                for unit in board.units
-            ],
-        )
-        cursor.executemany(
-            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
-            [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    retreat_option[0].get_name(retreat_option[1]),
-                )
-                for unit in board.units
-                if unit.retreat_options is not None
-                for retreat_option in unit.retreat_options
-            ],
-        )
+        result = job(cursor)
         cursor.close()
         self._connection.commit()
+        return result
+
+    def save_board(self, board_id: int, board: Board):
+        self.run(save_board_job(board_id, board))
+
+    def save_board_delta(self, board_id: int, board: Board, delta: PhaseDelta):
+        """Saves the phase board is in after the adjudication described by delta; see save_board_delta_job."""
+        if not self.run(save_board_delta_job(board_id, board, delta)):
+            self.save_board(board_id, board)
 
     def save_order_for_units(self, board: Board, units: Iterable[Unit]):
-        cursor = self._connection.cursor()
-        cursor.executemany(
-            "UPDATE units SET order_type=?, order_destination=?, order_source=?, failed_order=? "
-            "WHERE board_id=? and phase=? and (location=? or location=?) and is_dislodged=?",
-            [
-                (
-                    unit.order.__class__.__name__ if unit.order is not None else None,
-                    unit.order.get_destination_str() if unit.order is not None else None,
-                    unit.order.get_source_str() if unit.order is not None else None,
-                    unit.order.hasFailed if unit.order is not None else False,
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    f"{unit.province.get_name()} coast" if not unit.coast else None, # Legacy coast support
-                    unit.province.dislodged_unit == unit,
-                )
-                for unit in units
-            ],
-        )
-        cursor.executemany(
-            "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-            [
-                (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                )
-                for unit in units
-                if unit.retreat_options is not None
-            ],
-        )
-        cursor.executemany(
-            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
-            [
-                (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    retreat_option[0].get_name(retreat_option[1]),
-                )
-                for unit in units
-                if unit.retreat_options is not None
-                for retreat_option in unit.retreat_options
-            ],
-        )
-        cursor.close()
-        self._connection.commit()
+        self.execute_statements(order_statements(board, units))
 
     def save_build_orders_for_players(self, board: Board, player: Player | None):
-        if player is None:
-            players = board.players
-        else:
-            players = {player}
-        cursor = self._connection.cursor()
-        cursor.executemany(
-            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
-            "ON CONFLICT (board_id, phase, player, location) DO UPDATE SET is_build=?, is_army=?",
-            [
-                (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.province.get_name(build_order.coast if isinstance(build_order, Build) else None),
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                )
-                for player in players
-                for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
-            ],
-        )
-        cursor.executemany(
-            "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?) ",
-            [
-                (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.player.name,
-                    build_order.__class__.__name__,
-                )
-                for player in players
-                for build_order in player.vassal_orders.values()
-            ],
-        )
-        cursor.close()
-        self._connection.commit()
+        self.execute_statements(build_order_statements(board, player))
+
+    def execute_statements(self, statements: list[Statement]):
+        self.run(lambda cursor: run_statements(cursor, statements))
+
+    def clear_failed_orders(self, board_id: int, turn: Turn):
+        self.run(clear_failed_orders_job(board_id, turn))
 
     def get_spec_requests(self) -> dict[int, list[SpecRequest]]:
         requests = {}
@@ -644,59 +990,13 @@ class _DatabaseConnection:
         return requests
 
     def save_spec_request(self, request: SpecRequest):
-        cursor = self._connection.cursor()
-
-        cursor.execute(
-            "INSERT OR REPLACE INTO spec_requests (server_id, user_id, role_id) VALUES (?, ?, ?)",
-            (request.server_id, request.user_id, request.role_id),
-        )
-
-        cursor.close()
-        self._connection.commit()
+        self.execute_statements(spec_request_statements(request))
 
     def delete_board(self, board: Board):
-        cursor = self._connection.cursor()
-        cursor.execute(
-            "DELETE FROM boards WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.execute(
-            "DELETE FROM provinces WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.execute(
-            "DELETE FROM units WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.execute(
-            "DELETE FROM builds WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.execute(
-            "DELETE FROM retreat_options WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.execute(
-            "DELETE FROM vassal_orders WHERE board_id=? AND phase=?",
-            (board.board_id, board.turn.get_indexed_name()),
-        )
-        cursor.close()
-        self._connection.commit()
+        self.run(delete_board_job(board))
 
     def total_delete(self, board: Board):
-        cursor = self._connection.cursor()
-        cursor.execute("DELETE FROM boards WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM board_parameters WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM provinces WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM units WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM builds WHERE board_id=?", (board.board_id,))
-        cursor.execute(
-            "DELETE FROM retreat_options WHERE board_id=?", (board.board_id,)
-        )
-        cursor.execute("DELETE FROM players WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM spec_requests WHERE server_id=?", (board.board_id,))
-        cursor.close()
-        self._connection.commit()
+        self.run(total_delete_job(board))
 
     def execute_arbitrary_sql(self, sql: str, args: tuple):
         # TODO - everywhere using this should just be made into a method probably? idk
@@ -725,3 +1025,63 @@ def get_connection() -> _DatabaseConnection:
         return _db_class
     _db_class = _DatabaseConnection()
     return _db_class
+
+
+_async_db: "AsyncDatabase | None" = None
+_order_journal: "OrderJournal | None" = None
+
+
+def get_async_connection() -> "AsyncDatabase":
+    global _async_db
+    if _async_db:
+        return _async_db
+    # Imported here since the async database is built on this module
+    from DiploGM.db.async_database import AsyncDatabase
+
+    _async_db = AsyncDatabase()
+    # Queued writes would otherwise be lost when the process exits
+    atexit.register(close_async_connection)
+    return _async_db
+
+
+def get_order_journal() -> "OrderJournal":
+    """The journal orders are submitted to; orders left in it by a crash are written when it's first used."""
+    global _order_journal
+    if _order_journal:
+        return _order_journal
+    from DiploGM.db.order_journal import OrderJournal
+
+    journal = OrderJournal(get_async_connection())
+    journal.recover(get_connection())
+    _order_journal = journal
+    return _order_journal
+
+
+def flush_order_journal():
+    """Queues the orders journaled so far on the async database, so that writes queued after them come after them."""
+    if _order_journal is not None:
+        _order_journal.flush()
+
+
+def wait_for_writes(timeout: float | None = None):
+    """Waits until the orders journaled and writes queued on the async database so far are committed."""
+    flush_order_journal()
+    if _async_db is not None:
+        _async_db.flush(timeout)
+
+
+async def wait_for_writes_async():
+    """Like wait_for_writes, but waits without blocking the event loop."""
+    flush_order_journal()
+    if _async_db is not None:
+        await _async_db.wait_for_writes()
+
+
+def close_async_connection():
+    global _async_db, _order_journal
+    if _order_journal is not None:
+        _order_journal.close()
+        _order_journal = None
+    if _async_db is not None:
+        _async_db.close()
+        _async_db = None
@@ -0,0 +1,146 @@
+"""Write-behind for submitted orders.
+
+Players submit and resubmit orders many times before a deadline, and each submission used to be a database
+transaction of its own. Submissions are instead appended to a journal and synced to disk before the bot answers, then
+kept in memory for a short window; a unit that's ordered again within the window only has its latest order written.
+When the window ends, everything pending is written in one transaction by the async database's writer.
+
+The journal is split into numbered segment files, one per window. A segment is deleted once its orders are committed,
+so after a crash the segments left on disk hold every acknowledged order that may not have reached the database, and
+recover() writes them again.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future
+from typing import TextIO, TYPE_CHECKING
+
+from DiploGM.config import DATABASE_ORDER_JOURNAL, DATABASE_ORDER_JOURNAL_WINDOW
+from DiploGM.db.database import order_row, order_row_statements
+
+if TYPE_CHECKING:
+    from DiploGM.db.async_database import AsyncDatabase
+    from DiploGM.db.database import _DatabaseConnection
+    from DiploGM.models.board import Board
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+
+def _unit_key(row: tuple) -> tuple:
+    # Board id, phase, location and whether the unit is dislodged
+    return row[0], row[1], row[2], row[4]
+
+
+class OrderJournal:
+    def __init__(self, database: AsyncDatabase, directory: str = DATABASE_ORDER_JOURNAL,
+                 window: float = DATABASE_ORDER_JOURNAL_WINDOW):
+        self.database = database
+        self.directory = directory
+        self.window = window
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: dict[tuple, tuple] = {}
+        self._file: TextIO | None = None
+        self._segment = max(self._segment_numbers(), default=0) + 1
+        self._timer: threading.Timer | None = None
+        self.submissions = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def _segment_numbers(self) -> list[int]:
+        return sorted(int(name.removesuffix(".jsonl")) for name in os.listdir(self.directory)
+                      if name.removesuffix(".jsonl").isdigit())
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment}.jsonl")
+
+    def recover(self, connection: _DatabaseConnection) -> int:
+        """Writes the orders in segments left over from an earlier run to the database, then deletes the segments.
+
+        Returns the number of unit orders written.
+        """
+        rows: dict[tuple, tuple] = {}
+        paths = [self._path(segment) for segment in self._segment_numbers()]
+        for path in paths:
+            with open(path) as segment_file:
+                for line in segment_file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash while writing cuts off the last line, which was never acknowledged
+                        break
+                    for row in entry:
+                        rows[_unit_key(row)] = tuple(row)
+        if rows:
+            connection.execute_statements(order_row_statements(rows.values()))
+        for path in paths:
+            os.remove(path)
+        if paths:
+            logger.info(f"order_journal: recovered {len(rows)} orders from {len(paths)} segments")
+        return len(rows)
+
+    def record(self, board: Board, units: Iterable[Unit]):
+        """Saves the orders of units. They're on disk when this returns, and in the database once flushed."""
+        rows = [order_row(board, unit) for unit in units]
+        if not rows:
+            return
+        line = json.dumps(rows) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path(self._segment), "a")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            for row in rows:
+                self._pending[_unit_key(row)] = row
+            self.submissions += 1
+            if self.window > 0 and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.window <= 0:
+            self.flush()
+
+    def flush(self) -> Future[None] | None:
+        """Queues everything pending to be written in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return None
+            rows = list(self._pending.values())
+            self._pending = {}
+            path = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                path = self._path(self._segment)
+                self._segment += 1
+            # Queued while still holding the lock, so flushes reach the writer in order
+            future = self.database.submit(order_row_statements(rows))
+            self.flushes += 1
+            self.rows_written += len(rows)
+        start = time.time()
+        future.add_done_callback(lambda done: self._committed(done, path, len(rows), start))
+        return future
+
+    def _committed(self, future: Future, path: str | None, rows: int, start: float):
+        if future.exception() is not None:
+            # The segment is kept, so its orders are written again on the next startup
+            logger.error(f"order_journal: failed to write {rows} orders, keeping {path} to recover")
+            return
+        if path is not None:
+            os.remove(path)
+        logger.info(f"order_journal.flush.{rows}.{time.time() - start}s")
+
+    def close(self):
+        future = self.flush()
+        if future is not None:
+            future.exception()
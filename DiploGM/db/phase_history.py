@@ -0,0 +1,299 @@
+"""Past phases stored as deltas, with a full keyframe every few phases.
+
+A game's current phase always has a full row per province and per unit in the province_states and unit_states tables,
+since orders and GM edits change it in place. Once the next phase is saved it only changes when it's rolled back to, so
+it's compacted: unless it's due to be a keyframe, its rows are replaced by the provinces and units that differ from the
+phase before it, in province_deltas and unit_deltas. phase_history lists every compacted phase, so a phase is rebuilt
+from the nearest keyframe at or before it plus the deltas in between.
+
+Phases are identified by their ordinal (see phase_ordinal), which boards computes from the phase name, and provinces,
+locations and players by their ids in location_names and players.
+
+Run `python -m DiploGM.db.phase_history [database]` to compact the phases of an existing database; it reports how much
+smaller the database got.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+
+from DiploGM.models.turn import PhaseName, Turn
+
+logger = logging.getLogger(__name__)
+
+# Province id -> (owner id, core id, half core id)
+ProvinceRows = dict[int, tuple]
+# (location id, is dislodged) -> (owner id, is army, order type, destination id, source id, failed order)
+UnitRows = dict[tuple[int, bool], tuple]
+
+
+def phase_ordinal(phase: str) -> int:
+    """The position of an indexed phase name like "3 Fall Moves" in its game, counting every possible phase.
+
+    It's the same as the ordinal column of boards.
+    """
+    turn = Turn.turn_from_string(phase)
+    if turn is None:
+        raise ValueError(f"{phase} is not a phase")
+    return turn.year * len(PhaseName) + turn.phase.value
+
+
+def _is_keyframe(cursor: sqlite3.Cursor, board_id: int, ordinal: int) -> bool | None:
+    """Whether a compacted phase is a keyframe, or None if it hasn't been compacted."""
+    entry = cursor.execute(
+        "SELECT is_keyframe FROM phase_history WHERE board_id=? AND ordinal=?", (board_id, ordinal)
+    ).fetchone()
+    return None if entry is None else bool(entry[0])
+
+
+def _full_rows(cursor: sqlite3.Cursor, board_id: int, ordinal: int) -> tuple[ProvinceRows, UnitRows]:
+    provinces = {
+        province_id: (owner_id, core_id, half_core_id)
+        for province_id, owner_id, core_id, half_core_id in cursor.execute(
+            "SELECT province_id, owner_id, core_id, half_core_id FROM province_states WHERE board_id=? AND ordinal=?",
+            (board_id, ordinal),
+        )
+    }
+    units = {
+        (location_id, bool(is_dislodged)): tuple(rest)
+        for location_id, is_dislodged, *rest in cursor.execute(
+            "SELECT location_id, is_dislodged, owner_id, is_army, order_type, destination_id, source_id, "
+            "failed_order FROM unit_states WHERE board_id=? AND ordinal=?",
+            (board_id, ordinal),
+        )
+    }
+    return provinces, units
+
+
+def phase_rows(cursor: sqlite3.Cursor, board_id: int, ordinal: int) -> tuple[ProvinceRows, UnitRows]:
+    """The province and unit rows of a phase, rebuilt from its keyframe if it has been compacted."""
+    is_keyframe = _is_keyframe(cursor, board_id, ordinal)
+    if is_keyframe is None or is_keyframe:
+        return _full_rows(cursor, board_id, ordinal)
+    (keyframe,) = cursor.execute(
+        "SELECT MAX(ordinal) FROM phase_history WHERE board_id=? AND is_keyframe AND ordinal<?",
+        (board_id, ordinal),
+    ).fetchone()
+    if keyframe is None:
+        raise ValueError(f"Phase {ordinal} of board {board_id} has no keyframe")
+    provinces, units = _full_rows(cursor, board_id, keyframe)
+    for province_id, *row in cursor.execute(
+        "SELECT province_id, owner_id, core_id, half_core_id FROM province_deltas "
+        "WHERE board_id=? AND ordinal BETWEEN ? AND ? ORDER BY ordinal",
+        (board_id, keyframe + 1, ordinal),
+    ):
+        provinces[province_id] = tuple(row)
+    for location_id, is_dislodged, is_removed, *row in cursor.execute(
+        "SELECT location_id, is_dislodged, is_removed, owner_id, is_army, order_type, destination_id, source_id, "
+        "failed_order FROM unit_deltas WHERE board_id=? AND ordinal BETWEEN ? AND ? ORDER BY ordinal",
+        (board_id, keyframe + 1, ordinal),
+    ):
+        if is_removed:
+            units.pop((location_id, bool(is_dislodged)), None)
+        else:
+            units[(location_id, bool(is_dislodged))] = tuple(row)
+    return provinces, units
+
+
+def _ordinals(cursor: sqlite3.Cursor, board_id: int) -> list[int]:
+    """The ordinals of a game's saved phases, in order."""
+    for (phase,) in cursor.execute("SELECT phase FROM boards WHERE board_id=? AND ordinal IS NULL", (board_id,)):
+        logger.warning(f"Could not parse phase '{phase}' of board {board_id}")
+    return [
+        ordinal for (ordinal,) in cursor.execute(
+            "SELECT ordinal FROM boards WHERE board_id=? AND ordinal IS NOT NULL ORDER BY ordinal", (board_id,)
+        ).fetchall()
+    ]
+
+
+def _previous_ordinal(cursor: sqlite3.Cursor, board_id: int, ordinal: int) -> int | None:
+    return cursor.execute(
+        "SELECT MAX(ordinal) FROM boards WHERE board_id=? AND ordinal<?", (board_id, ordinal)
+    ).fetchone()[0]
+
+
+def compact_phase(cursor: sqlite3.Cursor, board_id: int, ordinal: int, keyframe_interval: int) -> bool:
+    """Replaces a past phase's rows with its changes since the phase before it, unless it's due to be a keyframe.
+
+    Returns whether the phase was stored as deltas.
+    """
+    if _is_keyframe(cursor, board_id, ordinal) is not None:
+        return False
+    previous = _previous_ordinal(cursor, board_id, ordinal)
+    is_keyframe = previous is None or _is_keyframe(cursor, board_id, previous) is None
+    if not is_keyframe:
+        last_keyframe = cursor.execute(
+            "SELECT MAX(ordinal) FROM phase_history WHERE board_id=? AND is_keyframe AND ordinal<?",
+            (board_id, ordinal),
+        ).fetchone()[0]
+        if last_keyframe is None:
+            is_keyframe = True
+        else:
+            (deltas,) = cursor.execute(
+                "SELECT COUNT(*) FROM phase_history WHERE board_id=? AND ordinal>? AND ordinal<?",
+                (board_id, last_keyframe, ordinal),
+            ).fetchone()
+            is_keyframe = deltas + 1 >= keyframe_interval
+    cursor.execute(
+        "INSERT INTO phase_history (board_id, ordinal, is_keyframe) VALUES (?, ?, ?)",
+        (board_id, ordinal, is_keyframe),
+    )
+    if is_keyframe:
+        return False
+
+    assert previous is not None
+    previous_provinces, previous_units = phase_rows(cursor, board_id, previous)
+    provinces, units = _full_rows(cursor, board_id, ordinal)
+    cursor.executemany(
+        "INSERT INTO province_deltas (board_id, ordinal, province_id, owner_id, core_id, half_core_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (board_id, ordinal, province_id) + row
+            for province_id, row in provinces.items()
+            if previous_provinces.get(province_id) != row
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO unit_deltas (board_id, ordinal, location_id, is_dislodged, is_removed, owner_id, is_army, "
+        "order_type, destination_id, source_id, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (board_id, ordinal, location_id, is_dislodged, False) + row
+            for (location_id, is_dislodged), row in units.items()
+            if previous_units.get((location_id, is_dislodged)) != row
+        ] + [
+            (board_id, ordinal, location_id, is_dislodged, True, None, None, None, None, None, None)
+            for location_id, is_dislodged in previous_units.keys() - units.keys()
+        ],
+    )
+    cursor.execute("DELETE FROM province_states WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    cursor.execute("DELETE FROM unit_states WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    return True
+
+
+def compact_previous_phase(cursor: sqlite3.Cursor, board_id: int, ordinal: int, keyframe_interval: int):
+    """Compacts the phase before the one at ordinal, which was just saved."""
+    previous = _previous_ordinal(cursor, board_id, ordinal)
+    if previous is not None:
+        compact_phase(cursor, board_id, previous, keyframe_interval)
+
+
+def expand_phase(cursor: sqlite3.Cursor, board_id: int, ordinal: int):
+    """Gives a compacted phase full rows again, turning it into a keyframe, so it can be changed in place.
+
+    The phases after it stay as they are, since their deltas are against the same rows.
+    """
+    if _is_keyframe(cursor, board_id, ordinal) is not False:
+        return
+    provinces, units = phase_rows(cursor, board_id, ordinal)
+    cursor.executemany(
+        "INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(board_id, ordinal, province_id) + row for province_id, row in provinces.items()],
+    )
+    cursor.executemany(
+        "INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type, "
+        "destination_id, source_id, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (board_id, ordinal, location_id, is_dislodged) + row
+            for (location_id, is_dislodged), row in units.items()
+        ],
+    )
+    cursor.execute("DELETE FROM province_deltas WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    cursor.execute("DELETE FROM unit_deltas WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    cursor.execute("UPDATE phase_history SET is_keyframe=TRUE WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+
+
+def expand_latest_phase(cursor: sqlite3.Cursor, board_id: int):
+    """Makes sure a game's current phase has full rows, after the phase after it was deleted."""
+    (latest,) = cursor.execute("SELECT MAX(ordinal) FROM boards WHERE board_id=?", (board_id,)).fetchone()
+    if latest is not None:
+        expand_phase(cursor, board_id, latest)
+
+
+def delete_phase(cursor: sqlite3.Cursor, board_id: int, ordinal: int):
+    cursor.execute("DELETE FROM phase_history WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    cursor.execute("DELETE FROM province_deltas WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+    cursor.execute("DELETE FROM unit_deltas WHERE board_id=? AND ordinal=?", (board_id, ordinal))
+
+
+def delete_game(cursor: sqlite3.Cursor, board_id: int):
+    cursor.execute("DELETE FROM phase_history WHERE board_id=?", (board_id,))
+    cursor.execute("DELETE FROM province_deltas WHERE board_id=?", (board_id,))
+    cursor.execute("DELETE FROM unit_deltas WHERE board_id=?", (board_id,))
+
+
+def compact_database(connection: sqlite3.Connection, keyframe_interval: int) -> tuple[int, int]:
+    """Compacts every past phase of every game. Returns the number of phases compacted and stored as deltas."""
+    cursor = connection.cursor()
+    board_ids = [board_id for (board_id,) in cursor.execute("SELECT DISTINCT board_id FROM boards").fetchall()]
+    compacted, as_deltas = 0, 0
+    for board_id in board_ids:
+        # The current phase stays as it is
+        for ordinal in _ordinals(cursor, board_id)[:-1]:
+            if _is_keyframe(cursor, board_id, ordinal) is not None:
+                continue
+            compacted += 1
+            as_deltas += compact_phase(cursor, board_id, ordinal, keyframe_interval)
+        connection.commit()
+    cursor.close()
+    return compacted, as_deltas
+
+
+def needs_migration(connection: sqlite3.Connection) -> bool:
+    """Whether a database still keeps provinces and units in tables by name, from before 15-IntegerKeys.sql."""
+    row = connection.execute("SELECT type FROM sqlite_master WHERE name='provinces'").fetchone()
+    return row is not None and row[0] == "table"
+
+
+def _size(connection: sqlite3.Connection) -> int:
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def _table_rows(connection: sqlite3.Connection) -> dict[str, int]:
+    return {
+        table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ("province_states", "unit_states", "province_deltas", "unit_deltas")
+    }
+
+
+def main():
+    # Imported here so that the config is only needed when migrating
+    from DiploGM.config import DATABASE_KEYFRAME_INTERVAL
+
+    arg_parser = argparse.ArgumentParser(description="Stores the past phases of a database as deltas between keyframes")
+    arg_parser.add_argument("database", nargs="?", default="bot_db.sqlite")
+    arg_parser.add_argument("--keyframe-interval", type=int, default=DATABASE_KEYFRAME_INTERVAL)
+    args = arg_parser.parse_args()
+    if not os.path.exists(args.database):
+        arg_parser.error(f"{args.database} doesn't exist")
+
+    connection = sqlite3.connect(args.database)
+    if needs_migration(connection):
+        for migration in ("14-DeltaPhaseHistory.sql", "15-IntegerKeys.sql"):
+            with open(f"DiploGM/db/SQL/{migration}") as sql_file:
+                connection.executescript(sql_file.read())
+    connection.execute("VACUUM")
+    size_before, rows_before = _size(connection), _table_rows(connection)
+
+    start = time.time()
+    compacted, as_deltas = compact_database(connection, args.keyframe_interval)
+    connection.execute("VACUUM")
+    size_after, rows_after = _size(connection), _table_rows(connection)
+    connection.close()
+
+    print(f"Compacted {compacted} past phases in {time.time() - start:.1f}s: {as_deltas} stored as deltas, "
+          f"{compacted - as_deltas} kept as keyframes")
+    for table in rows_before:
+        print(f"{table:>16}: {rows_before[table]:>10} -> {rows_after[table]:>10} rows")
+    saved = size_before - size_after
+    print(f"Database size: {size_before / 2**20:.2f} MiB -> {size_after / 2**20:.2f} MiB "
+          f"({saved / 2**20:.2f} MiB, {saved / size_before if size_before else 0:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,54 +4,91 @@ CREATE TABLE IF NOT EXISTS boards (
     data_file text,
     fish int,
 	name text,
+    -- The phase's position in the game, counting every possible phase; see phase_ordinal in phase_history.py
+    ordinal int GENERATED ALWAYS AS (
+        CAST(substr(phase, 1, instr(phase, ' ') - 1) AS INTEGER) * 5 + CASE substr(phase, instr(phase, ' ') + 1)
+        WHEN 'Spring Moves' THEN 0 WHEN 'Spring Retreats' THEN 1 WHEN 'Fall Moves' THEN 2
+        WHEN 'Fall Retreats' THEN 3 WHEN 'Winter Builds' THEN 4 END) VIRTUAL,
     PRIMARY KEY (board_id, phase));
+CREATE INDEX IF NOT EXISTS boards_ordinal ON boards (board_id, ordinal);
 CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY,
     board_id int,
     player_name text,
     color varchar(6),
     liege text,
     points int,
     discord_id text,
-    PRIMARY KEY (board_id, player_name),
+    UNIQUE (board_id, player_name),
     FOREIGN KEY (board_id, liege) REFERENCES players (board_id, player_name),
     FOREIGN KEY (board_id) REFERENCES boards (board_id));
-CREATE TABLE IF NOT EXISTS provinces (
+CREATE TABLE IF NOT EXISTS location_names (
+    location_id INTEGER PRIMARY KEY,
+    name text NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS province_states (
     board_id int,
-    phase text,
-    province_name text,
-    owner text,
-    core text,
-    half_core text,
-    PRIMARY KEY (board_id, phase, province_name),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, core) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, half_core) REFERENCES players (board_id, player_name));
-CREATE TABLE IF NOT EXISTS retreat_options (
+    ordinal int,
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, ordinal, province_id),
+    FOREIGN KEY (province_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner_id) REFERENCES players (player_id),
+    FOREIGN KEY (core_id) REFERENCES players (player_id),
+    FOREIGN KEY (half_core_id) REFERENCES players (player_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS unit_states (
     board_id int,
-    phase text,
-    origin text,
-    retreat_loc text,
-    PRIMARY KEY (board_id, phase, origin, retreat_loc),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, origin) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, phase, retreat_loc) REFERENCES provinces (board_id, phase, province_name));
-CREATE TABLE IF NOT EXISTS units (
+    ordinal int,
+    location_id int,
+    is_dislodged boolean,
+    owner_id int,
+    is_army boolean,
+    order_type text,
+    destination_id int,
+    source_id int,
+    failed_order boolean,
+    PRIMARY KEY (board_id, ordinal, location_id, is_dislodged),
+    FOREIGN KEY (location_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (owner_id) REFERENCES players (player_id),
+    FOREIGN KEY (destination_id) REFERENCES location_names (location_id),
+    FOREIGN KEY (source_id) REFERENCES location_names (location_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS phase_history (
     board_id int,
-    phase text,
-    location text,
+    ordinal int,
+    is_keyframe boolean,
+    PRIMARY KEY (board_id, ordinal)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS province_deltas (
+    board_id int,
+    ordinal int,
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, ordinal, province_id),
+    FOREIGN KEY (board_id, ordinal) REFERENCES phase_history (board_id, ordinal)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS unit_deltas (
+    board_id int,
+    ordinal int,
+    location_id int,
     is_dislodged boolean,
-    owner text,
+    is_removed boolean,
+    owner_id int,
     is_army boolean,
     order_type text,
-    order_destination text,
-    order_source text,
+    destination_id int,
+    source_id int,
     failed_order boolean,
-    PRIMARY KEY (board_id, phase, location, is_dislodged),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES retreat_options (board_id, phase, origin));
+    PRIMARY KEY (board_id, ordinal, location_id, is_dislodged),
+    FOREIGN KEY (board_id, ordinal) REFERENCES phase_history (board_id, ordinal)) WITHOUT ROWID;
+-- Locations here are kept by name, coast included, so they aren't keys into province_states
+CREATE TABLE IF NOT EXISTS retreat_options (
+    board_id int,
+    phase text,
+    origin text,
+    retreat_loc text,
+    PRIMARY KEY (board_id, phase, origin, retreat_loc),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase));
 CREATE TABLE IF NOT EXISTS builds(
     board_id int,
     phase text,
@@ -61,8 +98,7 @@ CREATE TABLE IF NOT EXISTS builds(
     is_army boolean,
     PRIMARY KEY (board_id, phase, player, location),
     FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name)
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name)
 );
 
 CREATE TABLE IF NOT EXISTS vassal_orders (
@@ -72,8 +108,8 @@ CREATE TABLE IF NOT EXISTS vassal_orders (
     target_player text,
     order_type text,
     PRIMARY KEY (board_id, phase, player, target_player),
-    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player),
-    FOREIGN KEY (board_id, target_player) REFERENCES players (board_id, player)
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
+    FOREIGN KEY (board_id, target_player) REFERENCES players (board_id, player_name)
 );
 CREATE TABLE IF NOT EXISTS spec_requests (
 	request_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -88,4 +124,90 @@ CREATE TABLE IF NOT EXISTS board_parameters (
     parameter_key TEXT NOT NULL,
     parameter_value TEXT NOT NULL,
     PRIMARY KEY (board_id, parameter_key)
-)
\ No newline at end of file
+);
+
+-- provinces and units show the current layout of province_states and unit_states by name, for queries written by hand
+-- (see .exec_sql) and GM edits. Writing to them writes to the tables behind them.
+CREATE VIEW IF NOT EXISTS provinces AS
+    SELECT s.board_id, b.phase, l.name AS province_name, o.player_name AS owner, c.player_name AS core,
+        h.player_name AS half_core, s.ordinal, s.province_id
+    FROM province_states s
+    JOIN boards b ON b.board_id = s.board_id AND b.ordinal = s.ordinal
+    JOIN location_names l ON l.location_id = s.province_id
+    LEFT JOIN players o ON o.player_id = s.owner_id
+    LEFT JOIN players c ON c.player_id = s.core_id
+    LEFT JOIN players h ON h.player_id = s.half_core_id;
+CREATE TRIGGER IF NOT EXISTS provinces_insert INSTEAD OF INSERT ON provinces BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.province_name);
+    INSERT INTO province_states (board_id, ordinal, province_id, owner_id, core_id, half_core_id) VALUES (
+        NEW.board_id,
+        (SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase),
+        (SELECT location_id FROM location_names WHERE name = NEW.province_name),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.core),
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.half_core));
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_update INSTEAD OF UPDATE ON provinces BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.province_name);
+    UPDATE province_states SET
+        ordinal = COALESCE((SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase), OLD.ordinal),
+        province_id = (SELECT location_id FROM location_names WHERE name = NEW.province_name),
+        owner_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        core_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.core),
+        half_core_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.half_core)
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND province_id = OLD.province_id;
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_delete INSTEAD OF DELETE ON provinces BEGIN
+    DELETE FROM province_states
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND province_id = OLD.province_id;
+END;
+CREATE VIEW IF NOT EXISTS units AS
+    SELECT s.board_id, b.phase, l.name AS location, s.is_dislodged, o.player_name AS owner, s.is_army, s.order_type,
+        d.name AS order_destination, r.name AS order_source, s.failed_order, s.ordinal, s.location_id
+    FROM unit_states s
+    JOIN boards b ON b.board_id = s.board_id AND b.ordinal = s.ordinal
+    JOIN location_names l ON l.location_id = s.location_id
+    LEFT JOIN players o ON o.player_id = s.owner_id
+    LEFT JOIN location_names d ON d.location_id = s.destination_id
+    LEFT JOIN location_names r ON r.location_id = s.source_id;
+CREATE TRIGGER IF NOT EXISTS units_insert INSTEAD OF INSERT ON units BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.location), (NEW.order_destination), (NEW.order_source);
+    INSERT INTO unit_states (board_id, ordinal, location_id, is_dislodged, owner_id, is_army, order_type,
+        destination_id, source_id, failed_order) VALUES (
+        NEW.board_id,
+        (SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase),
+        (SELECT location_id FROM location_names WHERE name = NEW.location),
+        NEW.is_dislodged,
+        (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        NEW.is_army,
+        NEW.order_type,
+        (SELECT location_id FROM location_names WHERE name = NEW.order_destination),
+        (SELECT location_id FROM location_names WHERE name = NEW.order_source),
+        NEW.failed_order);
+END;
+CREATE TRIGGER IF NOT EXISTS units_update INSTEAD OF UPDATE ON units BEGIN
+    INSERT OR IGNORE INTO location_names (name) VALUES (NEW.location), (NEW.order_destination), (NEW.order_source);
+    UPDATE unit_states SET
+        ordinal = COALESCE((SELECT ordinal FROM boards WHERE board_id = NEW.board_id AND phase = NEW.phase), OLD.ordinal),
+        location_id = (SELECT location_id FROM location_names WHERE name = NEW.location),
+        is_dislodged = NEW.is_dislodged,
+        owner_id = (SELECT player_id FROM players WHERE board_id = NEW.board_id AND player_name = NEW.owner),
+        is_army = NEW.is_army,
+        order_type = NEW.order_type,
+        destination_id = (SELECT location_id FROM location_names WHERE name = NEW.order_destination),
+        source_id = (SELECT location_id FROM location_names WHERE name = NEW.order_source),
+        failed_order = NEW.failed_order
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND location_id = OLD.location_id
+        AND is_dislodged = OLD.is_dislodged;
+END;
+CREATE TRIGGER IF NOT EXISTS units_delete INSTEAD OF DELETE ON units BEGIN
+    DELETE FROM unit_states
+    WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal AND location_id = OLD.location_id
+        AND is_dislodged = OLD.is_dislodged;
+END;
+-- Renaming a phase moves its rows to the new ordinal
+CREATE TRIGGER IF NOT EXISTS boards_phase_renamed AFTER UPDATE OF phase ON boards
+WHEN NEW.ordinal IS NOT OLD.ordinal BEGIN
+    UPDATE province_states SET ordinal = NEW.ordinal WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal;
+    UPDATE unit_states SET ordinal = NEW.ordinal WHERE board_id = OLD.board_id AND ordinal = OLD.ordinal;
+END;
@@ -1,5 +1,12 @@
+from __future__ import annotations
+
 import datetime
 import uuid
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.phase_delta import PhaseDelta
 
 
 class Event:
@@ -14,3 +21,12 @@ class Event:
 class OrderSubmitted(Event):
     def __init__(self) -> None:
         super().__init__()
+
+
+class PhaseAdjudicated(Event):
+    """A game's phase was adjudicated and saved; delta is what the adjudication changed to get to board."""
+    def __init__(self, server_id: int, board: Board, delta: PhaseDelta) -> None:
+        super().__init__()
+        self.server_id = server_id
+        self.board = board
+        self.delta = delta
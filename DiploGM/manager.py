@@ -1,18 +1,45 @@
+import asyncio
 import logging
 import time
 import os
-from typing import Optional
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional, TypeVar
 
 from discord import Member, User
 
+from DiploGM.config import (
+    ADJUDICATION_CACHE_SIZE,
+    ADJUDICATION_ROLLBACK_SNAPSHOTS,
+    ADJUDICATION_TIMEOUT,
+    ADJUDICATION_WHAT_IF_BATCH,
+    ADJUDICATION_WORKERS,
+    BOARDS_HISTORY_CACHE_PROVINCES,
+    BOARDS_IDLE_EVICTION,
+    BOARDS_WARM_UP,
+)
 from DiploGM.utils import SingletonMeta
 from DiploGM.adjudicator.adjudicator import make_adjudicator
 from DiploGM.adjudicator.mapper import Mapper
+from DiploGM.adjudicator.executor import AdjudicationExecutor
+from DiploGM.adjudicator.preview import LivePreview
+from DiploGM.adjudicator.what_if import ScenarioOutcome, WhatIf, make_overlay
+from DiploGM.adjudicator.speculation import MOVEMENT_MAP, MOVES_MAP, RESULTS_MAP, Speculation
+from DiploGM.adjudicator.defs import Resolution
 from DiploGM.map_parser.vector.vector import get_parser
 from DiploGM.models.turn import Turn
 from DiploGM.models.board import Board
+from DiploGM.models.board_state import get_board_state, hash_board_state, restore_board_state
 from DiploGM.db import database
+from DiploGM.db.board_handles import BoardHandles
+from DiploGM.db.board_history import BoardHistoryCache
+from DiploGM.events.eventbus import EventBus
+from DiploGM.events.events import PhaseAdjudicated
 from DiploGM.models.player import Player
+from DiploGM.models.order import UnitOrder
+from DiploGM.models.phase_delta import PhaseDelta
+from DiploGM.models.snapshot import BoardSnapshot
+from DiploGM.models.unit import Unit
 from DiploGM.models.spec_request import SpecRequest
 from DiploGM.utils.sanitise import simple_player_name
 
@@ -21,15 +48,48 @@ logger = logging.getLogger(__name__)
 SEVERENCE_A_ID = 1440703393369821248
 SEVERENCE_B_ID = 1440703645971644648
 
+T = TypeVar("T")
+
+def _keep_players(old_board: Board, board: Board):
+    """Gives the players of old_board the colors, points and lieges they have in board, as _get_board does with the
+    players table."""
+    current = {player.name: player for player in board.players}
+    players = {player.name: player for player in old_board.players}
+    for player in old_board.players:
+        player.vassals = []
+    for player in old_board.players:
+        now = current.get(player.name)
+        if now is None:
+            continue
+        player.render_color = now.render_color
+        player.points = now.points
+        player.liege = None if now.liege is None else players.get(now.liege.name)
+        if player.liege is not None:
+            player.liege.vassals.append(player)
+
+
 class Manager(metaclass=SingletonMeta):
     """Manager acts as an intermediary between Bot (the Discord API), Board (the board state), the database."""
 
     def __init__(self, board_ids: Optional[list[int]]=None):
         self._database = database.get_connection()
-        self._boards: dict[int, Board] = self._database.get_boards(board_ids)
+        # Writes orders a crash left in the journal before any board is loaded
+        database.get_order_journal()
+        # Boards are loaded when first looked up; see keep_boards_warm
+        self._boards = BoardHandles(self._database, self._database.get_board_handles(board_ids))
         self._spec_requests: dict[int, list[SpecRequest]] = (
             self._database.get_spec_requests()
         )
+        self._previews: dict[int, LivePreview] = {}
+        self._executor = AdjudicationExecutor(
+            ADJUDICATION_WORKERS, ADJUDICATION_TIMEOUT, ADJUDICATION_CACHE_SIZE, ADJUDICATION_WHAT_IF_BATCH
+        )
+        self._speculations: dict[int, Speculation] = {}
+        # server id -> (adjudicated board, maps drawn for it) for the last adjudication that used a speculation
+        self._speculated_maps: dict[int, tuple[Board, dict[str, tuple[bytes, str]]]] = {}
+        # server id -> the last few phases as they were before being adjudicated, newest last, for rollbacks
+        self._history: dict[int, deque[BoardSnapshot]] = {}
+        self._board_history = BoardHistoryCache(BOARDS_HISTORY_CACHE_PROVINCES)
         # TODO: have multiple for each variant?
         # do it like this so that the parser can cache data between board initializations
 
@@ -37,15 +97,17 @@ class Manager(metaclass=SingletonMeta):
         return set(self._boards.keys())
 
     def create_game(self, server_id: int, gametype: str = "impdip") -> str:
-        if self._boards.get(server_id):
+        if server_id in self._boards:
             return "A game already exists in this server."
         if not os.path.isdir(f"variants/{gametype}"):
             return f"Game {gametype} does not exist."
 
         logger.info(f"Creating new game in server {server_id}")
+        self._history.pop(server_id, None)
         self._boards[server_id] = get_parser(gametype).parse()
         self._boards[server_id].board_id = server_id
-        self._database.save_board(server_id, self._boards[server_id])
+        # Rare enough to wait for, so the game is saved by the time it's announced
+        self._save_phase(self._boards[server_id]).result()
 
         return f"{self._boards[server_id].data['name']} game created"
 
@@ -72,7 +134,7 @@ class Manager(metaclass=SingletonMeta):
             return "User has already been accepted for a request in this Server."
 
         self._spec_requests[server_id].append(obj)
-        self._database.save_spec_request(obj)
+        database.get_async_connection().save_spec_request(obj)
 
         return "Approved request Logged!"
 
@@ -90,11 +152,100 @@ class Manager(metaclass=SingletonMeta):
             raise RuntimeError("There is no existing game this this server.")
         return board
 
+    async def load_board(self, server_id: int):
+        """Loads the server's game on a reader thread if it isn't loaded yet, so that get_board doesn't have to load
+        it on the event loop. Does nothing if the server has no game."""
+        # NOTE: Temporary for Meme's Severence Diplomacy Event
+        if server_id == SEVERENCE_B_ID:
+            server_id = SEVERENCE_A_ID
+        if server_id not in self._boards or self._boards.is_loaded(server_id):
+            return
+        start = time.time()
+        handle = self._boards.handles[server_id]
+        board = await self._read(lambda connection: connection.load_board(handle))
+        # The game may have been deleted while it was loading
+        if server_id in self._boards:
+            self._boards.loaded(server_id, board)
+        logger.info(f"manager.load_board.{server_id}.{time.time() - start}s")
+
+    async def _read(self, job: Callable[[database._DatabaseConnection], T]) -> T:
+        """Runs job on one of the async database's reader threads, once the writes queued so far are committed."""
+        await database.wait_for_writes_async()
+        return await database.get_async_connection().read(job)
+
+    def fish_by_server(self) -> dict[int, int]:
+        """Every game's fish, without loading any games."""
+        return {board_id: self._boards.fish(board_id) for board_id in self._boards}
+
+    async def keep_boards_warm(self):
+        """Loads the most recently active games in the background after startup, then keeps unloading games that
+        nobody has used for a while. Runs until cancelled."""
+        start = time.time()
+        warmed = 0
+        for board_id in self._boards.most_recent(BOARDS_WARM_UP):
+            if not self._boards.is_loaded(board_id):
+                try:
+                    await self.load_board(board_id)
+                    warmed += 1
+                except Exception as ex:
+                    logger.warning(f"manager.warm_up.{board_id}: could not load board", exc_info=ex)
+        logger.info(f"manager.warm_up.{warmed}.{time.time() - start}s")
+
+        if not BOARDS_IDLE_EVICTION:
+            return
+        while True:
+            await asyncio.sleep(BOARDS_IDLE_EVICTION / 4)
+            self.unload_idle_boards(BOARDS_IDLE_EVICTION)
+
+    def unload_idle_boards(self, max_idle: float) -> list[int]:
+        """Unloads games that haven't been used for max_idle seconds, unless something is still working on them.
+        They are loaded again from the database when next needed."""
+        unloaded = []
+        for board_id in self._boards.idle(max_idle):
+            if board_id in self._speculations or self._executor.is_running(board_id):
+                continue
+            self._boards.unload(board_id)
+            self._previews.pop(board_id, None)
+            self._speculated_maps.pop(board_id, None)
+            unloaded.append(board_id)
+        if unloaded:
+            logger.info(f"manager.unload_idle_boards: unloaded {len(unloaded)} boards")
+        return unloaded
+
     def total_delete(self, server_id: int):
-        self._database.total_delete(self._boards[server_id])
+        database.flush_order_journal()
+        database.get_async_connection().total_delete(self._boards[server_id])
         del self._boards[server_id]
+        self.cancel_speculation(server_id)
+        self._previews.pop(server_id, None)
+        self._speculated_maps.pop(server_id, None)
+        self._history.pop(server_id, None)
+        self._board_history.invalidate(server_id)
+
+    def delete_board(self, board: Board):
+        """Deletes board's phase from the database."""
+        database.flush_order_journal()
+        database.get_async_connection().delete_board(board)
+        self._board_history.invalidate(board.board_id)
+
+    async def get_past_board(self, server_id: int, turn: Turn) -> Board | None:
+        """The game's board in the given phase, or None if there isn't one. Boards of phases before the current one
+        are cached and shared between callers, so they must not be modified."""
+        board = self.get_board(server_id)
+        phase = turn.get_indexed_name()
+        is_past = (turn.year, turn.phase.value) < (board.turn.year, board.turn.phase.value)
+        if is_past:
+            cached = self._board_history.get(board.board_id, phase)
+            if cached is not None:
+                return cached
+        past_board = await self._read(
+            lambda connection: connection.get_board(board.board_id, turn, board.fish, board.name, board.datafile)
+        )
+        if past_board is not None and is_past:
+            self._board_history.put(board.board_id, phase, past_board)
+        return past_board
 
-    def draw_map(
+    async def draw_map(
         self,
         server_id: int,
         draw_moves: bool = False,
@@ -108,13 +259,7 @@ class Manager(metaclass=SingletonMeta):
         if turn is None:
             board = cur_board
         else:
-            board = self._database.get_board(
-                cur_board.board_id,
-                turn,
-                cur_board.fish,
-                cur_board.name,
-                cur_board.datafile,
-            )
+            board = await self.get_past_board(server_id, turn)
             if board is None:
                 raise RuntimeError(
                     f"There is no {turn} board for this server"
@@ -163,26 +308,222 @@ class Manager(metaclass=SingletonMeta):
     def adjudicate(self, server_id: int, test: bool = False) -> Board:
         start = time.time()
 
-        board = self.get_board(server_id)
-        old_board = self._database.get_board(
-            server_id, board.turn, board.fish, board.name, board.datafile
-        )
-        assert old_board is not None
+        old_board = self._get_board_to_adjudicate(server_id, test)
         # mapper = Mapper(self._boards[server_id])
         # mapper.draw_moves_map(None)
+        if not test:
+            self._remember_phase(old_board)
         adjudicator = make_adjudicator(old_board)
         adjudicator.save_orders = not test
         # TODO - use adjudicator.orders() (tells you which ones succeeded and failed) to draw a better moves map
-        new_board = adjudicator.run()
+        new_board, delta = adjudicator.run_with_delta()
+        self._finish_adjudication(new_board, test)
+        if not test and not self._save_phase(new_board, delta).result():
+            self._save_phase(new_board).result()
+
+        elapsed = time.time() - start
+        logger.info(f"manager.adjudicate.{server_id}.{elapsed}s")
+        return new_board
+
+    async def adjudicate_async(self, server_id: int, test: bool = False) -> Board:
+        """Like adjudicate, but the adjudication itself runs in a worker process so the event loop isn't blocked.
+        If the orders were locked and haven't changed since, the result speculated at lock time is used instead."""
+        start = time.time()
+
+        speculation = await self._take_speculation(server_id)
+        if speculation is not None:
+            assert speculation.old_board is not None and speculation.new_board is not None
+            if not test:
+                self._remember_phase(speculation.old_board)
+                if speculation.old_board.turn.is_moves():
+                    database.get_async_connection().save_order_for_units(
+                        speculation.old_board, speculation.adjudicated_units
+                    )
+            new_board = speculation.new_board
+            delta = speculation.delta
+            self._commit_adjudication(new_board, test)
+            self._speculated_maps[server_id] = (new_board, speculation.maps)
+            if test:
+                # Nothing was committed, so the speculation still holds for the real adjudication
+                self._speculations[server_id] = speculation
+        else:
+            old_board = await self._get_board_to_adjudicate_async(server_id, test)
+            result = await self._executor.adjudicate(old_board)
+            if not test:
+                self._remember_phase(old_board)
+            new_board = result.apply(old_board, save_orders=not test)
+            delta = result.delta
+            self._finish_adjudication(new_board, test)
+            self._speculated_maps.pop(server_id, None)
+        if not test and not await asyncio.wrap_future(self._save_phase(new_board, delta)):
+            await asyncio.wrap_future(self._save_phase(new_board))
+
+        elapsed = time.time() - start
+        logger.info(f"manager.adjudicate_async.{server_id}.{elapsed}s")
+        if not test and delta is not None:
+            await EventBus().publish(PhaseAdjudicated(server_id, new_board, delta))
+        return new_board
+
+    def speculate(self, server_id: int):
+        """Starts adjudicating the current orders in the background, for when a GM locks orders.
+        Must be called from the event loop."""
+        self.cancel_speculation(server_id)
+        state_hash = hash_board_state(get_board_state(self.get_board(server_id)))
+        speculation = Speculation(state_hash)
+        speculation.task = asyncio.create_task(self._speculate(server_id, speculation))
+        self._speculations[server_id] = speculation
+
+    def cancel_speculation(self, server_id: int):
+        speculation = self._speculations.pop(server_id, None)
+        if speculation is not None and speculation.task is not None:
+            speculation.task.cancel()
+
+    def get_speculated_map(self, server_id: int, new_board: Board, kind: str) -> tuple[bytes, str] | None:
+        """Returns the map of the given kind drawn ahead of time for new_board, if its adjudication was speculated."""
+        speculated = self._speculated_maps.get(server_id)
+        if speculated is None or speculated[0] is not new_board:
+            return None
+        return speculated[1].get(kind)
+
+    async def _speculate(self, server_id: int, speculation: Speculation):
+        start = time.time()
+
+        old_board = await self._get_board_to_adjudicate_async(server_id)
+        result = await self._executor.adjudicate(old_board)
+        speculation.adjudicated_units = result.apply_orders(old_board)
+        speculation.delta = result.delta
+        speculation.old_board = old_board
+        new_board = restore_board_state(get_parser(old_board.datafile).parse(), result.new_state())
         new_board.turn = new_board.turn.get_next_turn()
+        speculation.new_board = new_board
+
+        # Rendering is plain Python too, so keep it off the event loop.
+        # The maps are only a head start: if one can't be drawn, .adjudicate draws it as usual
+        maps = {
+            MOVES_MAP: (old_board, {"draw_moves": True}),
+            MOVEMENT_MAP: (old_board, {"draw_moves": True, "movement_only": True}),
+            RESULTS_MAP: (new_board, {}),
+        }
+        for kind, (board, kwargs) in maps.items():
+            try:
+                speculation.maps[kind] = await asyncio.to_thread(self.draw_map_for_board, board, **kwargs)
+            except Exception as ex:
+                logger.warning(f"manager.speculate.{server_id}: could not draw {kind} map", exc_info=ex)
+
+        elapsed = time.time() - start
+        logger.info(f"manager.speculate.{server_id}.{elapsed}s")
+
+    async def _take_speculation(self, server_id: int) -> Speculation | None:
+        speculation = self._speculations.pop(server_id, None)
+        if speculation is None or speculation.task is None:
+            return None
+        state_hash = hash_board_state(get_board_state(self.get_board(server_id)))
+        if speculation.state_hash != state_hash:
+            logger.info(f"manager.speculation.{server_id}: orders changed since they were locked")
+            speculation.task.cancel()
+            # Let the cancellation finish so the executor is free for this board again
+            await asyncio.wait([speculation.task])
+            return None
+
+        await asyncio.wait([speculation.task])
+        if not speculation.is_ready():
+            logger.warning(f"manager.speculation.{server_id}: speculative adjudication failed", exc_info=(
+                None if speculation.task.cancelled() else speculation.task.exception()
+            ))
+            return None
+        logger.info(f"manager.speculation.{server_id}: using speculated adjudication")
+        return speculation
+
+    def cancel_adjudication(self, server_id: int) -> bool:
+        return self._executor.cancel(self.get_board(server_id).board_id)
+
+    def _get_board_to_adjudicate(self, server_id: int, test: bool = False) -> Board:
+        board = self.get_board(server_id)
+        if test:
+            # Nothing gets saved, so a copy of the live board will do
+            return board.snapshot().restore(get_parser(board.datafile).parse())
+        # The orders may still be queued for the async database's writer
+        database.wait_for_writes()
+        old_board = self._database.get_board(
+            server_id, board.turn, board.fish, board.name, board.datafile
+        )
+        assert old_board is not None
+        return old_board
+
+    async def _get_board_to_adjudicate_async(self, server_id: int, test: bool = False) -> Board:
+        """Like _get_board_to_adjudicate, but loads the board on a reader thread."""
+        board = self.get_board(server_id)
+        if test:
+            return board.snapshot().restore(get_parser(board.datafile).parse())
+        old_board = await self._read(
+            lambda connection: connection.get_board(server_id, board.turn, board.fish, board.name, board.datafile)
+        )
+        assert old_board is not None
+        return old_board
+
+    def _remember_phase(self, old_board: Board):
+        history = self._history.get(old_board.board_id)
+        if history is None:
+            history = deque(maxlen=ADJUDICATION_ROLLBACK_SNAPSHOTS)
+            self._history[old_board.board_id] = history
+        history.append(old_board.snapshot())
+
+    def _finish_adjudication(self, new_board: Board, test: bool):
+        new_board.turn = new_board.turn.get_next_turn()
+        self._commit_adjudication(new_board, test)
+
+    def _commit_adjudication(self, new_board: Board, test: bool):
         logger.info("Adjudicator ran successfully")
         if not test:
             self._boards[new_board.board_id] = new_board
-            self._database.save_board(new_board.board_id, new_board)
+
+    def _save_phase(self, board: Board, delta: PhaseDelta | None = None) -> Future[bool]:
+        """Queues saving board's phase on the async database's writer, after the orders of the phase before it. If
+        delta can't be used the future is done with False and nothing is saved; save the phase without it then."""
+        database.flush_order_journal()
+        if delta is None:
+            return database.get_async_connection().save_board(board.board_id, board)
+        return database.get_async_connection().save_board_delta(board.board_id, board, delta)
+
+    def preview(self, board_id: int) -> dict[Unit, Resolution]:
+        """Predicts which of the current orders would succeed, without changing the board."""
+        start = time.time()
+
+        board = self.get_board(board_id)
+        live_preview = self._previews.get(board_id)
+        if live_preview is None or live_preview.board is not board:
+            live_preview = LivePreview(board)
+            self._previews[board_id] = live_preview
+        results = live_preview.preview()
 
         elapsed = time.time() - start
-        logger.info(f"manager.adjudicate.{server_id}.{elapsed}s")
-        return new_board
+        logger.info(f"manager.preview.{board_id}.{elapsed}s")
+        return results
+
+    def what_if(self, board_id: int, scenarios: list[dict[Unit, UnitOrder | None]]) -> list[ScenarioOutcome]:
+        """Predicts the results of each scenario, a set of orders replacing some of the current ones, without
+        changing the board."""
+        start = time.time()
+
+        outcomes = WhatIf.from_board(self.get_board(board_id)).adjudicate_all(
+            [make_overlay(scenario) for scenario in scenarios]
+        )
+
+        elapsed = time.time() - start
+        logger.info(f"manager.what_if.{board_id}.{len(scenarios)}.{elapsed}s")
+        return outcomes
+
+    async def what_if_async(self, board_id: int, scenarios: list[dict[Unit, UnitOrder | None]]) -> list[ScenarioOutcome]:
+        """Like what_if, but in worker processes, for many scenarios."""
+        start = time.time()
+
+        outcomes = await self._executor.what_if(
+            self.get_board(board_id), [make_overlay(scenario) for scenario in scenarios]
+        )
+
+        elapsed = time.time() - start
+        logger.info(f"manager.what_if_async.{board_id}.{len(scenarios)}.{elapsed}s")
+        return outcomes
 
     def draw_fow_current_map(
         self,
@@ -266,26 +607,32 @@ class Manager(metaclass=SingletonMeta):
         logger.info(f"manager.draw_moves_map.{server_id}.{elapsed}s")
         return svg, file_name
 
-    def rollback(self, server_id: int) -> tuple[str, bytes, str]:
+    async def rollback(self, server_id: int) -> tuple[str, bytes, str]:
         logger.info(f"Rolling back in server {server_id}")
         board = self.get_board(server_id)
         # TODO: what happens if we're on the first phase?
         last_turn = board.turn.get_previous_turn()
 
-        old_board = self._database.get_board(
-            board.board_id,
-            last_turn,
-            board.fish,
-            board.name,
-            board.datafile,
-            clear_status=True,
-        )
+        old_board = self._rollback_from_history(board, last_turn)
         if old_board is None:
-            raise ValueError(
-                f"There is no {last_turn} board for this server"
+            old_board = await self._read(
+                lambda connection: connection.get_board(
+                    board.board_id,
+                    last_turn,
+                    board.fish,
+                    board.name,
+                    board.datafile,
+                )
             )
+            if old_board is None:
+                raise ValueError(
+                    f"There is no {last_turn} board for this server"
+                )
+            # Readers don't write, so the order results are cleared here rather than by get_board's clear_status
+            self._clear_failed_orders(old_board, last_turn)
 
-        self._database.delete_board(board)
+        # Also forgets the cached previous phase, whose order results were just cleared
+        self.delete_board(board)
         self._boards[old_board.board_id] = old_board
         mapper = Mapper(old_board)
 
@@ -293,25 +640,37 @@ class Manager(metaclass=SingletonMeta):
         file, file_name = mapper.draw_current_map()
         return message, file, file_name
 
-    def get_previous_board(self, server_id: int) -> Board | None:
+    def _rollback_from_history(self, board: Board, last_turn: Turn) -> Board | None:
+        """The board of the previous phase, if it's still in memory, with order results cleared like in the
+        database. Player rows aren't per phase, so like a board loaded from the database, it keeps the players'
+        current colors, points and lieges."""
+        history = self._history.get(board.board_id)
+        if not history or history[-1].phase != last_turn.get_indexed_name():
+            return None
+        start = time.time()
+        old_board = history.pop().restore(get_parser(board.datafile).parse())
+        self._clear_failed_orders(old_board, last_turn)
+        _keep_players(old_board, board)
+        logger.info(f"manager.rollback_from_history.{board.board_id}.{time.time() - start}s")
+        return old_board
+
+    def _clear_failed_orders(self, old_board: Board, turn: Turn):
+        for unit in old_board.units:
+            if unit.order is not None:
+                unit.order.hasFailed = False
+        database.get_async_connection().clear_failed_orders(old_board.board_id, turn)
+
+    async def get_previous_board(self, server_id: int) -> Board | None:
         board = self.get_board(server_id)
         # TODO: what happens if we're on the first phase?
-        last_turn = board.turn.get_previous_turn()
-        old_board = self._database.get_board(
-            board.board_id,
-            last_turn,
-            board.fish,
-            board.name,
-            board.datafile,
-        )
-        return old_board
+        return await self.get_past_board(server_id, board.turn.get_previous_turn())
 
-    def reload(self, server_id: int) -> tuple[str, bytes, str]:
+    async def reload(self, server_id: int) -> tuple[str, bytes, str]:
         logger.info(f"Reloading server {server_id}")
         board = self.get_board(server_id)
 
-        loaded_board = self._database.get_board(
-            server_id, board.turn, board.fish, board.name, board.datafile
+        loaded_board = await self._read(
+            lambda connection: connection.get_board(server_id, board.turn, board.fish, board.name, board.datafile)
         )
         if loaded_board is None:
             raise ValueError(
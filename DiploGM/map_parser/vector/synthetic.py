@@ -0,0 +1,342 @@
+"""Generates made-up variants of any size, for load testing the parser, adjudicator, database and mapper.
+
+Provinces are bricks laid in offset rows, so that every province borders up to six others and neighbouring coastal
+provinces share a sea, like on a real map. A generated variant is an ordinary bundle (variants/<name>/ with an SVG
+and config.json, plus assets/<name>_adjacencies.txt) and loads with get_parser(name) like any other.
+
+The same parameters and seed always give the same files.
+"""
+from __future__ import annotations
+
+import colorsys
+import json
+import logging
+import math
+import os
+import random
+import time
+from dataclasses import dataclass
+
+from lxml import etree
+
+from DiploGM.map_parser.vector.vector import NAMESPACE, SVG_CONFIG_KEY
+
+logger = logging.getLogger(__name__)
+
+BRICK_WIDTH = 40
+BRICK_HEIGHT = 24
+# Bricks are inset by GAP on every side, so neighbours are 2 * GAP apart and everything else much further
+GAP = 1
+NEUTRAL = "ffffff"
+NEUTRAL_SC = "cccccc"
+SEA_COLOR = "aaccff"
+
+# Neighbour offsets clockwise from east, for even and odd rows (odd rows are shifted right by half a brick)
+_RING = {
+    0: [(1, 0), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1)],
+    1: [(1, 0), (1, 1), (0, 1), (-1, 0), (0, -1), (1, -1)],
+}
+# Coast name for each position in the ring
+_RING_COASTS = ["ec", "sc", "sc", "wc", "nc", "nc"]
+# Where to draw a fleet on each coast, relative to the middle of the brick
+_COAST_OFFSETS = {"ec": (0.3, 0), "wc": (-0.3, 0), "nc": (0, -0.3), "sc": (0, 0.3)}
+
+_INKSCAPE = NAMESPACE["inkscape"]
+_SODIPODI = "{" + NAMESPACE["sodipodi"] + "}"
+
+
+@dataclass
+class SyntheticVariantOptions:
+    provinces: int = 1000
+    # Share of provinces that are sea
+    sea_ratio: float = 0.3
+    # Share of provinces bordering two separate bodies of water that get a coast on each
+    multi_coast_ratio: float = 0.5
+    players: int = 7
+    # Starting units per province; each sits on one of its player's home supply centers
+    unit_density: float = 0.2
+    # Share of the remaining land provinces with a neutral supply center
+    neutral_center_ratio: float = 0.15
+    seed: int = 0
+
+
+class SyntheticVariant:
+    """Lays out the map for a set of options; write() saves it as a variant bundle."""
+
+    def __init__(self, name: str, options: SyntheticVariantOptions):
+        self.name = name
+        self.options = options
+        rng = random.Random(options.seed)
+
+        self.columns = max(2, math.ceil(math.sqrt(options.provinces * BRICK_HEIGHT / BRICK_WIDTH)))
+        self.cells = [(i % self.columns, i // self.columns) for i in range(options.provinces)]
+        self.is_sea = {cell: rng.random() < options.sea_ratio for cell in self.cells}
+        self.names: dict[tuple[int, int], str] = {}
+        counts = {True: 0, False: 0}
+        for cell in self.cells:
+            counts[self.is_sea[cell]] += 1
+            self.names[cell] = f"{'Sea' if self.is_sea[cell] else 'Land'} {counts[self.is_sea[cell]]}"
+
+        self.player_names = [f"Power {i + 1}" for i in range(options.players)]
+        self.colors = {
+            player: "".join(f"{round(c * 255):02x}" for c in colorsys.hsv_to_rgb(i / options.players, 0.6, 0.85))
+            for i, player in enumerate(self.player_names)
+        }
+
+        # Coasts of multi-coast provinces: cell -> coast name -> neighbouring cells a fleet there can reach
+        self.coasts: dict[tuple[int, int], dict[str, list[tuple[int, int]]]] = {}
+        for cell in self.cells:
+            if not self.is_sea[cell]:
+                coasts = self._separate_coasts(cell)
+                if len(coasts) > 1 and rng.random() < options.multi_coast_ratio:
+                    self.coasts[cell] = coasts
+
+        land_cells = [cell for cell in self.cells if not self.is_sea[cell]]
+        rng.shuffle(land_cells)
+        unit_count = min(len(land_cells), round(options.unit_density * len(self.cells)))
+        # cell -> (player, "A"/"F", coast)
+        self.units: dict[tuple[int, int], tuple[str, str, str | None]] = {}
+        self.owners: dict[tuple[int, int], str] = {}
+        self.centers: set[tuple[int, int]] = set()
+        for i, cell in enumerate(land_cells[:unit_count]):
+            player = self.player_names[i % options.players]
+            self.owners[cell] = player
+            self.centers.add(cell)
+            coastal = any(self.is_sea.get(other, False) for other in self.neighbours(cell))
+            if coastal and rng.random() < 0.5:
+                coast = rng.choice(sorted(self.coasts[cell])) if cell in self.coasts else None
+                self.units[cell] = (player, "F", coast)
+            else:
+                self.units[cell] = (player, "A", None)
+        for cell in land_cells[unit_count:]:
+            if rng.random() < options.neutral_center_ratio:
+                self.centers.add(cell)
+
+    def neighbours(self, cell: tuple[int, int]) -> list[tuple[int, int] | None]:
+        """The six cells around cell, clockwise from east; None where the map ends."""
+        x, y = cell
+        ring = []
+        for dx, dy in _RING[y % 2]:
+            other = (x + dx, y + dy)
+            ring.append(other if other in self.is_sea else None)
+        return ring
+
+    def _separate_coasts(self, cell: tuple[int, int]) -> dict[str, list[tuple[int, int]]]:
+        """Splits the seas around a land province into unbroken runs; each run and the land provinces either side of
+        it make one coast. Returns {} unless every run gets a different coast name."""
+        ring = self.neighbours(cell)
+        is_sea = [other is not None and self.is_sea[other] for other in ring]
+        if all(is_sea) or not any(is_sea):
+            return {}
+        # Start just after a non-sea position so that no run wraps around the end of the list
+        start = next(i for i in range(6) if not is_sea[i]) + 1
+        runs: list[list[int]] = []
+        for step in range(6):
+            i = (start + step) % 6
+            if is_sea[i]:
+                if step > 0 and is_sea[(i - 1) % 6] and runs:
+                    runs[-1].append(i)
+                else:
+                    runs.append([i])
+
+        coasts: dict[str, list[tuple[int, int]]] = {}
+        for run in runs:
+            coast = _RING_COASTS[run[len(run) // 2]]
+            if coast in coasts:
+                return {}
+            reachable = [ring[i] for i in run]
+            for flank in ((run[0] - 1) % 6, (run[-1] + 1) % 6):
+                if ring[flank] is not None:
+                    reachable.append(ring[flank])
+            coasts[coast] = reachable
+        return coasts
+
+    def adjacencies(self) -> list[tuple[str, str]]:
+        pairs = set()
+        for cell in self.cells:
+            for other in self.neighbours(cell):
+                if other is not None:
+                    pairs.add(tuple(sorted((self.names[cell], self.names[other]))))
+        return sorted(pairs)
+
+    def _center(self, cell: tuple[int, int], offset: tuple[float, float] = (0, 0)) -> tuple[float, float]:
+        x, y = cell
+        left = x * BRICK_WIDTH + (y % 2) * BRICK_WIDTH / 2
+        return (
+            left + BRICK_WIDTH * (0.5 + offset[0]),
+            y * BRICK_HEIGHT + BRICK_HEIGHT * (0.5 + offset[1]),
+        )
+
+    def _brick(self, cell: tuple[int, int]) -> str:
+        x, y = cell
+        left = x * BRICK_WIDTH + (y % 2) * BRICK_WIDTH / 2 + GAP
+        top = y * BRICK_HEIGHT + GAP
+        return f"M {left},{top} h {BRICK_WIDTH - 2 * GAP} v {BRICK_HEIGHT - 2 * GAP} h {-(BRICK_WIDTH - 2 * GAP)} z"
+
+    def svg(self) -> bytes:
+        width = (self.columns + 1) * BRICK_WIDTH
+        height = (len(self.cells) // self.columns + 1) * BRICK_HEIGHT
+        nsmap = {None: NAMESPACE["svg"], "inkscape": _INKSCAPE.strip("{}"), "sodipodi": NAMESPACE["sodipodi"]}
+        root = etree.Element("svg", nsmap=nsmap, width=str(width), height=str(height),
+                             viewBox=f"0 0 {width} {height}")
+
+        def layer(layer_id: str) -> etree._Element:
+            return etree.SubElement(root, "g", id=layer_id)
+
+        def labelled(parent: etree._Element, tag: str, label: str, **attributes) -> etree._Element:
+            element = etree.SubElement(parent, tag, **attributes)
+            element.set(f"{_INKSCAPE}label", label)
+            return element
+
+        def unit_marker(parent: etree._Element, label: str, point: tuple[float, float], sides: int):
+            group = labelled(parent, "g", label)
+            path = etree.SubElement(group, "path", d=f"M {point[0] - 4},{point[1] - 4} h 8 v 8 h -8 z")
+            path.set(f"{_SODIPODI}cx", str(point[0]))
+            path.set(f"{_SODIPODI}cy", str(point[1]))
+            path.set(f"{_SODIPODI}sides", str(sides))
+
+        layer("background")
+        other_fills = layer("other_fills")
+        land = layer("land")
+        sea = layer("sea")
+        layer("island_borders")
+        layer("island_fill")
+        layer("island_rings")
+        names = layer("names")
+        centers = layer("centers")
+        starting_units = layer("starting_units")
+        army = layer("army")
+        retreat_army = layer("retreat_army")
+        fleet = layer("fleet")
+        retreat_fleet = layer("retreat_fleet")
+        layer("coast_markers")
+        layer("arrows")
+        layer("units")
+        sidebar = layer("sidebar")
+        season = etree.SubElement(sidebar, "g", id="season")
+        etree.SubElement(etree.SubElement(season, "text"), "tspan").text = ""
+        etree.SubElement(other_fills, "rect", width=str(width), height=str(height), style="fill:#000000;opacity:0")
+
+        for cell in self.cells:
+            name = self.names[cell]
+            middle = self._center(cell)
+            if self.is_sea[cell]:
+                labelled(sea, "path", name, d=self._brick(cell), style=f"fill:#{SEA_COLOR}")
+            else:
+                color = self.colors[self.owners[cell]] if cell in self.owners else NEUTRAL
+                labelled(land, "path", name, d=self._brick(cell), style=f"fill:#{color}")
+                unit_marker(army, name, middle, 6)
+                unit_marker(retreat_army, name, self._center(cell, (0.25, 0.25)), 6)
+            text = labelled(names, "text", name, x=str(middle[0]), y=str(middle[1]))
+            etree.SubElement(text, "tspan").text = name
+
+            coastal = self.is_sea[cell] or any(
+                other is not None and self.is_sea[other] for other in self.neighbours(cell)
+            )
+            if cell in self.coasts:
+                for coast in sorted(self.coasts[cell]):
+                    offset = _COAST_OFFSETS[coast]
+                    unit_marker(fleet, f"{name} {coast}", self._center(cell, offset), 3)
+                    unit_marker(retreat_fleet, f"{name} {coast}",
+                                self._center(cell, (offset[0] + 0.1, offset[1] + 0.1)), 3)
+            elif coastal:
+                unit_marker(fleet, name, middle, 3)
+                unit_marker(retreat_fleet, name, self._center(cell, (0.25, 0.25)), 3)
+
+            if cell in self.centers:
+                center = labelled(centers, "g", name)
+                x, y = self._center(cell, (-0.3, -0.2))
+                etree.SubElement(center, "circle", id=f"center{len(center.getparent())}", cx=str(x), cy=str(y), r="3",
+                                 style=f"fill:#{NEUTRAL_SC}")
+
+            if cell in self.units:
+                player, unit_type, coast = self.units[cell]
+                label = f"{unit_type}{name}" + (f" {coast}" if coast else "")
+                unit_marker(starting_units, label, middle, 3 if unit_type == "F" else 6)
+
+        return etree.tostring(root, xml_declaration=True, encoding="utf-8", pretty_print=True)
+
+    def config(self) -> dict:
+        overrides = {}
+        for cell, coasts in self.coasts.items():
+            overrides[self.names[cell]] = {
+                "coasts": {
+                    coast: [self._coast_target(cell, coast, other) for other in reachable]
+                    for coast, reachable in sorted(coasts.items())
+                }
+            }
+        return {
+            "name": self.name,
+            "file": f"{self.name}.svg",
+            "players": {player: {"color": color} for player, color in self.colors.items()},
+            "victory_conditions": "classic",
+            "overrides": {"provinces": overrides},
+            SVG_CONFIG_KEY: {
+                "land_layer": "land",
+                "island_borders": "island_borders",
+                "island_fill_layer": "island_fill",
+                "island_ring_layer": "island_rings",
+                "sea_borders": "sea",
+                "province_names": "names",
+                "supply_center_icons": "centers",
+                "starting_units": "starting_units",
+                "army": "army",
+                "retreat_army": "retreat_army",
+                "fleet": "fleet",
+                "retreat_fleet": "retreat_fleet",
+                "unit_output": "units",
+                "arrow_output": "arrows",
+                "coast_markers": "coast_markers",
+                "other_fills": "other_fills",
+                "background": "background",
+                "sidebar": "sidebar",
+                "season": "season",
+                "power_banners": "",
+                "delete_layer": ["army", "retreat_army", "fleet", "retreat_fleet"],
+                "detect_starting_units": True,
+                "province_labels": True,
+                "center_labels": True,
+                "unit_labels": True,
+                "unit_type_labeled": True,
+                "border_margin_hint": 2 * GAP + 1,
+                "neutral": NEUTRAL,
+                "neutral_sc": NEUTRAL_SC,
+                "default_sea_color": SEA_COLOR,
+                "unknown": "808080",
+                "unit_radius": 4,
+                "order_stroke_width": 1.5,
+                "map_width": (self.columns + 1) * BRICK_WIDTH,
+                "year": 1901,
+            },
+        }
+
+    def _coast_target(self, cell: tuple[int, int], coast: str, other: tuple[int, int]) -> str:
+        # A fleet reaches a neighbouring multi-coast province on the coast that faces the same sea
+        if self.is_sea[other] or other not in self.coasts:
+            return self.names[other]
+        shared_seas = set(self.coasts[cell][coast]) & set(self.neighbours(other))
+        for other_coast, reachable in self.coasts[other].items():
+            if shared_seas & set(reachable):
+                return f"{self.names[other]} {other_coast}"
+        return self.names[other]
+
+    def write(self, root: str = ".") -> None:
+        start = time.time()
+        folder = os.path.join(root, "variants", self.name)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{self.name}.svg"), "wb") as f:
+            f.write(self.svg())
+        with open(os.path.join(folder, "config.json"), "w") as f:
+            json.dump(self.config(), f, indent=1)
+        os.makedirs(os.path.join(root, "assets"), exist_ok=True)
+        with open(os.path.join(root, "assets", f"{self.name}_adjacencies.txt"), "w") as f:
+            for name1, name2 in self.adjacencies():
+                f.write(f"{name1},{name2}\n")
+        logger.info(f"map_parser.vector.synthetic.{self.name}: {len(self.cells)} provinces in {time.time() - start}s")
+
+
+def generate_variant(name: str, options: SyntheticVariantOptions | None = None, root: str = ".") -> SyntheticVariant:
+    """Writes a synthetic variant called name under root; load it with get_parser(name)."""
+    variant = SyntheticVariant(name, options or SyntheticVariantOptions())
+    variant.write(root)
+    return variant
@@ -6,8 +6,8 @@ from DiploGM.map_parser.vector.transform import TransGL3
 import logging
 
 from shapely.geometry import Point
-from typing import Callable
-from DiploGM.models.province import Province
+from typing import Any, Callable
+from DiploGM.models.province import Province, ProvinceTopology
 
 logger = logging.getLogger(__name__)
 
@@ -167,10 +167,10 @@ def parse_path(path_string: str, translation: TransGL3):
 # function: method in Province that, given the province and a child element corresponding to that province, initializes
 # that data in the Province
 def initialize_province_resident_data(
-    provinces: set[Province],
+    provinces: set[Province] | set[ProvinceTopology],
     resident_dataset: Element | list[Element],
     get_coordinates: Callable[[Element], tuple[float | None, float | None]],
-    resident_data_callback: Callable[[Province, Element, str | None], None],
+    resident_data_callback: Callable[[Any, Element, str | None], None],
 ) -> None:
     resident_dataset = list(resident_dataset)
     for province in provinces:
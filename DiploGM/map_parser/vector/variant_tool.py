@@ -0,0 +1,86 @@
+"""Maintenance commands for variant maps.
+
+Run from the repository root, e.g.
+    python -m DiploGM.map_parser.vector.variant_tool impdip.2.0 --rebuild-adjacencies
+    python -m DiploGM.map_parser.vector.variant_tool synthetic5k --generate --provinces 5000 --seed 1
+"""
+import argparse
+import logging
+import time
+
+from DiploGM.map_parser.vector.synthetic import SyntheticVariantOptions, generate_variant
+from DiploGM.map_parser.vector.vector import Parser
+from DiploGM.models.province import ProvinceType
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_adjacencies(variant: str) -> None:
+    start = time.time()
+    parser = Parser(variant)
+    parser._load_layers()
+    loaded = time.time()
+
+    # Rebuilding the whole topology also checks that the new adjacencies still make a valid map
+    parser.topology = parser._build_topology(rebuild_adjacencies=True)
+    built = time.time()
+    parser._save_compiled(parser.topology)
+
+    provinces = parser.topology.provinces.values()
+    adjacencies = sum(len(province.adjacent) + len(province.impassible_adjacent) for province in provinces) // 2
+    print(f"{variant}: {adjacencies} adjacencies among {len(provinces)} provinces")
+    print(f"  load svg:       {loaded - start:.3f}s")
+    print(f"  build topology: {built - loaded:.3f}s (adjacency search is logged separately)")
+    print(f"Written to assets/{variant}_adjacencies.txt and {parser.compiled_file}")
+
+
+def generate(variant: str, options: SyntheticVariantOptions) -> None:
+    start = time.time()
+    synthetic = generate_variant(variant, options)
+    generated = time.time()
+    board = Parser(variant).parse()
+    parsed = time.time()
+
+    seas = sum(province.type == ProvinceType.SEA for province in board.provinces)
+    print(f"{variant}: {len(board.provinces)} provinces ({seas} sea, {len(synthetic.coasts)} with several coasts), "
+          f"{len(board.players)} players, {len(board.units)} units")
+    print(f"  generate: {generated - start:.3f}s")
+    print(f"  parse:    {parsed - generated:.3f}s")
+    print(f"Written to variants/{variant}/ and assets/{variant}_adjacencies.txt")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Variant map maintenance")
+    arg_parser.add_argument("variant", help="name of the variant folder in variants/")
+    arg_parser.add_argument("--rebuild-adjacencies", action="store_true",
+                            help="recompute assets/<variant>_adjacencies.txt from the SVG")
+    synthetic = arg_parser.add_argument_group("synthetic variants")
+    synthetic.add_argument("--generate", action="store_true",
+                           help="write a made-up variant with this name, for load testing")
+    defaults = SyntheticVariantOptions()
+    synthetic.add_argument("--provinces", type=int, default=defaults.provinces)
+    synthetic.add_argument("--sea-ratio", type=float, default=defaults.sea_ratio)
+    synthetic.add_argument("--multi-coast-ratio", type=float, default=defaults.multi_coast_ratio)
+    synthetic.add_argument("--players", type=int, default=defaults.players)
+    synthetic.add_argument("--unit-density", type=float, default=defaults.unit_density)
+    synthetic.add_argument("--seed", type=int, default=defaults.seed)
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.generate:
+        generate(args.variant, SyntheticVariantOptions(
+            provinces=args.provinces,
+            sea_ratio=args.sea_ratio,
+            multi_coast_ratio=args.multi_coast_ratio,
+            players=args.players,
+            unit_density=args.unit_density,
+            seed=args.seed,
+        ))
+    elif args.rebuild_adjacencies:
+        rebuild_adjacencies(args.variant)
+    else:
+        arg_parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import copy
-import itertools
+import hashlib
 import json
 import logging
+import os
+import pickle
 import time
 import numpy as np
 from xml.etree.ElementTree import Element, tostring
@@ -14,8 +16,9 @@ from DiploGM.map_parser.vector.utils import get_element_color, get_unit_coordina
 from DiploGM.models.turn import PhaseName, Turn
 from DiploGM.models.board import Board
 from DiploGM.models.player import Player
-from DiploGM.models.province import Province, ProvinceType
-from DiploGM.models.unit import Unit, UnitType
+from DiploGM.models.province import ProvinceTopology, ProvinceType
+from DiploGM.models.topology import VariantTopology
+from DiploGM.models.unit import UnitType
 
 # TODO: (BETA) all attribute getting should be in utils which we import and call utils.my_unit()
 # TODO: (BETA) consistent in bracket formatting
@@ -26,6 +29,8 @@ NAMESPACE: dict[str, str] = {
 }
 HIGH_PROVINCES_KEY = "high provinces"
 SVG_CONFIG_KEY = "svg config"
+# Bump whenever VariantTopology's pickled layout changes so stale compiled variants are rebuilt
+COMPILED_VERSION = 1
 
 logger = logging.getLogger(__name__)
 
@@ -34,18 +39,74 @@ class Parser:
     def __init__(self, data: str):
         self.datafile = data
 
-
-
         with open(f"variants/{data}/config.json", "r") as f:
             self.data = json.load(f)
 
         self.data["file"] = f"variants/{data}/{self.data['file']}"
 
-        svg_root = etree.parse(self.data["file"])
-
         self.layers = self.data[SVG_CONFIG_KEY]
         self.layer_data: dict[str, Element] = {}
 
+        self.fow = self.layers.get("fow", False)
+        self.year_offset = self.layers.get("year", 1642)
+
+        self.color_to_player: dict[str, Player | None] = {}
+        self.name_to_province: dict[str, ProvinceTopology] = {}
+
+        # Starting position, keyed by province name; only used while building the topology
+        self.province_owners: dict[str, Player | None] = {}
+        self.province_cores: dict[str, Player | None] = {}
+        self.province_units: dict[str, tuple[str | None, UnitType, Player]] = {}
+        self.player_centers: dict[str, list[str]] = {}
+
+        self.compiled_file = f"assets/{data}_compiled.pickle"
+        self.source_hash = self._get_source_hash()
+        self.topology: VariantTopology | None = self._load_compiled()
+
+    def parse(self) -> Board:
+        if self.topology is None:
+            self._load_layers()
+            self.topology = self._build_topology()
+            self._save_compiled(self.topology)
+        return self.topology.create_board()
+
+    # Hash of everything the topology is built from, so that the compiled variant is rebuilt when any of it changes
+    def _get_source_hash(self) -> str:
+        source_hash = hashlib.sha256(str(COMPILED_VERSION).encode())
+        for path in (f"variants/{self.datafile}/config.json", self.data["file"], f"assets/{self.datafile}_adjacencies.txt"):
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                source_hash.update(f.read())
+        return source_hash.hexdigest()
+
+    def _load_compiled(self) -> VariantTopology | None:
+        try:
+            with open(self.compiled_file, "rb") as f:
+                source_hash, topology = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"{self.datafile}: couldn't load compiled variant, reparsing: {e}")
+            return None
+        if source_hash != self.source_hash:
+            logger.info(f"{self.datafile}: compiled variant is out of date, reparsing")
+            return None
+        logger.info(f"Loaded compiled variant {self.datafile}")
+        return topology
+
+    def _save_compiled(self, topology: VariantTopology) -> None:
+        # Building the topology may have just written the adjacency file
+        self.source_hash = self._get_source_hash()
+        try:
+            with open(self.compiled_file, "wb") as f:
+                pickle.dump((self.source_hash, topology), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            logger.warning(f"{self.datafile}: couldn't save compiled variant: {e}")
+
+    def _load_layers(self) -> None:
+        svg_root = etree.parse(self.data["file"])
+
         for layer in ["land_layer", "island_borders", "island_fill_layer",
                        "sea_borders", "province_names", "supply_center_icons",
                        "army", "retreat_army", "fleet", "retreat_fleet"]:
@@ -67,16 +128,7 @@ class Parser:
                 raise ValueError(f"Layer impassibles_layer not found in SVG")
             self.layer_data["impassibles_layer"] = impassibles_layer
 
-        self.fow = self.layers.get("fow", False)
-        self.year_offset = self.layers.get("year", 1642)
-
-        self.color_to_player: dict[str, Player | None] = {}
-        self.name_to_province: dict[str, Province] = {}
-
-        self.cache_provinces: set[Province] | None = None
-        self.cache_adjacencies: set[tuple[str, str]] | None = None
-
-    def parse(self) -> Board:
+    def _build_topology(self, rebuild_adjacencies: bool = False) -> VariantTopology:
         logger.debug("map_parser.vector.parse.start")
         start = time.time()
 
@@ -100,9 +152,7 @@ class Parser:
                 self.color_to_player[neutral_colors] = None
             self.color_to_player[self.data[SVG_CONFIG_KEY]["neutral_sc"]] = None
 
-        provinces = self._get_provinces()
-
-        units = {province.unit for province in provinces if province.unit}
+        provinces = self._get_provinces(rebuild_adjacencies)
 
         elapsed = time.time() - start
         logger.info(f"map_parser.vector.parse: {elapsed}s")
@@ -154,62 +204,58 @@ class Parser:
             if is_chaos:
                 game_data["players"][player.name] = {}
             if "iscc" not in game_data["players"][player.name]:
-                game_data["players"][player.name]["iscc"] = len([1 for p in provinces if p.has_supply_center and p.owner == player])
+                game_data["players"][player.name]["iscc"] = len([1 for p in provinces if p.has_supply_center and self.province_owners.get(p.name) == player])
             if "vscc" not in game_data["players"][player.name]:
                 game_data["players"][player.name]["vscc"] = game_data["victory_count"]
 
-        return Board(self.players, provinces, units, initial_turn, game_data, self.datafile, self.fow, self.year_offset)
-
-    def read_map(self) -> tuple[set[Province], set[tuple[str, str]]]:
-        if self.cache_provinces is None:
-            # set coordinates and names
-            raw_provinces: set[Province] = self._get_province_coordinates()
-            cache = []
-            self.cache_provinces = set()
-            for province in raw_provinces:
-                if province.name in cache:
-                    logger.warning(f"{self.datafile}: {province.name} repeats in map, ignoring...")
-                    continue
-                cache.append(province.name)
-                self.cache_provinces.add(province)
-
-            if not self.layers["province_labels"]:
-                self._initialize_province_names(self.cache_provinces)
-
-        provinces = copy.deepcopy(self.cache_provinces)
+        return VariantTopology(
+            dict(self.name_to_province),
+            {player.name: player.color_dict or player.default_color for player in self.players},
+            {name: owner.name for name, owner in self.province_owners.items() if owner},
+            {name: core.name for name, core in self.province_cores.items() if core},
+            self.player_centers,
+            [(name, coast, unit_type, player.name) for name, (coast, unit_type, player) in self.province_units.items()],
+            initial_turn,
+            game_data,
+            self.datafile,
+            self.fow,
+            self.year_offset,
+        )
+
+    def read_map(self, rebuild_adjacencies: bool = False) -> tuple[set[ProvinceTopology], set[tuple[str, str]]]:
+        # set coordinates and names
+        raw_provinces: set[ProvinceTopology] = self._get_province_coordinates()
+        cache = []
+        provinces = set()
+        for province in raw_provinces:
+            if province.name in cache:
+                logger.warning(f"{self.datafile}: {province.name} repeats in map, ignoring...")
+                continue
+            cache.append(province.name)
+            provinces.add(province)
+
+        if not self.layers["province_labels"]:
+            self._initialize_province_names(provinces)
+
         for province in provinces:
             self.name_to_province[province.name] = province
 
-        if self.cache_adjacencies is None:
-            # set adjacencies
-            self.cache_adjacencies = self._get_adjacencies(provinces)
-        adjacencies = copy.deepcopy(self.cache_adjacencies)
+        # set adjacencies
+        adjacencies = self._get_adjacencies(provinces, rebuild_adjacencies)
 
         return (provinces, adjacencies)
 
-    def add_province_to_board(self, provinces: set[Province], province: Province) -> set[Province]:
+    def add_province_to_board(self, provinces: set[ProvinceTopology], province: ProvinceTopology) -> set[ProvinceTopology]:
         provinces = {x for x in provinces if x.name != province.name}
         provinces.add(province)
         self.name_to_province[province.name] = province
         return provinces
 
-    def add_high_provinces(self, provinces: set[Province]):
+    def add_high_provinces(self, provinces: set[ProvinceTopology]):
         for name, data in self.data["overrides"][HIGH_PROVINCES_KEY].items():
-            high_provinces: list[Province] = []
+            high_provinces: list[ProvinceTopology] = []
             for index in range(1, data["num"] + 1):
-                province = Province(
-                    name + str(index),
-                    shapely.Polygon(),
-                    dict(),
-                    dict(),
-                    getattr(ProvinceType, data["type"]),
-                    False,
-                    set(),
-                    set(),
-                    None,
-                    None,
-                    None,
-                )
+                province = ProvinceTopology(name + str(index), shapely.Polygon(), getattr(ProvinceType, data["type"]))
                 provinces = self.add_province_to_board(provinces, province)
                 high_provinces.append(province)
 
@@ -227,7 +273,7 @@ class Parser:
                     ad.adjacent.add(high_province)
         return provinces
 
-    def json_cheats(self, provinces: set[Province]) -> set[Province]:
+    def json_cheats(self, provinces: set[ProvinceTopology]) -> set[ProvinceTopology]:
         if "overrides" not in self.data:
             return set()
         if HIGH_PROVINCES_KEY in self.data["overrides"]:
@@ -281,8 +327,8 @@ class Parser:
 
         return provinces
 
-    def _get_provinces(self) -> set[Province]:
-        provinces, adjacencies = self.read_map()
+    def _get_provinces(self, rebuild_adjacencies: bool = False) -> set[ProvinceTopology]:
+        provinces, adjacencies = self.read_map(rebuild_adjacencies)
         for name1, name2 in adjacencies:
             province1 = self.name_to_province[name1]
             province2 = self.name_to_province[name2]
@@ -328,7 +374,7 @@ class Parser:
 
         return provinces
 
-    def _get_province_coordinates(self) -> set[Province]:
+    def _get_province_coordinates(self) -> set[ProvinceTopology]:
         # TODO: (BETA) don't hardcode translation
         land_provinces = self._create_provinces_type(self.layer_data["land_layer"], ProvinceType.LAND)
         island_provinces = self._create_provinces_type(self.layer_data["island_borders"], ProvinceType.ISLAND)
@@ -346,7 +392,7 @@ class Parser:
         self,
         provinces_layer: Element,
         province_type: ProvinceType,
-    ) -> set[Province]:
+    ) -> set[ProvinceTopology]:
         provinces = set()
         for province_data in list(provinces_layer):
             path_string = province_data.get("d")
@@ -379,19 +425,7 @@ class Parser:
                 if name == "":
                     raise RuntimeError(f"Province name not found in province with data {province_data}")
 
-            province = Province(
-                name,
-                poly,
-                dict(),
-                dict(),
-                province_type,
-                False,
-                set(),
-                set(),
-                None,
-                None,
-                None,
-            )
+            province = ProvinceTopology(name, poly, province_type)
 
             provinces.add(province)
         return provinces
@@ -399,16 +433,16 @@ class Parser:
     def _initialize_province_owners(self, provinces_layer: Element) -> None:
         for province_data in list(provinces_layer):
             name = self._get_province_name(province_data)
-            self.name_to_province[name].owner = self.get_element_player(province_data, province_name=name)
+            self.province_owners[name] = self.get_element_player(province_data, province_name=name)
 
     # Sets province names given the names layer
-    def _initialize_province_names(self, provinces: set[Province]) -> None:
+    def _initialize_province_names(self, provinces: set[ProvinceTopology]) -> None:
         def get_coordinates(name_data: Element) -> tuple[float, float]:
             x, y = name_data.get("x"), name_data.get("y")
             assert(x is not None and y is not None)
             return float(x), float(y)
 
-        def set_province_name(province: Province, name_data: Element, _: str | None) -> None:
+        def set_province_name(province: ProvinceTopology, name_data: Element, _: str | None) -> None:
             if province.name != "":
                 raise RuntimeError(f"Province already has name: {province.name}")
             new_name = name_data.findall(".//svg:tspan", namespaces=NAMESPACE)[0].text
@@ -426,20 +460,20 @@ class Parser:
                 raise RuntimeError(f"{name} already has a supply center")
             province.has_supply_center = True
 
-            owner = province.owner
+            owner = self.province_owners.get(name)
             if owner:
-                owner.centers.add(province)
+                self.player_centers.setdefault(owner.name, []).append(name)
 
             # TODO: (BETA): we cheat assume core = owner if exists because capital center symbols work different
-            core = province.owner
+            core = owner
             if not core:
                 core_data = center_data.findall(".//svg:circle", namespaces=NAMESPACE)
                 if len(core_data) >= 2:
                     core = self.get_element_player(core_data[1], province_name=province.name)
-            province.core = core
+            self.province_cores[name] = core
 
     # Sets province supply center values
-    def _initialize_supply_centers(self, provinces: set[Province]) -> None:
+    def _initialize_supply_centers(self, provinces: set[ProvinceTopology]) -> None:
 
         def get_coordinates(supply_center_data: Element) -> tuple[float | None, float | None]:
             circles = supply_center_data.findall(".//svg:circle", namespaces=NAMESPACE)
@@ -454,31 +488,29 @@ class Parser:
             trans = TransGL3(supply_center_data)
             return trans.transform(base_coordinates)
 
-        def set_province_supply_center(province: Province, _element: Element, _coast: str | None) -> None:
+        def set_province_supply_center(province: ProvinceTopology, _element: Element, _coast: str | None) -> None:
             if province.has_supply_center:
                 raise RuntimeError(f"{province.name} already has a supply center")
             province.has_supply_center = True
 
         initialize_province_resident_data(provinces, self.layer_data["supply_center_icons"], get_coordinates, set_province_supply_center)
 
-    def _set_province_unit(self, province: Province, unit_data: Element, coast: str | None = None) -> None:
-        if province.unit:
+    def _set_province_unit(self, province: ProvinceTopology, unit_data: Element, coast: str | None = None) -> None:
+        if province.name in self.province_units:
             return
             raise RuntimeError(f"{province.name} already has a unit")
 
         unit_type = self._get_unit_type(unit_data)
 
         # assume that all starting units are on provinces colored in to their color
-        player = province.owner
+        player = self.province_owners.get(province.name)
         if player is None:
             raise Exception(f"{province.name} has a unit, but isn't owned by any country")
 
         # color_data = unit_data.findall(".//svg:path", namespaces=NAMESPACE)[0]
         # player = self.get_element_player(color_data)
 
-        unit = Unit(unit_type, player, province, coast, None)
-        province.unit = unit
-        unit.player.units.add(unit)
+        self.province_units[province.name] = (coast, unit_type, player)
         return
 
     def _initialize_units_assisted(self) -> None:
@@ -490,7 +522,7 @@ class Parser:
             self._set_province_unit(province, unit_data, coast)
 
     # Sets province unit values
-    def _initialize_units(self, provinces: set[Province]) -> None:
+    def _initialize_units(self, provinces: set[ProvinceTopology]) -> None:
         def get_coordinates(unit_data: Element) -> tuple[float | None, float | None]:
             base_coordinates = tuple(
                 map(float, unit_data.findall(".//svg:path", namespaces=NAMESPACE)[0].get("d").split()[1].split(","))
@@ -536,10 +568,10 @@ class Parser:
         province_name = province_data.get(f"{NAMESPACE.get('inkscape')}label")
         return province_name or ""
 
-    def _get_province(self, province_data: Element) -> Province:
+    def _get_province(self, province_data: Element) -> ProvinceTopology:
         return self.name_to_province[self._get_province_name(province_data)]
 
-    def _get_province_and_coast(self, province_name: str) -> tuple[Province, str | None]:
+    def _get_province_and_coast(self, province_name: str) -> tuple[ProvinceTopology, str | None]:
         coast_suffix: str | None = None
         coast_names = {" nc", " sc", " ec", " wc"}
         province_name = province_name.replace("(", "").replace(")", "")
@@ -554,17 +586,17 @@ class Parser:
         return province, coast_suffix
 
     # Returns province adjacency set
-    def _get_adjacencies(self, provinces: set[Province]) -> set[tuple[str, str]]:
+    def _get_adjacencies(self, provinces: set[ProvinceTopology], rebuild: bool = False) -> set[tuple[str, str]]:
         adjacencies = set()
         try:
+            if rebuild:
+                raise FileNotFoundError
             f = open(f"assets/{self.datafile}_adjacencies.txt", "r")
         except FileNotFoundError:
             f = open(f"assets/{self.datafile}_adjacencies.txt", "w")
-            # Combinations so that we only have (A, B) and not (B, A) or (A, A)
-            for province1, province2 in itertools.combinations(provinces, 2):
-                if shapely.distance(province1.geometry, province2.geometry) < self.layers["border_margin_hint"]:
-                    adjacencies.add((province1.name, province2.name))
-                    f.write(f"{province1.name},{province2.name}\n")
+            adjacencies = self._compute_adjacencies(provinces)
+            for name1, name2 in sorted(adjacencies):
+                f.write(f"{name1},{name2}\n")
         else:
             for line in f:
                 adjacencies.add(tuple(line[:-1].split(',')))
@@ -572,6 +604,28 @@ class Parser:
             f.close()
         return adjacencies
 
+    # Two provinces are adjacent if their borders are closer than border_margin_hint
+    def _compute_adjacencies(self, provinces: set[ProvinceTopology]) -> set[tuple[str, str]]:
+        start = time.time()
+        ordered = list(provinces)
+        geometries = np.array([province.geometry for province in ordered])
+        margin = self.layers["border_margin_hint"]
+
+        # Only pairs whose bounding boxes come within the margin are candidates for the exact distance check
+        shapely.prepare(geometries)
+        tree = shapely.STRtree(geometries)
+        left, right = tree.query(geometries, predicate="dwithin", distance=margin)
+        # Keep (A, B) but not (B, A) or (A, A)
+        candidates = left < right
+        left, right = left[candidates], right[candidates]
+        close = shapely.distance(geometries[left], geometries[right]) < margin
+
+        adjacencies = {(ordered[i].name, ordered[j].name) for i, j in zip(left[close], right[close])}
+
+        elapsed = time.time() - start
+        logger.info(f"map_parser.vector.adjacencies.{self.datafile}: {len(adjacencies)} among {len(ordered)} provinces in {elapsed}s")
+        return adjacencies
+
     def get_element_player(self, element: Element, province_name: str="") -> Player | None:
         color = get_element_color(element)
         #FIXME: only works if there's one person per province
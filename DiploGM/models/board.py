@@ -15,6 +15,7 @@ if TYPE_CHECKING:
     from DiploGM.models.turn import Turn
     from DiploGM.models.player import Player
     from DiploGM.models.province import Province, ProvinceType
+    from DiploGM.models.snapshot import BoardSnapshot
 
 
 logger = logging.getLogger(__name__)
@@ -43,6 +44,7 @@ class Board:
         self.datafile = datafile
         self.name: str | None = None
         self.fow = fow
+        self._indexed_provinces: list[Province] | None = None
 
         # store as lower case for user input purposes
         self.name_to_player: Dict[str, Player] = {player.name.lower(): player for player in self.players}
@@ -207,6 +209,12 @@ class Board:
 
         return visible
 
+    def get_indexed_provinces(self) -> list[Province]:
+        """Provinces sorted by name, so that a province has the same index on every board of this variant."""
+        if self._indexed_provinces is None:
+            self._indexed_provinces = sorted(self.provinces, key=lambda province: province.name)
+        return self._indexed_provinces
+
     def get_possible_locations(self, name: str) -> list[tuple[Province, str | None]]:
         pattern = r"^{}.*$".format(re.escape(name.strip()).replace("\\ ", r"\S*\s*"))
         matches = []
@@ -328,6 +336,15 @@ class Board:
         else:
             return str(self.turn.year)
         
+    def snapshot(self) -> BoardSnapshot:
+        """A compact copy of the per-game state of this board; see DiploGM.models.snapshot."""
+        from DiploGM.models.snapshot import BoardSnapshot
+        return BoardSnapshot(self)
+
+    def restore(self, snapshot: BoardSnapshot) -> Board:
+        """Puts this board back in the state it was in when the snapshot was taken."""
+        return snapshot.restore(self)
+
     def is_chaos(self) -> bool:
         return self.data["players"] == "chaos"
 
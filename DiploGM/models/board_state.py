@@ -0,0 +1,268 @@
+"""Compact, picklable copies of a board's per-game state.
+
+A state only holds names and plain values, so it is cheap to send to another process and can be applied to any board
+of the same variant. The static map comes from the variant topology and is never included.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any
+
+from DiploGM.models import order as orders
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import Unit, UnitType
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.player import Player
+    from DiploGM.models.province import Province
+
+# Order classes by name, for decoding
+_UNIT_ORDERS: dict[str, type[orders.UnitOrder]] = {
+    order_class.__name__: order_class
+    for order_class in [
+        orders.NMR,
+        orders.Hold,
+        orders.Core,
+        orders.Move,
+        orders.ConvoyMove,
+        orders.ConvoyTransport,
+        orders.Support,
+        orders.RetreatMove,
+        orders.RetreatDisband,
+    ]
+}
+_PLAYER_ORDERS: dict[str, type[orders.PlayerOrder]] = {
+    order_class.__name__: order_class for order_class in [orders.Build, orders.Disband]
+}
+_RELATIONSHIP_ORDERS: dict[str, type[orders.RelationshipOrder]] = {
+    order_class.__name__: order_class
+    for order_class in [
+        orders.Vassal,
+        orders.Liege,
+        orders.DualMonarchy,
+        orders.Disown,
+        orders.Defect,
+        orders.RebellionMarker,
+    ]
+}
+
+# Sections of a state that are keyed by name and diffed entry by entry
+_KEYED_SECTIONS = ("players", "provinces", "units")
+
+
+def get_board_state(board: Board) -> dict[str, Any]:
+    return {
+        "board": (board.board_id, board.fish, board.name, board.datafile, board.orders_enabled),
+        "turn": (board.turn.year, board.turn.phase, board.turn.start_year),
+        "data": copy.deepcopy(board.data),
+        "players": {player.name: _encode_player(player) for player in board.players},
+        "provinces": {
+            province.name: (
+                _name(province.owner),
+                _name(province.core),
+                _name(province.half_core),
+                _name(province.corer),
+            )
+            for province in board.provinces
+        },
+        "units": {unit_key(unit): _encode_unit(unit) for unit in board.units},
+    }
+
+
+def restore_players(board: Board, state: dict[str, Any]) -> dict[str, Player]:
+    """Restores the "board", "turn", "data" and "players" sections of a state, and empties every player's units and
+    centers for the caller to fill in again. Returns the players by name."""
+    board.board_id, board.fish, board.name, board.datafile, board.orders_enabled = state["board"]
+    board.turn = Turn(*state["turn"])
+    board.data = copy.deepcopy(state["data"])
+    if not board.is_chaos():
+        # Like Board.update_players, but safe to run on a board that already has these players and nicknames
+        for player_name, player_data in board.data["players"].items():
+            if player_name.lower() not in board.name_to_player:
+                board.add_new_player(player_name, player_data["color"])
+            player = board.name_to_player[player_name.lower()]
+            nickname = player_data.get("nickname")
+            if nickname and board.name_to_player.get(nickname.lower()) is not player:
+                board.add_nickname(player, nickname)
+
+    players = {player.name: player for player in board.players}
+    provinces = {province.name: province for province in board.provinces}
+
+    for player in board.players:
+        player.units = set()
+        player.centers = set()
+    for name, (render_color, points, liege, vassals, waived, build_orders, vassal_orders) in state["players"].items():
+        player = players[name]
+        player.render_color = render_color
+        player.points = points
+        player.liege = players.get(liege) if liege is not None else None
+        player.vassals = [players[vassal] for vassal in vassals]
+        player.waived_orders = waived
+        player.build_orders = {_decode_player_order(provinces, players, encoded) for encoded in build_orders}
+        player.vassal_orders = {
+            players[target]: _RELATIONSHIP_ORDERS[order_type](players[target]) for order_type, target in vassal_orders
+        }
+    return players
+
+
+def restore_board_state(board: Board, state: dict[str, Any]) -> Board:
+    """Overwrites the per-game state of board, which must be of the same variant as the state."""
+    players = restore_players(board, state)
+    provinces = {province.name: province for province in board.provinces}
+    for name, (owner, core, half_core, corer) in state["provinces"].items():
+        province = provinces[name]
+        province.owner = players.get(owner) if owner is not None else None
+        province.core = players.get(core) if core is not None else None
+        province.half_core = players.get(half_core) if half_core is not None else None
+        province.corer = players.get(corer) if corer is not None else None
+        province.unit = None
+        province.dislodged_unit = None
+        if province.owner is not None and province.has_supply_center:
+            province.owner.centers.add(province)
+
+    board.units = set()
+    for (province_name, coast, is_dislodged), (unit_type, owner, retreat_options, _) in state["units"].items():
+        province = provinces[province_name]
+        player = players[owner]
+        unit = Unit(
+            UnitType(unit_type),
+            player,
+            province,
+            coast,
+            None if retreat_options is None else {(provinces[name], c) for name, c in retreat_options},
+        )
+        if is_dislodged:
+            province.dislodged_unit = unit
+        else:
+            province.unit = unit
+        player.units.add(unit)
+        board.units.add(unit)
+    for unit in board.units:
+        unit.order = decode_unit_order(provinces, state["units"][unit_key(unit)][3])
+
+    return board
+
+
+def diff_board_states(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Returns only the parts of new that differ from old; apply_board_state_diff(old, diff) gives back new."""
+    diff: dict[str, Any] = {}
+    for section, value in new.items():
+        if section in _KEYED_SECTIONS:
+            old_section = old[section]
+            changed = {key: entry for key, entry in value.items() if old_section.get(key) != entry}
+            removed = [key for key in old_section if key not in value]
+            if changed or removed:
+                diff[section] = (changed, removed)
+        elif old.get(section) != value:
+            diff[section] = value
+    return diff
+
+
+def apply_board_state_diff(state: dict[str, Any], diff: dict[str, Any]) -> dict[str, Any]:
+    new_state = dict(state)
+    for section, value in diff.items():
+        if section in _KEYED_SECTIONS:
+            changed, removed = value
+            entries = dict(state[section])
+            for key in removed:
+                del entries[key]
+            entries.update(changed)
+            new_state[section] = entries
+        else:
+            new_state[section] = value
+    return new_state
+
+
+def hash_board_state(state: dict[str, Any]) -> str:
+    """Hash of the variant, the game position and every order in it; bookkeeping like fish and the order lock is left
+    out. It doesn't depend on the order units, players or provinces were added in."""
+    digest = hashlib.sha256()
+    digest.update(repr((state["board"][3], state["turn"])).encode())
+    digest.update(json.dumps(state["data"], sort_keys=True, default=repr).encode())
+    for section in _KEYED_SECTIONS:
+        digest.update(repr(sorted(map(repr, state[section].items()))).encode())
+    return digest.hexdigest()
+
+
+def unit_key(unit: Unit) -> tuple[str, str | None, bool]:
+    return unit.province.name, unit.coast, unit.province.dislodged_unit is unit
+
+
+def encode_unit_order(order: orders.UnitOrder | None) -> tuple | None:
+    if order is None:
+        return None
+    destination = getattr(order, "destination", None)
+    source = getattr(order, "source", None)
+    return (
+        order.__class__.__name__,
+        _name(destination),
+        getattr(order, "destination_coast", None),
+        _name(source),
+        order.hasFailed,
+    )
+
+
+def decode_unit_order(provinces: dict[str, Province], encoded: tuple | None) -> orders.UnitOrder | None:
+    if encoded is None:
+        return None
+    order_type, destination, destination_coast, source, has_failed = encoded
+    order_class = _UNIT_ORDERS[order_type]
+    order: orders.UnitOrder
+    if order_class in (orders.Move, orders.ConvoyMove, orders.RetreatMove):
+        order = order_class(provinces[destination], destination_coast)
+    elif order_class in (orders.Support, orders.ConvoyTransport):
+        order = order_class(provinces[source], provinces[destination], destination_coast)
+    else:
+        order = order_class()
+    order.hasFailed = has_failed
+    return order
+
+
+def _encode_unit(unit: Unit) -> tuple:
+    retreat_options = None
+    if unit.retreat_options is not None:
+        retreat_options = sorted(
+            ((province.name, coast) for province, coast in unit.retreat_options),
+            key=lambda option: (option[0], option[1] or ""),
+        )
+    return unit.unit_type.value, unit.player.name, retreat_options, encode_unit_order(unit.order)
+
+
+def _encode_player(player) -> tuple:
+    build_orders = []
+    for build_order in player.build_orders:
+        if isinstance(build_order, orders.PlayerOrder):
+            build_orders.append((
+                build_order.__class__.__name__,
+                build_order.province.name,
+                build_order.coast,
+                getattr(build_order, "unit_type", None) == UnitType.ARMY,
+            ))
+        else:
+            build_orders.append((build_order.__class__.__name__, build_order.player.name, None, False))
+    return (
+        player.render_color,
+        player.points,
+        _name(player.liege),
+        [vassal.name for vassal in player.vassals],
+        player.waived_orders,
+        sorted(build_orders, key=lambda encoded: (encoded[0], encoded[1], encoded[2] or "")),
+        sorted((order.__class__.__name__, target.name) for target, order in player.vassal_orders.items()),
+    )
+
+
+def _decode_player_order(provinces, players, encoded: tuple) -> orders.PlayerOrder | orders.RelationshipOrder:
+    order_type, target, coast, is_army = encoded
+    if order_type in _RELATIONSHIP_ORDERS:
+        # e.g. the RebellionMarker left in build_orders by a fall retreats phase
+        return _RELATIONSHIP_ORDERS[order_type](players[target])
+    if order_type == orders.Build.__name__:
+        return orders.Build(provinces[target], UnitType.ARMY if is_army else UnitType.FLEET, coast)
+    return _PLAYER_ORDERS[order_type](provinces[target])
+
+
+def _name(named) -> str | None:
+    return None if named is None else named.name
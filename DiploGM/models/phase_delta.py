@@ -0,0 +1,135 @@
+"""What an adjudication changed, so that saving or redrawing the next phase only has to deal with that.
+
+A PhaseDelta is the board state before adjudication (see DiploGM.models.board_state), the orders as they were
+adjudicated and the diff to the state after adjudication. Everything else is worked out from those on request.
+Unit keys are (province name, coast, is dislodged), as in board states.
+"""
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any
+
+from DiploGM.models.board_state import apply_board_state_diff
+from DiploGM.models.turn import Turn
+
+UnitKey = tuple[str, str | None, bool]
+
+# Orders that move a unit when they succeed
+_MOVE_ORDERS = ("Move", "ConvoyMove", "RetreatMove")
+
+
+class PhaseDelta:
+    def __init__(self, before: dict[str, Any], orders: dict[UnitKey, tuple | None], diff: dict[str, Any]):
+        self.before = before
+        # unit key -> encoded order as adjudicated, with hasFailed set
+        self.orders = orders
+        self.diff = diff
+
+    @cached_property
+    def after(self) -> dict[str, Any]:
+        return apply_board_state_diff(self.before, self.diff)
+
+    @property
+    def previous_phase(self) -> str:
+        return Turn(*self.before["turn"]).get_indexed_name()
+
+    def changed(self, section: str) -> dict[Any, tuple]:
+        """Entries of a section ("players", "provinces" or "units") that are new or different after adjudication."""
+        return self.diff[section][0] if section in self.diff else {}
+
+    def removed(self, section: str) -> list:
+        return self.diff[section][1] if section in self.diff else []
+
+    @cached_property
+    def moved_units(self) -> dict[UnitKey, UnitKey]:
+        """Where each unit that moved or retreated was -> where it is now."""
+        old_units = self.before["units"]
+        new_units = self.after["units"]
+        moved: dict[UnitKey, UnitKey] = {}
+        if Turn(*self.before["turn"]).is_builds():
+            return moved
+        for key, order in self.orders.items():
+            if order is None or order[0] not in _MOVE_ORDERS or order[4] or key not in old_units:
+                continue
+            order_type, destination, destination_coast = order[:3]
+            target = (destination, destination_coast, False)
+            # A retreat that failed isn't marked as failed, but leaves its destination empty
+            if order_type == "RetreatMove" and target in old_units:
+                continue
+            if target in new_units and new_units[target][:2] == old_units[key][:2]:
+                moved[key] = target
+        return moved
+
+    @cached_property
+    def dislodged_units(self) -> dict[UnitKey, list[tuple[str, str | None]] | None]:
+        """Units dislodged by this adjudication -> their retreat options."""
+        old_units = self.before["units"]
+        return {
+            key: entry[2]
+            for key, entry in self.after["units"].items()
+            if key[2] and key not in old_units and old_units.get((key[0], key[1], False), (None, None))[:2] == entry[:2]
+        }
+
+    @cached_property
+    def removed_units(self) -> list[UnitKey]:
+        """Units that are gone: disbanded, destroyed or unable to retreat."""
+        accounted = set(self.moved_units) | {(key[0], key[1], False) for key in self.dislodged_units}
+        arrived = set(self.moved_units.values())
+        new_units = self.after["units"]
+        return [
+            key for key, entry in self.before["units"].items()
+            if key not in accounted and (key in arrived or new_units.get(key, (None, None))[:2] != entry[:2])
+        ]
+
+    @cached_property
+    def created_units(self) -> list[UnitKey]:
+        """Units that weren't on the board before, i.e. builds."""
+        arrived = set(self.moved_units.values()) | set(self.dislodged_units)
+        departed = set(self.moved_units) | set(self.removed_units)
+        old_units = self.before["units"]
+        return [
+            key for key, entry in self.after["units"].items()
+            if key not in arrived and (key in departed or old_units.get(key, (None, None))[:2] != entry[:2])
+        ]
+
+    @cached_property
+    def ownership_changes(self) -> dict[str, tuple[str | None, str | None]]:
+        """Province -> (owner before, owner after)."""
+        old_provinces = self.before["provinces"]
+        return {
+            name: (old_provinces[name][0], entry[0])
+            for name, entry in self.changed("provinces").items()
+            if name in old_provinces and old_provinces[name][0] != entry[0]
+        }
+
+    @cached_property
+    def core_changes(self) -> dict[str, tuple[tuple[str | None, str | None], tuple[str | None, str | None]]]:
+        """Province -> ((core, half core) before, (core, half core) after)."""
+        old_provinces = self.before["provinces"]
+        return {
+            name: (old_provinces[name][1:3], entry[1:3])
+            for name, entry in self.changed("provinces").items()
+            if name in old_provinces and old_provinces[name][1:3] != entry[1:3]
+        }
+
+    @cached_property
+    def vassal_changes(self) -> dict[str, tuple[tuple[str | None, list[str]], tuple[str | None, list[str]]]]:
+        """Player -> ((liege, vassals) before, (liege, vassals) after)."""
+        old_players = self.before["players"]
+        return {
+            name: (old_players[name][2:4], entry[2:4])
+            for name, entry in self.changed("players").items()
+            if name in old_players and old_players[name][2:4] != entry[2:4]
+        }
+
+    @cached_property
+    def unit_rows(self) -> tuple[set[UnitKey], set[UnitKey]]:
+        """(units whose database row differs from the previous phase's, once orders are cleared;
+        units of the previous phase without a row in this one). The rest can be copied over."""
+        old_units = self.before["units"]
+        written = {
+            key for key, entry in self.after["units"].items()
+            if entry[3] is not None or key not in old_units or old_units[key][:2] != entry[:2]
+        }
+        dropped = {key for key in old_units if key not in self.after["units"]} | (written & old_units.keys())
+        return written, dropped
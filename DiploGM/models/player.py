@@ -5,7 +5,6 @@ from enum import Enum
 import discord
 
 from DiploGM.models import order
-from DiploGM.utils import simple_player_name
 
 
 if TYPE_CHECKING:
@@ -64,6 +63,8 @@ class Player:
 
 
     def find_discord_role(self, roles: Sequence[discord.Role]) -> Optional[discord.Role]:
+        # Imported here as DiploGM.utils imports this module
+        from DiploGM.utils import simple_player_name
         for role in roles:
             if simple_player_name(role.name) == simple_player_name(self.get_name()):
                 return role
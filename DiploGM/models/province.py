@@ -20,56 +20,12 @@ class ProvinceType(Enum):
     SEA = 3
     IMPASSIBLE = 4
 
+class ProvinceBase:
+    """Read-only helpers shared by ProvinceTopology and Province.
 
-class Province():
-    def __init__(
-        self,
-        name: str,
-        coordinates: Polygon | MultiPolygon,
-        primary_unit_coordinates: dict[UnitType | str, tuple[float, float]],
-        retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]],
-        province_type: ProvinceType,
-        has_supply_center: bool,
-        adjacent: set[Province],
-        fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]],
-        core: player.Player | None,
-        owner: player.Player | None,
-        local_unit: unit.Unit | None,  # TODO: probably doesn't make sense to init with a unit
-    ):
-        self.name: str = name
-        self.geometry: Polygon | MultiPolygon = coordinates
-        self.primary_unit_coordinates: dict[UnitType | str, tuple[float, float]] = primary_unit_coordinates
-        self.retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]] = retreat_unit_coordinates
-        self.type: ProvinceType = province_type
-        self.has_supply_center: bool = has_supply_center
-        self.adjacent: set[Province] = adjacent
-        self.fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]] = fleet_adjacent
-        self.impassible_adjacent: set[Province] = set()
-        self.corer: player.Player | None = None
-        self.core: player.Player | None = core
-        self.half_core: player.Player | None = None
-        self.owner: player.Player | None = owner
-        self.unit: unit.Unit | None = local_unit
-        self.dislodged_unit: unit.Unit | None = None
-        self.nonadjacent_coasts: set[str] = set()
-
-        # primary/retreat unit coordinates are of the form {unit_type/coast: (x, y)}
-        # all_locs/all_rets are of the form {unit_type/coast: set((x, y), (x2, y2), ...)}
-        # This assumes that only fleet units have to deal with multiple coasts
-        # TODO: Bundle primary and retreat coordinates into a single structure
-        self.all_locs = {}
-        self.all_rets = {}
-        if primary_unit_coordinates:
-            self.all_locs = {key: {value} for key, value in self.primary_unit_coordinates.items()}
-        if retreat_unit_coordinates:
-            self.all_rets = {key: {value} for key, value in self.retreat_unit_coordinates.items()}
-
-    def __str__(self):
-        return self.name
+    Subclasses provide name, fleet_adjacent and the unit coordinate dictionaries.
+    """
 
-    def __repr__(self):
-        return f"Province {self.name}"
-    
     def get_name(self, coast: str | None = None):
         if coast in self.fleet_adjacent:
             return f"{self.name} {coast}"
@@ -88,27 +44,7 @@ class Province():
         elif unit_type in self.retreat_unit_coordinates:
             return self.retreat_unit_coordinates[unit_type]
         return (0, 0)
-    
-    def set_unit_coordinate(self, coord, is_primary, unit_type, coast = None):
-        # Set default cooordinate if none are found
-        if coord is None:
-            coord = (0, 0)
 
-        if is_primary:
-            unit_coords = self.primary_unit_coordinates
-        else:
-            unit_coords = self.retreat_unit_coordinates
-        if coast:
-            unit_coords[coast] = coord
-        else:
-            unit_coords[unit_type] = coord
-
-    def get_owner(self) -> player.Player | None:
-        return self.owner
-
-    def get_unit(self) -> unit.Unit | None:
-        return self.unit
-    
     # Gets a set of all coasts if multiple exist, otherwise returns an empty set (== False)
     def get_multiple_coasts(self) -> set:
         if self.fleet_adjacent and isinstance(self.fleet_adjacent, dict):
@@ -117,7 +53,7 @@ class Province():
     
     # Gets all provinces adjacent via fleet, optionally from a given coast
     # If there are multiple coasts, coast must be specified
-    def get_coastal_adjacent(self, coast: str | None = None) -> set[tuple[Province, str | None]]:
+    def get_coastal_adjacent(self, coast: str | None = None) -> set:
         if coast:
             if not isinstance(self.fleet_adjacent, dict):
                 raise ValueError(f"Province {self.name} does not have multiple coasts.")
@@ -129,7 +65,7 @@ class Province():
         return self.fleet_adjacent
     
     # Checks if other province (and optionally coast) is adjacent via fleet
-    def is_coastally_adjacent(self, other: Province | tuple[Province, str | None], coast: str | None = None) -> bool:
+    def is_coastally_adjacent(self, other, coast: str | None = None) -> bool:
         if isinstance(other, tuple) and other[1] == None:
             dest = other[0]
         else:
@@ -141,7 +77,54 @@ class Province():
                 return True
         return False
 
-    def set_adjacent(self, other: Province | tuple[Province, str | None]):
+
+class ProvinceTopology(ProvinceBase):
+    """Static data for a province, built once per variant and shared by every board of that variant.
+
+    Adjacency sets link ProvinceTopology objects to each other. Once the variant has been parsed this must be
+    treated as read-only; per-game state lives on Province.
+    """
+
+    def __init__(self, name: str, coordinates: Polygon | MultiPolygon, province_type: ProvinceType):
+        self.name: str = name
+        self.geometry: Polygon | MultiPolygon = coordinates
+        self.primary_unit_coordinates: dict[UnitType | str, tuple[float, float]] = {}
+        self.retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]] = {}
+        self.type: ProvinceType = province_type
+        self.has_supply_center: bool = False
+        self.adjacent: set[ProvinceTopology] = set()
+        self.fleet_adjacent: set[tuple[ProvinceTopology, str | None]] | dict[str, set[tuple[ProvinceTopology, str | None]]] = set()
+        self.impassible_adjacent: set[ProvinceTopology] = set()
+        self.nonadjacent_coasts: set[str] = set()
+
+        # primary/retreat unit coordinates are of the form {unit_type/coast: (x, y)}
+        # all_locs/all_rets are of the form {unit_type/coast: set((x, y), (x2, y2), ...)}
+        # This assumes that only fleet units have to deal with multiple coasts
+        # TODO: Bundle primary and retreat coordinates into a single structure
+        self.all_locs: dict[UnitType | str, set[tuple[float, float]]] = {}
+        self.all_rets: dict[UnitType | str, set[tuple[float, float]]] = {}
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"ProvinceTopology {self.name}"
+
+    def set_unit_coordinate(self, coord, is_primary, unit_type, coast = None):
+        # Set default cooordinate if none are found
+        if coord is None:
+            coord = (0, 0)
+
+        if is_primary:
+            unit_coords = self.primary_unit_coordinates
+        else:
+            unit_coords = self.retreat_unit_coordinates
+        if coast:
+            unit_coords[coast] = coord
+        else:
+            unit_coords[unit_type] = coord
+
+    def set_adjacent(self, other: ProvinceTopology | tuple[ProvinceTopology, str | None]):
         if isinstance(other, tuple):
             other = other[0]
         if other.type == ProvinceType.IMPASSIBLE:
@@ -197,17 +180,17 @@ class Province():
                     # Since we know the other province has manually-assigned coasts
                     if province2.is_coastally_adjacent(self, coast2):
                     # if (province2.get_name(coast2) not in self.nonadjacent_coasts
-                    #     and Province.detect_coastal_connection(self, province2, coast2)):
+                    #     and ProvinceTopology.detect_coastal_connection(self, province2, coast2)):
                         self.fleet_adjacent.add((province2, coast2))
             elif self.type != ProvinceType.LAND:
                 self.fleet_adjacent.add((province2, None))
             elif (province2.fleet_adjacent
                   and province2.get_name() not in self.nonadjacent_coasts
-                  and Province.detect_coastal_connection(self, province2)):
+                  and ProvinceTopology.detect_coastal_connection(self, province2)):
                 self.fleet_adjacent.add((province2, None))
 
     @staticmethod
-    def detect_coastal_connection(p1: Province, p2: Province, coast: str | None = None):
+    def detect_coastal_connection(p1: ProvinceTopology, p2: ProvinceTopology, coast: str | None = None):
         # multiple possible tripoints could happen if there was a scenario
         # where two canals were blocked from connecting on one side by a land province but not the other
         # or by multiple rainbow-shaped seas
@@ -226,7 +209,7 @@ class Province():
             # if not, they must form rings inside and outside, meaning there is no connection
             
             # initialise the process queue and the connection sets
-            procqueue: list[Province] = []
+            procqueue: list[ProvinceTopology] = []
             connected_sets: set[frozenset[Province]] = set()
 
             for adjacent in p1.adjacent | p1.impassible_adjacent | \
@@ -280,4 +263,107 @@ class Province():
                             f"Final state: {connected_sets}")
 
         # no connection worked
-        return False
\ No newline at end of file
+        return False
+
+
+class Province(ProvinceBase):
+    """Per-game state of a province.
+
+    Static data (name, type, coordinates, adjacencies...) is read from the shared ProvinceTopology. Adjacencies are
+    resolved to this board's Province objects through `siblings`, a name lookup shared by every province on the board.
+    """
+
+    def __init__(
+        self,
+        topology: ProvinceTopology,
+        siblings: dict[str, Province],
+        core: player.Player | None = None,
+        owner: player.Player | None = None,
+        local_unit: unit.Unit | None = None,  # TODO: probably doesn't make sense to init with a unit
+    ):
+        self.topology: ProvinceTopology = topology
+        self._siblings: dict[str, Province] = siblings
+        self.corer: player.Player | None = None
+        self.core: player.Player | None = core
+        self.half_core: player.Player | None = None
+        self.owner: player.Player | None = owner
+        self.unit: unit.Unit | None = local_unit
+        self.dislodged_unit: unit.Unit | None = None
+
+        # Resolved lazily from the topology the first time they are needed
+        self._adjacent: frozenset[Province] | None = None
+        self._impassible_adjacent: frozenset[Province] | None = None
+        self._fleet_adjacent: frozenset[tuple[Province, str | None]] | dict[str, frozenset[tuple[Province, str | None]]] | None = None
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Province {self.name}"
+
+    @property
+    def name(self) -> str:
+        return self.topology.name
+
+    @property
+    def geometry(self) -> Polygon | MultiPolygon:
+        return self.topology.geometry
+
+    @property
+    def type(self) -> ProvinceType:
+        return self.topology.type
+
+    @property
+    def has_supply_center(self) -> bool:
+        return self.topology.has_supply_center
+
+    @property
+    def primary_unit_coordinates(self) -> dict[UnitType | str, tuple[float, float]]:
+        return self.topology.primary_unit_coordinates
+
+    @property
+    def retreat_unit_coordinates(self) -> dict[UnitType | str, tuple[float, float]]:
+        return self.topology.retreat_unit_coordinates
+
+    @property
+    def all_locs(self) -> dict[UnitType | str, set[tuple[float, float]]]:
+        return self.topology.all_locs
+
+    @property
+    def all_rets(self) -> dict[UnitType | str, set[tuple[float, float]]]:
+        return self.topology.all_rets
+
+    @property
+    def nonadjacent_coasts(self) -> set[str]:
+        return self.topology.nonadjacent_coasts
+
+    @property
+    def adjacent(self) -> frozenset[Province]:
+        if self._adjacent is None:
+            self._adjacent = frozenset(self._siblings[other.name] for other in self.topology.adjacent)
+        return self._adjacent
+
+    @property
+    def impassible_adjacent(self) -> frozenset[Province]:
+        if self._impassible_adjacent is None:
+            self._impassible_adjacent = frozenset(self._siblings[other.name] for other in self.topology.impassible_adjacent)
+        return self._impassible_adjacent
+
+    @property
+    def fleet_adjacent(self) -> frozenset[tuple[Province, str | None]] | dict[str, frozenset[tuple[Province, str | None]]]:
+        if self._fleet_adjacent is None:
+            fleet_adjacent = self.topology.fleet_adjacent
+            if isinstance(fleet_adjacent, dict):
+                self._fleet_adjacent = {coast: self._resolve_coasts(adjacent) for coast, adjacent in fleet_adjacent.items()}
+            else:
+                self._fleet_adjacent = self._resolve_coasts(fleet_adjacent)
+        return self._fleet_adjacent
+
+    def _resolve_coasts(self, adjacent: set[tuple[ProvinceTopology, str | None]]) -> frozenset[tuple[Province, str | None]]:
+        return frozenset((self._siblings[other.name], coast) for other, coast in adjacent)
+
+    def get_owner(self) -> player.Player | None:
+        return self.owner
+
+    def get_unit(self) -> unit.Unit | None:
+        return self.unit
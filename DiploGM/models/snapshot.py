@@ -0,0 +1,116 @@
+"""Compact copies of a board's per-game state, for restoring a board without going through the database.
+
+A BoardSnapshot keeps the same information as a board state (see DiploGM.models.board_state), but with provinces and
+players numbered instead of named: a province is its position in Board.get_indexed_provinces(), which is the same on
+every board of a variant, and a player is their position in the snapshot's players. Ownership and units are flat integer
+arrays, so taking a snapshot is cheap enough to do before every adjudication.
+"""
+from __future__ import annotations
+
+import copy
+from array import array
+from typing import TYPE_CHECKING
+
+from DiploGM.models.board_state import _encode_player, decode_unit_order, encode_unit_order, restore_players
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import Unit, UnitType
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.player import Player
+
+# Index of "no player"
+NONE = -1
+
+
+class BoardSnapshot:
+    def __init__(self, board: Board):
+        provinces = board.get_indexed_provinces()
+        province_index = {province: i for i, province in enumerate(provinces)}
+        self.board = (board.board_id, board.fish, board.name, board.datafile, board.orders_enabled)
+        self.turn = (board.turn.year, board.turn.phase, board.turn.start_year)
+        self.data = copy.deepcopy(board.data)
+        self.province_count = len(provinces)
+
+        by_name = {player.name: player for player in board.players}
+        self.players = tuple(sorted(by_name))
+        player_index = {name: i for i, name in enumerate(self.players)}
+        self.player_states = tuple(_encode_player(by_name[name]) for name in self.players)
+
+        def index(player: Player | None) -> int:
+            return NONE if player is None else player_index[player.name]
+
+        self.owners = array("h", (index(province.owner) for province in provinces))
+        self.cores = array("h", (index(province.core) for province in provinces))
+        self.half_cores = array("h", (index(province.half_core) for province in provinces))
+        self.corers = array("h", (index(province.corer) for province in provinces))
+
+        units = sorted(board.units, key=lambda unit: (province_index[unit.province], _is_dislodged(unit)))
+        self.unit_provinces = array("i", (province_index[unit.province] for unit in units))
+        self.unit_dislodged = array("b", (_is_dislodged(unit) for unit in units))
+        self.unit_fleets = array("b", (unit.unit_type == UnitType.FLEET for unit in units))
+        self.unit_owners = array("h", (player_index[unit.player.name] for unit in units))
+        self.unit_coasts = tuple(unit.coast for unit in units)
+        # (province index, coast) pairs, or None for a unit that isn't retreating
+        self.unit_retreats = tuple(
+            None if unit.retreat_options is None
+            else tuple((province_index[province], coast) for province, coast in unit.retreat_options)
+            for unit in units
+        )
+        self.unit_orders = tuple(encode_unit_order(unit.order) for unit in units)
+
+    @property
+    def phase(self) -> str:
+        return Turn(*self.turn).get_indexed_name()
+
+    def restore(self, board: Board) -> Board:
+        """Overwrites the per-game state of board, which must be of the same variant as the board this was taken of."""
+        if self.board[3] != board.datafile or self.province_count != len(board.provinces):
+            raise ValueError(f"A snapshot of a {self.board[3]} board can't be restored onto a {board.datafile} board")
+        provinces = board.get_indexed_provinces()
+        players = restore_players(board, {
+            "board": self.board,
+            "turn": self.turn,
+            "data": self.data,
+            "players": dict(zip(self.players, self.player_states)),
+        })
+        by_index = [players[name] for name in self.players]
+
+        def player(i: int) -> Player | None:
+            return None if i == NONE else by_index[i]
+
+        for i, province in enumerate(provinces):
+            province.owner = player(self.owners[i])
+            province.core = player(self.cores[i])
+            province.half_core = player(self.half_cores[i])
+            province.corer = player(self.corers[i])
+            province.unit = None
+            province.dislodged_unit = None
+            if province.owner is not None and province.has_supply_center:
+                province.owner.centers.add(province)
+
+        province_names = {province.name: province for province in provinces}
+        board.units = set()
+        for i, province_i in enumerate(self.unit_provinces):
+            province = provinces[province_i]
+            owner = by_index[self.unit_owners[i]]
+            retreats = self.unit_retreats[i]
+            unit = Unit(
+                UnitType.FLEET if self.unit_fleets[i] else UnitType.ARMY,
+                owner,
+                province,
+                self.unit_coasts[i],
+                None if retreats is None else {(provinces[j], coast) for j, coast in retreats},
+            )
+            if self.unit_dislodged[i]:
+                province.dislodged_unit = unit
+            else:
+                province.unit = unit
+            owner.units.add(unit)
+            board.units.add(unit)
+            unit.order = decode_unit_order(province_names, self.unit_orders[i])
+        return board
+
+
+def _is_dislodged(unit: Unit) -> bool:
+    return unit.province.dislodged_unit is unit
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import copy
+import logging
+import time
+
+from DiploGM.models.board import Board
+from DiploGM.models.player import Player
+from DiploGM.models.province import Province, ProvinceTopology, ProvinceType
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import Unit, UnitType
+
+logger = logging.getLogger(__name__)
+
+
+class VariantTopology:
+    """Everything about a variant that is fixed once its map has been parsed.
+
+    Built once per variant by the Parser and shared by every board of that variant, so creating a board only needs
+    fresh per-game state (players, owners, units) instead of re-parsing or deep-copying the map.
+    """
+
+    def __init__(
+        self,
+        provinces: dict[str, ProvinceTopology],
+        players: dict[str, str | dict[str, str]],
+        owners: dict[str, str],
+        cores: dict[str, str],
+        centers: dict[str, list[str]],
+        units: list[tuple[str, str | None, UnitType, str]],
+        initial_turn: Turn,
+        data: dict,
+        datafile: str,
+        fow: bool,
+        year_offset: int,
+    ):
+        # Includes impassible provinces, which only exist for adjacency purposes and don't go in board.provinces
+        self.provinces: dict[str, ProvinceTopology] = provinces
+        # player name -> color
+        self.players: dict[str, str | dict[str, str]] = players
+        # province name -> player name
+        self.owners: dict[str, str] = owners
+        self.cores: dict[str, str] = cores
+        # player name -> names of the provinces in player.centers
+        self.centers: dict[str, list[str]] = centers
+        # (province name, coast, unit type, player name)
+        self.units: list[tuple[str, str | None, UnitType, str]] = units
+        self.initial_turn: Turn = initial_turn
+        self.data: dict = data
+        self.datafile: str = datafile
+        self.fow: bool = fow
+        self.year_offset: int = year_offset
+
+    def __getstate__(self) -> dict:
+        # Provinces reference each other through their adjacency sets; store them by name so pickling
+        # doesn't recurse through the whole map graph
+        state = self.__dict__.copy()
+        state["provinces"] = [_flatten_province(province) for province in self.provinces.values()]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        flat_provinces = state.pop("provinces")
+        self.__dict__.update(state)
+        self.provinces = {}
+        for flat in flat_provinces:
+            province = ProvinceTopology(flat["name"], flat["geometry"], flat["type"])
+            province.has_supply_center = flat["has_supply_center"]
+            province.primary_unit_coordinates = flat["primary_unit_coordinates"]
+            province.retreat_unit_coordinates = flat["retreat_unit_coordinates"]
+            province.all_locs = flat["all_locs"]
+            province.all_rets = flat["all_rets"]
+            province.nonadjacent_coasts = flat["nonadjacent_coasts"]
+            self.provinces[province.name] = province
+
+        for flat in flat_provinces:
+            province = self.provinces[flat["name"]]
+            province.adjacent = {self.provinces[name] for name in flat["adjacent"]}
+            province.impassible_adjacent = {self.provinces[name] for name in flat["impassible_adjacent"]}
+            if isinstance(flat["fleet_adjacent"], dict):
+                province.fleet_adjacent = {
+                    coast: {(self.provinces[name], other_coast) for name, other_coast in adjacent}
+                    for coast, adjacent in flat["fleet_adjacent"].items()
+                }
+            else:
+                province.fleet_adjacent = {(self.provinces[name], coast) for name, coast in flat["fleet_adjacent"]}
+
+    def create_board(self) -> Board:
+        start = time.time()
+
+        players = {name: Player(name, color, set(), set()) for name, color in self.players.items()}
+
+        siblings: dict[str, Province] = {}
+        for name, topology in self.provinces.items():
+            siblings[name] = Province(
+                topology,
+                siblings,
+                players.get(self.cores.get(name)),
+                players.get(self.owners.get(name)),
+                None,
+            )
+
+        for player_name, province_names in self.centers.items():
+            players[player_name].centers.update(siblings[name] for name in province_names)
+
+        units = set()
+        for province_name, coast, unit_type, player_name in self.units:
+            province = siblings[province_name]
+            player = players[player_name]
+            unit = Unit(unit_type, player, province, coast, None)
+            province.unit = unit
+            player.units.add(unit)
+            units.add(unit)
+
+        provinces = {province for province in siblings.values() if province.type != ProvinceType.IMPASSIBLE}
+
+        board = Board(
+            set(players.values()),
+            provinces,
+            units,
+            Turn(self.initial_turn.year, self.initial_turn.phase, self.initial_turn.start_year),
+            copy.deepcopy(self.data),
+            self.datafile,
+            self.fow,
+            self.year_offset,
+        )
+
+        elapsed = time.time() - start
+        logger.debug(f"models.topology.create_board.{self.datafile}: {elapsed}s")
+        return board
+
+
+def _flatten_province(province: ProvinceTopology) -> dict:
+    if isinstance(province.fleet_adjacent, dict):
+        fleet_adjacent = {
+            coast: [(other.name, other_coast) for other, other_coast in adjacent]
+            for coast, adjacent in province.fleet_adjacent.items()
+        }
+    else:
+        fleet_adjacent = [(other.name, coast) for other, coast in province.fleet_adjacent]
+    return {
+        "name": province.name,
+        "geometry": province.geometry,
+        "type": province.type,
+        "has_supply_center": province.has_supply_center,
+        "primary_unit_coordinates": province.primary_unit_coordinates,
+        "retreat_unit_coordinates": province.retreat_unit_coordinates,
+        "all_locs": province.all_locs,
+        "all_rets": province.all_rets,
+        "nonadjacent_coasts": province.nonadjacent_coasts,
+        "adjacent": [other.name for other in province.adjacent],
+        "impassible_adjacent": [other.name for other in province.impassible_adjacent],
+        "fleet_adjacent": fleet_adjacent,
+    }
@@ -3,7 +3,7 @@ from DiploGM.models.player import Player
 from DiploGM.utils import get_unit_type, get_keywords, parse_season
 from DiploGM.adjudicator.mapper import Mapper
 from DiploGM.models.board import Board
-from DiploGM.db.database import get_connection
+from DiploGM.db.database import get_async_connection
 from DiploGM.utils.sanitise import sanitise_name, simple_player_name
 
 def parse_board_params(message: str, board: Board) -> tuple[str, str, bytes | None, str | None, str | None]:
@@ -118,7 +118,7 @@ def _add_player(keywords: list[str], board: Board) -> tuple[str | None, str | No
         "vscc" : board.data["victory_count"]
     }
     board.add_new_player(player_name, player_color)
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?)",
         (board.board_id, player_name, player_color, None, 0)
     )
@@ -144,7 +144,7 @@ def _parse_command(command: str, board: Board) -> None:
         raise RuntimeError("No command key phrases found")
     new_key, new_value = function_list[command_type](keywords, board)
     if new_key is not None:
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "INSERT OR REPLACE INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
             (board.board_id, new_key, new_value)
         )
\ No newline at end of file
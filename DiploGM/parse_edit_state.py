@@ -6,7 +6,7 @@ from DiploGM.config import ERROR_COLOUR, PARTIAL_ERROR_COLOUR
 from DiploGM.utils import get_unit_type, get_keywords, parse_season
 from DiploGM.adjudicator.mapper import Mapper
 from DiploGM.models.board import Board
-from DiploGM.db.database import get_connection
+from DiploGM.db.database import get_async_connection
 from DiploGM.manager import Manager
 from DiploGM.models.player import Player
 from DiploGM.models.province import Province
@@ -59,15 +59,15 @@ def _set_phase(keywords: list[str], board: Board) -> None:
     if new_turn is None:
         raise ValueError(f"{' '.join(keywords)} is not a valid phase name")
     board.turn = new_turn
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE boards SET phase=? WHERE board_id=? and phase=?",
         (board.turn.get_indexed_name(), board.board_id, old_turn),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET phase=? WHERE board_id=? and phase=?",
         (board.turn.get_indexed_name(), board.board_id, old_turn),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE units SET phase=? WHERE board_id=? and phase=?",
         (board.turn.get_indexed_name(), board.board_id, old_turn),
     )
@@ -77,7 +77,7 @@ def _set_province_core(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     province.core = player
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET core=? WHERE board_id=? and phase=? and province_name=?",
         (
             player.name if player is not None else None,
@@ -92,7 +92,7 @@ def _set_province_half_core(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     province.half_core = player
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET half_core=? WHERE board_id=? and phase=? and province_name=?",
         (
             player.name if player is not None else None,
@@ -112,7 +112,7 @@ def _set_player_color(keywords: list[str], board: Board) -> None:
         raise ValueError(f"Unknown hexadecimal color: {color}")
 
     player.render_color = color
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE players SET color=? WHERE board_id=? and player_name=?",
         (color, board.board_id, player.name),
     )
@@ -122,7 +122,7 @@ def _set_province_owner(keywords: list[str], board: Board) -> None:
     province = board.get_province(keywords[0])
     player = board.get_player(keywords[1])
     board.change_owner(province, player)
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
         (
             player.name if player is not None else None,
@@ -138,7 +138,7 @@ def _set_total_owner(keywords: list[str], board: Board) -> None:
     player = board.get_player(keywords[1])
     board.change_owner(province, player)
     province.core = player
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET owner=?, core=? WHERE board_id=? and phase=? and province_name=?",
         (
             player.name if player is not None else None,
@@ -165,7 +165,7 @@ def _create_unit(keywords: list[str], board: Board) -> None:
         coast = None
 
     unit = board.create_unit(unit_type, player, province, coast, None)
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) "
         "VALUES (?, ?, ?, ?, ?, ?) "
         "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
@@ -203,7 +203,7 @@ def _create_dislodged_unit(keywords: list[str], board: Board) -> None:
                 f"Could not find at least one province in retreat options."
             )
         unit = board.create_unit(unit_type, player, province, coast, retreat_options)
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) "
             "VALUES (?, ?, ?, ?, ?, ?) "
             "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
@@ -218,7 +218,7 @@ def _create_dislodged_unit(keywords: list[str], board: Board) -> None:
                 unit_type == UnitType.ARMY,
             ),
         )
-        get_connection().executemany_arbitrary_sql(
+        get_async_connection().executemany_arbitrary_sql(
             "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
             [
                 (
@@ -239,7 +239,7 @@ def _delete_unit(keywords: list[str], board: Board) -> None:
     unit = board.delete_unit(province)
     if not unit:
         raise RuntimeError(f"No unit to delete in {province}")
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
         (
             board.board_id,
@@ -255,11 +255,11 @@ def _delete_dislodged_unit(keywords: list[str], board: Board) -> None:
     unit = board.delete_dislodged_unit(province)
     if not unit:
         raise RuntimeError(f"No dislodged unit to delete in {province}")
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
         (board.board_id, board.turn.get_indexed_name(), unit.province.get_name(unit.coast), True),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
         (board.board_id, board.turn.get_indexed_name(), unit.province.get_name(unit.coast)),
     )
@@ -276,11 +276,11 @@ def _move_unit(keywords: list[str], board: Board) -> None:
     if not new_province.get_multiple_coasts():
         new_coast = None
     board.move_unit(unit, new_province, new_coast)
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
         (board.board_id, board.turn.get_indexed_name(), old_province.get_name(unit.coast), False),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
         (
             board.board_id,
@@ -312,7 +312,7 @@ def _dislodge_unit(keywords: list[str], board: Board) -> None:
             unit.unit_type, unit.player, unit.province, unit.coast, retreat_options
         )
         unit = board.delete_unit(province)
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "UPDATE units SET is_dislodged = True where board_id=? and phase=? and location=?",
             (board.board_id, board.turn.get_indexed_name(), province.name),
         )
@@ -327,7 +327,7 @@ def _make_units_claim_provinces(keywords: list[str], board: Board) -> None:
     for unit in board.units:
         if claim_centers or not unit.province.has_supply_center:
             board.change_owner(unit.province, unit.player)
-            get_connection().execute_arbitrary_sql(
+            get_async_connection().execute_arbitrary_sql(
                 "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
                 (
                     unit.player.name,
@@ -347,7 +347,7 @@ def _set_player_points(keywords: list[str], board: Board) -> None:
         raise ValueError("Can't have a negative number of points!")
 
     player.points = points
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE players SET points=? WHERE board_id=? and player_name=?",
         (points, board.board_id, player.name),
     )
@@ -360,7 +360,7 @@ def _set_player_vassal(keywords: list[str], board: Board) -> None:
         raise ValueError("Unknown player specified")
     vassal.liege = liege
     liege.vassals.append(vassal)
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE players SET liege=? WHERE board_id=? and player_name=?",
         (liege.name, board.board_id, vassal.name),
     )
@@ -375,7 +375,7 @@ def _remove_player_vassal(keywords: list[str], board: Board) -> None:
         if vassal.liege == liege:
             vassal.liege = None
             liege.vassals.remove(vassal)
-            get_connection().execute_arbitrary_sql(
+            get_async_connection().execute_arbitrary_sql(
                 "UPDATE players SET liege=? WHERE board_id=? and player_name=?",
                 (None, board.board_id, vassal.name),
             )
@@ -384,7 +384,7 @@ def _remove_player_vassal(keywords: list[str], board: Board) -> None:
 def _set_game_name(parameter_str: str, board: Board) -> None:
     newname = None if parameter_str == "None" else parameter_str
     board.name = newname
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE boards SET name=? WHERE board_id=?", (newname, board.board_id)
     )
 
@@ -438,8 +438,9 @@ def _load_state(keywords: list[str], board: Board) -> None:
     new_board.board_id = curr_board_id
 
     manager._boards[curr_board_id] = new_board
-    manager._database.delete_board(board)
-    manager._database.save_board(curr_board_id, new_board)
+    # Queued after the orders still pending for the replaced phase, so they can't land on top of the loaded one
+    manager.delete_board(board)
+    manager._save_phase(new_board)
 
 
 def _apocalypse(keywords: list[str], board: Board) -> None:
@@ -459,7 +460,7 @@ def _apocalypse(keywords: list[str], board: Board) -> None:
         for player in board.players:
             player.units -= armies
 
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "DELETE FROM units WHERE board_id=? AND phase=? AND is_army=1",
             (
                 board.board_id,
@@ -473,7 +474,7 @@ def _apocalypse(keywords: list[str], board: Board) -> None:
         for player in board.players:
             player.units -= fleets
 
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "DELETE FROM units WHERE board_id=? AND phase=? AND is_army=0",
             (
                 board.board_id,
@@ -488,7 +489,7 @@ def _apocalypse(keywords: list[str], board: Board) -> None:
         for player in board.players:
             player.centers = set()
 
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "UPDATE provinces SET owner=? WHERE board_id=? AND phase=?",
             (None, board.board_id, board.turn.get_indexed_name()),
         )
@@ -498,7 +499,7 @@ def _apocalypse(keywords: list[str], board: Board) -> None:
             province.core = None
             province.half_core = None
 
-        get_connection().execute_arbitrary_sql(
+        get_async_connection().execute_arbitrary_sql(
             "UPDATE provinces SET core=?, half_core=? WHERE board_id=? AND phase=?",
             (None, None, board.board_id, board.turn.get_indexed_name()),
         )
@@ -558,8 +559,8 @@ def _create_player(keywords: list[str], board: Board) -> None:
     board.players.add(new_player)
     board.name_to_player[name.lower()] = new_player
 
-    get_connection().execute_arbitrary_sql(
-        "INSERT INTO players VALUES (?, ?, ?, ?, ?, ?)",
+    get_async_connection().execute_arbitrary_sql(
+        "INSERT INTO players (board_id, player_name, color, liege, points, discord_id) VALUES (?, ?, ?, ?, ?, ?)",
         (
             board.board_id,
             name,
@@ -580,7 +581,7 @@ def _delete_player(keywords: list[str], board: Board) -> None:
     units: set[Unit] = set(filter(lambda u: u.player == player, board.units))
     player.units = set()
     board.units -= units
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "DELETE FROM units WHERE board_id=? AND phase=? AND owner=?",
         (board.board_id, board.turn.get_indexed_name(), player.name),
     )
@@ -593,15 +594,15 @@ def _delete_player(keywords: list[str], board: Board) -> None:
             p.core = None
         if p.half_core == player:
             p.half_core = None
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET owner=? WHERE board_id=? and phase=?",
         (None, board.board_id, board.turn.get_indexed_name()),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET core=? WHERE board_id=? and phase=? AND core=?",
         (None, board.board_id, board.turn.get_indexed_name(), player.name),
     )
-    get_connection().execute_arbitrary_sql(
+    get_async_connection().execute_arbitrary_sql(
         "UPDATE provinces SET half_core=? WHERE board_id=? and phase=? AND half_core=?",
         (None, board.board_id, board.turn.get_indexed_name(), player.name),
     )
@@ -609,7 +610,7 @@ def _delete_player(keywords: list[str], board: Board) -> None:
     # NOTE: Players are not tied to individual Phase boards, but the server as a whole
 
     # board.players.remove(player)
-    # get_connection().execute_arbitrary_sql(
+    # get_async_connection().execute_arbitrary_sql(
     #     "DELETE FROM units WHERE board_id=? AND phase=? AND owner=?",
     #     (board.board_id, board.turn.get_indexed_name(), player.name),
     # )
@@ -1,3 +1,4 @@
+import copy
 import logging
 
 from discord.ext.commands import Paginator
@@ -6,10 +7,11 @@ from lark.exceptions import VisitError
 
 from DiploGM.config import ERROR_COLOUR, PARTIAL_ERROR_COLOUR
 from DiploGM.utils import get_unit_type, _manage_coast_signature
+from DiploGM.adjudicator.adjudicator import PhaseValidator
 from DiploGM.models import turn
 from DiploGM.models import order
 from DiploGM.models.board import Board
-from DiploGM.db.database import get_connection
+from DiploGM.db.database import get_async_connection, get_order_journal
 from DiploGM.models.player import Player
 from DiploGM.models.province import Province
 from DiploGM.models.unit import Unit, UnitType
@@ -261,6 +263,7 @@ def parse_order(message: str, player_restriction: Player | None, board: Board) -
     movement = []
     orderoutput = []
     errors = []
+    warnings = []
     if board.turn.is_builds():
         generator.set_state(board, player_restriction)
         for order in orderlist:
@@ -279,7 +282,7 @@ def parse_order(message: str, player_restriction: Player | None, board: Board) -
             except UnexpectedCharacters as e:
                 orderoutput.append(f"\u001b[0;31m{order}")
                 errors.append(f"`{order}`: Please fix this order and try again")
-        database = get_connection()
+        database = get_async_connection()
         database.save_build_orders_for_players(board, player_restriction)
     elif board.turn.is_moves() or board.turn.is_retreats():
         if board.turn.is_moves():
@@ -306,8 +309,17 @@ def parse_order(message: str, player_restriction: Player | None, board: Board) -
             except UnexpectedCharacters as e:
                 orderoutput.append(f"\u001b[0;31m{order}")
                 errors.append(f"`{order}`: Please fix this order and try again")
-        database = get_connection()
-        database.save_order_for_units(board, movement)
+        if board.turn.is_moves() and not board.fow:
+            # Invalid orders are still accepted (they hold), but players should know; with fog of war the reason
+            # could give away units they can't see
+            validator = PhaseValidator(board)
+            for unit in movement:
+                # Validating fills in coasts and sources on the order it checks, so check a copy and save the order
+                # as it was given
+                valid, reason = validator.validate(unit.province, copy.copy(unit.order))
+                if not valid:
+                    warnings.append(f"`{unit} {unit.order}` will hold: {reason}")
+        get_order_journal().record(board, movement)
     else:
         return {
             "message": "The game is in an unknown phase. "
@@ -322,6 +334,8 @@ def parse_order(message: str, player_restriction: Player | None, board: Board) -
         paginator.add_line(line)
 
     output = paginator.pages
+    if warnings:
+        output[-1] += "\n" + "\n".join(warnings)
     if errors:
         output[-1] += "\n" + "\n".join(errors)
         if len(movement) > 0:
@@ -355,8 +369,8 @@ def parse_remove_order(message: str, player_restriction: Player | None, board: B
         except Exception as error:
             invalid.append((command, error))
 
-    database = get_connection()
-    database.save_order_for_units(board, list(updated_units))
+    get_order_journal().record(board, updated_units)
+    database = get_async_connection()
     for province in provinces_with_removed_builds:
         database.execute_arbitrary_sql(
             "DELETE FROM builds WHERE board_id=? and phase=? and location=?",
@@ -435,7 +449,7 @@ def remove_player_order_for_province(board: Board, player: Player, province: Pro
             continue
         if player_order.province == province:
             player.build_orders.remove(player_order)
-            database = get_connection()
+            database = get_async_connection()
             database.execute_arbitrary_sql(
                 "DELETE FROM builds WHERE board_id=? and phase=? and location=?",
                 (board.board_id, board.turn.get_indexed_name(), player_order.province.name),
@@ -446,7 +460,7 @@ def remove_player_order_for_province(board: Board, player: Player, province: Pro
 def remove_relationship_order(board: Board, order: order.RelationshipOrder, player: Player):
     if order.player in player.vassal_orders:
         del player.vassal_orders[order.player]
-    database = get_connection()
+    database = get_async_connection()
     database.execute_arbitrary_sql(
         "DELETE FROM vassal_orders WHERE board_id=? and phase=? and player=? and target_player=?",
         (board.board_id, board.turn.get_indexed_name(), player.name, order.player.name)
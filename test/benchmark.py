@@ -0,0 +1,600 @@
+"""Adjudication benchmarks.
+
+Times every DATC scenario in test/datc through BoardBuilder, and moves phases on synthetic boards far bigger than any
+real game: support webs, long convoy chains, rings of circular movement and Szykman paradoxes. For each it records the
+adjudication wall time, peak memory and how often the resolver ran, and writes them to a JSON file so that runs on
+different commits can be compared. Vassal adjudication is timed separately on chaos-sized games with hundreds of players
+offering, accepting and breaking off vassalage. Saving orders is timed under a burst of submissions like the one before
+a deadline, committing each one as it comes and through the order journal.
+
+Run from the repository root, e.g.
+    python -m test.benchmark --output bench.json
+    python -m test.benchmark --sizes 1000 --output new.json --compare bench.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable
+
+from shapely.geometry import box
+
+from DiploGM.adjudicator.adjudicator import BuildsAdjudicator, MovesAdjudicator
+from DiploGM.db.async_database import AsyncDatabase
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.db.order_journal import OrderJournal
+from DiploGM.models.board import Board
+from DiploGM.models.order import (
+    ConvoyTransport,
+    Defect,
+    Disown,
+    DualMonarchy,
+    Hold,
+    Liege,
+    Move,
+    RebellionMarker,
+    Support,
+    UnitOrder,
+    Vassal,
+)
+from DiploGM.models.player import Player
+from DiploGM.models.province import ProvinceTopology, ProvinceType
+from DiploGM.models.topology import VariantTopology
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+DEFAULT_SIZES = [1000, 5000, 20000]
+DEFAULT_VASSAL_PLAYERS = [500, 2000]
+DEFAULT_ORDER_SUBMISSIONS = [2000]
+PLAYERS = ["Austria", "England", "France", "Germany", "Italy", "Russia", "Turkey"]
+COUNTERS = ["resolve_calls", "adjudicate_calls", "backup_rule_calls", "cyclic_components"]
+
+
+class SyntheticMap:
+    """A made-up map built province by province, with units and their orders.
+
+    Province shapes are placeholder squares; only the adjacencies matter to the adjudicator.
+    """
+
+    def __init__(self):
+        self.provinces: dict[str, ProvinceTopology] = {}
+        # (province, unit type, player, order), where order is a tuple like ("move", destination)
+        self.units: list[tuple[str, UnitType, str, tuple]] = []
+
+    def province(self, name: str, province_type: ProvinceType = ProvinceType.LAND) -> str:
+        index = len(self.provinces)
+        self.provinces[name] = ProvinceTopology(name, box(index, 0, index + 1, 1), province_type)
+        return name
+
+    def connect(self, *names: str):
+        """Makes each province adjacent to the next one."""
+        for first, second in zip(names, names[1:]):
+            self.provinces[first].set_adjacent(self.provinces[second])
+            self.provinces[second].set_adjacent(self.provinces[first])
+
+    def unit(self, province: str, unit_type: UnitType, player: str, *order):
+        self.units.append((province, unit_type, player, order))
+
+    def topology(self) -> VariantTopology:
+        for province in self.provinces.values():
+            province.set_coasts()
+        for province in self.provinces.values():
+            province.set_adjacent_coasts()
+        return VariantTopology(
+            self.provinces,
+            {player: "000000" for player in PLAYERS},
+            {},
+            {},
+            {},
+            [(province, None, unit_type, player) for province, unit_type, player, _ in self.units],
+            Turn(1901, PhaseName.SPRING_MOVES, 1901),
+            {"players": {player: {"color": "000000"} for player in PLAYERS}},
+            "synthetic",
+            False,
+            0,
+        )
+
+    def give_orders(self, board: Board):
+        provinces = {province.name: province for province in board.provinces}
+        for province, _, _, (kind, *args) in self.units:
+            targets = [provinces[name] for name in args]
+            order: UnitOrder
+            if kind == "move":
+                order = Move(*targets)
+            elif kind == "support":
+                order = Support(*targets)
+            elif kind == "convoy":
+                order = ConvoyTransport(*targets)
+            else:
+                order = Hold()
+            provinces[province].unit.order = order
+
+
+def support_web(units: int, rng: random.Random) -> SyntheticMap:
+    """A grid with every fourth column at sea, about half full of units moving, holding and supporting each other."""
+    side = math.ceil(math.sqrt(2 * units))
+    synthetic = SyntheticMap()
+    for x in range(side):
+        province_type = ProvinceType.SEA if x % 4 == 3 else ProvinceType.LAND
+        for y in range(side):
+            synthetic.province(f"{x},{y}", province_type)
+    for x in range(side):
+        for y in range(side):
+            if x + 1 < side:
+                synthetic.connect(f"{x},{y}", f"{x + 1},{y}")
+            if y + 1 < side:
+                synthetic.connect(f"{x},{y}", f"{x},{y + 1}")
+
+    def reachable(name: str) -> list[str]:
+        own_type = synthetic.provinces[name].type
+        return sorted(other.name for other in synthetic.provinces[name].adjacent if other.type == own_type)
+
+    occupied = rng.sample(sorted(synthetic.provinces), units)
+    orders: dict[str, tuple] = {}
+    for name in occupied:
+        options = reachable(name)
+        orders[name] = ("move", rng.choice(options)) if options and rng.random() < 0.4 else ("hold",)
+    # Supports go last so they can match the order they support
+    occupied_set = set(occupied)
+    for name in occupied:
+        if orders[name][0] != "hold" or rng.random() < 0.25:
+            continue
+        neighbours = [other for other in reachable(name) if other in occupied_set]
+        if not neighbours:
+            continue
+        supported = rng.choice(neighbours)
+        if orders[supported][0] == "move" and orders[supported][1] in reachable(name):
+            orders[name] = ("support", supported, orders[supported][1])
+        elif orders[supported][0] != "move":
+            orders[name] = ("support", supported, supported)
+
+    for i, name in enumerate(occupied):
+        unit_type = UnitType.FLEET if synthetic.provinces[name].type == ProvinceType.SEA else UnitType.ARMY
+        synthetic.unit(name, unit_type, PLAYERS[i % len(PLAYERS)], *orders[name])
+    return synthetic
+
+
+def convoy_chains(units: int, rng: random.Random, length: int = 20) -> SyntheticMap:
+    """Armies convoyed along strips of `length` seas; every other destination is held by an enemy army."""
+    synthetic = SyntheticMap()
+    strip = 0
+    while len(synthetic.units) < units:
+        start = synthetic.province(f"chain{strip}.start")
+        seas = [synthetic.province(f"chain{strip}.sea{i}", ProvinceType.SEA) for i in range(length)]
+        end = synthetic.province(f"chain{strip}.end")
+        synthetic.connect(start, *seas, end)
+
+        player = PLAYERS[strip % len(PLAYERS)]
+        synthetic.unit(start, UnitType.ARMY, player, "move", end)
+        for sea in seas:
+            synthetic.unit(sea, UnitType.FLEET, player, "convoy", start, end)
+        if strip % 2:
+            synthetic.unit(end, UnitType.ARMY, rng.choice([p for p in PLAYERS if p != player]), "hold")
+        strip += 1
+    return synthetic
+
+
+def circular_rings(units: int, rng: random.Random, length: int = 6) -> SyntheticMap:
+    """Rings of armies that each move into the next province; every third ring is broken by a holding unit."""
+    synthetic = SyntheticMap()
+    ring = 0
+    while len(synthetic.units) < units:
+        names = [synthetic.province(f"ring{ring}.{i}") for i in range(length)]
+        synthetic.connect(*names, names[0])
+        broken = ring % 3 == 0
+        for i, name in enumerate(names):
+            player = rng.choice(PLAYERS)
+            if broken and i == 0:
+                synthetic.unit(name, UnitType.ARMY, player, "hold")
+            else:
+                synthetic.unit(name, UnitType.ARMY, player, "move", names[(i + 1) % length])
+        ring += 1
+    return synthetic
+
+
+def szykman_paradoxes(units: int, rng: random.Random) -> SyntheticMap:
+    """Copies of the convoy paradox that needs the Szykman rule: an army convoyed to cut the support that would
+    dislodge its own convoying fleet."""
+    synthetic = SyntheticMap()
+    gadget = 0
+    while len(synthetic.units) < units:
+        brest = synthetic.province(f"paradox{gadget}.brest")
+        channel = synthetic.province(f"paradox{gadget}.channel", ProvinceType.SEA)
+        london = synthetic.province(f"paradox{gadget}.london")
+        wales = synthetic.province(f"paradox{gadget}.wales")
+        synthetic.connect(brest, channel, london, wales, channel)
+
+        england, france = rng.sample(PLAYERS, 2)
+        synthetic.unit(london, UnitType.FLEET, england, "support", wales, channel)
+        synthetic.unit(wales, UnitType.FLEET, england, "move", channel)
+        synthetic.unit(brest, UnitType.ARMY, france, "move", london)
+        synthetic.unit(channel, UnitType.FLEET, france, "convoy", brest, london)
+        gadget += 1
+    return synthetic
+
+
+SCENARIOS: dict[str, Callable[[int, random.Random], SyntheticMap]] = {
+    "support_web": support_web,
+    "convoy_chains": convoy_chains,
+    "circular_rings": circular_rings,
+    "szykman_paradoxes": szykman_paradoxes,
+}
+
+
+def vassal_web(players: int, rng: random.Random) -> Board:
+    """A builds phase with vassals enabled and one to three centers per player, like a chaos game. About a third of
+    the players start as vassals; the rest of the relationship orders are random, including lieges that can't afford
+    their vassals, vassals accepting several lieges at once and dual monarchies."""
+    provinces: dict[str, ProvinceTopology] = {}
+    centers: dict[str, list[str]] = {}
+    for i in range(players):
+        centers[f"player{i}"] = []
+        for _ in range(rng.randint(1, 3)):
+            name = f"center{len(provinces)}"
+            provinces[name] = ProvinceTopology(name, box(len(provinces), 0, len(provinces) + 1, 1), ProvinceType.LAND)
+            provinces[name].has_supply_center = True
+            centers[f"player{i}"].append(name)
+    topology = VariantTopology(
+        provinces,
+        {player: "000000" for player in centers},
+        {province: player for player, names in centers.items() for province in names},
+        {province: player for player, names in centers.items() for province in names},
+        centers,
+        [],
+        Turn(1901, PhaseName.WINTER_BUILDS, 1901),
+        {"players": {player: {"color": "000000"} for player in centers}, "vassals": "enabled"},
+        "synthetic",
+        False,
+        0,
+    )
+    board = topology.create_board()
+    everyone = sorted(board.players, key=lambda player: int(player.name[len("player"):]))
+
+    for vassal in everyone:
+        if rng.random() < 0.3:
+            liege = rng.choice(everyone)
+            if liege is not vassal and liege.liege is None and not vassal.vassals:
+                vassal.liege = liege
+                liege.vassals.append(vassal)
+
+    for player in everyone:
+        other = rng.choice(everyone)
+        if other is player:
+            continue
+        roll = rng.random()
+        if roll < 0.4:
+            player.vassal_orders[other] = Vassal(other)
+            if rng.random() < 0.7:
+                other.vassal_orders[player] = Liege(player)
+                if other.liege is not None and rng.random() < 0.5:
+                    player.vassal_orders[other.liege] = RebellionMarker(other.liege)
+        elif roll < 0.55 and player.vassals:
+            vassal = rng.choice(player.vassals)
+            player.vassal_orders[vassal] = Disown(vassal)
+        elif roll < 0.65:
+            player.vassal_orders[other] = DualMonarchy(other)
+            other.vassal_orders[player] = DualMonarchy(player)
+        elif roll < 0.7 and player.liege is not None:
+            player.vassal_orders[player.liege] = Defect(player.liege)
+    return board
+
+
+def bench_vassals(players: int, repeat: int, seed: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        board = vassal_web(players, random.Random(seed))
+        adjudicator = BuildsAdjudicator(board)
+        start = time.perf_counter()
+        adjudicator.vassal_adju()
+        times.append(time.perf_counter() - start)
+    return {
+        "suite": "vassals",
+        "name": f"vassals/{players}",
+        "players": players,
+        "wall_time": statistics.median(times),
+        "min_wall_time": min(times),
+    }
+
+
+def _deadline_submissions(board: Board, submissions: int, rng: random.Random) -> list[tuple[Player, list]]:
+    """Players resubmitting random holds and moves for all their units, as they do before a deadline."""
+    players = sorted(board.players, key=lambda player: player.name)
+    submitted = []
+    for _ in range(submissions):
+        player = rng.choice(players)
+        orders = []
+        for unit in sorted(player.units, key=lambda unit: unit.province.name):
+            neighbours = sorted(province.name for province in unit.province.adjacent)
+            if neighbours and rng.random() < 0.7:
+                orders.append(Move(board.get_province(rng.choice(neighbours))))
+            else:
+                orders.append(Hold())
+        submitted.append((player, orders))
+    return submitted
+
+
+def bench_order_submissions(submissions: int, window: float, seed: int) -> list[dict]:
+    """Saves orders submitted in a burst straight to the database, and through the order journal."""
+    builder = BoardBuilder()
+    board = builder.board
+    players = sorted(board.players, key=lambda player: player.name)
+    land = [province for province in board.provinces if province.type == ProvinceType.LAND]
+    for index, province in enumerate(sorted(land, key=lambda province: province.name)):
+        builder.army(province.name, players[index % len(players)])
+    submitted = _deadline_submissions(board, submissions, random.Random(seed))
+
+    def submit(save: Callable[[list], None]):
+        for player, orders in submitted:
+            units = sorted(player.units, key=lambda unit: unit.province.name)
+            for unit, order in zip(units, orders):
+                unit.order = order
+            save(units)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "bench.sqlite")
+        connection = _DatabaseConnection(db_file)
+        connection.save_board(0, board)
+
+        start = time.perf_counter()
+        submit(lambda units: connection.save_order_for_units(board, units))
+        results.append(("direct", time.perf_counter() - start, submissions, submissions * len(submitted[0][1])))
+
+        async_database = AsyncDatabase(db_file)
+        journal = OrderJournal(async_database, os.path.join(directory, "journal"), window)
+        start = time.perf_counter()
+        submit(lambda units: journal.record(board, units))
+        journal.close()
+        results.append(("journal", time.perf_counter() - start, journal.flushes, journal.rows_written))
+        async_database.close()
+        del connection
+
+    return [
+        {
+            "suite": "orders",
+            "name": f"{method}/{submissions}",
+            "submissions": submissions,
+            "wall_time": wall_time,
+            "submissions_per_second": submissions / wall_time,
+            "commits": commits,
+            "commits_per_second": commits / wall_time,
+            "unit_rows_written": rows,
+        }
+        for method, wall_time, commits, rows in results
+    ]
+
+
+def _counters(adjudicator: MovesAdjudicator) -> dict[str, int]:
+    return {counter: getattr(adjudicator, counter) for counter in COUNTERS}
+
+
+def _adjudicate(board: Board) -> MovesAdjudicator:
+    adjudicator = MovesAdjudicator(board)
+    adjudicator.save_orders = False
+    adjudicator.run()
+    return adjudicator
+
+
+def bench_synthetic(scenario: str, units: int, repeat: int, seed: int) -> dict:
+    synthetic = SCENARIOS[scenario](units, random.Random(seed))
+    topology = synthetic.topology()
+
+    def fresh_board() -> Board:
+        board = topology.create_board()
+        synthetic.give_orders(board)
+        return board
+
+    times = []
+    adjudicator = None
+    for _ in range(repeat):
+        board = fresh_board()
+        start = time.perf_counter()
+        adjudicator = _adjudicate(board)
+        times.append(time.perf_counter() - start)
+    assert adjudicator is not None
+
+    board = fresh_board()
+    tracemalloc.start()
+    _adjudicate(board)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "suite": "synthetic",
+        "name": f"{scenario}/{units}",
+        "units": len(synthetic.units),
+        "wall_time": statistics.median(times),
+        "min_wall_time": min(times),
+        "peak_memory": peak_memory,
+        **_counters(adjudicator),
+    }
+
+
+@contextmanager
+def _record_adjudications(records: list[dict], trace_memory: bool):
+    """Times the BoardBuilder adjudication helpers while DATC tests run."""
+    originals = {
+        name: getattr(BoardBuilder, name) for name in ["moves_adjudicate", "retreats_adjudicate", "builds_adjudicate"]
+    }
+
+    def timed(method):
+        def wrapper(builder: BoardBuilder, test: unittest.TestCase):
+            if trace_memory:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            result = method(builder, test)
+            record = {"wall_time": time.perf_counter() - start, "units": len(builder.board.units)}
+            if trace_memory:
+                record["peak_memory"] = tracemalloc.get_traced_memory()[1] - baseline
+            if isinstance(result, MovesAdjudicator):
+                record.update(_counters(result))
+            records.append(record)
+            return result
+        return wrapper
+
+    for name, method in originals.items():
+        setattr(BoardBuilder, name, timed(method))
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(BoardBuilder, name, method)
+
+
+def _datc_tests() -> list[unittest.TestCase]:
+    def flatten(suite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                yield from flatten(test)
+            else:
+                yield test
+
+    suite = unittest.TestLoader().discover("test/datc", pattern="test_datc*.py", top_level_dir=".")
+    return sorted(flatten(suite), key=lambda test: test.id())
+
+
+def _run_datc_test(test: unittest.TestCase, trace_memory: bool) -> tuple[list[dict], bool]:
+    records: list[dict] = []
+    result = unittest.TestResult()
+    with _record_adjudications(records, trace_memory):
+        test.run(result)
+    return records, result.wasSuccessful()
+
+
+def bench_datc(repeat: int) -> list[dict]:
+    results = []
+    for test in _datc_tests():
+        times = []
+        passed = True
+        records: list[dict] = []
+        for _ in range(repeat):
+            records, success = _run_datc_test(test, trace_memory=False)
+            passed = passed and success
+            times.append(sum(record["wall_time"] for record in records))
+
+        tracemalloc.start()
+        memory_records, _ = _run_datc_test(test, trace_memory=True)
+        tracemalloc.stop()
+
+        entry = {
+            "suite": "datc",
+            "name": test.id().removeprefix("test.datc."),
+            "units": max((record["units"] for record in records), default=0),
+            "wall_time": statistics.median(times),
+            "min_wall_time": min(times),
+            "peak_memory": max((record["peak_memory"] for record in memory_records), default=0),
+            "passed": passed,
+        }
+        for counter in COUNTERS:
+            entry[counter] = sum(record.get(counter, 0) for record in records)
+        results.append(entry)
+    return results
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Returns the names of benchmarks that got more than `threshold` times slower than in the baseline."""
+    old = {(result["suite"], result["name"]): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = old.get((result["suite"], result["name"]))
+        if previous is None or previous["wall_time"] == 0:
+            continue
+        ratio = result["wall_time"] / previous["wall_time"]
+        # DATC scenarios take well under a millisecond, so ignore noise below that
+        if ratio > threshold and result["wall_time"] - previous["wall_time"] > 0.001:
+            regressions.append(f"{result['suite']} {result['name']}: {previous['wall_time']:.4f}s -> "
+                               f"{result['wall_time']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Adjudication benchmarks")
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    arg_parser.add_argument("--compare", help="JSON file of an earlier run to check for regressions against")
+    arg_parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    arg_parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES,
+                            help="unit counts of the synthetic boards")
+    arg_parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), default=list(SCENARIOS))
+    arg_parser.add_argument("--vassal-players", type=int, nargs="*", default=DEFAULT_VASSAL_PLAYERS,
+                            help="player counts of the vassal adjudication boards")
+    arg_parser.add_argument("--order-submissions", type=int, nargs="*", default=DEFAULT_ORDER_SUBMISSIONS,
+                            help="numbers of order submissions saved in a burst, as before a deadline")
+    arg_parser.add_argument("--order-window", type=float, default=0.05,
+                            help="seconds the order journal holds submissions before writing them")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--skip-datc", action="store_true")
+    args = arg_parser.parse_args()
+
+    # The backup rule warns about every paradox, and the synthetic boards have thousands of them
+    logging.basicConfig(level=logging.ERROR)
+
+    results = []
+    if not args.skip_datc:
+        results.extend(bench_datc(args.repeat))
+        failed = [result["name"] for result in results if not result["passed"]]
+        total = sum(result["wall_time"] for result in results)
+        print(f"datc: {len(results)} scenarios in {total:.3f}s, {len(failed)} failed {failed if failed else ''}")
+    for units in args.sizes:
+        for scenario in args.scenarios:
+            result = bench_synthetic(scenario, units, args.repeat, args.seed)
+            results.append(result)
+            print(f"{result['name']:>26}: {result['wall_time']:8.3f}s {result['peak_memory'] / 2**20:8.1f} MiB "
+                  f"{result['resolve_calls']:>9} resolves {result['backup_rule_calls']:>6} backup rules")
+
+    for players in args.vassal_players:
+        result = bench_vassals(players, args.repeat, args.seed)
+        results.append(result)
+        print(f"{result['name']:>26}: {result['wall_time']:8.3f}s")
+
+    for submissions in args.order_submissions:
+        for result in bench_order_submissions(submissions, args.order_window, args.seed):
+            results.append(result)
+            print(f"{result['name']:>26}: {result['wall_time']:8.3f}s {result['submissions_per_second']:8.0f} "
+                  f"submissions/s {result['commits']:>6} commits ({result['commits_per_second']:.0f}/s) "
+                  f"{result['unit_rows_written']:>7} unit rows written")
+
+    report = {
+        "commit": _commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import os
+import random
+import tempfile
+import unittest
+
+from DiploGM.adjudicator import trace as resolution_trace
+from DiploGM.adjudicator.adjudicator import BuildsAdjudicator, MovesAdjudicator, PhaseValidator, convoy_is_possible, order_is_valid
+from DiploGM.adjudicator.convoy_index import ConvoyIndex
+from DiploGM.adjudicator.defs import Resolution
+from DiploGM.adjudicator.preview import LivePreview
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Defect, Disown, DualMonarchy, Liege, Move, RebellionMarker, Vassal
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+from DiploGM.parse_order import parse_order
+from test.benchmark import vassal_web
+from test.utils import BoardBuilder, TemporaryDatabase
+
+
+def _pairwise_vassal_adju(board):
+    """The vassal adjudication as it was before it was made linear, to check it still gives the same results."""
+    new_vassals = {}
+    new_lieges = {}
+    for player in board.players:
+        scs = 0
+        for vassal in player.vassals:
+            scs += len(vassal.centers)
+        new_vassals[player] = player.vassals.copy()
+        if scs > len(player.centers):
+            for order in player.vassal_orders.values():
+                if isinstance(order, Disown) and order.player in player.vassals:
+                    new_vassals[player].remove(order.player)
+                scs2 = 0
+                for vassal in new_vassals[player]:
+                    scs2 += len(vassal.centers)
+                if scs2 > len(player.centers):
+                    new_vassals[player] = []
+        else:
+            for order in player.vassal_orders.values():
+                if isinstance(order, Vassal):
+                    vassal = order.player
+                    if player in vassal.vassal_orders and isinstance(vassal.vassal_orders[player], Liege):
+                        if (not vassal.liege) or (vassal.liege in player.vassal_orders and isinstance(player.vassal_orders[vassal.liege], RebellionMarker)):
+                            new_vassals[player].append(vassal)
+
+    for player in board.players:
+        new_liege = None
+        overcommited = False
+        for liege in board.players:
+            if player in new_vassals[liege]:
+                if new_liege is None:
+                    new_liege = liege
+                else:
+                    overcommited = True
+                    break
+        if overcommited:
+            for liege in board.players:
+                if player in new_vassals[liege]:
+                    new_vassals[liege].remove(player)
+        for order in player.vassal_orders:
+            if isinstance(order, Defect) and player in new_vassals[order.player]:
+                new_vassals[order.player].remove(player)
+                new_liege = None
+        new_lieges[player] = new_liege
+
+    for player in board.players:
+        player.liege = new_lieges[player]
+        player.vassals = new_vassals[player]
+    for player in board.players:
+        for order in player.vassal_orders.values():
+            if isinstance(order, DualMonarchy) and player in order.player.vassal_orders and isinstance(order.player.vassal_orders[player], DualMonarchy):
+                other = order.player
+                if other.liege == None and not other.vassals and player.liege == None and not player.vassals:
+                    other.vassals = [player]
+                    player.vassals = [other]
+                    other.liege = player
+                    player.liege = other
+
+    for player in board.players:
+        player.points += len(player.centers)
+        if player.liege not in player.vassals:
+            for vassal in player.vassals:
+                player.points += len(vassal.centers)
+                for subvassal in vassal.vassals:
+                    player.points += len(subvassal.centers)
+        else:
+            player.points += len(player.liege.centers)
+            continue
+
+        if player.liege:
+            player.points += len(player.liege.centers) // 2
+
+
+def _relationships(board):
+    return {
+        player.name: (player.liege and player.liege.name, [vassal.name for vassal in player.vassals], player.points)
+        for player in board.players
+    }
+
+
+def _restore_relationships(board, relationships):
+    players = {player.name: player for player in board.players}
+    for name, (liege, vassals, points) in relationships.items():
+        players[name].liege = players[liege] if liege else None
+        players[name].vassals = [players[vassal] for vassal in vassals]
+        players[name].points = points
+
+
+class TestVassalAdjudication(unittest.TestCase):
+    def test_same_results_as_pairwise_adjudication(self):
+        compared = 0
+        for seed in range(40):
+            board = vassal_web(60, random.Random(seed))
+            before = _relationships(board)
+            try:
+                _pairwise_vassal_adju(board)
+            except ValueError:
+                # The old version raised on a disown after all vassals were already lost
+                continue
+            expected = _relationships(board)
+            _restore_relationships(board, before)
+            BuildsAdjudicator(board).vassal_adju()
+            self.assertEqual(_relationships(board), expected, seed)
+            self.assertNotEqual(expected, before)
+            compared += 1
+        self.assertGreater(compared, 30)
+
+
+class TestDependencyComponents(unittest.TestCase):
+    def test_circular_movement_is_cyclic(self):
+        """
+            Turkey: F Ankara - Constantinople
+            Turkey: A Constantinople - Smyrna
+            Turkey: A Smyrna - Ankara
+            The circle is the only cyclic component.
+        """
+        b = BoardBuilder()
+        f_ankara = b.move(b.turkey, UnitType.FLEET, "Ankara", "Constantinople")
+        a_constantinople = b.move(b.turkey, UnitType.ARMY, "Constantinople", "Smyrna")
+        a_smyrna = b.move(b.turkey, UnitType.ARMY, "Smyrna", "Ankara")
+        b.move(b.germany, UnitType.ARMY, "Berlin", "Prussia")
+
+        b.assertSuccess(f_ankara, a_constantinople, a_smyrna)
+        adj = b.moves_adjudicate(self)
+        self.assertEqual(adj.cyclic_components, 1)
+
+    def test_bounce_is_acyclic(self):
+        """
+            Germany: A Berlin - Silesia
+            Russia: A Warsaw - Silesia
+            Russia: A Prussia Supports A Warsaw - Silesia
+            A supported bounce has no cycle to guess through.
+        """
+        b = BoardBuilder()
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        a_warsaw = b.move(b.russia, UnitType.ARMY, "Warsaw", "Silesia")
+        b.supportMove(b.russia, UnitType.ARMY, "Prussia", a_warsaw, "Silesia")
+
+        b.assertFail(a_berlin)
+        b.assertSuccess(a_warsaw)
+        adj = b.moves_adjudicate(self)
+        self.assertEqual(adj.cyclic_components, 0)
+
+
+class TestLivePreview(unittest.TestCase):
+    def test_preview_only_readjudicates_changed_neighbourhood(self):
+        """
+            Germany: A Berlin - Silesia
+            Russia: A Warsaw - Silesia
+            Turkey: F Ankara - Black Sea
+            Changing Berlin's order should not adjudicate the Turkish fleet again,
+            and previews should never touch the units' orders.
+        """
+        b = BoardBuilder()
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        a_warsaw = b.move(b.russia, UnitType.ARMY, "Warsaw", "Silesia")
+        f_ankara = b.move(b.turkey, UnitType.FLEET, "Ankara", "Black Sea")
+        a_munich = b.army("Munich", b.germany)
+
+        live_preview = LivePreview(b.board)
+        results = live_preview.preview()
+        self.assertEqual(results[a_berlin], Resolution.FAILS)
+        self.assertEqual(results[a_warsaw], Resolution.FAILS)
+        self.assertEqual(results[f_ankara], Resolution.SUCCEEDS)
+        self.assertEqual(results[a_munich], Resolution.SUCCEEDS)
+        self.assertIsNone(a_munich.order)
+
+        a_berlin.order = Move(b.board.get_province("Prussia"))
+        results = live_preview.preview()
+        self.assertEqual(results[a_berlin], Resolution.SUCCEEDS)
+        self.assertEqual(results[a_warsaw], Resolution.SUCCEEDS)
+        self.assertEqual(results[f_ankara], Resolution.SUCCEEDS)
+        self.assertEqual(live_preview.last_resolved, 2)
+        self.assertIsNone(a_munich.order)
+        self.assertFalse(a_berlin.order.hasFailed)
+
+        live_preview.preview()
+        self.assertEqual(live_preview.last_resolved, 0)
+
+
+class TestConvoyIndex(unittest.TestCase):
+    def test_index_matches_search(self):
+        """
+            England: F North Sea, F English Channel, F Mid-Atlantic Ocean Convoys A London - Brest
+            England: F Norwegian Sea, F Ionian Sea
+            The index should agree with a fresh search for every pair of land provinces.
+        """
+        b = BoardBuilder()
+        a_london = b.army("London", b.england)
+        b.fleet("North Sea", b.england)
+        b.fleet("Norwegian Sea", b.england)
+        b.fleet("Ionian Sea", b.england)
+        b.convoy(b.england, "English Channel", a_london, "Brest")
+        b.convoy(b.england, "Mid-Atlantic Ocean", a_london, "Brest")
+
+        index = ConvoyIndex(b.board)
+        land = [province for province in b.board.provinces if province.type != ProvinceType.SEA]
+        for start in land:
+            for end in land:
+                for strict in (False, True):
+                    self.assertEqual(
+                        index.convoy_is_possible(start, end, strict),
+                        convoy_is_possible(start, end, strict),
+                        f"{start} -> {end}, strict={strict}",
+                    )
+
+
+class TestPhaseValidator(unittest.TestCase):
+    def test_shared_checks_are_memoized(self):
+        """
+            Germany: A Munich - Burgundy
+            Germany: A Ruhr, A Kiel (no unit in reach), F Holland Support A Munich - Burgundy
+            France: A Paris Supports A Munich - Burgundy
+            Every support validates the same Munich - Burgundy move; results match order_is_valid.
+        """
+        TemporaryDatabase(self)
+        b = BoardBuilder()
+        a_munich = b.move(b.germany, UnitType.ARMY, "Munich", "Burgundy")
+        supports = [
+            b.supportMove(b.germany, UnitType.ARMY, "Ruhr", a_munich, "Burgundy"),
+            b.supportMove(b.germany, UnitType.ARMY, "Kiel", a_munich, "Burgundy"),
+            b.supportMove(b.germany, UnitType.FLEET, "Holland", a_munich, "Burgundy"),
+            b.supportMove(b.france, UnitType.ARMY, "Paris", a_munich, "Burgundy"),
+        ]
+
+        validator = PhaseValidator(b.board)
+        results = validator.validate_all(strict_convoys_supports=True)
+        for unit in [a_munich] + supports:
+            self.assertEqual(results[unit], order_is_valid(unit.province, unit.order, strict_convoys_supports=True))
+        self.assertTrue(results[supports[0]][0])
+        self.assertFalse(results[supports[1]][0])
+        self.assertGreater(validator.memo_hits, 0)
+
+    def test_submission_warns_about_invalid_orders(self):
+        TemporaryDatabase(self)
+        b = BoardBuilder()
+        b.army("Paris", b.france)
+        response = parse_order(".order\nA Paris - Munich\n", b.france, b.board)
+        self.assertIn("will hold", response["messages"][-1])
+        self.assertEqual(response["title"], "**Orders validated successfully.**")
+
+    def test_submission_keeps_orders_as_given(self):
+        TemporaryDatabase(self)
+        b = BoardBuilder()
+        f_gascony = b.fleet("Gascony", b.france)
+        parse_order(".order\nF Gascony - Spain\n", b.france, b.board)
+        # Validation works out the only coast Gascony reaches, but the order saved is the one the player gave
+        self.assertIsNone(f_gascony.order.destination_coast)
+
+
+def _outcome(trace):
+    return dict(zip(trace.orders, trace.resolutions))
+
+
+class TestResolutionTrace(unittest.TestCase):
+    def _paradox(self):
+        """
+            England: F London Supports F Wales - English Channel
+            England: F Wales - English Channel
+            France: A Brest - London
+            France: F English Channel Convoys A Brest - London
+        """
+        b = BoardBuilder()
+        f_wales = b.move(b.england, UnitType.FLEET, "Wales", "English Channel")
+        b.supportMove(b.england, UnitType.FLEET, "London", f_wales, "English Channel")
+        a_brest = b.move(b.france, UnitType.ARMY, "Brest", "London")
+        b.convoy(b.france, "English Channel", a_brest, "London")
+        return b.board
+
+    def test_trace_round_trip(self):
+        board = self._paradox()
+        state = get_board_state(board)
+        untraced = MovesAdjudicator(self._paradox())
+        untraced.save_orders = False
+        untraced.run()
+
+        adjudicator = MovesAdjudicator(board)
+        adjudicator.save_orders = False
+        trace = adjudicator.start_trace()
+        adjudicator.run()
+        trace.finish(adjudicator, state)
+
+        # Tracing doesn't change the outcome
+        expected = resolution_trace.ResolutionTrace()
+        expected.finish(untraced)
+        self.assertEqual(_outcome(trace), _outcome(expected))
+        self.assertEqual(trace.backup_rules, 2)
+
+        profiles = resolution_trace.profile(trace)
+        self.assertEqual(sum(p.resolutions for p in profiles), trace.events[::4].count(resolution_trace.ENTER))
+        paradox = [trace.orders[p.order] for p in profiles if p.backup_rules]
+        self.assertTrue(any("CONVOY" in order for order in paradox), paradox)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "paradox.trace")
+            trace.save(path)
+            loaded = resolution_trace.ResolutionTrace.load(path)
+        self.assertEqual(loaded.events, trace.events)
+        self.assertEqual(loaded.orders, trace.orders)
+        self.assertEqual(loaded.state, state)
+
+        self.assertEqual(_outcome(resolution_trace.rerun(loaded)), _outcome(trace))
+
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from DiploGM.db.async_database import AsyncDatabase
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Hold, Move
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+_COUNT_SPEC_REQUESTS = "SELECT COUNT(*) FROM spec_requests"
+
+
+def _count(connection: _DatabaseConnection) -> int:
+    return connection._connection.execute(_COUNT_SPEC_REQUESTS).fetchone()[0]
+
+
+class TestAsyncDatabase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, "test.sqlite")
+        self.database = _DatabaseConnection(self.db_file)
+        self.async_database = AsyncDatabase(self.db_file, readers=2, write_batch=8)
+
+    def tearDown(self):
+        self.async_database.close()
+        del self.database
+        self.directory.cleanup()
+
+    def _insert(self, server_id: int):
+        return self.async_database.execute_arbitrary_sql(
+            "INSERT INTO spec_requests (server_id, user_id, role_id) VALUES (?, ?, ?)", (server_id, 1, 1)
+        )
+
+    def test_writes_are_committed(self):
+        futures = [self._insert(server_id) for server_id in range(20)]
+        self.async_database.flush()
+        self.assertTrue(all(future.done() and future.exception() is None for future in futures))
+        self.assertEqual(_count(self.database), 20)
+        self.assertEqual(self.database._connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_failed_write_keeps_the_rest_of_its_batch(self):
+        first = self._insert(1)
+        failed = self.async_database.execute_arbitrary_sql("INSERT INTO no_such_table VALUES (?)", (1,))
+        last = self._insert(2)
+        self.async_database.flush()
+        self.assertIsNone(first.exception())
+        self.assertIsInstance(failed.exception(), sqlite3.OperationalError)
+        self.assertIsNone(last.exception())
+        self.assertEqual(_count(self.database), 2)
+
+    def test_awaiting_writes_and_reads(self):
+        async def run():
+            await asyncio.gather(*(asyncio.wrap_future(self._insert(server_id)) for server_id in range(5)))
+            return await self.async_database.read(_count)
+
+        self.assertEqual(asyncio.run(run()), 5)
+
+    def test_reads_dont_wait_for_writes(self):
+        self._insert(1)
+        self.async_database.flush()
+        writer = sqlite3.connect(self.db_file, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO spec_requests (server_id, user_id, role_id) VALUES (2, 1, 1)")
+        try:
+            # The uncommitted row isn't seen, and the read doesn't block on the open write
+            self.assertEqual(asyncio.run(asyncio.wait_for(self.async_database.read(_count), 5)), 1)
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+
+    def test_orders_round_trip(self):
+        b = BoardBuilder()
+        a_berlin = b.hold(b.germany, UnitType.ARMY, "Berlin")
+        f_st_petersburg = b.move(b.russia, UnitType.FLEET, "St. Petersburg sc", "Gulf of Bothnia")
+        self.database.save_board(0, b.board)
+        a_berlin.order = Move(b.board.get_province("Silesia"))
+        f_st_petersburg.order = Hold()
+        self.async_database.save_order_for_units(b.board, b.board.units)
+        self.async_database.flush()
+        loaded = self.database.get_board(0, b.board.turn, b.board.fish, b.board.name, b.board.datafile)
+        assert loaded is not None
+        self.assertEqual(get_board_state(loaded)["units"], get_board_state(b.board)["units"])
+
+    def test_boards_are_saved_as_queued(self):
+        b = BoardBuilder()
+        b.hold(b.germany, UnitType.ARMY, "Berlin")
+        state = get_board_state(b.board)
+        saved = self.async_database.save_board(0, b.board)
+        # The rows were built when the save was queued, so later changes aren't saved with it
+        b.board.get_province("Berlin").owner = b.russia
+        self.assertTrue(saved.result(5))
+        loaded = self.database.get_board(0, b.board.turn, b.board.fish, b.board.name, b.board.datafile)
+        assert loaded is not None
+        self.assertEqual(get_board_state(loaded), state)
+
+        self.async_database.delete_board(b.board).result(5)
+        self.assertIsNone(self.database.get_board(0, b.board.turn, b.board.fish, b.board.name, b.board.datafile))
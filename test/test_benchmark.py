@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+from test.benchmark import SCENARIOS, bench_synthetic, bench_vassals, circular_rings, szykman_paradoxes
+
+
+def _adjudicate(synthetic):
+    board = synthetic.topology().create_board()
+    synthetic.give_orders(board)
+    adjudicator = MovesAdjudicator(board)
+    adjudicator.save_orders = False
+    adjudicator.run()
+    return adjudicator, board
+
+
+class TestSyntheticBoards(unittest.TestCase):
+    def test_paradoxes_use_szykman_rule(self):
+        adjudicator, board = _adjudicate(szykman_paradoxes(8, random.Random(0)))
+        self.assertEqual(adjudicator.backup_rule_calls, 2)
+        for gadget in range(2):
+            # The convoy fails, so the army stays put, the support holds and the convoying fleet is dislodged
+            self.assertIsNotNone(board.get_province(f"paradox{gadget}.channel").dislodged_unit)
+            self.assertIsNotNone(board.get_province(f"paradox{gadget}.brest").unit)
+            self.assertIsNone(board.get_province(f"paradox{gadget}.wales").unit)
+
+    def test_unbroken_rings_rotate(self):
+        synthetic = circular_rings(12, random.Random(0))
+        before = {province: player for province, _, player, _ in synthetic.units}
+        _, board = _adjudicate(synthetic)
+        # Ring 0 is broken by a holding unit, ring 1 moves round by one
+        for i in range(6):
+            self.assertEqual(board.get_province(f"ring0.{i}").unit.player.name, before[f"ring0.{i}"])
+            self.assertEqual(board.get_province(f"ring1.{(i + 1) % 6}").unit.player.name, before[f"ring1.{i}"])
+
+    def test_every_scenario_reports(self):
+        for scenario in SCENARIOS:
+            result = bench_synthetic(scenario, 50, repeat=1, seed=0)
+            self.assertGreaterEqual(result["units"], 50)
+            self.assertGreater(result["resolve_calls"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+
+    def test_vassal_benchmark_reports(self):
+        result = bench_vassals(50, repeat=1, seed=0)
+        self.assertEqual(result["name"], "vassals/50")
+        self.assertGreater(result["wall_time"], 0)
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from DiploGM import manager as manager_module
+from DiploGM.db import database
+from DiploGM.db.board_handles import BoardHandles
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder, TemporaryDatabase
+
+BOARD_ID = 3
+OTHER_BOARD_ID = 5
+
+
+def _save_as(board, board_id: int):
+    """Saves board as a new game with another id; it stays the test game it was built as."""
+    database.get_connection().save_board(board_id, board)
+
+
+class TestBoardHandles(unittest.TestCase):
+    def setUp(self):
+        TemporaryDatabase(self)
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.FALL_MOVES, b.board.turn.start_year)
+        b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        b.hold(b.russia, UnitType.ARMY, "Warsaw")
+        self.database = database.get_connection()
+        _save_as(b.board, BOARD_ID)
+        self.board = b.board
+
+    def _handles(self) -> BoardHandles:
+        return BoardHandles(self.database, self.database.get_board_handles([BOARD_ID]))
+
+    def test_loads_on_first_lookup(self):
+        handles = self._handles()
+        self.assertIn(BOARD_ID, handles)
+        self.assertEqual(list(handles), [BOARD_ID])
+        self.assertFalse(handles.is_loaded(BOARD_ID))
+        self.assertEqual(handles.fish(BOARD_ID), self.board.fish)
+
+        board = handles[BOARD_ID]
+        self.assertTrue(handles.is_loaded(BOARD_ID))
+        self.assertIs(handles[BOARD_ID], board)
+        self.assertEqual(board.turn.get_indexed_name(), self.board.turn.get_indexed_name())
+        self.assertIsNotNone(board.get_province("Berlin").unit)
+
+    def test_unload_keeps_memory_only_state(self):
+        handles = self._handles()
+        board = handles[BOARD_ID]
+        board.orders_enabled = False
+        board.fish = 12
+        before = get_board_state(board)
+        self.assertEqual(handles.idle(0), [BOARD_ID])
+        self.assertEqual(handles.idle(3600), [])
+
+        handles.unload(BOARD_ID)
+        self.assertFalse(handles.is_loaded(BOARD_ID))
+        self.assertEqual(handles.fish(BOARD_ID), 12)
+        reloaded = handles[BOARD_ID]
+        self.assertIsNot(reloaded, board)
+        self.assertFalse(reloaded.orders_enabled)
+        self.assertEqual(get_board_state(reloaded), before)
+
+    def test_most_recent(self):
+        _save_as(self.board, OTHER_BOARD_ID)
+        handles = BoardHandles(self.database, self.database.get_board_handles([BOARD_ID, OTHER_BOARD_ID]))
+        self.assertEqual(handles.most_recent(1), [OTHER_BOARD_ID])
+        handles[BOARD_ID] = handles[BOARD_ID]
+        self.assertEqual(handles.most_recent(2), [BOARD_ID, OTHER_BOARD_ID])
+
+
+class TestManagerBoardLoading(unittest.TestCase):
+    def setUp(self):
+        self.manager = TemporaryDatabase(self).manager
+        b = BoardBuilder()
+        b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        _save_as(b.board, BOARD_ID)
+        self.board = b.board
+        self.manager._boards = BoardHandles(
+            self.manager._database, self.manager._database.get_board_handles([BOARD_ID])
+        )
+
+    def test_warm_up_then_unload(self):
+        with mock.patch.object(manager_module, "BOARDS_IDLE_EVICTION", 0):
+            asyncio.run(self.manager.keep_boards_warm())
+        self.assertTrue(self.manager._boards.is_loaded(BOARD_ID))
+
+        board = self.manager.get_board(BOARD_ID)
+        self.assertEqual(self.manager.unload_idle_boards(3600), [])
+        self.assertEqual(self.manager.unload_idle_boards(0), [BOARD_ID])
+        self.assertFalse(self.manager._boards.is_loaded(BOARD_ID))
+        self.assertEqual(get_board_state(self.manager.get_board(BOARD_ID)), get_board_state(board))
+
+    def test_load_board_on_a_reader(self):
+        threads = []
+        load_board = database._DatabaseConnection.load_board
+
+        def record_thread(connection, handle):
+            threads.append(threading.current_thread().name)
+            return load_board(connection, handle)
+
+        with mock.patch.object(database._DatabaseConnection, "load_board", record_thread):
+            asyncio.run(self.manager.load_board(BOARD_ID))
+            self.assertTrue(self.manager._boards.is_loaded(BOARD_ID))
+            self.manager.get_board(BOARD_ID)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("database-reader"))
+
+    def test_total_delete_forgets_the_game(self):
+        async def run():
+            self.manager.preview(BOARD_ID)
+            self.manager.speculate(BOARD_ID)
+            speculation = self.manager._speculations[BOARD_ID]
+            self.manager.total_delete(BOARD_ID)
+            assert speculation.task is not None
+            await asyncio.wait([speculation.task])
+            return speculation.task
+
+        task = asyncio.run(run())
+        self.assertTrue(task.cancelled())
+        self.assertNotIn(BOARD_ID, self.manager._previews)
+        self.assertNotIn(BOARD_ID, self.manager._speculations)
+        self.assertNotIn(BOARD_ID, self.manager._speculated_maps)
+        self.assertNotIn(BOARD_ID, self.manager.list_servers())
+
+    def test_fish_by_server_loads_nothing(self):
+        self.assertEqual(self.manager.fish_by_server(), {BOARD_ID: 0})
+        self.assertFalse(self.manager._boards.is_loaded(BOARD_ID))
@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+
+from DiploGM.db.board_history import BoardHistoryCache
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder, TemporaryDatabase
+
+
+class TestBoardHistoryCache(unittest.TestCase):
+    def setUp(self):
+        TemporaryDatabase(self)
+        self.board = BoardBuilder().board
+        self.size = len(self.board.provinces)
+
+    def test_bounded_by_provinces(self):
+        cache = BoardHistoryCache(2 * self.size)
+        for phase in ("0 Spring Moves", "0 Fall Moves", "0 Winter Builds"):
+            cache.put(0, phase, self.board)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(0, "0 Spring Moves"))
+        self.assertIs(cache.get(0, "0 Fall Moves"), self.board)
+
+        # Fall was used last, so Winter goes first
+        cache.put(0, "1 Spring Moves", self.board)
+        self.assertIsNone(cache.get(0, "0 Winter Builds"))
+        self.assertIsNotNone(cache.get(0, "0 Fall Moves"))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_invalidate(self):
+        cache = BoardHistoryCache(10 * self.size)
+        cache.put(0, "0 Spring Moves", self.board)
+        cache.put(1, "0 Spring Moves", self.board)
+        cache.invalidate(0)
+        self.assertIsNone(cache.get(0, "0 Spring Moves"))
+        self.assertIsNotNone(cache.get(1, "0 Spring Moves"))
+
+    def test_too_large(self):
+        cache = BoardHistoryCache(self.size - 1)
+        cache.put(0, "0 Spring Moves", self.board)
+        self.assertEqual(len(cache), 0)
+
+
+class TestPastBoards(unittest.TestCase):
+    def setUp(self):
+        self.manager = TemporaryDatabase(self).manager
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.FALL_MOVES, b.board.turn.start_year)
+        b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        self.manager._database.delete_board(b.board)
+        self.manager._database.save_board(0, b.board)
+        self.fall = b.board.turn
+        self.manager.adjudicate(0)
+        self.manager._board_history.invalidate(0)
+
+    def _past_board(self, turn: Turn):
+        return asyncio.run(self.manager.get_past_board(0, turn))
+
+    def test_past_phases_are_cached(self):
+        first = self._past_board(self.fall)
+        assert first is not None
+        self.assertIsNotNone(first.get_province("Berlin").unit)
+        self.assertIs(self._past_board(self.fall), first)
+        self.assertIs(asyncio.run(self.manager.get_previous_board(0)), first)
+
+        # The current phase can still change, so it's always loaded
+        current = self.manager.get_board(0).turn
+        self.assertIsNot(self._past_board(current), self._past_board(current))
+
+    def test_deleting_a_phase_invalidates(self):
+        first = self._past_board(self.fall)
+        self.manager.delete_board(self.manager.get_board(0))
+        self.assertIsNot(self._past_board(self.fall), first)
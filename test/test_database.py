@@ -0,0 +1,75 @@
+import unittest
+
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder, TemporaryDatabase
+
+
+class TestBoardLoading(unittest.TestCase):
+    def setUp(self):
+        self.database = TemporaryDatabase(self).connection
+        self.builder = BoardBuilder()
+
+    def _round_trip(self):
+        board = self.builder.board
+        self.database.delete_board(board)
+        self.database.save_board(0, board)
+        loaded = self.database.get_board(0, board.turn, board.fish, board.name, board.datafile)
+        assert loaded is not None
+        self.assertEqual(get_board_state(loaded), get_board_state(board))
+        return loaded
+
+    def test_moves_orders(self):
+        """
+            Germany: A Berlin - Silesia
+            Germany: A Munich Supports A Berlin - Silesia
+            Russia: F St Petersburg sc - Gulf of Bothnia
+            England: F North Sea Convoys A Yorkshire - Norway
+        """
+        b = self.builder
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        b.supportMove(b.germany, UnitType.ARMY, "Munich", a_berlin, "Silesia")
+        b.move(b.russia, UnitType.FLEET, "St. Petersburg sc", "Gulf of Bothnia")
+        a_yorkshire = b.move(b.england, UnitType.ARMY, "Yorkshire", "Norway")
+        b.convoy(b.england, "North Sea", a_yorkshire, "Norway")
+        self._round_trip()
+
+    def test_retreats(self):
+        b = self.builder
+        b.board.turn = Turn(b.board.turn.year, PhaseName.SPRING_RETREATS, b.board.turn.start_year)
+        for name in ("Silesia", "Spain"):
+            retreating = b.fleet(f"{name} nc", b.russia) if name == "Spain" else b.army(name, b.russia)
+            province = retreating.province
+            province.unit = None
+            province.dislodged_unit = retreating
+        silesia = b.board.get_province("Silesia").dislodged_unit
+        silesia.retreat_options = {(b.board.get_province("Galicia"), None), (b.board.get_province("Warsaw"), None)}
+        spain = b.board.get_province("Spain").dislodged_unit
+        spain.retreat_options = {(b.board.get_province("Portugal"), None)}
+        b.retreat(silesia, "Galicia")
+
+        loaded = self._round_trip()
+        self.assertEqual(len(loaded.get_province("Silesia").dislodged_unit.retreat_options), 2)
+        self.assertEqual(loaded.get_province("Spain").dislodged_unit.coast, "nc")
+
+    def test_builds(self):
+        b = self.builder
+        b.board.turn = Turn(b.board.turn.year, PhaseName.WINTER_BUILDS, b.board.turn.start_year)
+        b.player_core(b.russia, "St. Petersburg", "Moscow")
+        b.build(b.russia, (UnitType.FLEET, "St. Petersburg sc"), (UnitType.ARMY, "Moscow"))
+        b.army("Kiel", b.germany)
+        b.disband(b.germany, "Kiel")
+        self._round_trip()
+
+    def test_legacy_coast_names(self):
+        b = self.builder
+        b.fleet("Brest", b.france)
+        self.database.delete_board(b.board)
+        self.database.save_board(0, b.board)
+        self.database.execute_arbitrary_sql(
+            "UPDATE units SET location=? WHERE board_id=0 AND location=?", ("Brest coast", "Brest")
+        )
+        loaded = self.database.get_board(0, b.board.turn, b.board.fish, b.board.name, b.board.datafile)
+        assert loaded is not None
+        self.assertEqual(get_board_state(loaded)["units"], get_board_state(b.board)["units"])
@@ -0,0 +1,200 @@
+import asyncio
+import unittest
+
+from test.utils import BoardBuilder
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+from DiploGM.adjudicator.cache import AdjudicationCache
+from DiploGM.adjudicator.defs import Resolution
+from DiploGM.adjudicator.executor import AdjudicationExecutor, AdjudicationResult, adjudicate_state
+from DiploGM.adjudicator.what_if import WhatIf, make_overlay
+from DiploGM.manager import Manager
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.board_state import get_board_state, hash_board_state, restore_board_state
+from DiploGM.models.order import Hold, Move
+from DiploGM.models.unit import UnitType
+
+
+def _build_board():
+    """
+        Germany: A Berlin - Silesia
+        Germany: A Munich Supports A Berlin - Silesia
+        Russia: A Warsaw - Silesia
+        Russia: A Silesia Holds
+        France: F Brest (no order)
+    """
+    b = BoardBuilder()
+    a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+    b.supportMove(b.germany, UnitType.ARMY, "Munich", a_berlin, "Silesia")
+    b.move(b.russia, UnitType.ARMY, "Warsaw", "Silesia")
+    b.hold(b.russia, UnitType.ARMY, "Silesia")
+    b.fleet("Brest", b.france)
+    return b.board
+
+
+def _copy(board):
+    return restore_board_state(get_parser("classic").parse(), get_board_state(board))
+
+
+class TestAdjudicationExecutor(unittest.TestCase):
+    def test_state_round_trip(self):
+        board = _build_board()
+        self.assertEqual(get_board_state(_copy(board)), get_board_state(board))
+
+    def test_worker_matches_in_process_adjudication(self):
+        board = _build_board()
+        expected = MovesAdjudicator(_copy(board))
+        expected.save_orders = False
+        expected_state = get_board_state(expected.run())
+
+        state = get_board_state(board)
+        orders, diff = adjudicate_state(state)
+        result = AdjudicationResult(state, orders, diff).apply(board, save_orders=False)
+
+        self.assertEqual(get_board_state(result), expected_state)
+        self.assertIsNotNone(result.get_province("Silesia").dislodged_unit)
+        # NMRs are filled in and failures are reported back
+        self.assertEqual(orders[("Brest", None, False)][0], "NMR")
+        self.assertFalse(orders[("Berlin", None, False)][4])
+        self.assertTrue(orders[("Warsaw", None, False)][4])
+
+    def test_process_pool(self):
+        board = _build_board()
+        expected_state = get_board_state(_copy(board))
+        executor = AdjudicationExecutor(max_workers=1, timeout=120)
+        try:
+            result = asyncio.run(executor.adjudicate(board))
+        finally:
+            executor.shutdown()
+
+        # The board itself is only changed once the result is applied
+        self.assertEqual(get_board_state(board), expected_state)
+        result.apply(board, save_orders=False)
+        self.assertEqual(board.get_province("Silesia").unit.player.name, "Germany")
+
+
+class TestAdjudicationCache(unittest.TestCase):
+    def test_hash_ignores_insertion_order(self):
+        state = get_board_state(_build_board())
+        shuffled = dict(state)
+        for section in ["data", "players", "provinces", "units"]:
+            shuffled[section] = dict(reversed(list(state[section].items())))
+        self.assertEqual(hash_board_state(shuffled), hash_board_state(state))
+
+        other_variant = dict(state)
+        other_variant["board"] = state["board"][:3] + ("impdip",) + state["board"][4:]
+        self.assertNotEqual(hash_board_state(other_variant), hash_board_state(state))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = AdjudicationCache(2)
+        cache.put("a", {}, {})
+        cache.put("b", {}, {})
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("c", {}, {})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        self.assertEqual(cache.hit_rate, 0.75)
+
+    def test_repeated_adjudication_is_a_hit(self):
+        board = _build_board()
+        executor = AdjudicationExecutor(max_workers=0, timeout=120, cache_size=4)
+        try:
+            first = asyncio.run(executor.adjudicate(board))
+            second = asyncio.run(executor.adjudicate(board))
+            self.assertEqual((executor.cache.hits, executor.cache.misses), (1, 1))
+            self.assertEqual(second.new_state(), first.new_state())
+            self.assertEqual(second.orders, first.orders)
+
+            board.get_province("Warsaw").unit.order = Move(board.get_province("Galicia"))
+            third = asyncio.run(executor.adjudicate(board))
+            self.assertEqual(executor.cache.misses, 2)
+            self.assertNotEqual(third.orders, first.orders)
+        finally:
+            executor.shutdown()
+
+
+class TestWhatIf(unittest.TestCase):
+    def test_scenarios_match_adjudication(self):
+        board = _build_board()
+        before = get_board_state(board)
+        munich = board.get_province("Munich").unit
+        warsaw = board.get_province("Warsaw").unit
+        scenarios = [
+            {},
+            {munich: Hold()},
+            {warsaw: Move(board.get_province("Galicia"))},
+            {munich: Hold(), warsaw: None},
+        ]
+        outcomes = Manager().what_if(board.board_id, scenarios)
+
+        for scenario, outcome in zip(scenarios, outcomes):
+            state = get_board_state(board)
+            for key, order in make_overlay(scenario).items():
+                state["units"][key] = state["units"][key][:3] + (order,)
+            expected = MovesAdjudicator(restore_board_state(get_parser("classic").parse(), state))
+            expected.save_orders = False
+            expected.run()
+            for order in expected.orders:
+                key = (order.current_province.name, None, False)
+                self.assertEqual(outcome.resolutions[key], order.resolution, (scenario, key))
+
+        self.assertEqual(outcomes[0].dislodged, {("Silesia", None, False)})
+        self.assertEqual(outcomes[1].dislodged, set())
+        self.assertEqual(outcomes[1].resolutions[("Berlin", None, False)], Resolution.FAILS)
+        self.assertEqual(outcomes[3].dislodged, set())
+        # The board keeps its own orders
+        self.assertEqual(get_board_state(board), before)
+
+    def test_convoy_orders_are_not_shared_between_scenarios(self):
+        b = BoardBuilder()
+        a_london = b.move(b.england, UnitType.ARMY, "London", "Belgium")
+        f_north_sea = b.convoy(b.england, "North Sea", a_london, "Belgium")
+        what_if = WhatIf.from_board(b.board)
+        convoyed, held, convoyed_again = what_if.adjudicate_all([{}, make_overlay({f_north_sea: Hold()}), {}])
+        self.assertEqual(convoyed.resolutions[("London", None, False)], Resolution.SUCCEEDS)
+        self.assertEqual(held.resolutions[("London", None, False)], Resolution.FAILS)
+        self.assertEqual(convoyed_again.resolutions[("London", None, False)], Resolution.SUCCEEDS)
+
+    def test_process_pool_batches(self):
+        board = _build_board()
+        munich = board.get_province("Munich").unit
+        overlays = [make_overlay({munich: Hold()}) if i % 2 else {} for i in range(5)]
+        executor = AdjudicationExecutor(max_workers=2, timeout=120, what_if_batch=2)
+        try:
+            outcomes = asyncio.run(executor.what_if(board, overlays))
+        finally:
+            executor.shutdown()
+        self.assertEqual(outcomes, WhatIf.from_board(board).adjudicate_all(overlays))
+
+
+class TestSpeculation(unittest.TestCase):
+    def setUp(self):
+        b = BoardBuilder()
+        self.army = b.move(b.france, UnitType.ARMY, "Paris", "Burgundy")
+        b.move(b.germany, UnitType.ARMY, "Munich", "Burgundy")
+        self.manager = Manager()
+        self.manager._database.delete_board(b.board)
+        self.manager._database.save_board(0, b.board)
+        self.board = b.board
+
+    def test_locked_orders_are_adjudicated_ahead_of_time(self):
+        async def adjudicate():
+            self.manager.speculate(0)
+            return await self.manager.adjudicate_async(0, test=True)
+
+        new_board = asyncio.run(adjudicate())
+        self.assertIs(self.manager._speculated_maps[0][0], new_board)
+        self.assertTrue(new_board.turn.is_retreats())
+        self.assertIs(new_board.get_province("Paris").unit.player, new_board.get_player("France"))
+
+    def test_order_change_invalidates_speculation(self):
+        async def adjudicate():
+            self.manager.speculate(0)
+            self.army.order = Move(self.board.get_province("Picardy"))
+            self.manager._database.save_order_for_units(self.board, [self.army])
+            return await self.manager.adjudicate_async(0, test=True)
+
+        new_board = asyncio.run(adjudicate())
+        self.assertNotIn(0, self.manager._speculated_maps)
+        self.assertIs(new_board.get_province("Picardy").unit.player, new_board.get_player("France"))
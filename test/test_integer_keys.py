@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Move
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+# The tables that kept provinces and units by name, before 15-IntegerKeys.sql
+_NAMED_SCHEMA = """
+CREATE TABLE boards (board_id int, phase text, data_file text, fish int, name text, PRIMARY KEY (board_id, phase));
+CREATE TABLE players (board_id int, player_name text, color varchar(6), liege text, points int, discord_id text,
+    PRIMARY KEY (board_id, player_name));
+CREATE TABLE provinces (board_id int, phase text, province_name text, owner text, core text, half_core text,
+    PRIMARY KEY (board_id, phase, province_name));
+CREATE TABLE units (board_id int, phase text, location text, is_dislodged boolean, owner text, is_army boolean,
+    order_type text, order_destination text, order_source text, failed_order boolean,
+    PRIMARY KEY (board_id, phase, location, is_dislodged));
+CREATE TABLE retreat_options (board_id int, phase text, origin text, retreat_loc text,
+    PRIMARY KEY (board_id, phase, origin, retreat_loc),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
+    FOREIGN KEY (board_id, phase, origin) REFERENCES provinces (board_id, phase, province_name),
+    FOREIGN KEY (board_id, phase, retreat_loc) REFERENCES provinces (board_id, phase, province_name));
+CREATE TABLE builds (board_id int, phase text, player text, location text, is_build boolean, is_army boolean,
+    PRIMARY KEY (board_id, phase, player, location),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
+    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name));
+CREATE TABLE vassal_orders (board_id int, phase text, player text, target_player text, order_type text,
+    PRIMARY KEY (board_id, phase, player, target_player),
+    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player),
+    FOREIGN KEY (board_id, target_player) REFERENCES players (board_id, player));
+"""
+# Tables whose keys used to refer to provinces, which is a view now, or to players columns that don't exist
+_REFERRING_TABLES = ("retreat_options", "builds", "vassal_orders")
+
+
+class TestIntegerKeys(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, "test.sqlite")
+        self.database = _DatabaseConnection(self.db_file)
+
+        b = BoardBuilder()
+        a_berlin = b.army("Berlin", b.germany)
+        a_berlin.order = Move(b.board.get_province("Silesia"))
+        b.fleet("St. Petersburg sc", b.russia)
+        b.board.get_province("Warsaw").owner = b.russia
+        self.builder = b
+
+    def tearDown(self):
+        del self.database
+        self.directory.cleanup()
+
+    def _load(self, database: _DatabaseConnection, turn: Turn | None = None):
+        board = self.builder.board
+        loaded = database.get_board(0, turn or board.turn, board.fish, board.name, board.datafile)
+        assert loaded is not None
+        return loaded
+
+    def test_edits_by_name(self):
+        b = self.builder
+        self.database.save_board(0, b.board)
+        phase = b.board.turn.get_indexed_name()
+        self.database.execute_arbitrary_sql(
+            "UPDATE provinces SET owner=? WHERE board_id=0 and phase=? and province_name=?",
+            ("Germany", phase, "Warsaw"),
+        )
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+            (0, phase, "Kiel", False, "Germany", False),
+        )
+        self.database.execute_arbitrary_sql("DELETE FROM units WHERE board_id=0 and phase=? and owner=?",
+                                            (phase, "Russia"))
+
+        loaded = self._load(self.database)
+        self.assertEqual(loaded.get_province("Warsaw").owner.name, "Germany")
+        self.assertEqual(loaded.get_province("Kiel").unit.unit_type, UnitType.FLEET)
+        self.assertIsNone(loaded.get_province("St. Petersburg").unit)
+        self.assertEqual(
+            self.database._connection.execute(
+                "SELECT order_destination FROM units WHERE board_id=0 AND location='Berlin'"
+            ).fetchone(),
+            ("Silesia",),
+        )
+
+    def test_renamed_phase_keeps_its_rows(self):
+        board = self.builder.board
+        self.database.save_board(0, board)
+        renamed = Turn(board.turn.year, PhaseName.FALL_MOVES, board.turn.start_year)
+        self.database.execute_arbitrary_sql(
+            "UPDATE boards SET phase=? WHERE board_id=0 and phase=?",
+            (renamed.get_indexed_name(), board.turn.get_indexed_name()),
+        )
+        board.turn = renamed
+        self.assertEqual(get_board_state(self._load(self.database, renamed)), get_board_state(board))
+
+    def test_phase_ranges(self):
+        board = self.builder.board
+        for _ in range(6):
+            self.database.save_board(0, board)
+            board.turn = board.turn.get_next_turn()
+        (first, last), = self.database._connection.execute(
+            "SELECT MIN(ordinal), MAX(ordinal) FROM boards WHERE board_id=0"
+        ).fetchall()
+        phases = self.database._connection.execute(
+            "SELECT COUNT(*) FROM boards WHERE board_id=0 AND ordinal BETWEEN ? AND ?", (first + 1, last - 1)
+        ).fetchone()[0]
+        self.assertEqual(phases, 4)
+
+    def _assert_keys_refer_to_tables(self, connection: sqlite3.Connection):
+        for table in _REFERRING_TABLES:
+            # Raises a foreign key mismatch if a key refers to a view, or to columns that aren't unique
+            self.assertEqual(connection.execute(f"PRAGMA foreign_key_check({table})").fetchall(), [], table)
+
+    def test_keys_refer_to_tables(self):
+        self._assert_keys_refer_to_tables(self.database._connection)
+
+    def test_migrating_named_rows(self):
+        board = self.builder.board
+        self.database.save_board(0, board)
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+            (0, board.turn.get_indexed_name(), "Berlin", "Prussia"),
+        )
+        connection = self.database._connection
+        tables = {
+            "boards": "SELECT board_id, phase, data_file, fish, name FROM boards",
+            "players": "SELECT board_id, player_name, color, liege, points, discord_id FROM players",
+            "provinces": "SELECT board_id, phase, province_name, owner, core, half_core FROM provinces",
+            "units": "SELECT board_id, phase, location, is_dislodged, owner, is_army, order_type, order_destination, "
+                     "order_source, failed_order FROM units",
+            "retreat_options": "SELECT board_id, phase, origin, retreat_loc FROM retreat_options",
+        }
+        rows = {table: connection.execute(sql).fetchall() for table, sql in tables.items()}
+
+        old_file = os.path.join(self.directory.name, "old.sqlite")
+        old = sqlite3.connect(old_file)
+        old.executescript(_NAMED_SCHEMA)
+        for table, table_rows in rows.items():
+            placeholders = ", ".join("?" for _ in table_rows[0])
+            old.executemany(f"INSERT INTO {table} VALUES ({placeholders})", table_rows)
+        old.commit()
+        with self.assertRaises(RuntimeError):
+            _DatabaseConnection(old_file)
+
+        for migration in ("14-DeltaPhaseHistory.sql", "15-IntegerKeys.sql"):
+            with open(f"DiploGM/db/SQL/{migration}") as sql_file:
+                old.executescript(sql_file.read())
+        for table, sql in tables.items():
+            self.assertEqual(sorted(old.execute(sql).fetchall()), sorted(rows[table]), table)
+        self._assert_keys_refer_to_tables(old)
+        old.close()
+
+        migrated = _DatabaseConnection(old_file)
+        self.assertEqual(get_board_state(self._load(migrated)), get_board_state(board))
+        del migrated
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import time
+import unittest
+
+from DiploGM.db.async_database import AsyncDatabase
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.db.order_journal import OrderJournal
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Hold, Move
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+
+class TestOrderJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, "test.sqlite")
+        self.journal_directory = os.path.join(self.directory.name, "journal")
+        self.database = _DatabaseConnection(self.db_file)
+        self.async_database = AsyncDatabase(self.db_file, readers=1)
+
+        b = BoardBuilder()
+        self.a_berlin = b.hold(b.germany, UnitType.ARMY, "Berlin")
+        self.f_kiel = b.hold(b.germany, UnitType.FLEET, "Kiel")
+        self.database.save_board(0, b.board)
+        self.builder = b
+
+    def tearDown(self):
+        self.async_database.close()
+        del self.database
+        self.directory.cleanup()
+
+    def _journal(self, window: float = 60) -> OrderJournal:
+        return OrderJournal(self.async_database, self.journal_directory, window)
+
+    def _saved_units(self):
+        board = self.builder.board
+        loaded = self.database.get_board(0, board.turn, board.fish, board.name, board.datafile)
+        assert loaded is not None
+        return get_board_state(loaded)["units"]
+
+    def _segments(self) -> list[str]:
+        return os.listdir(self.journal_directory)
+
+    def test_resubmissions_are_coalesced(self):
+        journal = self._journal()
+        board = self.builder.board
+        for destination in ("Silesia", "Munich", "Prussia"):
+            self.a_berlin.order = Move(board.get_province(destination))
+            journal.record(board, [self.a_berlin])
+        journal.record(board, [self.f_kiel])
+        self.assertEqual(len(journal._pending), 2)
+
+        future = journal.flush()
+        assert future is not None
+        future.result()
+        self.assertEqual((journal.submissions, journal.flushes), (4, 1))
+        self.assertEqual(self._saved_units(), get_board_state(board)["units"])
+        self.assertEqual(self._segments(), [])
+
+    def test_flushes_after_window(self):
+        journal = self._journal(window=0.01)
+        self.a_berlin.order = Move(self.builder.board.get_province("Silesia"))
+        journal.record(self.builder.board, [self.a_berlin])
+        deadline = time.monotonic() + 5
+        while (journal.flushes == 0 or self._segments()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.async_database.flush()
+        self.assertEqual(self._saved_units(), get_board_state(self.builder.board)["units"])
+
+    def test_recovers_after_crash(self):
+        journal = self._journal()
+        board = self.builder.board
+        self.a_berlin.order = Move(board.get_province("Silesia"))
+        journal.record(board, [self.a_berlin])
+        self.f_kiel.order = Hold()
+        journal.record(board, [self.f_kiel])
+        # The crash cut off a submission that was never acknowledged
+        with open(os.path.join(self.journal_directory, self._segments()[0]), "a") as segment:
+            segment.write('[[0, "')
+
+        self.assertEqual(self._journal().recover(self.database), 2)
+        self.assertEqual(self._saved_units(), get_board_state(board)["units"])
+        self.assertEqual(self._segments(), [])
@@ -0,0 +1,138 @@
+import asyncio
+import unittest
+
+from DiploGM.adjudicator.adjudicator import make_adjudicator
+from DiploGM.events.base_listener import BaseListener
+from DiploGM.events.eventbus import EventBus
+from DiploGM.events.events import PhaseAdjudicated
+from DiploGM.manager import Manager
+from DiploGM.models.order import RetreatMove
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder, TemporaryDatabase
+
+PHASE_TABLES = ["boards", "provinces", "units", "retreat_options", "builds"]
+
+
+def _rows(manager: Manager, board_id: int, phase: str) -> dict[str, list]:
+    connection = manager._database._connection
+    rows = {
+        table: sorted(
+            connection.execute(f"SELECT * FROM {table} WHERE board_id=? AND phase=?", (board_id, phase)).fetchall(),
+            key=repr,
+        )
+        for table in PHASE_TABLES
+    }
+    rows["players"] = sorted(connection.execute("SELECT * FROM players WHERE board_id=?", (board_id,)).fetchall())
+    return rows
+
+
+def _full_save_rows(manager: Manager, board_id: int) -> dict[str, list]:
+    """The rows save_board writes for the current board, in place of the ones already saved."""
+    board = manager.get_board(board_id)
+    manager._database.delete_board(board)
+    manager._database.save_board(board_id, board)
+    return _rows(manager, board_id, board.turn.get_indexed_name())
+
+
+class _Recorder(BaseListener):
+    def __init__(self):
+        super().__init__(None)
+        self.events = []
+
+    def setup(self, bus):
+        self.bus = bus
+
+    def supports(self, event) -> bool:
+        return True
+
+    async def process(self, event):
+        self.events.append(event)
+
+
+class TestPhaseDelta(unittest.TestCase):
+    def setUp(self):
+        """
+            Germany: A Berlin - Silesia
+            Germany: A Munich Supports A Berlin - Silesia
+            Russia: A Warsaw - Silesia
+            Russia: A Silesia Holds
+            England: F North Sea - Norway
+            France: A Paris Holds
+        """
+        self.manager = TemporaryDatabase(self).manager
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.FALL_MOVES, b.board.turn.start_year)
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        b.supportMove(b.germany, UnitType.ARMY, "Munich", a_berlin, "Silesia")
+        b.move(b.russia, UnitType.ARMY, "Warsaw", "Silesia")
+        b.hold(b.russia, UnitType.ARMY, "Silesia")
+        b.move(b.england, UnitType.FLEET, "North Sea", "Norway")
+        b.hold(b.france, UnitType.ARMY, "Paris")
+        self.builder = b
+        self.manager._database.delete_board(b.board)
+        self.manager._database.save_board(0, b.board)
+
+    def test_moves_delta(self):
+        adjudicator = make_adjudicator(self.manager._get_board_to_adjudicate(0))
+        adjudicator.save_orders = False
+        _, delta = adjudicator.run_with_delta()
+
+        self.assertEqual(delta.moved_units, {
+            ("Berlin", None, False): ("Silesia", None, False),
+            ("North Sea", None, False): ("Norway", None, False),
+        })
+        self.assertEqual(list(delta.dislodged_units), [("Silesia", None, True)])
+        self.assertNotIn("Warsaw", [name for name, _ in delta.dislodged_units[("Silesia", None, True)]])
+        self.assertEqual(delta.removed_units, [])
+        self.assertEqual(delta.created_units, [])
+        self.assertEqual(delta.ownership_changes["Norway"], (None, "England"))
+        self.assertNotIn("Paris", delta.ownership_changes)
+        self.assertEqual(delta.vassal_changes, {})
+
+    def test_builds_delta(self):
+        b = self.builder
+        b.board.turn = b.board.turn.get_next_turn().get_next_turn()
+        self.assertTrue(b.board.turn.is_builds())
+        for unit in b.board.units:
+            unit.order = None
+        b.player_core(b.england, "Liverpool")
+        b.build(b.england, (UnitType.ARMY, "Liverpool"))
+        b.board.change_owner(b.board.get_province("Paris"), b.germany)
+        b.board.data["build_options"] = "anywhere"
+        _, delta = make_adjudicator(b.board).run_with_delta()
+        self.assertEqual(delta.created_units, [("Liverpool", None, False)])
+        self.assertEqual(delta.moved_units, {})
+
+    def test_only_changed_rows_are_written(self):
+        new_board = self.manager.adjudicate(0)
+        self.assertTrue(new_board.turn.is_retreats())
+        phase = new_board.turn.get_indexed_name()
+        saved = _rows(self.manager, 0, phase)
+        self.assertIn(("Silesia", 1), [(row[2], row[3]) for row in saved["units"]])
+        self.assertEqual(saved, _full_save_rows(self.manager, 0))
+
+        # Then the retreat, which also leaves Paris and Munich where they are
+        board = self.manager.get_board(0)
+        russian = board.get_province("Silesia").dislodged_unit
+        russian.order = RetreatMove(board.get_province("Galicia"))
+        self.manager._database.save_order_for_units(board, [russian])
+        new_board = self.manager.adjudicate(0)
+        self.assertIs(new_board.get_province("Galicia").unit.player, new_board.get_player("Russia"))
+        saved = _rows(self.manager, 0, new_board.turn.get_indexed_name())
+        self.assertEqual(saved, _full_save_rows(self.manager, 0))
+
+    def test_adjudication_is_published(self):
+        recorder = _Recorder()
+        bus = EventBus()
+        bus.subscribe(PhaseAdjudicated, recorder)
+        self.addCleanup(bus.unsubscribe, PhaseAdjudicated, recorder)
+
+        new_board = asyncio.run(self.manager.adjudicate_async(0))
+        event, = recorder.events
+        self.assertEqual(event.server_id, 0)
+        self.assertIs(event.board, new_board)
+        self.assertEqual(event.delta.moved_units[("Berlin", None, False)], ("Silesia", None, False))
+
+        asyncio.run(self.manager.adjudicate_async(0, test=True))
+        self.assertEqual(len(recorder.events), 1)
@@ -0,0 +1,99 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from DiploGM.db import database, phase_history
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.province import ProvinceType
+from test.utils import BoardBuilder
+
+PHASES = 12
+KEYFRAME_INTERVAL = 4
+
+
+class TestPhaseHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = _DatabaseConnection(os.path.join(self.directory.name, "test.sqlite"))
+        self.builder = BoardBuilder()
+        self.turns = []
+        self.states = []
+
+    def tearDown(self):
+        del self.database
+        self.directory.cleanup()
+
+    def _play(self):
+        """Saves PHASES phases in which a few provinces change hands and units come and go."""
+        b = self.builder
+        rng = random.Random(0)
+        players = sorted(b.board.players, key=lambda player: player.name)
+        land = sorted(
+            (province for province in b.board.provinces if province.type == ProvinceType.LAND),
+            key=lambda province: province.name,
+        )
+        with mock.patch.object(database, "DATABASE_KEYFRAME_INTERVAL", KEYFRAME_INTERVAL):
+            for _ in range(PHASES):
+                for province in rng.sample(land, 3):
+                    province.owner = rng.choice(players)
+                    if province.unit is None:
+                        b.army(province.name, rng.choice(players))
+                    else:
+                        b.board.delete_unit(province)
+                self.database.save_board(0, b.board)
+                self.turns.append(b.board.turn)
+                self.states.append(get_board_state(b.board))
+                b.board.turn = b.board.turn.get_next_turn()
+
+    def _load(self, index: int):
+        board = self.builder.board
+        loaded = self.database.get_board(0, self.turns[index], board.fish, board.name, board.datafile)
+        assert loaded is not None
+        return get_board_state(loaded)
+
+    def _count(self, sql: str) -> int:
+        return self.database._connection.execute(sql).fetchone()[0]
+
+    def test_past_phases_are_rebuilt(self):
+        self._play()
+        for index in range(PHASES):
+            self.assertEqual(self._load(index), self.states[index], str(self.turns[index]))
+
+        # The first phase and every fourth after it are keyframes; the current phase isn't compacted yet
+        self.assertEqual(self._count("SELECT COUNT(*) FROM phase_history"), PHASES - 1)
+        self.assertEqual(self._count("SELECT COUNT(*) FROM phase_history WHERE is_keyframe"), 3)
+        self.assertEqual(self._count("SELECT COUNT(DISTINCT phase) FROM provinces"), 4)
+        self.assertLess(self._count("SELECT COUNT(*) FROM province_deltas"), 3 * PHASES)
+
+    def test_rolling_back_expands_the_previous_phase(self):
+        self._play()
+        board = self.builder.board
+        board.turn = self.turns[-1]
+        self.database.delete_board(board)
+        previous = self.turns[-2].get_indexed_name()
+        self.assertEqual(
+            self._count(f"SELECT COUNT(*) FROM provinces WHERE phase='{previous}'"), len(board.provinces)
+        )
+        self.assertEqual(self._load(PHASES - 2), self.states[-2])
+        self.assertEqual(self._load(PHASES - 3), self.states[-3])
+
+        # Saving the next phase compacts it again
+        board.turn = self.turns[-1]
+        self.database.save_board(0, board)
+        self.assertEqual(self._load(PHASES - 2), self.states[-2])
+
+    def test_migrating_full_phases(self):
+        with mock.patch.object(phase_history, "compact_previous_phase"):
+            self._play()
+        self.assertEqual(self._count("SELECT COUNT(*) FROM phase_history"), 0)
+
+        connection: sqlite3.Connection = self.database._connection
+        compacted, as_deltas = phase_history.compact_database(connection, KEYFRAME_INTERVAL)
+        self.assertEqual((compacted, as_deltas), (PHASES - 1, PHASES - 1 - 3))
+        for index in range(PHASES):
+            self.assertEqual(self._load(index), self.states[index], str(self.turns[index]))
+        self.assertEqual(phase_history.compact_database(connection, KEYFRAME_INTERVAL), (0, 0))
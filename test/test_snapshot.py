@@ -0,0 +1,144 @@
+import unittest
+
+from DiploGM.manager import Manager
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Liege, Vassal
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+
+class TestBoardSnapshot(unittest.TestCase):
+    def setUp(self):
+        """
+            Germany: A Berlin - Silesia
+            Germany: A Munich Supports A Berlin - Silesia
+            Russia: A Silesia Holds
+            England: F North Sea - Norway
+        """
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.FALL_MOVES, b.board.turn.start_year)
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        b.supportMove(b.germany, UnitType.ARMY, "Munich", a_berlin, "Silesia")
+        b.hold(b.russia, UnitType.ARMY, "Silesia")
+        b.move(b.england, UnitType.FLEET, "North Sea", "Norway")
+        b.player_core(b.england, "Liverpool")
+        self.builder = b
+
+    def test_round_trip(self):
+        board = self.builder.board
+        board.get_province("Silesia").unit.order.hasFailed = True
+        restored = board.snapshot().restore(get_parser(board.datafile).parse())
+        self.assertEqual(get_board_state(restored), get_board_state(board))
+
+    def test_restore_in_place(self):
+        board = self.builder.board
+        before = get_board_state(board)
+        snapshot = board.snapshot()
+        board.change_owner(board.get_province("Norway"), self.builder.england)
+        board.delete_unit(board.get_province("Berlin"))
+        board.turn = board.turn.get_next_turn()
+        self.assertNotEqual(get_board_state(board), before)
+        board.restore(snapshot)
+        self.assertEqual(get_board_state(board), before)
+        self.assertEqual(snapshot.phase, board.turn.get_indexed_name())
+
+    def test_retreats_round_trip(self):
+        board = self.builder.board
+        silesia = board.get_province("Silesia")
+        retreating = silesia.unit
+        silesia.unit = None
+        silesia.dislodged_unit = retreating
+        retreating.retreat_options = {(board.get_province("Galicia"), None), (board.get_province("Warsaw"), None)}
+        restored = board.snapshot().restore(get_parser(board.datafile).parse())
+        self.assertEqual(get_board_state(restored), get_board_state(board))
+        self.assertIsNotNone(restored.get_province("Silesia").dislodged_unit)
+
+
+class TestRollbackHistory(unittest.TestCase):
+    def setUp(self):
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.FALL_MOVES, b.board.turn.start_year)
+        a_berlin = b.move(b.germany, UnitType.ARMY, "Berlin", "Silesia")
+        b.supportMove(b.germany, UnitType.ARMY, "Munich", a_berlin, "Silesia")
+        b.hold(b.russia, UnitType.ARMY, "Silesia")
+        self.manager = Manager()
+        self.manager._database.delete_board(b.board)
+        self.manager._database.save_board(0, b.board)
+        self.manager._boards[0] = self.manager._database.get_board(
+            0, b.board.turn, b.board.fish, b.board.name, b.board.datafile
+        )
+        self.manager._history.pop(0, None)
+
+    def tearDown(self):
+        self.manager._history.pop(0, None)
+
+    def test_rollback_uses_history(self):
+        before = self.manager.get_board(0)
+        self.manager.adjudicate(0)
+        self.assertEqual(len(self.manager._history[0]), 1)
+        from_database = self.manager._database.get_board(
+            0, before.turn, before.fish, before.name, before.datafile, clear_status=True
+        )
+
+        current = self.manager.get_board(0)
+        rolled_back = self.manager._rollback_from_history(current, current.turn.get_previous_turn())
+        assert rolled_back is not None
+        self.assertEqual(rolled_back.turn.get_indexed_name(), before.turn.get_indexed_name())
+        self.assertEqual(len(self.manager._history[0]), 0)
+        self.assertEqual(get_board_state(rolled_back), get_board_state(from_database))
+
+    def test_rollback_keeps_current_players(self):
+        b = BoardBuilder()
+        b.board.turn = Turn(b.board.turn.year, PhaseName.WINTER_BUILDS, b.board.turn.start_year)
+        b.player_core(b.germany, "Berlin", "Munich", "Kiel")
+        b.player_core(b.austria, "Vienna")
+        b.germany.vassal_orders[b.austria] = Vassal(b.austria)
+        b.austria.vassal_orders[b.germany] = Liege(b.germany)
+        database = self.manager._database
+        database.delete_board(b.board)
+        database.save_board(0, b.board)
+        database.save_build_orders_for_players(b.board, None)
+        database.execute_arbitrary_sql(
+            "INSERT OR REPLACE INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (0, ?, ?)",
+            ("vassals", "enabled"),
+        )
+        self.addCleanup(
+            database.execute_arbitrary_sql, "DELETE FROM board_parameters WHERE board_id=0 AND parameter_key=?",
+            ("vassals",),
+        )
+        self.manager._boards[0] = database.get_board(0, b.board.turn, b.board.fish, b.board.name, b.board.datafile)
+
+        self.manager.adjudicate(0)
+        current = self.manager.get_board(0)
+        self.assertEqual(current.get_player("Austria").liege, current.get_player("Germany"))
+        last_turn = current.turn.get_previous_turn()
+        from_database = database.get_board(0, last_turn, current.fish, current.name, current.datafile, clear_status=True)
+        from_history = self.manager._rollback_from_history(current, last_turn)
+        assert from_database is not None and from_history is not None
+
+        def players(board):
+            return {
+                player.name: (
+                    player.render_color, player.points, str(player.liege), sorted(map(str, player.vassals))
+                )
+                for player in board.players
+            }
+
+        self.assertEqual(players(from_history), players(from_database))
+        self.assertEqual(players(from_history), players(current))
+        self.assertEqual(get_board_state(from_history), get_board_state(from_database))
+
+    def test_test_adjudication_leaves_database(self):
+        board = self.manager.get_board(0)
+        connection = self.manager._database._connection
+        rows = connection.execute("SELECT * FROM units WHERE board_id=0 ORDER BY phase, location").fetchall()
+        new_board = self.manager.adjudicate(0, test=True)
+        self.assertIsNot(new_board, board)
+        self.assertIs(self.manager.get_board(0), board)
+        self.assertNotIn(0, self.manager._history)
+        self.assertEqual(
+            connection.execute("SELECT * FROM units WHERE board_id=0 ORDER BY phase, location").fetchall(), rows
+        )
+        self.assertIsNotNone(board.get_province("Berlin").unit)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import unittest
+
+from DiploGM.adjudicator.adjudicator import MovesAdjudicator
+from DiploGM.adjudicator.mapper import Mapper
+from DiploGM.manager import Manager
+from DiploGM.map_parser.vector import vector
+from DiploGM.map_parser.vector.synthetic import SyntheticVariant, SyntheticVariantOptions, generate_variant
+from DiploGM.map_parser.vector.vector import Parser, get_parser
+from DiploGM.models.board_state import get_board_state
+from DiploGM.models.order import Move
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+
+VARIANT = "synthetic_test"
+OPTIONS = SyntheticVariantOptions(provinces=400, players=5, unit_density=0.25, seed=3)
+
+
+class TestSyntheticVariant(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.synthetic = generate_variant(VARIANT, OPTIONS)
+
+    @classmethod
+    def tearDownClass(cls):
+        vector.parsers.pop(VARIANT, None)
+        shutil.rmtree(f"variants/{VARIANT}", ignore_errors=True)
+        for path in (f"assets/{VARIANT}_adjacencies.txt", f"assets/{VARIANT}_compiled.pickle"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_same_seed_same_variant(self):
+        again = SyntheticVariant(VARIANT, OPTIONS)
+        self.assertEqual(again.svg(), self.synthetic.svg())
+        self.assertEqual(again.config(), self.synthetic.config())
+        other = SyntheticVariant(VARIANT, SyntheticVariantOptions(provinces=400, players=5, seed=4))
+        self.assertNotEqual(other.adjacencies(), self.synthetic.adjacencies())
+
+    def test_parses(self):
+        board = get_parser(VARIANT).parse()
+        self.assertEqual(len(board.provinces), 400)
+        self.assertEqual(len(board.players), 5)
+        self.assertEqual(len(board.units), 100)
+        seas = sum(province.type == ProvinceType.SEA for province in board.provinces)
+        self.assertTrue(80 < seas < 160, seas)
+        for unit in board.units:
+            self.assertIn(unit.province, unit.player.centers)
+            if unit.unit_type == UnitType.FLEET:
+                self.assertTrue(unit.province.get_coastal_adjacent(unit.coast))
+
+        multi_coast = [province for province in board.provinces if province.get_multiple_coasts()]
+        self.assertTrue(multi_coast)
+        for province in multi_coast:
+            for coast in province.get_multiple_coasts():
+                for other, other_coast in province.get_coastal_adjacent(coast):
+                    # Fleet adjacencies go both ways
+                    self.assertIn((province, coast), other.get_coastal_adjacent(other_coast))
+
+    def test_adjacencies_match_svg(self):
+        parser = Parser(VARIANT)
+        parser._load_layers()
+        computed = parser._compute_adjacencies(parser._get_province_coordinates())
+        self.assertEqual({tuple(sorted(pair)) for pair in computed}, set(self.synthetic.adjacencies()))
+
+    def test_game(self):
+        manager = Manager()
+        manager.create_game(1, VARIANT)
+        try:
+            board = manager.get_board(1)
+            for unit in board.units:
+                destination = min(unit.province.adjacent, key=lambda province: province.name)
+                unit.order = Move(destination)
+            adjudicator = MovesAdjudicator(board)
+            adjudicator.save_orders = False
+            adjudicator.run()
+            Mapper(board).draw_current_map()
+        finally:
+            manager.total_delete(1)
+
+    def test_loads_from_database(self):
+        manager = Manager()
+        manager.create_game(1, VARIANT)
+        try:
+            board = manager.get_board(1)
+            # Coasts are saved as e.g. "Land 134 sc", which on larger maps is also the start of "Land 1341"
+            province = next(
+                province for province in sorted(board.provinces, key=lambda p: p.name)
+                if province.get_multiple_coasts() and province.unit is None
+            )
+            coast = sorted(province.get_multiple_coasts())[0]
+            board.create_unit(UnitType.FLEET, next(iter(board.players)), province, coast, None)
+            manager._database.delete_board(board)
+            manager._database.save_board(1, board)
+
+            loaded = manager._database.get_board(1, board.turn, board.fish, board.name, board.datafile)
+            assert loaded is not None
+            self.assertEqual(get_board_state(loaded), get_board_state(board))
+        finally:
+            manager.total_delete(1)
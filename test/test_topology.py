@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from test.utils import BoardBuilder
+from DiploGM.map_parser.vector.vector import Parser
+from DiploGM.models.unit import UnitType
+
+
+class TestTopology(unittest.TestCase):
+    def test_boards_share_topology(self):
+        """
+            Two boards of the same variant should share static province data,
+            while adjacencies point at provinces of their own board.
+        """
+        board_a = BoardBuilder().board
+        board_b = BoardBuilder().board
+        paris_a = board_a.get_province("Paris")
+        paris_b = board_b.get_province("Paris")
+
+        self.assertIsNot(paris_a, paris_b)
+        self.assertIs(paris_a.topology, paris_b.topology)
+        self.assertIn(board_a.get_province("Picardy"), paris_a.adjacent)
+        self.assertNotIn(board_b.get_province("Picardy"), paris_a.adjacent)
+
+    def test_boards_have_independent_state(self):
+        """
+            Changing owners or units on one board shouldn't affect a fresh board.
+        """
+        board_a = BoardBuilder().board
+        board_b = BoardBuilder().board
+        germany_a = board_a.get_player("Germany")
+
+        board_a.get_province("Holland").owner = germany_a
+        board_a.create_unit(UnitType.ARMY, germany_a, board_a.get_province("Holland"), None, None)
+
+        holland_b = board_b.get_province("Holland")
+        self.assertIsNone(holland_b.owner)
+        self.assertIsNone(holland_b.unit)
+        self.assertEqual(len(board_a.units), len(board_b.units) + 1)
+
+    def test_compiled_topology_round_trip(self):
+        """
+            A compiled topology should load back as the same map graph.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            compiled_file = os.path.join(directory, "classic_compiled.pickle")
+            # Built from the variant itself, whatever compiled variant is left in assets/
+            parser = Parser("classic")
+            parser.compiled_file = compiled_file
+            parser.topology = None
+            parser.parse()
+            topology = parser.topology
+
+            other = Parser("classic")
+            other.compiled_file = compiled_file
+            loaded = other._load_compiled()
+        assert topology is not None and loaded is not None
+
+        self.assertIsNot(topology, loaded)
+        self.assertEqual(topology.provinces.keys(), loaded.provinces.keys())
+        for name, province in topology.provinces.items():
+            other = loaded.provinces[name]
+            self.assertEqual({p.name for p in province.adjacent}, {p.name for p in other.adjacent})
+            if isinstance(province.fleet_adjacent, dict):
+                self.assertEqual(province.fleet_adjacent.keys(), other.fleet_adjacent.keys())
+                for coast in province.fleet_adjacent:
+                    self.assertEqual({(p.name, c) for p, c in province.fleet_adjacent[coast]},
+                                     {(p.name, c) for p, c in other.fleet_adjacent[coast]})
+            else:
+                self.assertEqual({(p.name, c) for p, c in province.fleet_adjacent},
+                                 {(p.name, c) for p, c in other.fleet_adjacent})
+        self.assertEqual(len(topology.create_board().units), len(loaded.create_board().units))
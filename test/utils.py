@@ -15,8 +15,45 @@ from DiploGM.models.unit import UnitType, Unit
 from DiploGM.models.player import Player
 from DiploGM.models.turn import Turn
 from DiploGM.adjudicator.adjudicator import MovesAdjudicator, RetreatsAdjudicator, BuildsAdjudicator, ResolutionState, Resolution
+from DiploGM.db import database
+from DiploGM.db.async_database import AsyncDatabase
+from DiploGM.db.order_journal import OrderJournal
+from DiploGM.utils import SingletonMeta
 
+import os
+import tempfile
 import unittest
+from unittest import mock
+
+
+class TemporaryDatabase:
+    """Puts a database and order journal in a temporary directory in place of bot_db.sqlite and order_journal/ for
+    the rest of a test, along with a Manager (and so BoardBuilder games) that uses them."""
+
+    def __init__(self, test: unittest.TestCase):
+        directory = tempfile.TemporaryDirectory()
+        test.addCleanup(directory.cleanup)
+        self.db_file = os.path.join(directory.name, "bot_db.sqlite")
+        self.connection = database._DatabaseConnection(self.db_file)
+        self.async_connection = AsyncDatabase(self.db_file, readers=1)
+        self.journal = OrderJournal(self.async_connection, os.path.join(directory.name, "order_journal"))
+        patches = [
+            mock.patch.object(database, "_db_class", self.connection),
+            mock.patch.object(database, "_async_db", self.async_connection),
+            mock.patch.object(database, "_order_journal", self.journal),
+        ]
+        for patch in patches:
+            patch.start()
+            test.addCleanup(patch.stop)
+        # Cleanups run last first: this closes the journal and its writer before the patches are undone
+        test.addCleanup(database.close_async_connection)
+
+        self.manager = Manager(force_new=True)
+        test.addCleanup(self.manager._executor.shutdown)
+        manager_patch = mock.patch.dict(SingletonMeta._instances, {Manager: self.manager})
+        manager_patch.start()
+        test.addCleanup(manager_patch.stop)
+
 
 # Allows for specifying units, uses the classic diplomacy board as that is used by DATC 
 # Only implements the subset of adjacencies necessary to run the DATC tests as of now
@@ -253,8 +290,7 @@ class BoardBuilder():
         for order in adj.orders:
             order.state = ResolutionState.UNRESOLVED
 
-        for order in adj.orders:
-            adj._resolve_order(order)
+        adj.resolve_all()
 
         # for order in adj.orders:
         #     print(order)